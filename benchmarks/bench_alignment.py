@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+'''Benchmark the coarse-to-fine alignment (`dup_finder.coarse_to_fine_alignment`)
+against the exhaustive one (`dup_finder.best_alignment`) on the synthetic
+corpus the tests use (`tests/alignment_corpus.py`), reporting throughput
+and how many of the exhaustive search's matches it finds:
+
+    python benchmarks/bench_alignment.py [--pairs-per-kind 100] [--length 600 6000]
+
+Pure NumPy - needs the package installed (or `PYTHONPATH=src`), not ffmpeg.
+'''
+
+# System imports
+import argparse
+import os
+import sys
+import time
+
+# Local imports
+from video_processing_utils import dup_finder
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tests'))
+import alignment_corpus  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pairs-per-kind', type=int, default=100,
+                        help="Pairs of each kind (default: %(default)s)")
+    parser.add_argument('--length', type=int, nargs=2, default=(600, 6000), metavar=('MIN', 'MAX'),
+                        help="Sequence length range, in samples (default: 600 6000)")
+    parser.add_argument('--min-overlap', type=float, default=0.5,
+                        help="Minimum overlap fraction (default: %(default)s)")
+    parser.add_argument('--threshold', type=float, default=dup_finder.DEFAULT_SEQUENCE_THRESHOLD,
+                        help="Match threshold (default: %(default)s)")
+    args = parser.parse_args()
+
+    pairs = alignment_corpus.corpus(0, args.pairs_per_kind, tuple(args.length))
+
+    start = time.perf_counter()
+    exhaustive = [dup_finder.best_alignment(a, b, args.min_overlap) for _, a, b, _ in pairs]
+    exhaustive_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    coarse = [
+        dup_finder.coarse_to_fine_alignment(a, b, args.min_overlap, max_distance=args.threshold)
+        for _, a, b, _ in pairs
+    ]
+    coarse_seconds = time.perf_counter() - start
+
+    matches = [i for i, result in enumerate(exhaustive) if result[1] <= args.threshold]
+    found = [
+        i for i in matches
+        if coarse[i] is not None and coarse[i][0] == exhaustive[i][0] and coarse[i][1] <= args.threshold
+    ]
+    extra = [
+        i for i, result in enumerate(coarse)
+        if result is not None and result[1] <= args.threshold and i not in matches
+    ]
+
+    print(f"{len(pairs)} pairs, {len(matches)} exhaustive matches")
+    print(f"  coarse-to-fine found {len(found)}/{len(matches)} at the same offset, " +
+          f"{len(extra)} extra")
+    print(f"  best_alignment:           {len(pairs) / exhaustive_seconds:8.1f} pairs/s")
+    print(f"  coarse_to_fine_alignment: {len(pairs) / coarse_seconds:8.1f} pairs/s " +
+          f"({exhaustive_seconds / coarse_seconds:.1f}x faster)")
+
+
+if __name__ == '__main__':
+    main()
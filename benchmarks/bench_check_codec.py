@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+'''Benchmark `check_codec`'s container header fast path against ffprobe.
+
+Times `container_probe.read_video_codecs` and an uncached `codec` profile
+ffprobe run on the same files. Without file arguments, short MP4 and
+Matroska clips are generated first:
+
+    python benchmarks/bench_check_codec.py [FILE ...]
+
+Needs the ffmpeg and ffprobe executables, and the package installed (or
+`PYTHONPATH=src`).
+'''
+
+# System imports
+import argparse
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Local imports
+from video_processing_utils import container_probe, ffmpeg_utils
+
+
+def make_clips(directory: str) -> list[str]:
+    """Write the same 10 s clip as MP4 and Matroska into `directory`,
+    H.264 if ffmpeg has libx264 (so the MP4 is answerable from its
+    headers), otherwise MPEG-4 Part 2."""
+    clips = []
+    for vcodec in ('libx264', 'mpeg4'):
+        for extension in ('mp4', 'mkv'):
+            output = f'{directory}/clip.{extension}'
+            process = subprocess.run([
+                'ffmpeg', '-v', 'error', '-y',
+                '-f', 'lavfi', '-i', 'testsrc2=size=320x240:rate=25:duration=10',
+                '-f', 'lavfi', '-i', 'sine=duration=10',
+                '-c:v', vcodec, '-c:a', 'aac', output,
+            ], check=False)
+            if process.returncode == 0:
+                clips.append(output)
+        if clips:
+            return clips
+    sys.exit("ffmpeg couldn't encode the test clips")
+
+
+def median_ms(func, repeats: int) -> float:
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return 1000 * statistics.median(times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('files', nargs='*', help="Files to check (default: generated clips)")
+    parser.add_argument('--repeats', type=int, default=50,
+                        help="Runs per file and method, the median is reported (default: %(default)s)")
+    args = parser.parse_args()
+
+    if shutil.which('ffmpeg') is None or shutil.which('ffprobe') is None:
+        sys.exit("ffmpeg and ffprobe are needed on the path")
+    ffmpeg_utils.configure_probe_cache(enabled=False)
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        files = args.files or make_clips(work_dir)
+        print(f"{'file':<40} {'headers ms':>11} {'ffprobe ms':>11}  header answer")
+        for filename in files:
+            header_ms = median_ms(lambda: container_probe.read_video_codecs(filename), args.repeats)
+            ffprobe_ms = median_ms(
+                lambda: ffmpeg_utils.fetch_file_data(filename, profile='codec'), args.repeats,
+            )
+            answer = container_probe.read_video_codecs(filename)
+            print(
+                f"{filename[-40:]:<40} {header_ms:11.3f} {ffprobe_ms:11.2f}  " +
+                f"{answer if answer is not None else 'needs ffprobe'}"
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+'''Benchmark keyframe-only frame sampling against fps sampling
+(`dup_finder.compute_frame_hash_sequence`): hashing time per file and the
+best-alignment distance each mode gives a pair of encodes of the same
+content.
+
+Without arguments, two encodes of a generated clip with `--gops` keyframe
+intervals are compared; pass pairs of real files as A B [A B ...] to see
+the distance shift on actual content:
+
+    python benchmarks/bench_keyframe_sampling.py [--interval 5] [--gops 50 250] [A B ...]
+
+Needs the ffmpeg executable, and the package installed (or
+`PYTHONPATH=src`).
+'''
+
+# System imports
+import argparse
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+# Local imports
+from video_processing_utils import dup_finder
+
+
+def make_encodes(directory: str, gops: list[int], duration: int) -> list[str]:
+    """Encode the same 25 fps test clip once per keyframe interval."""
+    outputs = []
+    for gop in gops:
+        output = f'{directory}/gop{gop}.mkv'
+        subprocess.run([
+            'ffmpeg', '-v', 'error', '-y',
+            '-f', 'lavfi', '-i', f'testsrc2=size=640x360:rate=25:duration={duration}',
+            '-c:v', 'mpeg4', '-q:v', '4', '-g', str(gop), '-pix_fmt', 'yuv420p', output,
+        ], check=True)
+        outputs.append(output)
+    return outputs
+
+
+def bench_pair(file_a: str, file_b: str, interval: float) -> None:
+    print(f"{file_a} vs {file_b}")
+    print(f"  {'sampling':<9} {'hash s (A)':>10} {'hash s (B)':>10} {'distance':>9} {'offset':>7}")
+    for sampling in dup_finder.SAMPLING_MODES:
+        sequences, seconds = [], []
+        for filename in (file_a, file_b):
+            start = time.perf_counter()
+            sequences.append(dup_finder.compute_frame_hash_sequence(
+                filename, interval, sampling=sampling,
+            ))
+            seconds.append(time.perf_counter() - start)
+        alignment = dup_finder.best_alignment(*sequences, 0.5)
+        offset, distance = (alignment[0], f'{alignment[1]:.2f}') if alignment else ('-', '-')
+        print(f"  {sampling:<9} {seconds[0]:10.2f} {seconds[1]:10.2f} {distance:>9} {offset:>7}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('files', nargs='*', help="Pairs of files to compare (default: generated)")
+    parser.add_argument('--interval', type=float, default=5.0,
+                        help="Sample interval in seconds (default: %(default)s)")
+    parser.add_argument('--gops', type=int, nargs=2, default=[50, 250],
+                        help="Keyframe intervals of the generated encodes, in frames " +
+                             "(default: 50 250)")
+    parser.add_argument('--duration', type=int, default=300,
+                        help="Length of the generated clip in seconds (default: %(default)s)")
+    args = parser.parse_args()
+
+    if len(args.files) % 2:
+        parser.error("files come in pairs")
+    if shutil.which('ffmpeg') is None:
+        sys.exit("ffmpeg is needed on the path")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        files = args.files or make_encodes(work_dir, args.gops, args.duration)
+        for file_a, file_b in zip(files[::2], files[1::2]):
+            bench_pair(file_a, file_b, args.interval)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+'''Benchmark holding probe results as `media_info.MediaInfo` vs raw dicts.
+
+Measures, with `tracemalloc`, the memory retained by `--files` parsed
+ffprobe outputs kept as the nested dicts `json.loads` returns, and by the
+same outputs converted with `MediaInfo.from_probe` (the dicts dropped),
+plus the conversion time. Without file arguments each output is a
+synthetic but typical full-profile probe of a Matroska file (video, two
+audio tracks, two subtitle tracks, cover art); with FILE arguments their
+real ffprobe outputs are cycled through instead:
+
+    python benchmarks/bench_media_info.py [--files 10000] [FILE ...]
+
+FILE arguments need the ffprobe executable; both need the package
+installed (or `PYTHONPATH=src`).
+'''
+
+# System imports
+import argparse
+import json
+import time
+import tracemalloc
+
+# Local imports
+from video_processing_utils import ffmpeg_utils
+from video_processing_utils.media_info import MediaInfo
+
+
+def stream(index: int, codec_type: str, codec_name: str, **fields) -> dict:
+    """An ffprobe stream entry with the fields it reports for every stream."""
+    entry = {
+        'index': index, 'codec_name': codec_name, 'codec_long_name': codec_name.upper(),
+        'codec_type': codec_type, 'codec_tag_string': '[0][0][0][0]', 'codec_tag': '0x0000',
+        'r_frame_rate': '0/0', 'avg_frame_rate': '0/0', 'time_base': '1/1000',
+        'start_pts': 0, 'start_time': '0.000000', 'extradata_size': 42,
+        'disposition': {
+            key: 0 for key in (
+                'default', 'dub', 'original', 'comment', 'lyrics', 'karaoke', 'forced',
+                'hearing_impaired', 'visual_impaired', 'clean_effects', 'attached_pic',
+                'timed_thumbnails', 'non_diegetic', 'captions', 'descriptions',
+                'metadata', 'dependent', 'still_image',
+            )
+        },
+        'tags': {
+            'language': 'eng', 'BPS': '1234567', 'DURATION': '00:42:17.123000000',
+            'NUMBER_OF_FRAMES': '60831', 'NUMBER_OF_BYTES': '391538216',
+            '_STATISTICS_WRITING_APP': 'mkvmerge v81.0',
+            '_STATISTICS_TAGS': 'BPS DURATION NUMBER_OF_FRAMES NUMBER_OF_BYTES',
+        },
+    }
+    entry.update(fields)
+    return entry
+
+
+def synthetic_probe(n: int) -> str:
+    """ffprobe JSON for the `n`-th synthetic file (values vary per file, as
+    they would across a library, so nothing is shared between outputs)."""
+    video = stream(
+        0, 'video', 'hevc', profile='Main 10', width=1920, height=1080 - n % 2,
+        coded_width=1920, coded_height=1080, closed_captions=0, film_grain=0,
+        has_b_frames=2, sample_aspect_ratio='1:1', display_aspect_ratio='16:9',
+        pix_fmt='yuv420p10le', level=120, color_range='tv', chroma_location='left',
+        refs=1, r_frame_rate='24000/1001', avg_frame_rate='24000/1001',
+    )
+    audio = [
+        stream(index, 'audio', codec, sample_fmt='fltp', sample_rate='48000', channels=6,
+               channel_layout='5.1(side)', bits_per_sample=0, initial_padding=312)
+        for index, codec in ((1, 'eac3'), (2, 'aac'))
+    ]
+    subtitles = [stream(index, 'subtitle', 'subrip') for index in (3, 4)]
+    cover = stream(5, 'video', 'mjpeg', width=600, height=900, pix_fmt='yuvj420p')
+    cover['disposition']['attached_pic'] = 1
+    return json.dumps({
+        'streams': [video] + audio + subtitles + [cover],
+        'format': {
+            'filename': f'/library/Series/Season 01/Episode {n:05}.mkv',
+            'nb_streams': 6, 'nb_programs': 0, 'format_name': 'matroska,webm',
+            'format_long_name': 'Matroska / WebM', 'start_time': '0.000000',
+            'duration': f'{2537.123 + n:.6f}', 'size': str(1_500_000_000 + n),
+            'bit_rate': '4730000', 'probe_score': 100,
+            'tags': {'title': f'Episode {n}', 'ENCODER': 'Lavf61.1.100'},
+        },
+    })
+
+
+def retained(build) -> tuple[object, int]:
+    """Call `build`, returning its result and the bytes it left allocated."""
+    tracemalloc.start()
+    result = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--files', type=int, default=10_000,
+                        help="Probe results to hold (default: %(default)s)")
+    parser.add_argument('filenames', nargs='*', metavar='FILE',
+                        help="Real files whose full probes to use instead of synthetic ones")
+    args = parser.parse_args()
+
+    if args.filenames:
+        real = [
+            json.dumps(ffmpeg_utils.fetch_file_data(filename, profile='full'))
+            for filename in args.filenames
+        ]
+        outputs = [real[n % len(real)] for n in range(args.files)]
+    else:
+        outputs = [synthetic_probe(n) for n in range(args.files)]
+
+    probes, dict_bytes = retained(lambda: [json.loads(output) for output in outputs])
+    del probes
+
+    start = time.perf_counter()
+    infos, info_bytes = retained(lambda: [
+        MediaInfo.from_probe(f'{n}.mkv', json.loads(output)) for n, output in enumerate(outputs)
+    ])
+    seconds = time.perf_counter() - start
+    del infos
+
+    print(f"{args.files} probe results held:")
+    print(f"  {'as':<10} {'total MiB':>10} {'bytes/file':>11}")
+    for name, size in (('dicts', dict_bytes), ('MediaInfo', info_bytes)):
+        print(f"  {name:<10} {size / 2 ** 20:10.2f} {size // args.files:11}")
+    print(f"  {info_bytes / dict_bytes:.1%} of the dicts' memory; " +
+          f"from_probe (with json.loads) {1e6 * seconds / args.files:.1f} us/file " +
+          "(tracemalloc overhead included)")
+
+
+if __name__ == '__main__':
+    main()
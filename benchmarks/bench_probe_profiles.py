@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+'''Benchmark the ffprobe profiles (`ffmpeg_utils.PROBE_PROFILES`).
+
+For each profile, times the ffprobe run (spawn plus output) and the
+`json.loads` of its output separately, and reports the JSON size. The probe
+cache is bypassed. Without file arguments a clip with `--chapters` chapters
+is generated first, as chapter-heavy files are where `full` costs the most:
+
+    python benchmarks/bench_probe_profiles.py [--chapters 500] [FILE ...]
+
+Needs the ffmpeg and ffprobe executables, and the package installed (or
+`PYTHONPATH=src`).
+'''
+
+# System imports
+import argparse
+import json
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# External imports
+import ffmpeg
+
+# Local imports
+from video_processing_utils import ffmpeg_utils
+
+
+def make_chaptered_clip(directory: str, chapters: int) -> str:
+    """Write a 60 s test clip with `chapters` chapters into `directory`."""
+    metadata = f'{directory}/chapters.ffmetadata'
+    with open(metadata, 'w', encoding='utf-8') as fp:
+        fp.write(';FFMETADATA1\n')
+        step_ms = 60_000 // chapters
+        for chapter in range(chapters):
+            fp.write(
+                f'[CHAPTER]\nTIMEBASE=1/1000\nSTART={chapter * step_ms}\n' +
+                f'END={(chapter + 1) * step_ms}\ntitle=Chapter {chapter + 1}\n'
+            )
+    output = f'{directory}/chapters.mkv'
+    subprocess.run([
+        'ffmpeg', '-v', 'error', '-y',
+        '-f', 'lavfi', '-i', 'testsrc2=size=320x240:rate=25:duration=60',
+        '-f', 'lavfi', '-i', 'sine=duration=60',
+        '-f', 'ffmetadata', '-i', metadata, '-map_chapters', '2',
+        '-map', '0:v', '-map', '1:a', '-c:v', 'mpeg4', '-c:a', 'aac', output,
+    ], check=True)
+    return output
+
+
+def bench_file(filename: str, repeats: int) -> None:
+    print(f"{filename}")
+    print(f"  {'profile':<10} {'probe ms':>9} {'parse ms':>9} {'JSON bytes':>11}")
+    for profile in ffmpeg_utils.PROBE_PROFILES:
+        cmd = ffmpeg_utils._ffprobe_command(ffmpeg.FFmpeg, filename, profile)
+        probe_times, parse_times = [], []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            output = cmd.execute()
+            probe_times.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            json.loads(output)
+            parse_times.append(time.perf_counter() - start)
+        print(
+            f"  {profile:<10} {1000 * statistics.median(probe_times):9.2f} " +
+            f"{1000 * statistics.median(parse_times):9.3f} {len(output):11}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('files', nargs='*', help="Files to probe (default: a generated clip)")
+    parser.add_argument('--chapters', type=int, default=500,
+                        help="Chapters in the generated clip (default: %(default)s)")
+    parser.add_argument('--repeats', type=int, default=20,
+                        help="Probes per profile, the median is reported (default: %(default)s)")
+    args = parser.parse_args()
+
+    if shutil.which('ffmpeg') is None or shutil.which('ffprobe') is None:
+        sys.exit("ffmpeg and ffprobe are needed on the path")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        files = args.files or [make_chaptered_clip(work_dir, args.chapters)]
+        for filename in files:
+            bench_file(filename, args.repeats)
+
+
+if __name__ == '__main__':
+    main()
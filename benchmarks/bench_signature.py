@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+'''Benchmark the 'signature' engine against 'dhash' (`dup_finder.ENGINES`).
+
+Alignment speed: aligns synthetic matching and unrelated pairs (from
+`tests/alignment_corpus.py`) as 1-word dHash sequences and as
+`video_signature.SIGNATURE_WORDS`-word signature rows - pure NumPy.
+
+Recall, with `--media`: hashes pairs of files with both engines and
+reports each pair's best-alignment distance against the engine's
+threshold, plus hashing time. Without file arguments, a generated clip is
+paired with a smaller, lower-quality re-encode of itself (a match) and
+with an unrelated clip; pass pairs of real files as A B [A B ...] instead:
+
+    python benchmarks/bench_signature.py [--length 1440] [--media [A B ...]]
+
+The recall part needs the ffmpeg executable; both need the package
+installed (or `PYTHONPATH=src`).
+'''
+
+# System imports
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+# External imports
+import numpy
+
+# Local imports
+from video_processing_utils import dup_finder, video_signature
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tests'))
+import alignment_corpus  # noqa: E402
+
+
+def bench_alignment(length: int, pairs: int, min_overlap: float) -> None:
+    print(f"Aligning {pairs} pair(s) of {length}-sample sequences, ms per pair:")
+    print(f"  {'engine':<10} {'words':>5} {'match':>8} {'unrelated':>10}")
+    for engine, words in (('dhash', None), ('signature', video_signature.SIGNATURE_WORDS)):
+        rng = numpy.random.default_rng(25)
+        timings = []
+        for kind in ('intro', 'unrelated'):
+            sequences = [alignment_corpus.make_pair(rng, kind, length, words)[:2] for _ in range(pairs)]
+            start = time.perf_counter()
+            for seq_a, seq_b in sequences:
+                dup_finder.best_alignment(seq_a, seq_b, min_overlap)
+            timings.append(1000 * (time.perf_counter() - start) / pairs)
+        print(f"  {engine:<10} {words or 1:5} {timings[0]:8.2f} {timings[1]:10.2f}")
+
+
+def make_media(directory: str) -> list[str]:
+    """(original, re-encode) and (original, unrelated) clips."""
+    def encode(name: str, source: str, *options: str) -> str:
+        output = f'{directory}/{name}'
+        subprocess.run([
+            'ffmpeg', '-v', 'error', '-y', '-f', 'lavfi', '-i', source,
+            '-c:v', 'mpeg4', *options, '-pix_fmt', 'yuv420p', output,
+        ], check=True)
+        return output
+
+    original = encode('original.mkv', 'testsrc2=size=640x360:rate=25:duration=120', '-q:v', '2')
+    reencode = encode('reencode.mkv', 'testsrc2=size=640x360:rate=25:duration=120',
+                      '-q:v', '12', '-vf', 'scale=320:180', '-g', '250')
+    unrelated = encode('unrelated.mkv', 'mandelbrot=size=640x360:rate=25', '-t', '120', '-q:v', '2')
+    return [original, reencode, original, unrelated]
+
+
+def bench_recall(files: list[str], interval: float, min_overlap: float) -> None:
+    print(f"Hashing every {interval} s; distance / engine threshold (<= 1 is a match):")
+    print(f"  {'engine':<10} {'hash s':>7} {'distance':>9} {'/ thresh':>9}  pair")
+    for file_a, file_b in zip(files[::2], files[1::2]):
+        for engine in dup_finder.ENGINES:
+            start = time.perf_counter()
+            sequences = [
+                dup_finder.compute_frame_hash_sequence(filename, interval, engine=engine)
+                for filename in (file_a, file_b)
+            ]
+            seconds = time.perf_counter() - start
+            _, distance, _ = dup_finder.best_alignment(*sequences, min_overlap)
+            threshold = dup_finder.engine_threshold(engine)
+            print(f"  {engine:<10} {seconds:7.2f} {distance:9.2f} {distance / threshold:9.2f}  " +
+                  f"{os.path.basename(file_a)} vs {os.path.basename(file_b)}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--length', type=int, default=1440,
+                        help="Samples per synthetic sequence (default: %(default)s)")
+    parser.add_argument('--pairs', type=int, default=20,
+                        help="Synthetic pairs of each kind (default: %(default)s)")
+    parser.add_argument('--min-overlap', type=float, default=0.5,
+                        help="Minimum overlap fraction (default: %(default)s)")
+    parser.add_argument('--interval', type=float, default=2.0,
+                        help="Sample interval for --media, in seconds (default: %(default)s)")
+    parser.add_argument('--media', nargs='*', metavar='FILE',
+                        help="Also compare recall on media: pairs of files, or generated clips")
+    args = parser.parse_args()
+
+    if args.media is not None:
+        if len(args.media) % 2:
+            parser.error("--media files come in pairs")
+        if shutil.which('ffmpeg') is None:
+            sys.exit("ffmpeg is needed on the path for --media")
+
+    bench_alignment(args.length, args.pairs, args.min_overlap)
+
+    if args.media is None:
+        return
+    with tempfile.TemporaryDirectory() as work_dir:
+        bench_recall(args.media or make_media(work_dir), args.interval, args.min_overlap)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,31 @@
 '''Main module init'''
 
+# System imports
+import importlib
+
 __version__ = "0.0.21"
 
-from .ffmpeg_utils import concat_ffmpeg_demuxer, \
-    fetch_file_metadata, \
-    fetch_file_data
+# Convenience re-exports, resolved on first access (PEP 562) rather than at
+# import time: ffmpeg_utils pulls in python-ffmpeg (and through it asyncio),
+# which entry points like vucheck and vuembedsub never use but would
+# otherwise pay for on every start.
+_LAZY_EXPORTS = {
+    'concat_ffmpeg_demuxer': 'ffmpeg_utils',
+    'fetch_file_metadata': 'ffmpeg_utils',
+    'fetch_file_data': 'ffmpeg_utils',
+    'async_concat_ffmpeg_demuxer': 'ffmpeg_utils',
+    'async_fetch_file_data': 'ffmpeg_utils',
+}
+
+
+def __getattr__(name: str):
+    if name not in _LAZY_EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(f".{_LAZY_EXPORTS[name]}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(_LAZY_EXPORTS))
@@ -0,0 +1,161 @@
+'''Audio fingerprints for vudupcheck's audio prefilter.
+
+Decoding a file's audio to low-rate mono PCM costs a small fraction of
+decoding its video, and two encodes of the same content carry (nearly) the
+same soundtrack - so comparing audio first lets `dup_finder` skip the video
+hashing of files whose every duration-close partner sounds different.
+
+The fingerprint is the classic spectral-band-energy one (Haitsma & Kalker):
+the audio is cut into overlapping windows every `HOP_SAMPLES`, each
+window's spectrum is summed into `FINGERPRINT_BITS + 1` log-spaced bands,
+and each bit records whether the energy difference between two adjacent
+bands grew or shrank since the previous window. Signs of differences don't
+care about volume, codec or bitrate, while unrelated audio agrees on about
+half the bits. Every window packs into one uint64, just like a frame's
+dHash, so fingerprints are aligned with the same `dup_finder` machinery as
+frame-hash sequences.
+'''
+
+# System imports
+import logging
+
+# External imports
+import numpy
+
+# Local imports
+from . import ffmpeg_utils
+
+logger = logging.getLogger(__name__)
+
+# Audio is decoded to mono 16-bit PCM at SAMPLE_RATE - the bands top out at
+# BAND_HIGH_HZ, well below its Nyquist frequency.
+SAMPLE_RATE = 5512
+# Samples per analysis window (~0.37 s) and between window starts (~0.09
+# s), i.e. about 11 fingerprints per second - windows have to overlap, or
+# two files whose audio starts a fraction of a hop apart would be cut into
+# unrelated windows.
+WINDOW_SAMPLES = 2048
+HOP_SAMPLES = WINDOW_SAMPLES // 4
+FINGERPRINT_BITS = 64
+# The frequency range the bands cover - where most of the perceptually
+# relevant (and codec-preserved) energy is.
+BAND_LOW_HZ = 300.0
+BAND_HIGH_HZ = 2000.0
+
+# Seconds between fingerprints, the unit of an audio alignment's offset.
+FINGERPRINT_INTERVAL = HOP_SAMPLES / SAMPLE_RATE
+
+# Windows quieter than this RMS (about -60 dBFS) count as silence and get
+# an all-zero fingerprint; a track that's mostly silence (e.g. muted) says
+# nothing about its file, see `is_mostly_silent`.
+SILENCE_RMS = 32.0
+SILENT_FRACTION = 0.5
+
+_WINDOW = numpy.hanning(WINDOW_SAMPLES).astype(numpy.float32)
+# Edges of the FINGERPRINT_BITS + 1 bands as rfft bin indices; the
+# narrowest band still spans several bins.
+_BAND_BINS = numpy.searchsorted(
+    numpy.fft.rfftfreq(WINDOW_SAMPLES, 1.0 / SAMPLE_RATE),
+    numpy.geomspace(BAND_LOW_HZ, BAND_HIGH_HZ, FINGERPRINT_BITS + 2),
+)
+
+
+def compute_audio_fingerprint(path: str) -> numpy.ndarray:
+    """Fingerprint the first audio stream of `path`.
+
+    The audio is decoded through the current media backend (see
+    `ffmpeg_utils.set_backend`) and fingerprinted chunk by chunk as it
+    streams in, so memory use doesn't grow with the file's length beyond
+    the fingerprint itself (under 100 bytes per second).
+
+    Args:
+        path (str): Path to the media file.
+
+    Raises:
+        ffmpeg.errors.FFmpegError: If `path` has no audio stream or it
+            can't be decoded.
+
+    Returns:
+        numpy.ndarray: One uint64 fingerprint per `FINGERPRINT_INTERVAL`,
+            in playback order - empty for audio shorter than a couple of
+            windows.
+    """
+    energies, loud = [], []
+    pending = numpy.empty(0, dtype=numpy.float32)
+    for chunk in ffmpeg_utils.get_backend().iter_mono_audio(path, SAMPLE_RATE):
+        samples = numpy.frombuffer(chunk, dtype='<i2', count=len(chunk) // 2)
+        pending = numpy.concatenate((pending, samples.astype(numpy.float32)))
+        num_windows = 0
+        if len(pending) >= WINDOW_SAMPLES:
+            num_windows = 1 + (len(pending) - WINDOW_SAMPLES) // HOP_SAMPLES
+            windows = numpy.lib.stride_tricks.sliding_window_view(
+                pending, WINDOW_SAMPLES,
+            )[:num_windows * HOP_SAMPLES:HOP_SAMPLES]
+            energies.append(band_energies(windows))
+            loud.append(numpy.sqrt(numpy.mean(windows ** 2, axis=1)) >= SILENCE_RMS)
+        # Keep the samples the next window starts at.
+        pending = pending[num_windows * HOP_SAMPLES:]
+
+    if not energies:
+        return numpy.empty(0, dtype=numpy.uint64)
+    fingerprint = fingerprint_bits(numpy.concatenate(energies))
+    loud = numpy.concatenate(loud)
+    fingerprint[~(loud[1:] & loud[:-1])] = 0
+    return fingerprint
+
+
+def band_energies(windows: numpy.ndarray) -> numpy.ndarray:
+    """Spectral energy of each of `windows` in each fingerprint band.
+
+    Args:
+        windows (numpy.ndarray): `(n, WINDOW_SAMPLES)` PCM samples.
+
+    Returns:
+        numpy.ndarray: `(n, FINGERPRINT_BITS + 1)` band energies.
+    """
+    spectrum = numpy.fft.rfft(windows * _WINDOW, axis=1)
+    power = (spectrum.real ** 2 + spectrum.imag ** 2)[:, _BAND_BINS[0]:_BAND_BINS[-1]]
+    return numpy.add.reduceat(power, _BAND_BINS[:-1] - _BAND_BINS[0], axis=1).astype(numpy.float32)
+
+
+def fingerprint_bits(energies: numpy.ndarray) -> numpy.ndarray:
+    """Pack consecutive windows' band energies into fingerprints.
+
+    Args:
+        energies (numpy.ndarray): `band_energies` of consecutive windows.
+
+    Returns:
+        numpy.ndarray: One uint64 per window after the first, bit `m`
+            (most significant first) set if the energy difference between
+            bands `m` and `m + 1` grew since the previous window.
+    """
+    band_diffs = energies[:, :-1] - energies[:, 1:]
+    bits = band_diffs[1:] > band_diffs[:-1]
+    packed = numpy.packbits(bits, axis=1)
+    return packed.view('>u8').ravel().astype(numpy.uint64)
+
+
+def is_mostly_silent(fingerprint: numpy.ndarray) -> bool:
+    """Whether more than `SILENT_FRACTION` of `fingerprint` is silence (or
+    it's empty), too little to tell its file apart from any other.
+
+    Args:
+        fingerprint (numpy.ndarray): A `compute_audio_fingerprint` result.
+
+    Returns:
+        bool: True if the fingerprint shouldn't be relied on.
+    """
+    if len(fingerprint) == 0:
+        return True
+    return bool(numpy.count_nonzero(fingerprint == 0) > SILENT_FRACTION * len(fingerprint))
+
+
+def fingerprint_store_kind() -> str:
+    """`HashStore` kind for fingerprints from `compute_audio_fingerprint`
+    with the current parameters and media backend."""
+    kind = f"audio{FINGERPRINT_BITS}:{SAMPLE_RATE}:{WINDOW_SAMPLES}:{HOP_SAMPLES}"
+    backend = ffmpeg_utils.get_backend()
+    # Other backends' resamplers aren't sample-for-sample ffmpeg's.
+    if backend.name != ffmpeg_utils.SubprocessBackend.name:
+        kind = f"{backend.name}:{kind}"
+    return kind
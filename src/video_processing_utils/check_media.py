@@ -7,57 +7,86 @@ that produced decode errors (corrupt streams, truncated files, etc.).
 
 # System imports
 import argparse
-import concurrent.futures
-import gc
 import glob
 import logging
 import os
 import pathlib
 import pprint
-import queue
 import re
-import subprocess
-import time
 
 # Local imports
 from . import utils
 
 logger = logging.getLogger(__name__)
 
-def enqueue_output(fH, q):
-    for line in iter(fH.readline, ''):
-        q.put(line)
-    fH.close()
+# Files decoded at once unless --jobs says otherwise. Each decode is already
+# multithreaded by ffmpeg, so this mostly helps with many small files.
+DEFAULT_JOBS = 1
 
-def read_popen_pipes(p):
-    '''
+async def count_decode_errors(filename: str) -> int:
+    """Fully decode `filename` with ffmpeg and count the errors it reports.
 
-    https://stackoverflow.com/questions/2804543/read-subprocess-stdout-line-by-line
-    '''
+    Args:
+        filename (str): File to check.
 
-    with concurrent.futures.ThreadPoolExecutor(2) as pool:
-        q_stdout, q_stderr = queue.Queue(), queue.Queue()
+    Returns:
+        int: Number of error lines ffmpeg printed (at least 1 if ffmpeg
+            failed outright).
+    """
+    # Imported here rather than at the top: the asyncio engine pulls in
+    # python-ffmpeg, asyncio, sqlite3 and the probe cache, which would
+    # otherwise double vucheck's start-up time - `--help` included.
+    import ffmpeg
+    import ffmpeg.asyncio
+    from . import ffmpeg_utils
+
+    errors_count = 0
+
+    def on_stderr(line: str) -> None:
+        nonlocal errors_count
+        if re.search("error", line, flags=re.I):
+            errors_count += 1
+
+    cmd = ffmpeg.asyncio.FFmpeg().option('v', 'error').input(filename).output(
+        '-', f='null',
+    )
+    try:
+        await ffmpeg_utils.async_run_ffmpeg(cmd, on_stderr=on_stderr)
+    except ffmpeg.errors.FFmpegError as exc:
+        logger.debug(f"ffmpeg failed on '{filename}': {exc.message}")
+        errors_count = max(errors_count, 1)
 
-        pool.submit(enqueue_output, p.stdout, q_stdout)
-        pool.submit(enqueue_output, p.stderr, q_stderr)
+    return errors_count
 
-        while True:
-            if p.poll() is not None and q_stdout.empty() and q_stderr.empty():
-                break
+async def check_files(file_list: list[str], jobs: int) -> list[tuple[str, int]]:
+    """Check every file in `file_list`, up to `jobs` at a time, printing
+    each file with errors as soon as its check finishes.
 
-            out_line = err_line = ''
+    Args:
+        file_list (list[str]): Files to check.
+        jobs (int): Maximum concurrent ffmpeg processes.
+
+    Returns:
+        list[tuple[str, int]]: `(filename, errors_count)` for each file
+            with errors, in `file_list` order.
+    """
+    import asyncio
+    from . import ffmpeg_utils
 
-            try:
-                out_line = q_stdout.get_nowait()
-            except queue.Empty:
-                pass
+    ffmpeg_utils.set_async_process_limit(jobs)
 
-            try:
-                err_line = q_stderr.get_nowait()
-            except queue.Empty:
-                pass
+    async def check_one(filename: str) -> int:
+        errors_count = await count_decode_errors(filename)
+        if errors_count > 0:
+            print(f"'{filename}': {errors_count} error(s)")
+        return errors_count
 
-            yield (out_line, err_line)
+    error_counts = await asyncio.gather(*(check_one(curr_file) for curr_file in file_list))
+    return [
+        (curr_file, errors_count)
+        for curr_file, errors_count in zip(file_list, error_counts)
+        if errors_count > 0
+    ]
 
 def create_parser() -> argparse.ArgumentParser:
     """Arg handler for CLI.
@@ -85,6 +114,12 @@ def create_parser() -> argparse.ArgumentParser:
         default=False,
         help="Recurse into subdirectories of --path",
     )
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        default=DEFAULT_JOBS,
+        help="Number of files to decode concurrently (default: %(default)s)",
+    )
     utils.add_common_arguments(parser=parser)
 
     return parser
@@ -112,35 +147,12 @@ def main() -> None:
     else:
         search_regex = os.path.join(str(args.path), args.pattern)
 
-    logger.info(f"Starting with regex: {search_regex}")
-    files_with_errors = []
-    for curr_file in glob.glob(search_regex, recursive=args.recursive):
-        errors_count = 0
+    # Not imported at the top - see count_decode_errors().
+    import asyncio
 
-        ffmpeg_cmd = ['ffmpeg', '-v', 'error', '-i', curr_file, '-f', 'null', '-']
-
-        with subprocess.Popen(
-            ffmpeg_cmd,
-            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
-            bufsize=1, text=True,
-        ) as progH:
-
-            for out_line, err_line in read_popen_pipes(progH):
-                if re.search("error", out_line, flags=re.I):
-                    errors_count += 1
-
-                if re.search("error", err_line, flags=re.I):
-                    errors_count += 1
-
-            progH.poll()
-
-            time.sleep(2)
-
-        if errors_count > 0:
-            print(f"'{curr_file}': {errors_count} error(s)")
-            files_with_errors.append((curr_file, errors_count))
-
-        gc.collect()
+    logger.info(f"Starting with regex: {search_regex}")
+    file_list = glob.glob(search_regex, recursive=args.recursive)
+    files_with_errors = asyncio.run(check_files(file_list, args.jobs))
 
     if files_with_errors:
         print(f"\nDone - {len(files_with_errors)} file(s) with errors:")
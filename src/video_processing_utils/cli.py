@@ -12,29 +12,14 @@ import ffmpeg
 
 # Local imports
 import video_processing_utils
+import video_processing_utils.ffmpeg_utils
 import video_processing_utils.utils
+# Re-exported, this used to live here.
+from video_processing_utils.utils import walk_files
 
 # Globals
 logger = logging.getLogger(__name__)
 
-# Utility functions
-
-def walk_files(base_path='.') -> list[str]:
-    """Recursively walk files in a directory.
-
-    Args:
-        base_path (str, optional): Directory to walk. Defaults to '.'.
-
-    Returns:
-        list[str]: Paths of every file found under `base_path`.
-    """
-    file_list = []
-    for root, _, files in os.walk(base_path):
-        for curr_file in files:
-            file_list.append(f"{os.path.join(root,curr_file)}")
-
-    return file_list
-
 ### CLI concat functions
 
 def cli_concat_create_parser() -> argparse.ArgumentParser:
@@ -60,9 +45,31 @@ def cli_concat_create_parser() -> argparse.ArgumentParser:
     )
     parser.add_argument(
         '-o', '--output',
-        help="The output path to output to",
+        help="The output path to output to, or '-' to stream it to stdout",
         required=True,
     )
+    parser.add_argument(
+        '--stream-format',
+        help="Container to stream in with '-o -' (default: %(default)s)",
+        choices=list(video_processing_utils.ffmpeg_utils.STREAM_FORMATS),
+        default='matroska',
+    )
+    incompatible_group = parser.add_mutually_exclusive_group()
+    incompatible_group.add_argument(
+        '--split-incompatible',
+        help="Rather than failing on an input that doesn't match the ones " +
+            "before it, concatenate each run of compatible inputs into its " +
+            "own <output>-partN file",
+        default=False,
+        action='store_true',
+    )
+    incompatible_group.add_argument(
+        '--normalize-incompatible',
+        help="Rather than failing on inputs that don't match the first one, " +
+            "re-encode just those to match it before concatenating",
+        default=False,
+        action='store_true',
+    )
     parser.add_argument(
         '-d', '--debug',
         help="Turn on debugging logging",
@@ -70,6 +77,8 @@ def cli_concat_create_parser() -> argparse.ArgumentParser:
         default=False,
         required=False,
     )
+    video_processing_utils.utils.add_probe_cache_arguments(parser=parser)
+    video_processing_utils.utils.add_backend_arguments(parser=parser)
 
     return parser
 
@@ -85,7 +94,10 @@ def cli_concat_parse_cli() -> argparse.Namespace:
     if len(args.input) <= 1:
         parser.error("Pass more than 1 input filename")
 
-    if args.over_write is False and os.path.exists(args.output):
+    if args.output == '-' and args.split_incompatible:
+        parser.error("--split-incompatible can't be used with '-o -'")
+
+    if args.over_write is False and args.output != '-' and os.path.exists(args.output):
         parser.error(f"Output file '{args.output}' exists, aborting")
 
     return args
@@ -98,15 +110,30 @@ def cli_concat_main() -> None:
     # CLIs (errors only) since the ffmpeg progress line already covers
     # normal feedback; --debug still enables full DEBUG logging as usual.
     video_processing_utils.utils.setup_logging(args=args, default_level=logging.ERROR)
+    video_processing_utils.ffmpeg_utils.configure_probe_cache(
+        enabled=not args.no_probe_cache,
+        cache_dir=args.probe_cache_dir,
+    )
+    video_processing_utils.ffmpeg_utils.set_backend(args.backend)
     logger.debug(f"Parsed arguments: {pprint.pformat(args)}")
-    print(f"Merging: {args.input} to {args.output}")
+    # With '-o -' stdout carries the video, so messages go to stderr.
+    message_file = sys.stderr if args.output == '-' else sys.stdout
+    print(f"Merging: {args.input} to {args.output}", file=message_file)
     try:
-        video_processing_utils.concat_ffmpeg_demuxer(
+        output_files = video_processing_utils.concat_ffmpeg_demuxer(
             input_files=args.input,
             output_file=args.output,
             over_write=args.over_write,
+            split_incompatible=args.split_incompatible,
+            normalize_incompatible=args.normalize_incompatible,
+            stream_format=args.stream_format,
         )
+        if len(output_files) > 1:
+            print(f"Inputs split into {len(output_files)} parts: {output_files}",
+                  file=message_file)
     except (RuntimeError, ffmpeg.errors.FFmpegError) as exc:
         logger.error(f"Concat failed: {exc}")
         sys.exit(1)
+    finally:
+        video_processing_utils.ffmpeg_utils.log_probe_cache_stats()
 
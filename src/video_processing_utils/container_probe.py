@@ -0,0 +1,413 @@
+'''Read track codecs straight from MP4/MOV and Matroska/WebM headers.
+
+A fast path for questions like "is this file already HEVC?" that only need
+each track's type and codec: rather than spawning ffprobe, walk just enough
+of the container to reach the track descriptions -
+
+  - MP4/MOV: the top-level boxes are skipped by their size fields until
+    `moov`, which is read whole (it's usually well under a megabyte), then
+    each `trak`'s `mdia/hdlr` handler type (video/audio/...) and
+    `mdia/minf/stbl/stsd` sample entry format (e.g. 'hvc1') are read.
+  - Matroska/WebM: the Segment's top-level elements are skipped by their
+    size fields until `Tracks`, then each `TrackEntry`'s TrackType and
+    CodecID (e.g. 'V_MPEGH/ISO/HEVC') are read.
+
+Either way only a few small seeks/reads are needed, independent of file
+size. Codec names are normalised to ffprobe's `codec_name`s. Anything this
+doesn't fully understand - another container, an unknown or ambiguous video
+codec, an encrypted track, a damaged header - yields None so the caller can
+fall back to ffprobe rather than act on a guess.
+
+References:
+https://developer.apple.com/documentation/quicktime-file-format
+https://www.matroska.org/technical/elements.html
+'''
+
+# System imports
+import logging
+import struct
+
+logger = logging.getLogger(__name__)
+
+# Refuse to read headers bigger than these - a corrupt size field shouldn't
+# turn a header peek into reading gigabytes.
+MAX_MOOV_BYTES = 64 * 1024 * 1024
+MAX_TRACKS_BYTES = 16 * 1024 * 1024
+# Top-level boxes/elements to skip past before giving up.
+MAX_TOP_LEVEL_ITEMS = 256
+
+# Top-level MP4/MOV box types - the first box has to be one of these for the
+# file to be treated as MP4.
+MP4_TOP_LEVEL_BOXES = {
+    b'ftyp', b'styp', b'moov', b'mdat', b'free', b'skip', b'wide', b'pdin',
+    b'uuid', b'sidx', b'moof', b'meta',
+}
+MP4_HANDLER_TYPES = {
+    b'vide': 'video',
+    b'soun': 'audio',
+    b'sbtl': 'subtitle',
+    b'subt': 'subtitle',
+    b'text': 'subtitle',
+}
+# Sample entry formats with an unambiguous ffprobe codec_name. Formats that
+# need deeper parsing to identify (e.g. 'mp4v'/'mp4a', whose codec is set by
+# the esds object type) or that are encrypted ('encv'/'enca') are left out.
+MP4_CODECS = {
+    b'hvc1': 'hevc', b'hev1': 'hevc', b'dvh1': 'hevc', b'dvhe': 'hevc',
+    b'avc1': 'h264', b'avc2': 'h264', b'avc3': 'h264', b'avc4': 'h264',
+    b'av01': 'av1',
+    b'vp08': 'vp8', b'vp09': 'vp9',
+    b'apch': 'prores', b'apcn': 'prores', b'apcs': 'prores',
+    b'apco': 'prores', b'ap4h': 'prores', b'ap4x': 'prores',
+    b'jpeg': 'mjpeg', b'mjpa': 'mjpeg', b'png ': 'png',
+    b's263': 'h263',
+    b'ac-3': 'ac3', b'ec-3': 'eac3', b'Opus': 'opus', b'fLaC': 'flac',
+    b'alac': 'alac',
+    b'tx3g': 'mov_text',
+}
+
+EBML_HEADER_ID = 0x1A45DFA3
+MKV_SEGMENT_ID = 0x18538067
+MKV_TRACKS_ID = 0x1654AE6B
+MKV_CLUSTER_ID = 0x1F43B675
+MKV_TRACK_ENTRY_ID = 0xAE
+MKV_TRACK_TYPE_ID = 0x83
+MKV_CODEC_ID_ID = 0x86
+MKV_TRACK_TYPES = {
+    1: 'video',
+    2: 'audio',
+    0x11: 'subtitle',
+}
+MKV_CODECS = {
+    'V_MPEGH/ISO/HEVC': 'hevc',
+    'V_MPEG4/ISO/AVC': 'h264',
+    'V_AV1': 'av1',
+    'V_VP8': 'vp8',
+    'V_VP9': 'vp9',
+    'V_MPEG1': 'mpeg1video',
+    'V_MPEG2': 'mpeg2video',
+    'V_MPEG4/ISO/SP': 'mpeg4',
+    'V_MPEG4/ISO/ASP': 'mpeg4',
+    'V_MPEG4/ISO/AP': 'mpeg4',
+    'V_THEORA': 'theora',
+    'V_PRORES': 'prores',
+    'V_MJPEG': 'mjpeg',
+    'A_AAC': 'aac',
+    'A_AC3': 'ac3',
+    'A_EAC3': 'eac3',
+    'A_DTS': 'dts',
+    'A_FLAC': 'flac',
+    'A_MPEG/L2': 'mp2',
+    'A_MPEG/L3': 'mp3',
+    'A_OPUS': 'opus',
+    'A_TRUEHD': 'truehd',
+    'A_VORBIS': 'vorbis',
+    'S_TEXT/UTF8': 'subrip',
+    'S_TEXT/ASS': 'ass',
+    'S_TEXT/SSA': 'ass',
+    'S_TEXT/WEBVTT': 'webvtt',
+    'S_HDMV/PGS': 'hdmv_pgs_subtitle',
+    'S_VOBSUB': 'dvd_subtitle',
+}
+
+
+class _UnsupportedContainer(Exception):
+    """Raised internally when the file can't be answered from its headers."""
+
+
+def read_track_codecs(filename: str) -> list[tuple[str, str | None]] | None:
+    """Read each track's type and codec from an MP4/MOV or Matroska/WebM
+    file's headers, without spawning ffprobe.
+
+    Args:
+        filename (str): File to read.
+
+    Returns:
+        list[tuple[str, str | None]] | None: `(codec_type, codec_name)` per
+            track in file order - `codec_type` as ffprobe names it ('video',
+            'audio', 'subtitle' or 'data'), `codec_name` normalised to
+            ffprobe's name or None if not recognised. None if the file isn't
+            a container this understands or its headers couldn't be read.
+    """
+    try:
+        with open(filename, 'rb') as media_file:
+            magic = media_file.read(8)
+            if len(magic) < 8:
+                return None
+            media_file.seek(0)
+            if int.from_bytes(magic[:4], 'big') == EBML_HEADER_ID:
+                return _read_matroska_tracks(media_file)
+            if magic[4:8] in MP4_TOP_LEVEL_BOXES:
+                return _read_mp4_tracks(media_file)
+            return None
+    except (OSError, _UnsupportedContainer, struct.error, IndexError,
+            UnicodeDecodeError) as exc:
+        logger.debug(f"Header parse of '{filename}' failed, needs ffprobe: {exc}")
+        return None
+
+
+def read_video_codecs(filename: str) -> list[str] | None:
+    """ffprobe-style codec names of every video track in `filename`, read
+    from the container headers.
+
+    Args:
+        filename (str): File to read.
+
+    Returns:
+        list[str] | None: One codec name per video track, or None if that
+            can't be answered definitively from the headers (unsupported
+            container, no video tracks found, or any video track whose
+            codec isn't recognised) - fall back to ffprobe then.
+    """
+    tracks = read_track_codecs(filename)
+    if tracks is None:
+        return None
+
+    video_codecs = [codec for codec_type, codec in tracks if codec_type == 'video']
+    if not video_codecs or None in video_codecs:
+        return None
+
+    return video_codecs
+
+
+### MP4/MOV
+
+def _read_box_header(media_file) -> tuple[bytes, int, int | None] | None:
+    """Read the box header at the current position.
+
+    Returns:
+        tuple[bytes, int, int | None] | None: `(type, header_len, box_len)` -
+            `box_len` is None for a box running to the end of the file - or
+            None at end of file.
+    """
+    header = media_file.read(8)
+    if len(header) < 8:
+        return None
+
+    box_len, box_type = struct.unpack('>I4s', header)
+    header_len = 8
+    if box_len == 1:
+        box_len = struct.unpack('>Q', media_file.read(8))[0]
+        header_len = 16
+    elif box_len == 0:
+        box_len = None
+
+    if box_len is not None and box_len < header_len:
+        raise _UnsupportedContainer(f"invalid '{box_type!r}' box size {box_len}")
+
+    return box_type, header_len, box_len
+
+
+def _iter_child_boxes(data: bytes, start: int = 0, end: int | None = None):
+    """Yield `(type, payload_start, payload_end)` for each box in
+    `data[start:end]`."""
+    end = len(data) if end is None else end
+    pos = start
+    while pos + 8 <= end:
+        box_len, box_type = struct.unpack_from('>I4s', data, pos)
+        header_len = 8
+        if box_len == 1:
+            box_len = struct.unpack_from('>Q', data, pos + 8)[0]
+            header_len = 16
+        elif box_len == 0:
+            box_len = end - pos
+        if box_len < header_len or pos + box_len > end:
+            raise _UnsupportedContainer(f"invalid '{box_type!r}' box size {box_len}")
+        yield box_type, pos + header_len, pos + box_len
+        pos += box_len
+
+
+def _find_child_box(data: bytes, start: int, end: int, box_type: bytes):
+    """`(payload_start, payload_end)` of the first `box_type` child box in
+    `data[start:end]`, or None."""
+    for child_type, child_start, child_end in _iter_child_boxes(data, start, end):
+        if child_type == box_type:
+            return child_start, child_end
+    return None
+
+
+def _read_mp4_tracks(media_file) -> list[tuple[str, str | None]]:
+    for _ in range(MAX_TOP_LEVEL_ITEMS):
+        box_start = media_file.tell()
+        box_header = _read_box_header(media_file)
+        if box_header is None:
+            raise _UnsupportedContainer("no 'moov' box found")
+        box_type, header_len, box_len = box_header
+
+        if box_type == b'moov':
+            if box_len is None or box_len > MAX_MOOV_BYTES:
+                raise _UnsupportedContainer(f"'moov' box too large ({box_len})")
+            moov = media_file.read(box_len - header_len)
+            if len(moov) < box_len - header_len:
+                raise _UnsupportedContainer("truncated 'moov' box")
+            return _parse_mp4_moov(moov)
+
+        if box_len is None:
+            raise _UnsupportedContainer("no 'moov' box found")
+        media_file.seek(box_start + box_len)
+
+    raise _UnsupportedContainer("no 'moov' box found")
+
+
+def _parse_mp4_moov(moov: bytes) -> list[tuple[str, str | None]]:
+    tracks = []
+    for box_type, trak_start, trak_end in _iter_child_boxes(moov):
+        if box_type != b'trak':
+            continue
+
+        mdia = _find_child_box(moov, trak_start, trak_end, b'mdia')
+        if mdia is None:
+            raise _UnsupportedContainer("'trak' without 'mdia'")
+
+        # hdlr: version/flags (4), pre_defined (4), handler_type (4), ...
+        hdlr = _find_child_box(moov, *mdia, b'hdlr')
+        if hdlr is None:
+            raise _UnsupportedContainer("'mdia' without 'hdlr'")
+        handler_type = moov[hdlr[0] + 8:hdlr[0] + 12]
+        codec_type = MP4_HANDLER_TYPES.get(handler_type, 'data')
+
+        # stsd: version/flags (4), entry_count (4), then sample entries,
+        # each starting with size (4) and format (4).
+        codec_name = None
+        box_range = mdia
+        for child_type in (b'minf', b'stbl', b'stsd'):
+            box_range = _find_child_box(moov, *box_range, child_type)
+            if box_range is None:
+                break
+        else:
+            stsd_start, stsd_end = box_range
+            if stsd_start + 16 <= stsd_end:
+                sample_format = moov[stsd_start + 12:stsd_start + 16]
+                codec_name = MP4_CODECS.get(sample_format)
+
+        tracks.append((codec_type, codec_name))
+
+    return tracks
+
+
+### Matroska/WebM
+
+def _parse_vint(data: bytes, pos: int, keep_marker: bool) -> tuple[int, int]:
+    """Decode the EBML variable-length integer at `data[pos]`.
+
+    Args:
+        data (bytes): Buffer to read from.
+        pos (int): Offset of the first byte.
+        keep_marker (bool): Keep the length marker bit (element IDs are
+            conventionally written with it, sizes without).
+
+    Returns:
+        tuple[int, int]: `(value, encoded_length)`. An all-ones size ("unknown
+            size") is returned as -1.
+    """
+    first = data[pos]
+    if first == 0:
+        raise _UnsupportedContainer("invalid EBML variable-length integer")
+    length = 9 - first.bit_length()
+    if pos + length > len(data):
+        raise _UnsupportedContainer("truncated EBML variable-length integer")
+
+    value = first if keep_marker else first & (0xFF >> length)
+    for byte in data[pos + 1:pos + length]:
+        value = (value << 8) | byte
+
+    if not keep_marker and value == (1 << (7 * length)) - 1:
+        return -1, length
+    return value, length
+
+
+def _read_element_header(media_file) -> tuple[int, int, int] | None:
+    """Read the element header at the current position.
+
+    Returns:
+        tuple[int, int, int] | None: `(element_id, header_len, payload_len)`,
+            `payload_len` -1 if unknown, or None at end of file.
+    """
+    header = media_file.read(12)
+    if len(header) < 2:
+        return None
+
+    element_id, id_len = _parse_vint(header, 0, keep_marker=True)
+    payload_len, size_len = _parse_vint(header, id_len, keep_marker=False)
+    return element_id, id_len + size_len, payload_len
+
+
+def _iter_child_elements(data: bytes, start: int = 0, end: int | None = None):
+    """Yield `(element_id, payload_start, payload_end)` for each element in
+    `data[start:end]`."""
+    end = len(data) if end is None else end
+    pos = start
+    while pos < end:
+        element_id, id_len = _parse_vint(data, pos, keep_marker=True)
+        payload_len, size_len = _parse_vint(data, pos + id_len, keep_marker=False)
+        payload_start = pos + id_len + size_len
+        if payload_len < 0 or payload_start + payload_len > end:
+            raise _UnsupportedContainer(f"invalid size for element 0x{element_id:X}")
+        yield element_id, payload_start, payload_start + payload_len
+        pos = payload_start + payload_len
+
+
+def _read_matroska_tracks(media_file) -> list[tuple[str, str | None]]:
+    element_header = _read_element_header(media_file)
+    if element_header is None:
+        raise _UnsupportedContainer("truncated EBML header")
+    _, header_len, payload_len = element_header
+    if payload_len < 0:
+        raise _UnsupportedContainer("EBML header of unknown size")
+    media_file.seek(header_len + payload_len)
+
+    segment_start = media_file.tell()
+    element_header = _read_element_header(media_file)
+    if element_header is None or element_header[0] != MKV_SEGMENT_ID:
+        raise _UnsupportedContainer("no Segment after the EBML header")
+    # The Segment's own size doesn't matter (and is often unknown for
+    # live-written files) - only its children are walked.
+    media_file.seek(segment_start + element_header[1])
+
+    for _ in range(MAX_TOP_LEVEL_ITEMS):
+        element_start = media_file.tell()
+        element_header = _read_element_header(media_file)
+        if element_header is None:
+            break
+        element_id, header_len, payload_len = element_header
+
+        if element_id == MKV_TRACKS_ID:
+            if payload_len < 0 or payload_len > MAX_TRACKS_BYTES:
+                raise _UnsupportedContainer(f"Tracks element too large ({payload_len})")
+            media_file.seek(element_start + header_len)
+            tracks_data = media_file.read(payload_len)
+            if len(tracks_data) < payload_len:
+                raise _UnsupportedContainer("truncated Tracks element")
+            return _parse_matroska_tracks(tracks_data)
+
+        if element_id == MKV_CLUSTER_ID or payload_len < 0:
+            # Tracks has to come before the media data.
+            break
+        media_file.seek(element_start + header_len + payload_len)
+
+    raise _UnsupportedContainer("no Tracks element found")
+
+
+def _parse_matroska_tracks(tracks_data: bytes) -> list[tuple[str, str | None]]:
+    tracks = []
+    for element_id, entry_start, entry_end in _iter_child_elements(tracks_data):
+        if element_id != MKV_TRACK_ENTRY_ID:
+            continue
+
+        track_type = None
+        codec_id = None
+        for child_id, child_start, child_end in \
+            _iter_child_elements(tracks_data, entry_start, entry_end):
+            if child_id == MKV_TRACK_TYPE_ID:
+                track_type = int.from_bytes(tracks_data[child_start:child_end], 'big')
+            elif child_id == MKV_CODEC_ID_ID:
+                codec_id = tracks_data[child_start:child_end].rstrip(b'\0').decode('ascii')
+
+        codec_type = MKV_TRACK_TYPES.get(track_type, 'data')
+        codec_name = MKV_CODECS.get(codec_id)
+        if codec_name is None and codec_id is not None and codec_id.startswith('A_AAC'):
+            # e.g. the legacy 'A_AAC/MPEG4/LC' IDs.
+            codec_name = 'aac'
+        tracks.append((codec_type, codec_name))
+
+    return tracks
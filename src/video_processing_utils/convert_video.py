@@ -29,7 +29,6 @@ import subprocess
 import sys
 import time
 import traceback
-import typing
 
 # External imports
 import ffmpeg
@@ -37,6 +36,9 @@ import psutil
 
 # Local imports
 from . import ffmpeg_utils, utils
+from .media_info import MediaInfo
+# Re-exported, these used to live here.
+from .utils import ACCEPTED_EXTENSIONS, determine_new_filename
 
 
 # Global objs
@@ -44,19 +46,6 @@ logger = logging.getLogger(__name__)
 lock = multiprocessing.Lock()
 
 # Global definitions
-ACCEPTED_EXTENSIONS = [
-    '3gp',
-    'asf', 'avi',
-    'divx',
-    'flv',
-    'm2ts', 'm2v', 'm4v', 'mkv', 'mov', 'mp4', 'mpeg', 'mpg',
-    'ogm',
-    'rm', 'rmvb',
-    'ts',
-    'vob',
-    'webm', 'wmv',
-    'xvid',
-]
 DEFAULT_OUTPUT_EXTENSION = 'mp4'
 
 if psutil.WINDOWS:
@@ -78,32 +67,6 @@ class SkipFile(Exception):
     """
 
 # Functions
-def determine_new_filename(fileprefix: str, ext: str='mp4') -> typing.Tuple[str,bool]:
-    """Determine temp output filename during encode.
-
-    Args:
-        fileprefix (str): Prefix to use.
-        ext (str, optional): output extension. Defaults to 'mp4'.
-
-    Returns:
-        typing.Tuple[str,bool]: filename as index 0, index 1 will be True if this is a
-            temporary filename, False if this will be the final filename.
-    """
-    new_file_name = f"{fileprefix}.{ext}"
-
-    if not os.path.exists(new_file_name):
-        return (new_file_name, False)
-
-    # The file exists so we need to try an incrementing number
-    i = 1
-    while True:
-        new_file_name = f"{fileprefix}-{i}.{ext}"
-
-        if not os.path.exists(new_file_name):
-            return (new_file_name, True)
-
-        i += 1
-
 def timedelta_parse(value: str) -> datetime.timedelta:
     """Convert input string to a datetime.timedelta object.
 
@@ -124,96 +87,59 @@ def timedelta_parse(value: str) -> datetime.timedelta:
         )
     })
 
-def read_total_frames(input_filename: str, full_metadata: dict, video_streams_data: list) -> int:
+def read_total_frames(input_filename: str, media: MediaInfo) -> float:
     """Read the total number of frames from a file's metadata.
 
     Args:
-        full_metadata (dict): The file metadata from fetch_file_data.
+        input_filename (str): File the metadata came from (for messages).
+        media (MediaInfo): The file's metadata, from
+            ffmpeg_utils.fetch_media_info. Must have a primary video stream.
 
     Raises:
         SkipFile: Thrown when we can't determine the frame count.
 
     Returns:
-        int: Frame count.
+        float: Frame count.
     """
+    video_stream = media.primary_video
+
     # Simple case
-    if 'nb_frames' in video_streams_data[0]:
-        return float(video_streams_data[0]['nb_frames'])
+    if video_stream.nb_frames is not None:
+        return float(video_stream.nb_frames)
 
-    total_frames = -1
-    match video_streams_data[0]['codec_name']:
+    match video_stream.codec_name:
         case 'av1' | 'flv1' | 'h264' | 'msmpeg4v3' | 'rv40' | 'vp6f' | 'vp8' | 'vp9':
-            # Split 'avg_frame_rate': '2997/100' or '982057/32768' to 29.97
-            # Can be 0/0
-            if 'avg_frame_rate' in video_streams_data[0] and video_streams_data[0]['avg_frame_rate'] != '0/0':
-                frame_base, divisor = video_streams_data[0]['avg_frame_rate'].split('/')
-            elif 'r_frame_rate' in video_streams_data[0] and video_streams_data[0]['r_frame_rate'] != '0/0':
-                frame_base, divisor = video_streams_data[0]['r_frame_rate'].split('/')
-            else:
-                msg = "Unable to read frame rate from " +\
-                    f"{video_streams_data[0]['codec_name']} in '{input_filename}'"
-                logger.error(msg)
-                raise SkipFile(msg)
-
-            try:
-                frame_rate = float(frame_base) / float(divisor)
-            except ZeroDivisionError:
-                logger.error(f"Zero division error: {pprint.pformat(video_streams_data)}")
-                raise
-
-            if 'duration' in video_streams_data[0]:
-                duration_str = video_streams_data[0]['duration']
-            else:
-                try:
-                    # Duration can sometimes be DURATION or DURATION-eng
-                    duration_key = list(filter(
-                        lambda y: y[:8] == 'DURATION',
-                        video_streams_data[0]['tags'].keys(),
-                    ))[0]
-                    duration_str = video_streams_data[0]['tags'][duration_key]
-                except (IndexError,KeyError):
-                    if 'duration' in full_metadata['format']:
-                        duration_str = full_metadata['format']['duration']
-                    else:
-                        logger.error(pprint.pformat(full_metadata))
-                        raise SkipFile(f"Unable to determine duration: {video_streams_data}")
-
-            duration = (
-                timedelta_parse(duration_str) -
-                timedelta_parse(video_streams_data[0]['start_time'])
-            ).total_seconds()
-
-            total_frames = duration * frame_rate
+            # These can carry a non-zero stream start time that the
+            # duration has to be offset by.
+            subtract_start_time = True
         case 'mpeg1video' | 'mpeg2video' | 'mpeg4' | 'vc1' | 'wmv1' | 'wmv2' | 'wmv3':
-            if video_streams_data[0]['avg_frame_rate'] != '0/0':
-                frame_rate_definition = video_streams_data[0]['avg_frame_rate']
-            elif video_streams_data[0]['r_frame_rate'] != '0/0':
-                frame_rate_definition = video_streams_data[0]['r_frame_rate']
-            else:
-                msg = "Unable to read frame rate from " +\
-                    f"{video_streams_data[0]['codec_name']} in '{input_filename}'"
-                logger.error(msg)
-                raise SkipFile(msg)
-
-            frame_base, divisor = frame_rate_definition.split('/')
-            if 'duration' in video_streams_data[0]:
-                duration = float(video_streams_data[0]['duration'])
-            elif 'duration' in full_metadata['format']:
-                # Duration isn't set on the video stream
-                duration = float(full_metadata['format']['duration'])
-            else:
-                msg = f"Unable to determine duration"
-                logger.error(f"{msg}\nVideo metadata: {pprint.pformat(full_metadata)}")
-                raise SkipFile(msg)
-
-            total_frames = duration * (float(frame_base) / int(divisor))
+            subtract_start_time = False
         case _:
             msg = "Unknown codec - read frame count from codec: " +\
-                f"{video_streams_data[0]['codec_name']} in '{input_filename}'"
+                f"{video_stream.codec_name} in '{input_filename}'"
             logger.error(msg)
             raise SkipFile(msg)
 
-    return total_frames
+    if video_stream.frame_rate is None:
+        msg = "Unable to read frame rate from " +\
+            f"{video_stream.codec_name} in '{input_filename}'"
+        logger.error(msg)
+        raise SkipFile(msg)
+
+    # Duration isn't always set on the video stream, fall back to the
+    # container's.
+    duration = video_stream.duration
+    if duration is None:
+        duration = media.duration
+    if duration is None:
+        msg = "Unable to determine duration"
+        logger.error(f"{msg}\nVideo metadata: {pprint.pformat(media)}")
+        raise SkipFile(msg)
+
+    if subtract_start_time and video_stream.start_time:
+        duration -= video_stream.start_time
+
+    return duration * video_stream.frame_rate
 
 
 def transcode_file_ffmpeg(input_filename: str, output_filename: str,
@@ -241,39 +167,28 @@ def transcode_file_ffmpeg(input_filename: str, output_filename: str,
         SkipFile: Raised if the input file is missing.
         RuntimeError: Rauised if the ffmpeg command line is invalid.
     """
-    full_metadata = ffmpeg_utils.fetch_file_data(input_filename)
-    logger.debug(pprint.pformat(full_metadata))
+    # Chapters/programs aren't needed here, just the streams and format.
+    media = ffmpeg_utils.fetch_media_info(input_filename, profile='streams')
+    logger.debug(pprint.pformat(media))
     # Real video streams only - excludes attached pictures (embedded cover
     # art), which are typically (but not always) mjpeg. Excluding all mjpeg
     # streams unconditionally was wrong: some files' actual video track is
     # itself mjpeg-encoded (e.g. old webcam/capture AVI files), and that was
-    # being dropped entirely, leaving this list empty and crashing everything
-    # downstream that assumes video_streams_data[0] exists.
-    video_streams_data = list(filter(
-        lambda x: x['codec_type'] == 'video' and x['disposition']['attached_pic'] == 0,
-        full_metadata['streams']
-    ))
-    if not video_streams_data:
+    # being dropped entirely.
+    video_stream = media.primary_video
+    if video_stream is None:
         raise SkipFile(f"No (non-attached-picture) video stream found in '{input_filename}'")
-    total_frames = read_total_frames(input_filename, full_metadata, video_streams_data)
-    try:
-        source_duration_seconds = float(full_metadata['format']['duration'])
-    except (KeyError, ValueError):
-        source_duration_seconds = None
+    total_frames = read_total_frames(input_filename, media)
+    source_duration_seconds = media.duration
 
     # Fetch the video_formats
-    video_formats = list(map(lambda x: x['codec_name'], video_streams_data))
+    video_formats = [stream.codec_name for stream in media.video_streams]
 
     # Detect embedded images
     extra_params = {}
-    for i in range(len(full_metadata['streams'])):
-        if full_metadata['streams'][i]['codec_type'] == 'video' and \
-            full_metadata['streams'][i]['disposition']['attached_pic']:
-            # Attached images should just be copied.
-            extra_params[f'codec:{i}'] = 'copy'
-
-
-
+    for attached_pic in media.attached_pics:
+        # Attached images should just be copied.
+        extra_params[f'codec:{attached_pic.index}'] = 'copy'
 
     # Check the video size
     # To handle:
@@ -287,20 +202,20 @@ def transcode_file_ffmpeg(input_filename: str, output_filename: str,
     # To track down, how to calculate which one from the parameters
     # Most commonly this is handled by a scale paramter:
     # -filter:v "scale=720:-2"
-    height_modulo = video_streams_data[0]['height'] % 4
-    width_modulo  = video_streams_data[0]['width']  % 4
+    height_modulo = video_stream.height % 4
+    width_modulo  = video_stream.width  % 4
     if height_modulo != 0 or width_modulo != 0:
         if height_modulo != 0 and width_modulo != 0:
             # Both are bad, explicit (rounded up) values have to be used for both
-            new_width  = video_streams_data[0]['width']  + (4 - width_modulo)
-            new_height = video_streams_data[0]['height'] + (4 - height_modulo)
+            new_width  = video_stream.width  + (4 - width_modulo)
+            new_height = video_stream.height + (4 - height_modulo)
             scale_value = f"{new_width}:{new_height}"
         elif width_modulo != 0:
             # Set scale=-2:<height>
-            scale_value = f"-2:{video_streams_data[0]['height']}"
+            scale_value = f"-2:{video_stream.height}"
         else:
             # Set scale=<width>:-2
-            scale_value = f"{video_streams_data[0]['width']}:-2"
+            scale_value = f"{video_stream.width}:-2"
         # Use a stream-specific filter (rather than the global 'vf') so it only
         # applies to the primary video stream. A blanket '-vf' also gets applied to
         # any other video streams (e.g. an embedded cover-art image copied via
@@ -601,6 +516,8 @@ def parse_args():
     parser = argparse.ArgumentParser(description='Bulk converter')
 
     utils.add_common_arguments(parser=parser)
+    utils.add_probe_cache_arguments(parser=parser)
+    utils.add_backend_arguments(parser=parser)
 
     # Add app specific CLI arguments.
     parser.add_argument(
@@ -652,6 +569,11 @@ def main() -> None:
         return
 
     utils.setup_logging(args=args)
+    ffmpeg_utils.configure_probe_cache(
+        enabled=not args.no_probe_cache,
+        cache_dir=args.probe_cache_dir,
+    )
+    ffmpeg_utils.set_backend(args.backend)
 
     logger.debug(f"Args: {args}")
 
@@ -664,5 +586,7 @@ def main() -> None:
     else:
         process_dir(args)
 
+    ffmpeg_utils.log_probe_cache_stats()
+
 if __name__ == '__main__':
     main()
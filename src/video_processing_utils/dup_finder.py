@@ -12,7 +12,9 @@ compared by sliding one sequence over the other to find the offset with the
 lowest average Hamming distance over the overlapping region - this is the
 same idea as audio fingerprinting cross-correlation. An offset of ~0 with
 full overlap is "same content, different encode"; a non-zero offset with
-partial overlap is "same content, shifted by an intro/outro".
+partial overlap is "same content, shifted by an intro/outro". The offset
+search runs coarse-to-fine: on block-averaged sequences first, then at full
+resolution only around the most promising offsets.
 
 This intentionally only *reports* possible duplicate groups - it never
 deletes or modifies a file. Perceptual hashing has false positives, and
@@ -31,20 +33,29 @@ both duplicate scenarios above, rather than needing two separate mechanisms.
 
 # System imports
 import argparse
+import bisect
+import concurrent.futures
 import dataclasses
+import hashlib
 import itertools
 import logging
 import os
 import pathlib
 import pprint
+import sqlite3
+import sys
+import typing
 
 # External imports
 import ffmpeg
+import numpy
 
 # Local imports
-from . import ffmpeg_utils, utils
-from .cli import walk_files
-from .convert_video import ACCEPTED_EXTENSIONS
+from . import audio_fingerprint, ffmpeg_utils, utils, video_signature
+from .hash_store import HashStore
+from .library_index import LibraryEntry, LibraryIndex, absolute_path, is_current, relative_path
+from .media_info import MediaInfo
+from .sequence_arena import SequenceArena
 
 logger = logging.getLogger(__name__)
 
@@ -53,7 +64,60 @@ logger = logging.getLogger(__name__)
 FRAME_HASH_HEIGHT = 8
 FRAME_HASH_WIDTH = FRAME_HASH_HEIGHT + 1
 FRAME_HASH_BYTES = FRAME_HASH_WIDTH * FRAME_HASH_HEIGHT
-HASH_BITS = FRAME_HASH_HEIGHT * FRAME_HASH_HEIGHT  # 64 for the 8x8 default
+# 64 for the 8x8 default, which is also the most dhash_frames() can pack
+# into its uint64 hashes.
+HASH_BITS = FRAME_HASH_HEIGHT * FRAME_HASH_HEIGHT
+
+# coarse_to_fine_alignment() defaults: hashes averaged into each coarse one,
+# coarse offsets refined at full resolution, and the fewest coarse hashes
+# worth searching (shorter sequences are aligned exhaustively).
+COARSE_FACTOR = 8
+COARSE_TOP_K = 4
+COARSE_MIN_BLOCKS = 8
+
+# How compute_frame_hash_sequence() picks the frames to hash: 'fps' decodes
+# every frame and takes the one shown at each sample time; 'keyframe' only
+# decodes keyframes and takes the latest one at or before each sample time.
+SAMPLING_MODES = ['fps', 'keyframe']
+
+# What compute_frame_hash_sequence() hashes each sampled frame into:
+# 'dhash' is a 64-bit dHash; 'signature' is its MPEG-7 signature from
+# ffmpeg's signature filter (see video_signature), a row of
+# video_signature.SIGNATURE_WORDS uint64s compared by L1 distance.
+ENGINES = ['dhash', 'signature']
+
+# Default match threshold for 'dhash' frame hashes (of HASH_BITS).
+DEFAULT_SEQUENCE_THRESHOLD = 10.0
+
+# How find_duplicates() picks the pairs worth aligning: 'duration' pairs
+# files of similar length; 'index' pairs files sharing near-identical frames,
+# found through a FrameHashIndex.
+CANDIDATE_MODES = ['duration', 'index']
+
+# FrameHashIndex defaults: substrings each hash is split into (a divisor of
+# HASH_BITS), the Hamming distance up to which two frames count as the
+# same, how many times the average bucket size a bucket can grow before
+# it's treated as uninformative (title cards, logos...), the smallest
+# bucket ever treated so, and the shared frames that make two files a
+# candidate pair.
+INDEX_CHUNKS = 4
+FRAME_MATCH_RADIUS = 8
+INDEX_STOP_FACTOR = 64
+INDEX_MIN_STOP_SIZE = 256
+MIN_SHARED_FRAMES = 3
+# Frames whose hash has fewer set bits than this are near-flat (black
+# screens, fades) - every file has them, so they're left out of the index.
+INDEX_MIN_FRAME_BITS = 8
+
+# Audio fingerprints (see `audio_fingerprint`) of the same content differ
+# in well under this many of their 64 bits on average, even across lossy
+# re-encodes; unrelated audio differs in about 32. The audio prefilter only
+# rejects pairs above it, so it errs towards hashing a pair's video anyway.
+AUDIO_REJECT_DISTANCE = 26.0
+
+# Set bits in each possible byte value.
+_BYTE_POPCOUNTS = numpy.array([bin(value).count('1') for value in range(256)], dtype=numpy.uint8)
+
 
 
 @dataclasses.dataclass
@@ -73,7 +137,7 @@ class DuplicateMatch:
     '''A detected match between two files.'''
     file_a: str
     file_b: str
-    distance: float    # average per-frame Hamming distance over the overlap (0-64, lower = more similar)
+    distance: float    # average per-frame distance over the overlap (0-64 for dHash, lower = more similar)
     offset_seconds: float
     overlap_fraction: float  # fraction of the shorter sequence that overlapped
 
@@ -90,63 +154,406 @@ def probe_video_info(path: str) -> VideoInfo:
     Returns:
         VideoInfo: Technical info about the file.
     """
-    metadata = ffmpeg_utils.fetch_file_data(path)
-    video_streams = [
-        curr_stream for curr_stream in metadata['streams']
-        if curr_stream['codec_type'] == 'video' and
-            curr_stream['disposition']['attached_pic'] == 0
-    ]
-    if not video_streams:
+    return video_info_from_media(
+        path, ffmpeg_utils.fetch_media_info(path, profile='geometry'),
+    )
+
+
+def video_info_from_media(path: str, media: MediaInfo) -> VideoInfo:
+    """Build a `VideoInfo` from an already-probed file.
+
+    Args:
+        path (str): Path to the video file.
+        media (MediaInfo): `path` probed with at least the 'geometry'
+            profile.
+
+    Raises:
+        ValueError: If no (non-attached-picture) video stream is found.
+
+    Returns:
+        VideoInfo: Technical info about the file.
+    """
+    stream = media.primary_video
+    if stream is None:
         raise ValueError(f"No video stream found in '{path}'")
-    stream = video_streams[0]
 
-    duration = metadata.get('format', {}).get('duration') or stream.get('duration')
+    duration = media.duration or stream.duration
     if duration is None:
         raise ValueError(f"Could not determine duration of '{path}'")
 
     return VideoInfo(
         path=path,
-        duration=float(duration),
-        width=stream.get('width', 0),
-        height=stream.get('height', 0),
+        duration=duration,
+        width=stream.width or 0,
+        height=stream.height or 0,
         size_bytes=os.path.getsize(path),
     )
 
 
-def compute_frame_hash_sequence(path: str, sample_interval_seconds: float) -> list[int]:
+def video_info_from_entry(entry: LibraryEntry, path: str) -> VideoInfo:
+    """Build a `VideoInfo` from a duplicate index (or shard) entry, without
+    touching the file.
+
+    Args:
+        entry (LibraryEntry): The indexed file.
+        path (str): Where the file is reported, e.g. its indexed path
+            under the library root (`library_index.absolute_path`).
+
+    Returns:
+        VideoInfo: Technical info about the file, as indexed.
+    """
+    return VideoInfo(
+        path=path, duration=entry.duration, width=entry.width,
+        height=entry.height, size_bytes=entry.size_bytes,
+    )
+
+
+def compute_frame_hash_sequence(path: str, sample_interval_seconds: float,
+                                threads: int | None = None,
+                                sampling: str = 'fps',
+                                engine: str = 'dhash') -> numpy.ndarray:
     """Compute a perceptual hash (dHash) for frames sampled at a fixed
     interval across the whole video.
 
+    Frames are decoded through the current media backend (see
+    `ffmpeg_utils.set_backend`).
+
+    'keyframe' sampling skips decoding everything but keyframes, which
+    makes hashing several times cheaper, at a cost in accuracy: each sample
+    is the latest keyframe at or before its time, up to a GOP length (often
+    2-10 seconds) early, and two encodes of the same content rarely place
+    their keyframes alike. Matching pairs therefore score a higher
+    distance than with 'fps' sampling - most noticeably on fast-cut
+    content - so a higher `--sequence-threshold` and a sample interval
+    well above the GOP length suit it. Files hashed in different modes
+    can't be meaningfully compared.
+
     Args:
         path (str): Path to the video file.
         sample_interval_seconds (float): Seconds between sampled frames.
+        threads (int | None, optional): Decoder threads to use. Defaults to
+            None (the decoder's own choice).
+        sampling (str, optional): A `SAMPLING_MODES` entry. Defaults to
+            'fps'.
+        engine (str, optional): An `ENGINES` entry. 'signature' frames are
+            always decoded by the ffmpeg executable. Defaults to 'dhash'.
+
+    Raises:
+        ValueError: If `sampling` or `engine` isn't a known mode.
+        ffmpeg.errors.FFmpegError: If `path` can't be decoded.
 
     Returns:
-        list[int]: One hash per sampled frame, in playback order. Each hash
-            is a `HASH_BITS`-bit integer.
+        numpy.ndarray: One uint64 hash per sampled frame, in playback order
+            - or with the 'signature' engine, one row of them.
     """
+    if sampling not in SAMPLING_MODES:
+        raise ValueError(f"Unknown sampling mode '{sampling}'")
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown hashing engine '{engine}'")
+    if engine == 'signature':
+        return video_signature.compute_signature_sequence(
+            path, sample_interval_seconds, threads=threads,
+            keyframes_only=sampling == 'keyframe',
+        )
+
+    # Hashed chunk by chunk as the frames are decoded, so memory use doesn't
+    # grow with the video's length.
     fps = 1.0 / sample_interval_seconds
-    cmd = ffmpeg.FFmpeg().option('v', 'error').input(path).output(
-        'pipe:1',
-        {
-            'vf': f'fps={fps},scale={FRAME_HASH_WIDTH}:{FRAME_HASH_HEIGHT}:flags=bilinear',
-            'f': 'rawvideo',
-            'pix_fmt': 'gray',
-            'an': None,
-        },
-    )
-    raw_frames = cmd.execute()
-
-    return [
-        _dhash_from_frame(raw_frames[offset:offset + FRAME_HASH_BYTES])
-        for offset in range(0, len(raw_frames) - FRAME_HASH_BYTES + 1, FRAME_HASH_BYTES)
+    hashes = [
+        dhash_frames(chunk)
+        for chunk in ffmpeg_utils.get_backend().iter_gray_frames(
+            path, fps, FRAME_HASH_WIDTH, FRAME_HASH_HEIGHT, threads=threads,
+            keyframes_only=sampling == 'keyframe',
+        )
     ]
+    if not hashes:
+        return numpy.empty(0, dtype=numpy.uint64)
+    return numpy.concatenate(hashes)
+
+
+def hash_store_kind(sample_interval_seconds: float, sampling: str = 'fps',
+                    engine: str = 'dhash') -> str:
+    """`HashStore` kind for sequences from `compute_frame_hash_sequence`
+    with the current hash geometry and media backend."""
+    if engine == 'signature':
+        return video_signature.signature_store_kind(sample_interval_seconds, sampling)
+    kind = f"dhash{FRAME_HASH_WIDTH}x{FRAME_HASH_HEIGHT}:{float(sample_interval_seconds)!r}"
+    if sampling != 'fps':
+        kind = f"{kind}:{sampling}"
+    backend = ffmpeg_utils.get_backend()
+    # Other backends' frames aren't byte-for-byte ffmpeg's, so are kept apart.
+    if backend.name != ffmpeg_utils.SubprocessBackend.name:
+        kind = f"{backend.name}:{kind}"
+    return kind
+
+
+def engine_threshold(engine: str) -> float:
+    """Default `find_duplicates` match threshold for `engine`'s frame
+    distances.
+
+    Args:
+        engine (str): An `ENGINES` entry.
+
+    Returns:
+        float: The threshold.
+    """
+    if engine == 'signature':
+        return video_signature.SIGNATURE_THRESHOLD
+    return DEFAULT_SEQUENCE_THRESHOLD
+
+
+def engine_max_distance(engine: str) -> int:
+    """Largest possible distance between two of `engine`'s frame hashes."""
+    if engine == 'signature':
+        return video_signature.SIGNATURE_BITS
+    return HASH_BITS
+
+
+def stored_frame_hash_sequence(
+    path: str, sample_interval_seconds: float, hash_store: HashStore | None,
+    threads: int | None = None,
+    sampling: str = 'fps',
+    engine: str = 'dhash',
+) -> numpy.ndarray:
+    """`compute_frame_hash_sequence`, reusing `hash_store`'s copy while
+    `path` is unchanged and storing a freshly computed one.
+
+    Args:
+        path (str): Path to the video file.
+        sample_interval_seconds (float): Seconds between sampled frames.
+        hash_store (HashStore | None): Store to consult, or None to always
+            compute.
+        threads (int | None, optional): Decoder threads to use when
+            computing. Defaults to None (the decoder's own choice).
+        sampling (str, optional): A `SAMPLING_MODES` entry. Defaults to
+            'fps'.
+        engine (str, optional): An `ENGINES` entry. Defaults to 'dhash'.
+
+    Raises:
+        ffmpeg.errors.FFmpegError: If `path` can't be decoded.
+        ValueError: If `sampling` or `engine` isn't a known mode.
+
+    Returns:
+        numpy.ndarray: As `compute_frame_hash_sequence`.
+    """
+    if hash_store is None:
+        return compute_frame_hash_sequence(
+            path, sample_interval_seconds, threads=threads, sampling=sampling, engine=engine,
+        )
+
+    kind = hash_store_kind(sample_interval_seconds, sampling, engine)
+    sequence = hash_store.get(path, kind)
+    if sequence is None:
+        sequence = compute_frame_hash_sequence(
+            path, sample_interval_seconds, threads=threads, sampling=sampling, engine=engine,
+        )
+        hash_store.put(path, kind, sequence)
+    elif engine == 'signature':
+        # Stored flat.
+        sequence = sequence.reshape(-1, video_signature.SIGNATURE_WORDS)
+    return sequence
+
+
+@dataclasses.dataclass
+class HashResult:
+    '''Outcome of hashing one file as part of a batch - exactly one of
+    `sequence`/`error` is set.
+    '''
+    path: str
+    sequence: numpy.ndarray | None = None
+    error: Exception | None = None
+
+
+def decode_threads_per_job(jobs: int) -> int | None:
+    """Decoder threads to give each of `jobs` concurrent decodes so that
+    together they use about one thread per core.
+
+    Args:
+        jobs (int): Concurrent decodes.
+
+    Returns:
+        int | None: Threads per decode, or None for a single job (the
+            decoder's own choice).
+    """
+    if jobs <= 1:
+        return None
+    return max(1, (os.cpu_count() or 1) // jobs)
+
+
+def iter_frame_hash_sequences(
+    paths: typing.Iterable[str],
+    sample_interval_seconds: float,
+    hash_store: HashStore | None = None,
+    jobs: int = 1,
+    sampling: str = 'fps',
+    engine: str = 'dhash',
+) -> typing.Iterator[HashResult]:
+    """Hash many files via `stored_frame_hash_sequence`, up to `jobs` at a
+    time, yielding the results in the same order as `paths`.
+
+    A file that fails to decode is reported through its result's `error`
+    rather than aborting the rest of the batch.
+
+    Args:
+        paths (typing.Iterable[str]): Files to hash.
+        sample_interval_seconds (float): Seconds between sampled frames.
+        hash_store (HashStore | None, optional): See
+            `stored_frame_hash_sequence`. Defaults to None.
+        jobs (int, optional): Maximum concurrent decodes; each gets a share
+            of the cores as decoder threads (`decode_threads_per_job`).
+            Defaults to 1.
+        sampling (str, optional): A `SAMPLING_MODES` entry. Defaults to
+            'fps'.
+        engine (str, optional): An `ENGINES` entry. Defaults to 'dhash'.
+
+    Yields:
+        HashResult: One per entry in `paths`.
+    """
+    threads = decode_threads_per_job(jobs)
+
+    def hash_one(path: str) -> numpy.ndarray:
+        return stored_frame_hash_sequence(
+            path, sample_interval_seconds, hash_store,
+            threads=threads, sampling=sampling, engine=engine,
+        )
+
+    yield from _iter_hash_results(hash_one, paths, jobs)
+
+
+def stored_audio_fingerprint(path: str, hash_store: HashStore | None) -> numpy.ndarray:
+    """`audio_fingerprint.compute_audio_fingerprint`, reusing `hash_store`'s
+    copy while `path` is unchanged and storing a freshly computed one.
+
+    Args:
+        path (str): Path to the media file.
+        hash_store (HashStore | None): Store to consult, or None to always
+            compute.
+
+    Raises:
+        ffmpeg.errors.FFmpegError: If `path` has no audio stream or it
+            can't be decoded.
+
+    Returns:
+        numpy.ndarray: The uint64 fingerprint sequence.
+    """
+    if hash_store is None:
+        return audio_fingerprint.compute_audio_fingerprint(path)
+
+    kind = audio_fingerprint.fingerprint_store_kind()
+    fingerprint = hash_store.get(path, kind)
+    if fingerprint is None:
+        fingerprint = audio_fingerprint.compute_audio_fingerprint(path)
+        hash_store.put(path, kind, fingerprint)
+    return fingerprint
+
+
+def iter_audio_fingerprints(
+    paths: typing.Iterable[str],
+    hash_store: HashStore | None = None,
+    jobs: int = 1,
+) -> typing.Iterator[HashResult]:
+    """Fingerprint many files' audio via `stored_audio_fingerprint`, up to
+    `jobs` at a time, yielding the results in the same order as `paths`.
+
+    A file without (decodable) audio is reported through its result's
+    `error` rather than aborting the rest of the batch.
+
+    Args:
+        paths (typing.Iterable[str]): Files to fingerprint.
+        hash_store (HashStore | None, optional): See
+            `stored_audio_fingerprint`. Defaults to None.
+        jobs (int, optional): Maximum concurrent decodes. Defaults to 1.
+
+    Yields:
+        HashResult: One per entry in `paths`, the fingerprint as its
+            `sequence`.
+    """
+    def fingerprint_one(path: str) -> numpy.ndarray:
+        return stored_audio_fingerprint(path, hash_store)
+
+    yield from _iter_hash_results(fingerprint_one, paths, jobs)
+
+
+def _iter_hash_results(
+    hash_one: typing.Callable[[str], numpy.ndarray],
+    paths: typing.Iterable[str],
+    jobs: int,
+) -> typing.Iterator[HashResult]:
+    """Run `hash_one` on each of `paths`, up to `jobs` at a time, yielding
+    a `HashResult` per path in order."""
+    def run_one(path: str) -> HashResult:
+        try:
+            return HashResult(path=path, sequence=hash_one(path))
+        except ffmpeg.errors.FFmpegError as exc:
+            return HashResult(path=path, error=exc)
+
+    paths = list(paths)
+    if jobs <= 1 or len(paths) <= 1:
+        yield from map(run_one, paths)
+        return
+
+    # The work happens in the ffmpeg subprocesses (or PyAV, which releases
+    # the GIL while decoding), so threads are enough.
+    with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(run_one, path) for path in paths]
+        for future in futures:
+            yield future.result()
+
+
+def open_hash_store(enabled: bool = True, store_dir: str | None = None) -> HashStore | None:
+    """Open the persistent frame-hash sequence store.
+
+    Args:
+        enabled (bool, optional): Use the store at all. Defaults to True.
+        store_dir (str | None, optional): Directory to keep the store
+            database in. Defaults to None (`utils.user_cache_dir()`).
+
+    Returns:
+        HashStore | None: The store, or None if it's disabled or couldn't
+            be opened (hashing then just runs unstored).
+    """
+    if not enabled:
+        return None
+
+    store_dir = store_dir or utils.user_cache_dir()
+    try:
+        return HashStore(store_dir)
+    except (OSError, sqlite3.Error) as exc:
+        logger.warning(f"Hash store in '{store_dir}' unavailable, hashing every file: {exc}")
+        return None
+
+
+def dhash_frames(raw_frames: bytes | memoryview) -> numpy.ndarray:
+    """Difference hashes of back-to-back `FRAME_HASH_WIDTH` x
+    `FRAME_HASH_HEIGHT` greyscale frames, all computed in one vectorized
+    pass. Bit-identical to `_dhash_from_frame` per frame.
+
+    Args:
+        raw_frames (bytes | memoryview): The frames, `FRAME_HASH_BYTES`
+            each. A trailing partial frame is ignored.
+
+    Returns:
+        numpy.ndarray: One uint64 hash per frame, in order.
+    """
+    num_frames = len(raw_frames) // FRAME_HASH_BYTES
+    frames = numpy.frombuffer(
+        raw_frames, dtype=numpy.uint8, count=num_frames * FRAME_HASH_BYTES,
+    ).reshape(num_frames, FRAME_HASH_HEIGHT, FRAME_HASH_WIDTH)
+
+    # Row-major bits, first pixel most significant: pack each frame's
+    # HASH_BITS comparisons into bytes and read them as one big-endian
+    # 64-bit integer.
+    bits = frames[:, :, :-1] > frames[:, :, 1:]
+    packed = numpy.packbits(bits.reshape(num_frames, HASH_BITS), axis=1)
+    return packed.view('>u8').ravel().astype(numpy.uint64)
 
 
 def _dhash_from_frame(frame: bytes) -> int:
     """Difference hash of one `FRAME_HASH_WIDTH` x `FRAME_HASH_HEIGHT`
     greyscale frame: one bit per pixel, set if it's brighter than the pixel
     to its right.
+
+    Pure-Python reference for `dhash_frames`.
     """
     bits = 0
     for row in range(FRAME_HASH_HEIGHT):
@@ -162,14 +569,26 @@ def hamming_distance(hash_a: int, hash_b: int) -> int:
 
 
 def best_alignment(
-    seq_a: list[int], seq_b: list[int], min_overlap_fraction: float,
+    seq_a: numpy.ndarray | list[int], seq_b: numpy.ndarray | list[int],
+    min_overlap_fraction: float,
 ) -> tuple[int, float, int] | None:
     """Slide `seq_b` over `seq_a` to find the offset with the lowest average
     Hamming distance over the overlapping region.
 
+    Every offset is scored at once: the summed distance over an overlap is
+    the popcounts of both sides (prefix sums) minus twice the number of
+    bits set in both, and that last term for all offsets is the
+    cross-correlation of the two sequences' 64 bit planes, done via FFT.
+    `_best_alignment_reference` is the direct loop this replaces.
+
+    Wider hashes work the same way: a sequence may also be a `(length,
+    words)` uint64 array, each row one hash of `64 * words` bits (as from
+    the 'signature' engine, see `video_signature`).
+
     Args:
-        seq_a (list[int]): Reference frame-hash sequence.
-        seq_b (list[int]): Frame-hash sequence to align against `seq_a`.
+        seq_a (numpy.ndarray | list[int]): Reference frame-hash sequence.
+        seq_b (numpy.ndarray | list[int]): Frame-hash sequence to align
+            against `seq_a`.
         min_overlap_fraction (float): Minimum fraction of the shorter
             sequence's length that must overlap for an offset to be
             considered, so near-empty overlaps at extreme offsets don't win
@@ -182,6 +601,227 @@ def best_alignment(
             intro `seq_b` doesn't), or None if neither sequence has any
             frames, or no offset reaches `min_overlap_fraction`.
     """
+    seq_a = numpy.asarray(seq_a, dtype=numpy.uint64)
+    seq_b = numpy.asarray(seq_b, dtype=numpy.uint64)
+    len_a, len_b = len(seq_a), len(seq_b)
+    if len_a == 0 or len_b == 0:
+        return None
+
+    min_overlap = max(1, int(min_overlap_fraction * min(len_a, len_b)))
+
+    scores = _alignment_scores(_bit_planes(seq_a), _bit_planes(seq_b), min_overlap)
+    if scores is None:
+        return None
+    offsets, avg_distances, overlaps = scores
+
+    best = _rank_alignments(offsets, avg_distances, overlaps)[0]
+    return int(offsets[best]), float(avg_distances[best]), int(overlaps[best])
+
+
+def _alignment_scores(
+    planes_a: numpy.ndarray, planes_b: numpy.ndarray, min_overlap: int,
+) -> tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray] | None:
+    """Average Hamming distance at every offset of `planes_b` over
+    `planes_a` (see `best_alignment`) overlapping by at least `min_overlap`
+    rows.
+
+    The planes are `(length, bits)` bit matrices (`_bit_planes`), or
+    fractional ones (`_block_planes`) - the distance between two rows is
+    then the expected number of differing bits.
+
+    Returns:
+        tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray] | None:
+            `(offsets, avg_distances, overlaps)` for the offsets reaching
+            `min_overlap`, or None if none does.
+    """
+    len_a, len_b = len(planes_a), len(planes_b)
+    offsets = numpy.arange(-(len_b - 1), len_a)
+    starts = numpy.maximum(0, offsets)
+    ends = numpy.minimum(len_a, len_b + offsets)
+    overlaps = ends - starts
+    valid = overlaps >= min_overlap
+    if not valid.any():
+        return None
+    offsets, starts, ends, overlaps = offsets[valid], starts[valid], ends[valid], overlaps[valid]
+
+    exact = numpy.issubdtype(planes_a.dtype, numpy.integer)
+    sum_dtype = numpy.int64 if exact else numpy.float64
+    popcounts_a = numpy.concatenate(([0], numpy.cumsum(planes_a.sum(axis=1, dtype=sum_dtype))))
+    popcounts_b = numpy.concatenate(([0], numpy.cumsum(planes_b.sum(axis=1, dtype=sum_dtype))))
+
+    # both_set[offset] = sum over i of popcount(seq_a[i] & seq_b[i - offset]),
+    # the bit planes' cross-correlations summed (which linearity lets happen
+    # before the inverse FFT). Zero-padded so it doesn't wrap around;
+    # negative offsets land at the end.
+    fft_len = 1 << (len_a + len_b - 2).bit_length()
+    spectrum = (
+        numpy.fft.rfft(planes_a, n=fft_len, axis=0) *
+        numpy.conj(numpy.fft.rfft(planes_b, n=fft_len, axis=0))
+    ).sum(axis=1)
+    both_set = numpy.fft.irfft(spectrum, n=fft_len)
+    if exact:
+        both_set = numpy.rint(both_set).astype(numpy.int64)
+
+    total_distances = (
+        popcounts_a[ends] - popcounts_a[starts] +
+        popcounts_b[ends - offsets] - popcounts_b[starts - offsets] -
+        2 * both_set[offsets % fft_len]
+    )
+    return offsets, total_distances / overlaps, overlaps
+
+
+def _rank_alignments(
+    offsets: numpy.ndarray, avg_distances: numpy.ndarray, overlaps: numpy.ndarray,
+) -> numpy.ndarray:
+    """Indices into the scored offsets, best alignment first.
+
+    Ranked by (lowest avg_distance, then largest overlap) so that when two
+    offsets tie on distance - easy to happen by chance over a short/partial
+    overlap - the one backed by more evidence wins; then by lowest offset,
+    as `_best_alignment_reference` would.
+    """
+    return numpy.lexsort((offsets, -overlaps, avg_distances))
+
+
+def coarse_to_fine_alignment(
+    seq_a: numpy.ndarray | list[int], seq_b: numpy.ndarray | list[int],
+    min_overlap_fraction: float,
+    max_distance: float | None = None,
+    factor: int = COARSE_FACTOR,
+    top_k: int = COARSE_TOP_K,
+) -> tuple[int, float, int] | None:
+    """`best_alignment`, searched coarse-to-fine rather than scoring every
+    offset at full resolution.
+
+    Both sequences are first shrunk `factor`-fold by averaging each block
+    of `factor` hashes' bits, and every offset of those is scored - about
+    `factor` times less work than `best_alignment`. Only the `top_k`
+    best coarse offsets are then refined, by scoring the full-resolution
+    offsets each one covers exactly. A matching offset still shows up at
+    coarse resolution, as a dip diluted by the surrounding unrelated
+    frames, so in practice this finds the same alignment as the
+    exhaustive search on matching pairs; on unrelated pairs it may return
+    a worse offset than `best_alignment` would, which doesn't matter as
+    neither is a match.
+
+    Sequences too short to shrink usefully are handed to `best_alignment`.
+
+    Args:
+        seq_a (numpy.ndarray | list[int]): Reference frame-hash sequence.
+        seq_b (numpy.ndarray | list[int]): Frame-hash sequence to align
+            against `seq_a`.
+        min_overlap_fraction (float): See `best_alignment`.
+        max_distance (float | None, optional): Give up (return None) right
+            after the coarse pass if even the most favourable reading of
+            its best offset can't reach this average distance - typically
+            the match threshold. Defaults to None (always refine).
+        factor (int, optional): Hashes averaged into each coarse one.
+            Defaults to COARSE_FACTOR.
+        top_k (int, optional): Coarse offsets to refine. Defaults to
+            COARSE_TOP_K.
+
+    Returns:
+        tuple[int, float, int] | None: As `best_alignment`, or None if the
+            pair was rejected by `max_distance`.
+    """
+    seq_a = numpy.asarray(seq_a, dtype=numpy.uint64)
+    seq_b = numpy.asarray(seq_b, dtype=numpy.uint64)
+    len_a, len_b = len(seq_a), len(seq_b)
+    if factor <= 1 or min(len_a, len_b) < factor * COARSE_MIN_BLOCKS:
+        return best_alignment(seq_a, seq_b, min_overlap_fraction)
+
+    min_overlap = max(1, int(min_overlap_fraction * min(len_a, len_b)))
+
+    planes_a, planes_b = _bit_planes(seq_a), _bit_planes(seq_b)
+    # A coarse offset covers full-resolution offsets whose overlap can be up
+    # to a block longer than its own.
+    coarse = _alignment_scores(
+        _block_planes(planes_a, factor), _block_planes(planes_b, factor),
+        max(1, min_overlap // factor - 1),
+    )
+    if coarse is None:
+        return None
+    coarse_offsets, coarse_distances, coarse_overlaps = coarse
+
+    if max_distance is not None:
+        # Coarse offset q compares block pairs whose frames are offset by
+        # q * factor - (factor - 1) .. q * factor + (factor - 1); any one
+        # full-resolution offset contributes a fraction of that average,
+        # at least 1/(2 * factor) for the better of the two coarse offsets
+        # straddling it. Reading the dip below the typical (unrelated)
+        # coarse distance as coming from that one offset alone gives the
+        # lowest distance it could have.
+        background = float(numpy.median(coarse_distances))
+        dip = background - float(coarse_distances.min())
+        if background - 2 * factor * dip > max_distance:
+            return None
+
+    top = _rank_alignments(coarse_offsets, coarse_distances, coarse_overlaps)[:top_k]
+    candidates = numpy.unique(numpy.concatenate([
+        numpy.arange(offset * factor - (factor - 1), offset * factor + factor)
+        for offset in coarse_offsets[top]
+    ]))
+    candidates = candidates[(candidates > -len_b) & (candidates < len_a)]
+
+    offsets, avg_distances, overlaps = _offset_distances(seq_a, seq_b, candidates)
+    valid = overlaps >= min_overlap
+    if not valid.any():
+        return None
+    offsets, avg_distances, overlaps = offsets[valid], avg_distances[valid], overlaps[valid]
+
+    best = _rank_alignments(offsets, avg_distances, overlaps)[0]
+    return int(offsets[best]), float(avg_distances[best]), int(overlaps[best])
+
+
+def _offset_distances(
+    seq_a: numpy.ndarray, seq_b: numpy.ndarray, offsets: numpy.ndarray,
+) -> tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+    """Exact `(offsets, avg_distances, overlaps)` for just the given
+    offsets of `seq_b` over `seq_a`, all scored in one gather."""
+    len_a, len_b = len(seq_a), len(seq_b)
+    starts = numpy.maximum(0, offsets)
+    ends = numpy.minimum(len_a, len_b + offsets)
+    overlaps = ends - starts
+
+    # One row per offset, padded out to the longest overlap (the padding
+    # re-reads the last overlapping pair, then is zeroed).
+    positions = numpy.arange(overlaps.max())
+    index_a = numpy.minimum(starts[:, None] + positions, ends[:, None] - 1)
+    differing = seq_a[index_a] ^ seq_b[index_a - offsets[:, None]]
+    differing[positions >= overlaps[:, None]] = 0
+    totals = _BYTE_POPCOUNTS[differing.view(numpy.uint8)].reshape(
+        len(offsets), -1,
+    ).sum(axis=1, dtype=numpy.int64)
+    return offsets, totals / overlaps, overlaps
+
+
+def _bit_counts(values: numpy.ndarray) -> numpy.ndarray:
+    """Number of set bits in each of a uint64 array's values."""
+    return _BYTE_POPCOUNTS[values.view(numpy.uint8)].reshape(-1, 8).sum(axis=1)
+
+
+def _block_planes(planes: numpy.ndarray, factor: int) -> numpy.ndarray:
+    """`planes` averaged over consecutive blocks of `factor` rows (a
+    trailing partial block is dropped): row `k` holds the fraction of
+    hashes `k * factor .. (k + 1) * factor - 1` with each bit set."""
+    num_blocks = len(planes) // factor
+    return planes[:num_blocks * factor].reshape(
+        num_blocks, factor, planes.shape[1],
+    ).mean(axis=1)
+
+
+def _bit_planes(seq: numpy.ndarray) -> numpy.ndarray:
+    """`(len(seq), 64 * words)` matrix of 0/1 - the bits of each hash,
+    whether one uint64 or a row of `words` of them."""
+    return numpy.unpackbits(seq.view(numpy.uint8).reshape(len(seq), -1), axis=1)
+
+
+def _best_alignment_reference(
+    seq_a: list[int], seq_b: list[int], min_overlap_fraction: float,
+) -> tuple[int, float, int] | None:
+    """Pure-Python, offset-by-offset reference for `best_alignment` - same
+    arguments and result.
+    """
     len_a, len_b = len(seq_a), len(seq_b)
     if len_a == 0 or len_b == 0:
         return None
@@ -215,6 +855,266 @@ def best_alignment(
     return best
 
 
+def _by_duration(infos: dict[str, VideoInfo]) -> tuple[list[str], list[float], list[int]]:
+    """`infos`' paths sorted by duration (ties in `infos` order), with their
+    durations and positions in `infos`."""
+    order = sorted(
+        enumerate(infos.values()), key=lambda item: (item[1].duration, item[0]),
+    )
+    return (
+        [info.path for _, info in order],
+        [info.duration for _, info in order],
+        [index for index, _ in order],
+    )
+
+
+def iter_duration_close_pairs(
+    infos: dict[str, VideoInfo], max_duration_diff: float,
+) -> typing.Iterator[tuple[str, str]]:
+    """Lazily yield every pair of files whose durations differ by at most
+    `max_duration_diff` seconds.
+
+    Sorts by duration and sweeps a window over it, so costs O(n log n + k)
+    for k pairs rather than comparing all n^2 / 2 pairs.
+
+    Args:
+        infos (dict[str, VideoInfo]): Files to pair, keyed by path.
+        max_duration_diff (float): Maximum duration difference in seconds.
+
+    Yields:
+        tuple[str, str]: `(path_a, path_b)`, with `path_a` before `path_b`
+            in `infos`' order. Pairs come in order of the shorter file's
+            duration, not `infos`' order.
+    """
+    paths, durations, positions = _by_duration(infos)
+    for start, (path_a, duration_a) in enumerate(zip(paths, durations)):
+        end = start + 1
+        while end < len(paths) and durations[end] - duration_a <= max_duration_diff:
+            if positions[start] < positions[end]:
+                yield path_a, paths[end]
+            else:
+                yield paths[end], path_a
+            end += 1
+
+
+def duration_close_summary(
+    infos: dict[str, VideoInfo], max_duration_diff: float,
+) -> tuple[set[str], int]:
+    """What `iter_duration_close_pairs` would yield, without generating
+    the pairs: which files are in at least one, and how many there are.
+
+    Args:
+        infos (dict[str, VideoInfo]): Files to pair, keyed by path.
+        max_duration_diff (float): Maximum duration difference in seconds.
+
+    Returns:
+        tuple[set[str], int]: Paths with at least one duration-close
+            partner, and the number of pairs.
+    """
+    paths, durations, _ = _by_duration(infos)
+    paired: set[str] = set()
+    num_pairs = 0
+    end = 0
+    for start, duration in enumerate(durations):
+        # The window's end only ever moves forward as its start does.
+        end = max(end, start + 1)
+        while end < len(durations) and durations[end] - duration <= max_duration_diff:
+            end += 1
+        if end > start + 1:
+            paired.update(paths[start:start + 2])
+            num_pairs += end - start - 1
+    return paired, num_pairs
+
+
+def iter_duration_close_cross_pairs(
+    infos_a: dict[str, VideoInfo], infos_b: dict[str, VideoInfo],
+    max_duration_diff: float,
+) -> typing.Iterator[tuple[str, str]]:
+    """Lazily yield every pair of one file from `infos_a` and one from
+    `infos_b` whose durations differ by at most `max_duration_diff`
+    seconds, in O(n log n + k) like `iter_duration_close_pairs`.
+
+    Args:
+        infos_a (dict[str, VideoInfo]): First side's files, keyed by path.
+        infos_b (dict[str, VideoInfo]): Second side's files, keyed by path.
+        max_duration_diff (float): Maximum duration difference in seconds.
+
+    Yields:
+        tuple[str, str]: `(path_a, path_b)`, in `infos_a` order.
+    """
+    paths_b, durations_b, _ = _by_duration(infos_b)
+    for path_a, info_a in infos_a.items():
+        start = bisect.bisect_left(durations_b, info_a.duration - max_duration_diff)
+        # The subtraction above can round either way; step back over any
+        # file it skipped that the check below accepts.
+        while start > 0 and info_a.duration - durations_b[start - 1] <= max_duration_diff:
+            start -= 1
+        for index in range(start, len(paths_b)):
+            if durations_b[index] - info_a.duration > max_duration_diff:
+                break
+            if abs(info_a.duration - durations_b[index]) <= max_duration_diff:
+                yield path_a, paths_b[index]
+
+
+class FrameHashIndex:
+    """Multi-index hash over the individual frame hashes of many files, for
+    finding files that share near-identical frames without comparing every
+    pair of files.
+
+    Each 64-bit hash is split into `num_chunks` substrings, and every
+    frame is filed under each of its substrings. Two frames within
+    `num_chunks - 1` bits of each other must agree exactly on at least one
+    substring, so looking a frame up only touches the frames in its own
+    few buckets; frames further apart are still found whenever their
+    differing bits happen to miss a substring. Candidates are then checked
+    against `radius` on the full hash.
+
+    Near-flat frames (`INDEX_MIN_FRAME_BITS`) are neither indexed nor
+    looked up, and oversized buckets are skipped, as near-identical frames
+    that turn up in many unrelated files say nothing about whether two of
+    them are duplicates.
+
+    Files are added first, then queried - the index is (re)built on the
+    first query after an `add`.
+    """
+
+    def __init__(self, num_chunks: int = INDEX_CHUNKS, radius: int = FRAME_MATCH_RADIUS,
+                 stop_factor: int = INDEX_STOP_FACTOR):
+        """Create an empty index.
+
+        Args:
+            num_chunks (int, optional): Substrings to split each hash
+                into; must divide HASH_BITS. Defaults to INDEX_CHUNKS.
+            radius (int, optional): Maximum Hamming distance for two frames
+                to count as the same. Defaults to FRAME_MATCH_RADIUS.
+            stop_factor (int, optional): Buckets more than this many times
+                the average size (and at least INDEX_MIN_STOP_SIZE) are
+                skipped when querying. Defaults to INDEX_STOP_FACTOR.
+
+        Raises:
+            ValueError: If `num_chunks` doesn't divide HASH_BITS.
+        """
+        if HASH_BITS % num_chunks:
+            raise ValueError(f"num_chunks must divide {HASH_BITS}, not {num_chunks}")
+        self.num_chunks = num_chunks
+        self.radius = radius
+        self.stop_factor = stop_factor
+        self.keys: list[str] = []
+        self._sequences: list[numpy.ndarray] = []
+        self._built = None
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def add(self, key: str, sequence: numpy.ndarray) -> None:
+        """Index the frame hashes of one file.
+
+        Args:
+            key (str): Identifies the file in query results, e.g. its path.
+            sequence (numpy.ndarray): The file's uint64 frame hashes.
+        """
+        self.keys.append(key)
+        self._sequences.append(numpy.asarray(sequence, dtype=numpy.uint64))
+        self._built = None
+
+    def _build(self) -> tuple:
+        if self._built is None:
+            lengths = [len(sequence) for sequence in self._sequences]
+            hashes = numpy.concatenate(self._sequences) if self._sequences else \
+                numpy.empty(0, dtype=numpy.uint64)
+            file_ids = numpy.repeat(numpy.arange(len(lengths)), lengths)
+            informative = _bit_counts(hashes) >= INDEX_MIN_FRAME_BITS
+            hashes, file_ids = hashes[informative], file_ids[informative]
+            chunk_bits = HASH_BITS // self.num_chunks
+            max_bucket = max(
+                INDEX_MIN_STOP_SIZE, self.stop_factor * len(hashes) >> chunk_bits,
+            )
+            tables = []
+            for chunk in range(self.num_chunks):
+                values = self._chunk_values(hashes, chunk)
+                order = numpy.argsort(values, kind='stable')
+                tables.append((values[order], order))
+            self._built = (hashes, file_ids, tables, max_bucket)
+        return self._built
+
+    def _chunk_values(self, hashes: numpy.ndarray, chunk: int) -> numpy.ndarray:
+        chunk_bits = HASH_BITS // self.num_chunks
+        mask = numpy.uint64((1 << chunk_bits) - 1)
+        return (hashes >> numpy.uint64(chunk * chunk_bits)) & mask
+
+    def _shared_frame_counts(self, sequence: numpy.ndarray) -> numpy.ndarray:
+        """For each indexed file (by position in `keys`), how many of
+        `sequence`'s frames are within `radius` of one of its frames."""
+        hashes, file_ids, tables, max_bucket = self._build()
+        num_files = len(self.keys)
+        sequence = numpy.asarray(sequence, dtype=numpy.uint64)
+
+        frame_numbers = numpy.flatnonzero(_bit_counts(sequence) >= INDEX_MIN_FRAME_BITS)
+        sequence = sequence[frame_numbers]
+
+        found = []
+        for chunk, (sorted_values, order) in enumerate(tables):
+            query_values = self._chunk_values(sequence, chunk)
+            lows = numpy.searchsorted(sorted_values, query_values, side='left')
+            sizes = numpy.searchsorted(sorted_values, query_values, side='right') - lows
+            sizes[sizes > max_bucket] = 0
+            total = int(sizes.sum())
+            if total == 0:
+                continue
+
+            # Every (query frame, bucket entry) pair, flattened.
+            frames = numpy.repeat(numpy.arange(len(sequence)), sizes)
+            positions = numpy.arange(total) + numpy.repeat(lows - (numpy.cumsum(sizes) - sizes), sizes)
+            entries = order[positions]
+
+            close = _bit_counts(sequence[frames] ^ hashes[entries]) <= self.radius
+            found.append(frame_numbers[frames[close]] * num_files + file_ids[entries[close]])
+
+        if not found:
+            return numpy.zeros(num_files, dtype=numpy.int64)
+        # A frame counts once per file, however many frames/substrings hit.
+        return numpy.bincount(numpy.unique(numpy.concatenate(found)) % num_files, minlength=num_files)
+
+    def query(self, sequence: numpy.ndarray, min_shared_frames: int = 1) -> dict[str, int]:
+        """Find the indexed files sharing near-identical frames with
+        `sequence`.
+
+        Args:
+            sequence (numpy.ndarray): uint64 frame hashes to look up.
+            min_shared_frames (int, optional): Only report files matching
+                at least this many of `sequence`'s frames. Defaults to 1.
+
+        Returns:
+            dict[str, int]: Matching file key -> number of `sequence`'s
+                frames within `radius` of one of that file's frames.
+        """
+        counts = self._shared_frame_counts(sequence)
+        return {
+            self.keys[file_id]: int(counts[file_id])
+            for file_id in numpy.flatnonzero(counts >= max(1, min_shared_frames))
+        }
+
+    def iter_candidate_pairs(self, min_shared_frames: int = MIN_SHARED_FRAMES,
+                             ) -> typing.Iterator[tuple[str, str, int]]:
+        """Lazily yield the pairs of indexed files sharing near-identical
+        frames.
+
+        Args:
+            min_shared_frames (int, optional): Frames of the earlier-added
+                file of a pair that must have a near-identical frame in
+                the other. Defaults to MIN_SHARED_FRAMES.
+
+        Yields:
+            tuple[str, str, int]: `(key_a, key_b, shared_frames)`, with
+                `key_a` added before `key_b`.
+        """
+        for file_id, key in enumerate(self.keys):
+            counts = self._shared_frame_counts(self._sequences[file_id])
+            for other_id in numpy.flatnonzero(counts[file_id + 1:] >= min_shared_frames):
+                other_id += file_id + 1
+                yield key, self.keys[other_id], int(counts[other_id])
+
+
 class DisjointSet:
     """Minimal union-find, used to group pairwise matches into duplicate
     clusters (e.g. the same movie present in three different resolutions).
@@ -237,75 +1137,195 @@ class DisjointSet:
             self._parent[root_a] = root_b
 
 
-def find_duplicates(
-    file_list: list[str],
-    sequence_interval: float,
-    sequence_threshold: float,
-    min_overlap_fraction: float,
-    max_duration_diff: float,
-) -> tuple[list[list[str]], dict[str, VideoInfo], list[DuplicateMatch]]:
-    """Scan `file_list` for likely duplicates.
+def probe_video_infos(
+    file_list: list[str], probe_workers: int = ffmpeg_utils.DEFAULT_PROBE_WORKERS,
+) -> dict[str, VideoInfo]:
+    """`probe_video_info` for many files, concurrently. Files that can't be
+    probed are logged and left out.
 
     Args:
-        file_list (list[str]): Video files to compare.
-        sequence_interval (float): Seconds between sampled frames when
-            hashing each file.
-        sequence_threshold (float): Maximum average per-frame Hamming
-            distance (0-`HASH_BITS`) over the aligned overlap for two files
-            to be considered a match.
-        min_overlap_fraction (float): Minimum fraction of the shorter file's
-            sampled frames that must align for a match.
-        max_duration_diff (float): Only compare pairs whose durations differ
-            by less than this many seconds - a cheap prefilter so unrelated
-            files never get their (expensive) hash sequences computed.
+        file_list (list[str]): Video files to probe.
+        probe_workers (int, optional): Maximum concurrent ffprobe processes.
+            Defaults to ffmpeg_utils.DEFAULT_PROBE_WORKERS.
 
     Returns:
-        tuple[list[list[str]], dict[str, VideoInfo], list[DuplicateMatch]]:
-            Duplicate groups (each a list of 2+ paths), technical info per
-            file that was successfully probed, and the individual pairwise
-            matches that produced the groups.
+        dict[str, VideoInfo]: Technical info per file, in `file_list` order.
     """
     infos: dict[str, VideoInfo] = {}
-    for path in file_list:
+    for result in ffmpeg_utils.iter_fetch_media_info(
+        file_list, max_workers=probe_workers, profile='geometry',
+    ):
+        path = result.filename
         try:
-            infos[path] = probe_video_info(path)
-        except (ValueError, ffmpeg.errors.FFmpegError) as exc:
+            if result.error is not None:
+                raise result.error
+            infos[path] = video_info_from_media(path, result.data)
+        except (ValueError, OSError, ffmpeg.errors.FFmpegError) as exc:
             logger.warning(f"Skipping '{path}': could not read video info ({exc})")
+    return infos
 
-    paths = list(infos.keys())
 
-    # Cheap prefilter: only files with at least one duration-close partner
-    # are worth the cost of computing a hash sequence for.
-    candidate_pairs = [
-        (path_a, path_b)
-        for path_a, path_b in itertools.combinations(paths, 2)
-        if abs(infos[path_a].duration - infos[path_b].duration) <= max_duration_diff
-    ]
-    paths_needing_hash = {path for pair in candidate_pairs for path in pair}
+def hash_video_files(
+    paths: list[str],
+    sequence_interval: float,
+    hash_store: HashStore | None = None,
+    jobs: int = 1,
+    sampling: str = 'fps',
+    engine: str = 'dhash',
+) -> SequenceArena:
+    """Hash many files via `iter_frame_hash_sequences`, logging progress.
+    Files that can't be decoded are logged and left out.
 
-    logger.info(
-        f"{len(paths)} file(s) probed, {len(paths_needing_hash)} have at " +
-        f"least one duration-close candidate and will be hashed " +
-        f"({len(candidate_pairs)} pair(s) to compare)."
+    The sequences go straight into a `SequenceArena` as they come in, so
+    holding them all costs disk rather than memory.
+
+    Args:
+        paths (list[str]): Files to hash.
+        sequence_interval (float): Seconds between sampled frames.
+        hash_store (HashStore | None, optional): See
+            `stored_frame_hash_sequence`. Defaults to None.
+        jobs (int, optional): Maximum concurrent decodes. Defaults to 1.
+        sampling (str, optional): A `SAMPLING_MODES` entry. Defaults to
+            'fps'.
+        engine (str, optional): An `ENGINES` entry. Defaults to 'dhash'.
+
+    Returns:
+        SequenceArena: Hash sequence per file, in `paths` order.
+    """
+    sequences = SequenceArena()
+    hash_results = iter_frame_hash_sequences(
+        paths, sequence_interval, hash_store=hash_store, jobs=jobs,
+        sampling=sampling, engine=engine,
     )
+    for index, result in enumerate(hash_results, start=1):
+        if result.error is not None:
+            logger.warning(f"Skipping '{result.path}': could not hash frames ({result.error})")
+            continue
+        logger.info(f"Hashed ({index}/{len(paths)}): '{result.path}'")
+        sequences.add(result.path, result.sequence)
+    return sequences
 
-    sequences: dict[str, list[int]] = {}
-    for index, path in enumerate(sorted(paths_needing_hash), start=1):
-        logger.info(f"Hashing ({index}/{len(paths_needing_hash)}): '{path}'")
-        try:
-            sequences[path] = compute_frame_hash_sequence(path, sequence_interval)
-        except ffmpeg.errors.FFmpegError as exc:
-            logger.warning(f"Skipping '{path}': could not hash frames ({exc})")
 
-    matches: list[DuplicateMatch] = []
-    dsu = DisjointSet(paths)
+def fingerprint_audio_files(
+    paths: list[str],
+    hash_store: HashStore | None = None,
+    jobs: int = 1,
+) -> SequenceArena:
+    """Fingerprint many files' audio via `iter_audio_fingerprints`, into a
+    `SequenceArena` like `hash_video_files`.
+
+    Files without audio, with audio that can't be decoded, or whose audio
+    is mostly silence are left out - their pairs can't be judged by audio.
 
+    Args:
+        paths (list[str]): Files to fingerprint.
+        hash_store (HashStore | None, optional): See
+            `stored_audio_fingerprint`. Defaults to None.
+        jobs (int, optional): Maximum concurrent decodes. Defaults to 1.
+
+    Returns:
+        SequenceArena: Fingerprint per usable file, in `paths` order.
+    """
+    fingerprints = SequenceArena()
+    results = iter_audio_fingerprints(paths, hash_store=hash_store, jobs=jobs)
+    for index, result in enumerate(results, start=1):
+        if result.error is not None:
+            logger.debug(f"No audio fingerprint for '{result.path}' ({result.error})")
+        elif audio_fingerprint.is_mostly_silent(result.sequence):
+            logger.debug(f"No audio fingerprint for '{result.path}' (mostly silent)")
+        else:
+            logger.info(f"Fingerprinted audio ({index}/{len(paths)}): '{result.path}'")
+            fingerprints.add(result.path, result.sequence)
+    return fingerprints
+
+
+def filter_pairs_by_audio(
+    candidate_pairs: typing.Iterable[tuple[str, str]],
+    fingerprint_of: typing.Callable[[str], numpy.ndarray | None],
+    min_overlap_fraction: float,
+    coarse_factor: int = COARSE_FACTOR,
+) -> list[tuple[str, str]]:
+    """Drop the candidate pairs whose audio shows they can't match.
+
+    Each pair's audio fingerprints are aligned like frame-hash sequences
+    (`coarse_to_fine_alignment`); a pair is dropped only if even its best
+    offset leaves the audio further apart than `AUDIO_REJECT_DISTANCE`.
+    Pairs where either file has no usable fingerprint are kept, to be
+    judged on their video alone.
+
+    Note that a duplicate with different audio - dubbed into another
+    language, say - is rejected too.
+
+    Args:
+        candidate_pairs (typing.Iterable[tuple[str, str]]): Pairs of paths.
+        fingerprint_of (typing.Callable[[str], numpy.ndarray | None]):
+            Looks up a path's audio fingerprint, None if it has none.
+        min_overlap_fraction (float): See `find_duplicates`.
+        coarse_factor (int, optional): See `find_duplicates`. Defaults to
+            COARSE_FACTOR.
+
+    Returns:
+        list[tuple[str, str]]: The pairs that still need comparing, in
+            candidate order.
+    """
+    kept: list[tuple[str, str]] = []
+    for path_a, path_b in candidate_pairs:
+        fingerprint_a, fingerprint_b = fingerprint_of(path_a), fingerprint_of(path_b)
+        if fingerprint_a is None or fingerprint_b is None:
+            kept.append((path_a, path_b))
+            continue
+
+        # No max_distance: the coarse pass's early rejection is tuned to
+        # frame hashes, and audio alignment is cheap next to a video decode.
+        result = coarse_to_fine_alignment(
+            fingerprint_a, fingerprint_b, min_overlap_fraction, factor=coarse_factor,
+        )
+        if result is None or result[1] > AUDIO_REJECT_DISTANCE:
+            continue
+        offset, avg_distance, _ = result
+        logger.debug(
+            f"Audio of '{path_a}' and '{path_b}' matches at offset " +
+            f"{offset * audio_fingerprint.FINGERPRINT_INTERVAL:.1f}s (distance {avg_distance:.1f})"
+        )
+        kept.append((path_a, path_b))
+    return kept
+
+
+def align_candidate_pairs(
+    candidate_pairs: typing.Iterable[tuple[str, str]],
+    sequence_of: typing.Callable[[str], numpy.ndarray | None],
+    sequence_interval: float,
+    sequence_threshold: float,
+    min_overlap_fraction: float,
+    coarse_factor: int = COARSE_FACTOR,
+) -> list[DuplicateMatch]:
+    """Align each candidate pair's hash sequences and keep the matches.
+
+    Args:
+        candidate_pairs (typing.Iterable[tuple[str, str]]): Pairs of paths
+            to compare.
+        sequence_of (typing.Callable[[str], numpy.ndarray | None]): Looks
+            up a path's hash sequence, None if it has none (pairs with such
+            a path are skipped).
+        sequence_interval (float): Seconds between sampled frames.
+        sequence_threshold (float): See `find_duplicates`.
+        min_overlap_fraction (float): See `find_duplicates`.
+        coarse_factor (int, optional): See `find_duplicates`. Defaults to
+            COARSE_FACTOR.
+
+    Returns:
+        list[DuplicateMatch]: The pairs that matched, in candidate order.
+    """
+    matches: list[DuplicateMatch] = []
     for path_a, path_b in candidate_pairs:
-        seq_a, seq_b = sequences.get(path_a), sequences.get(path_b)
+        seq_a, seq_b = sequence_of(path_a), sequence_of(path_b)
         if seq_a is None or seq_b is None:
             continue
 
-        result = best_alignment(seq_a, seq_b, min_overlap_fraction)
+        result = coarse_to_fine_alignment(
+            seq_a, seq_b, min_overlap_fraction,
+            max_distance=sequence_threshold, factor=coarse_factor,
+        )
         if result is None:
             continue
         offset, avg_distance, overlap = result
@@ -318,16 +1338,564 @@ def find_duplicates(
                 offset_seconds=offset * sequence_interval,
                 overlap_fraction=overlap / min(len(seq_a), len(seq_b)),
             ))
-            dsu.union(path_a, path_b)
+    return matches
+
+
+def group_matches(paths: typing.Iterable[str], matches: list[DuplicateMatch]) -> list[list[str]]:
+    """Group pairwise matches into duplicate clusters.
+
+    Args:
+        paths (typing.Iterable[str]): Every path a match can refer to, in
+            the order groups and their members should come in.
+        matches (list[DuplicateMatch]): The matches.
+
+    Returns:
+        list[list[str]]: Duplicate groups, each a list of 2+ paths.
+    """
+    paths = list(paths)
+    dsu = DisjointSet(paths)
+    for match in matches:
+        dsu.union(match.file_a, match.file_b)
 
     groups: dict[str, list[str]] = {}
     for path in paths:
         groups.setdefault(dsu.find(path), []).append(path)
 
-    duplicate_groups = [members for members in groups.values() if len(members) > 1]
+    return [members for members in groups.values() if len(members) > 1]
+
+
+def find_duplicates(
+    file_list: list[str],
+    sequence_interval: float,
+    sequence_threshold: float,
+    min_overlap_fraction: float,
+    max_duration_diff: float,
+    probe_workers: int = ffmpeg_utils.DEFAULT_PROBE_WORKERS,
+    coarse_factor: int = COARSE_FACTOR,
+    hash_store: HashStore | None = None,
+    jobs: int = 1,
+    sampling: str = 'fps',
+    candidates: str = 'duration',
+    min_shared_frames: int = MIN_SHARED_FRAMES,
+    audio_prefilter: bool = False,
+    engine: str = 'dhash',
+) -> tuple[list[list[str]], dict[str, VideoInfo], list[DuplicateMatch]]:
+    """Scan `file_list` for likely duplicates.
+
+    Args:
+        file_list (list[str]): Video files to compare.
+        sequence_interval (float): Seconds between sampled frames when
+            hashing each file.
+        sequence_threshold (float): Maximum average per-frame distance
+            over the aligned overlap for two files to be considered a
+            match: Hamming distance (0-`HASH_BITS`) for 'dhash', L1
+            distance (0-`video_signature.SIGNATURE_BITS`) for 'signature'
+            (see `engine_threshold`).
+        min_overlap_fraction (float): Minimum fraction of the shorter file's
+            sampled frames that must align for a match.
+        max_duration_diff (float): With 'duration' candidates, only compare
+            pairs whose durations differ by less than this many seconds - a
+            cheap prefilter so unrelated files never get their (expensive)
+            hash sequences computed.
+        probe_workers (int, optional): Maximum concurrent ffprobe processes
+            while reading each file's video info. Defaults to
+            ffmpeg_utils.DEFAULT_PROBE_WORKERS.
+        coarse_factor (int, optional): Downsampling factor for the
+            coarse-to-fine alignment search (see
+            `coarse_to_fine_alignment`); 1 scores every offset exhaustively
+            with `best_alignment`. Defaults to COARSE_FACTOR.
+        hash_store (HashStore | None, optional): Persistent store to reuse
+            unchanged files' hash sequences from, and to keep newly
+            computed ones in. Defaults to None (hash every file).
+        jobs (int, optional): Maximum files to decode and hash
+            concurrently. Defaults to 1.
+        sampling (str, optional): How to pick the frames to hash, a
+            `SAMPLING_MODES` entry (see `compute_frame_hash_sequence`).
+            Defaults to 'fps'.
+        candidates (str, optional): How to pick the pairs to align, a
+            `CANDIDATE_MODES` entry. 'index' hashes every file and pairs
+            those sharing at least `min_shared_frames` near-identical
+            frames (see `FrameHashIndex`), regardless of duration - which
+            also finds a clip cut out of a longer video. Defaults to
+            'duration'.
+        min_shared_frames (int, optional): See `candidates`. Defaults to
+            MIN_SHARED_FRAMES.
+        audio_prefilter (bool, optional): With 'duration' candidates,
+            fingerprint the files' audio first (much cheaper than hashing
+            their video) and drop the pairs whose audio doesn't match (see
+            `filter_pairs_by_audio`), so only files left with a partner
+            get their video hashed. Files without usable audio are hashed
+            as usual. Defaults to False.
+        engine (str, optional): What to hash each sampled frame into, an
+            `ENGINES` entry. 'signature' only works with 'duration'
+            candidates. Defaults to 'dhash'.
+
+    Raises:
+        ValueError: If `candidates` or `engine` isn't a known mode, or
+            they don't go together.
+
+    Returns:
+        tuple[list[list[str]], dict[str, VideoInfo], list[DuplicateMatch]]:
+            Duplicate groups (each a list of 2+ paths), technical info per
+            file that was successfully probed, and the individual pairwise
+            matches that produced the groups.
+    """
+    if candidates not in CANDIDATE_MODES:
+        raise ValueError(f"Unknown candidate mode '{candidates}'")
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown hashing engine '{engine}'")
+    if engine != 'dhash' and candidates == 'index':
+        # FrameHashIndex splits 64-bit hashes into substrings.
+        raise ValueError("'index' candidates only work with the 'dhash' engine")
+
+    infos = probe_video_infos(file_list, probe_workers=probe_workers)
+    paths = list(infos.keys())
+
+    candidate_pairs = None
+    if candidates == 'index':
+        if audio_prefilter:
+            logger.warning("The audio prefilter only applies to 'duration' candidates, ignoring it")
+        # The pairs are only known once every file's frames are indexed.
+        paths_needing_hash = set(paths)
+        logger.info(f"{len(paths)} file(s) probed, all will be hashed and indexed.")
+    else:
+        # Cheap prefilter: only files with at least one duration-close
+        # partner are worth the cost of computing a hash sequence for.
+        paths_needing_hash, num_pairs = duration_close_summary(infos, max_duration_diff)
+
+        logger.info(
+            f"{len(paths)} file(s) probed, {len(paths_needing_hash)} have at " +
+            f"least one duration-close candidate and will be hashed " +
+            f"({num_pairs} pair(s) to compare)."
+        )
+
+        if audio_prefilter:
+            fingerprints = fingerprint_audio_files(
+                sorted(paths_needing_hash), hash_store=hash_store, jobs=jobs,
+            )
+            candidate_pairs = filter_pairs_by_audio(
+                iter_duration_close_pairs(infos, max_duration_diff), fingerprints.get,
+                min_overlap_fraction, coarse_factor=coarse_factor,
+            )
+            paths_needing_hash = {path for pair in candidate_pairs for path in pair}
+            logger.info(
+                f"{len(fingerprints)} file(s) have usable audio; " +
+                f"{len(candidate_pairs)} pair(s) not ruled out by it, " +
+                f"{len(paths_needing_hash)} file(s) will be hashed."
+            )
+            fingerprints.close()
+
+    sequences = hash_video_files(
+        sorted(paths_needing_hash), sequence_interval,
+        hash_store=hash_store, jobs=jobs, sampling=sampling, engine=engine,
+    )
+
+    duplicate_groups, matches = match_hashed_files(
+        infos, sequences, sequence_interval, sequence_threshold,
+        min_overlap_fraction, max_duration_diff, coarse_factor=coarse_factor,
+        candidates=candidates, min_shared_frames=min_shared_frames,
+        candidate_pairs=candidate_pairs,
+    )
+    sequences.close()
     return duplicate_groups, infos, matches
 
 
+def match_hashed_files(
+    infos: dict[str, VideoInfo],
+    sequences: SequenceArena,
+    sequence_interval: float,
+    sequence_threshold: float,
+    min_overlap_fraction: float,
+    max_duration_diff: float,
+    coarse_factor: int = COARSE_FACTOR,
+    candidates: str = 'duration',
+    min_shared_frames: int = MIN_SHARED_FRAMES,
+    candidate_pairs: typing.Iterable[tuple[str, str]] | None = None,
+) -> tuple[list[list[str]], list[DuplicateMatch]]:
+    """The second half of `find_duplicates`, once the files are hashed:
+    pick the candidate pairs, align them and group the matches.
+
+    Args:
+        infos (dict[str, VideoInfo]): Every file, in report order.
+        sequences (SequenceArena): Hash sequences of (at least) the files
+            that can be part of a candidate pair; others are skipped.
+        sequence_interval (float): See `find_duplicates`.
+        sequence_threshold (float): See `find_duplicates`.
+        min_overlap_fraction (float): See `find_duplicates`.
+        max_duration_diff (float): See `find_duplicates`.
+        coarse_factor (int, optional): See `find_duplicates`. Defaults to
+            COARSE_FACTOR.
+        candidates (str, optional): See `find_duplicates`. Defaults to
+            'duration'.
+        min_shared_frames (int, optional): See `find_duplicates`. Defaults
+            to MIN_SHARED_FRAMES.
+        candidate_pairs (typing.Iterable[tuple[str, str]] | None, optional):
+            With 'duration' candidates, pairs already picked (e.g. by the
+            audio prefilter) to use instead. Defaults to None.
+
+    Returns:
+        tuple[list[list[str]], list[DuplicateMatch]]: Duplicate groups and
+            the pairwise matches that produced them.
+    """
+    if candidates == 'index':
+        frame_index = FrameHashIndex()
+        for path in infos:
+            if path in sequences:
+                frame_index.add(path, sequences.get(path))
+        candidate_pairs = [
+            (path_a, path_b)
+            for path_a, path_b, _ in frame_index.iter_candidate_pairs(min_shared_frames)
+        ]
+        logger.info(
+            f"{len(candidate_pairs)} pair(s) share at least {min_shared_frames} " +
+            "near-identical frame(s) and will be compared."
+        )
+    elif candidate_pairs is None:
+        candidate_pairs = iter_duration_close_pairs(infos, max_duration_diff)
+
+    matches = align_candidate_pairs(
+        candidate_pairs, sequences.get, sequence_interval, sequence_threshold,
+        min_overlap_fraction, coarse_factor=coarse_factor,
+    )
+    return group_matches(infos, matches), matches
+
+
+def shard_index(path: str, base_path: str, num_shards: int) -> int:
+    """Which of `num_shards` shards `path` belongs to.
+
+    Decided by a hash of the path relative to `base_path` alone, so every
+    machine agrees whatever order it lists the files in and wherever it
+    mounts the library, and adding or removing files doesn't move any
+    other file to another shard.
+
+    Args:
+        path (str): File under `base_path`.
+        base_path (str): Root of the library being sharded.
+        num_shards (int): Total shards.
+
+    Returns:
+        int: The shard, 0-based.
+    """
+    digest = hashlib.blake2b(relative_path(path, base_path).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') % num_shards
+
+
+def select_shard(file_list: list[str], base_path: str, shard: int, num_shards: int) -> list[str]:
+    """The files of `file_list` in shard `shard` (0-based) of `num_shards`,
+    see `shard_index`.
+
+    Args:
+        file_list (list[str]): Files under `base_path`.
+        base_path (str): Root of the library being sharded.
+        shard (int): Shard to select, 0-based.
+        num_shards (int): Total shards.
+
+    Returns:
+        list[str]: The shard's files, in `file_list` order.
+    """
+    return [path for path in file_list if shard_index(path, base_path, num_shards) == shard]
+
+
+def find_duplicates_in_shards(
+    shards: list[LibraryIndex],
+    sequence_interval: float,
+    sequence_threshold: float,
+    min_overlap_fraction: float,
+    max_duration_diff: float,
+    coarse_factor: int = COARSE_FACTOR,
+    candidates: str = 'duration',
+    min_shared_frames: int = MIN_SHARED_FRAMES,
+    base_path: str = '',
+) -> tuple[list[list[str]], dict[str, VideoInfo], list[DuplicateMatch]]:
+    """`find_duplicates` over files already probed and hashed into shard
+    files (`vudupcheck --hash-only`), e.g. by several machines. Nothing is
+    probed or decoded, and the files themselves needn't be reachable.
+
+    Files are identified by their path relative to the library root, so
+    shards hashed on machines mounting the library at different places
+    agree on them.
+
+    Args:
+        shards (list[LibraryIndex]): The shards, all of the same kind. A
+            file in more than one (e.g. left over from sharding with
+            another N) is taken from the shard that indexed the most
+            recently modified version, the first of them on a tie.
+        sequence_interval (float): Seconds between sampled frames the
+            shards were hashed with.
+        sequence_threshold (float): See `find_duplicates`.
+        min_overlap_fraction (float): See `find_duplicates`.
+        max_duration_diff (float): See `find_duplicates`.
+        coarse_factor (int, optional): See `find_duplicates`. Defaults to
+            COARSE_FACTOR.
+        candidates (str, optional): See `find_duplicates`. Defaults to
+            'duration'.
+        min_shared_frames (int, optional): See `find_duplicates`. Defaults
+            to MIN_SHARED_FRAMES.
+        base_path (str, optional): Where the library root is mounted here;
+            files are reported under it. Defaults to '' (paths relative to
+            the library root).
+
+    Raises:
+        ValueError: If `candidates` isn't a known mode.
+
+    Returns:
+        tuple[list[list[str]], dict[str, VideoInfo], list[DuplicateMatch]]:
+            As `find_duplicates`.
+    """
+    if candidates not in CANDIDATE_MODES:
+        raise ValueError(f"Unknown candidate mode '{candidates}'")
+
+    # Which shard each file is taken from, decided before reading any
+    # sequence.
+    sources: dict[str, tuple[int, LibraryEntry]] = {}
+    num_repeats = 0
+    for shard_number, shard in enumerate(shards):
+        for path, entry in shard.entries().items():
+            if path in sources:
+                num_repeats += 1
+                if entry.mtime_ns <= sources[path][1].mtime_ns:
+                    continue
+            sources[path] = (shard_number, entry)
+    if num_repeats:
+        logger.warning(
+            f"{num_repeats} file(s) are in more than one shard (left over from " +
+            "another --shard N?), using each one's most recently modified version"
+        )
+
+    infos: dict[str, VideoInfo] = {}
+    sequences = SequenceArena()
+    for shard_number, shard in enumerate(shards):
+        for path, sequence in shard.iter_sequences():
+            if sources[path][0] != shard_number:
+                continue
+            report_path = os.path.normpath(absolute_path(path, base_path))
+            infos[report_path] = video_info_from_entry(sources[path][1], report_path)
+            sequences.add(report_path, sequence)
+    infos = dict(sorted(infos.items()))
+
+    if candidates == 'index':
+        logger.info(f"{len(infos)} file(s) in {len(shards)} shard(s), all will be indexed.")
+    else:
+        paths_with_partner, num_pairs = duration_close_summary(infos, max_duration_diff)
+        logger.info(
+            f"{len(infos)} file(s) in {len(shards)} shard(s), " +
+            f"{len(paths_with_partner)} with at least one duration-close " +
+            f"candidate ({num_pairs} pair(s) to compare)."
+        )
+
+    duplicate_groups, matches = match_hashed_files(
+        infos, sequences, sequence_interval, sequence_threshold,
+        min_overlap_fraction, max_duration_diff, coarse_factor=coarse_factor,
+        candidates=candidates, min_shared_frames=min_shared_frames,
+    )
+    sequences.close()
+    return duplicate_groups, infos, matches
+
+
+def update_library_index(
+    library: LibraryIndex,
+    file_list: list[str],
+    base_path: str,
+    sequence_interval: float,
+    probe_workers: int = ffmpeg_utils.DEFAULT_PROBE_WORKERS,
+    hash_store: HashStore | None = None,
+    jobs: int = 1,
+    sampling: str = 'fps',
+) -> tuple[int, int]:
+    """Bring `library` in line with `file_list`: probe and hash the files
+    that are new or have changed since they were indexed, and drop the
+    indexed files that are no longer in `file_list`. Unchanged files
+    aren't touched.
+
+    Files are indexed by their path relative to `base_path`, which becomes
+    the index's root - so an index updated from another mount point of the
+    same library keeps every unchanged entry.
+
+    Args:
+        library (LibraryIndex): Index to update, of the kind `sampling` and
+            `sequence_interval` produce.
+        file_list (list[str]): Every video file in the library.
+        base_path (str): Root of the library.
+        sequence_interval (float): Seconds between sampled frames.
+        probe_workers (int, optional): See `find_duplicates`. Defaults to
+            ffmpeg_utils.DEFAULT_PROBE_WORKERS.
+        hash_store (HashStore | None, optional): See `find_duplicates`.
+            Defaults to None.
+        jobs (int, optional): See `find_duplicates`. Defaults to 1.
+        sampling (str, optional): See `find_duplicates`. Defaults to 'fps'.
+
+    Returns:
+        tuple[int, int]: Number of files (re)indexed, and number dropped as
+            deleted.
+    """
+    root = os.path.abspath(base_path)
+    if library.root not in (None, root):
+        logger.info(f"Index root moves from '{library.root}' to '{root}'")
+    library.set_root(root)
+
+    entries = library.entries()
+    current_paths = {relative_path(path, root): os.path.abspath(path) for path in file_list}
+
+    to_index = [
+        path for path in sorted(current_paths)
+        if path not in entries or not is_current(entries[path], root)
+    ]
+    deleted = [path for path in entries if path not in current_paths]
+    # Changed files are dropped too, so one that now fails to probe or hash
+    # doesn't keep its stale sequence.
+    library.remove(deleted + [path for path in to_index if path in entries])
+    logger.info(
+        f"{len(entries)} file(s) indexed, {len(current_paths)} found: " +
+        f"{len(to_index)} new or changed, {len(deleted)} deleted."
+    )
+
+    infos = probe_video_infos(
+        [current_paths[path] for path in to_index], probe_workers=probe_workers,
+    )
+    sequences = hash_video_files(
+        list(infos), sequence_interval, hash_store=hash_store, jobs=jobs, sampling=sampling,
+    )
+
+    num_indexed = 0
+    for path, sequence in sequences.items():
+        info = infos[path]
+        try:
+            size, mtime_ns, inode = utils.file_identity(path)
+        except OSError as exc:
+            logger.warning(f"Skipping '{path}': {exc}")
+            continue
+        library.put(LibraryEntry(
+            path=relative_path(path, root), size_bytes=size, mtime_ns=mtime_ns, inode=inode,
+            duration=info.duration, width=info.width, height=info.height,
+        ), sequence)
+        num_indexed += 1
+    sequences.close()
+
+    return num_indexed, len(deleted)
+
+
+def find_duplicates_against(
+    library: LibraryIndex,
+    file_list: list[str],
+    sequence_interval: float,
+    sequence_threshold: float,
+    min_overlap_fraction: float,
+    max_duration_diff: float,
+    probe_workers: int = ffmpeg_utils.DEFAULT_PROBE_WORKERS,
+    coarse_factor: int = COARSE_FACTOR,
+    hash_store: HashStore | None = None,
+    jobs: int = 1,
+    sampling: str = 'fps',
+    candidates: str = 'duration',
+    min_shared_frames: int = MIN_SHARED_FRAMES,
+) -> tuple[list[list[str]], dict[str, VideoInfo], list[DuplicateMatch]]:
+    """Check a batch of new files for duplicates already in `library`.
+
+    Only the batch is probed and hashed; each new file is aligned only
+    against the indexed files picked as its candidates. Files of the batch
+    that are themselves indexed (unchanged) are skipped, and files within
+    the batch aren't compared with each other.
+
+    Args:
+        library (LibraryIndex): The library's index, of the kind `sampling`
+            and `sequence_interval` produce.
+        file_list (list[str]): The new video files.
+        sequence_interval (float): See `find_duplicates`.
+        sequence_threshold (float): See `find_duplicates`.
+        min_overlap_fraction (float): See `find_duplicates`.
+        max_duration_diff (float): See `find_duplicates`.
+        probe_workers (int, optional): See `find_duplicates`. Defaults to
+            ffmpeg_utils.DEFAULT_PROBE_WORKERS.
+        coarse_factor (int, optional): See `find_duplicates`. Defaults to
+            COARSE_FACTOR.
+        hash_store (HashStore | None, optional): See `find_duplicates`.
+            Defaults to None.
+        jobs (int, optional): See `find_duplicates`. Defaults to 1.
+        sampling (str, optional): See `find_duplicates`. Defaults to 'fps'.
+        candidates (str, optional): See `find_duplicates` - 'index' builds
+            a `FrameHashIndex` over the whole library. Defaults to
+            'duration'.
+        min_shared_frames (int, optional): See `find_duplicates`. Defaults
+            to MIN_SHARED_FRAMES.
+
+    Raises:
+        ValueError: If `candidates` isn't a known mode.
+
+    Returns:
+        tuple[list[list[str]], dict[str, VideoInfo], list[DuplicateMatch]]:
+            As `find_duplicates` - each group holds at least one new file
+            and the indexed files it matched; the info covers both.
+    """
+    if candidates not in CANDIDATE_MODES:
+        raise ValueError(f"Unknown candidate mode '{candidates}'")
+
+    # Indexed files are known by their path under the index's root.
+    root = library.root or ''
+    entries = library.entries()
+    library_paths = {absolute_path(path, root): path for path in entries}
+    library_infos = {
+        path: video_info_from_entry(entries[relative], path)
+        for path, relative in library_paths.items()
+    }
+
+    def is_indexed(path: str) -> bool:
+        relative = relative_path(path, root) if root else None
+        return relative in entries and is_current(entries[relative], root)
+
+    new_files = [path for path in file_list if not is_indexed(path)]
+    logger.info(
+        f"{len(new_files)} new file(s) to check against {len(entries)} indexed file(s)" +
+        (f" ({len(file_list) - len(new_files)} already indexed)" if len(new_files) < len(file_list) else "")
+    )
+
+    new_infos = probe_video_infos(new_files, probe_workers=probe_workers)
+    new_sequences = hash_video_files(
+        list(new_infos), sequence_interval, hash_store=hash_store, jobs=jobs, sampling=sampling,
+    )
+
+    # Library sequences are read from the index once, into an arena.
+    library_sequences = SequenceArena()
+    if candidates == 'index':
+        # All added before any is looked up, as in match_hashed_files().
+        for path, sequence in library.iter_sequences():
+            library_sequences.add(absolute_path(path, root), sequence)
+        frame_index = FrameHashIndex()
+        for path, sequence in library_sequences.items():
+            frame_index.add(path, sequence)
+        candidate_pairs = [
+            (path, library_path)
+            for path, sequence in new_sequences.items()
+            for library_path in frame_index.query(sequence, min_shared_frames)
+        ]
+    else:
+        candidate_pairs = list(iter_duration_close_cross_pairs(
+            {path: new_infos[path] for path in new_sequences}, library_infos, max_duration_diff,
+        ))
+    logger.info(f"{len(candidate_pairs)} new/indexed pair(s) to compare.")
+
+    def sequence_of(path: str) -> numpy.ndarray | None:
+        if path in new_sequences:
+            return new_sequences.get(path)
+        if path not in library_sequences:
+            sequence = library.sequence(library_paths[path])
+            if sequence is None:
+                return None
+            library_sequences.add(path, sequence)
+        return library_sequences.get(path)
+
+    matches = align_candidate_pairs(
+        candidate_pairs, sequence_of, sequence_interval, sequence_threshold,
+        min_overlap_fraction, coarse_factor=coarse_factor,
+    )
+    new_sequences.close()
+    library_sequences.close()
+
+    infos = dict(new_infos)
+    for match in matches:
+        infos.setdefault(match.file_b, library_infos[match.file_b])
+    return group_matches(infos, matches), infos, matches
+
+
 def format_size(num_bytes: float) -> str:
     """Human-readable byte size, e.g. '1.3GB'."""
     for unit in ('B', 'KB', 'MB', 'GB'):
@@ -349,11 +1917,19 @@ def print_report(
     duplicate_groups: list[list[str]],
     infos: dict[str, VideoInfo],
     matches: list[DuplicateMatch],
+    max_distance: int = HASH_BITS,
 ) -> None:
     """Print a human-readable report of the duplicate groups found.
 
     Never deletes or otherwise touches any file - this is a report to
     support manual review only.
+
+    Args:
+        duplicate_groups (list[list[str]]): See `find_duplicates`.
+        infos (dict[str, VideoInfo]): See `find_duplicates`.
+        matches (list[DuplicateMatch]): See `find_duplicates`.
+        max_distance (int, optional): Scale the match distances are
+            reported on (`engine_max_distance`). Defaults to HASH_BITS.
     """
     if not duplicate_groups:
         print("No likely duplicates found.")
@@ -393,7 +1969,7 @@ def print_report(
                 print(
                     f"      match: '{os.path.basename(path_a)}' <-> " +
                     f"'{os.path.basename(path_b)}' " +
-                    f"(distance={match.distance:.1f}/{HASH_BITS}, " +
+                    f"(distance={match.distance:.1f}/{max_distance}, " +
                     f"offset={match.offset_seconds:+.1f}s, " +
                     f"overlap={match.overlap_fraction:.0%})"
                 )
@@ -421,7 +1997,55 @@ def create_parser() -> argparse.ArgumentParser:
         '--path',
         type=pathlib.Path,
         default='.',
-        help="Path to the media library to scan (default: %(default)s)",
+        help="Path to the media library to scan - or with --against, the " +
+            "new files to check (default: %(default)s)",
+    )
+    index_group = parser.add_mutually_exclusive_group()
+    index_group.add_argument(
+        '--update',
+        metavar='INDEX',
+        default=None,
+        help="Rather than reporting duplicates, bring the duplicate index " +
+            "file INDEX (created if missing) in line with the files under " +
+            "--path: only new or changed files are hashed, deleted ones " +
+            "are dropped",
+    )
+    index_group.add_argument(
+        '--against',
+        metavar='INDEX',
+        default=None,
+        help="Report which files under --path duplicate a file in the " +
+            "duplicate index INDEX (see --update), hashing only the files " +
+            "under --path",
+    )
+    index_group.add_argument(
+        '--hash-only',
+        metavar='SHARD',
+        default=None,
+        help="Rather than reporting duplicates, probe and hash the files " +
+            "under --path (or their --shard) into the shard file SHARD " +
+            "(created if missing, otherwise updated like --update), for a " +
+            "later --merge",
+    )
+    index_group.add_argument(
+        '--merge',
+        metavar='SHARD',
+        nargs='+',
+        default=None,
+        help="Report duplicates among the files of the given shard files " +
+            "(see --hash-only), without probing, hashing or even reaching " +
+            "the files themselves; they're reported under --path, where " +
+            "the library root is mounted here (default: relative to it)",
+    )
+    parser.add_argument(
+        '--shard',
+        metavar='I/N',
+        type=parse_shard,
+        default=None,
+        help="With --hash-only, only take the I-th (1-based) of N " +
+            "deterministic slices of the files under --path - run with " +
+            "1/N .. N/N on N machines sharing the library, giving all of " +
+            "them the same --path root and hashing options",
     )
     parser.add_argument(
         '-r', '--recursive',
@@ -436,13 +2060,36 @@ def create_parser() -> argparse.ArgumentParser:
         help="Seconds between sampled frames when hashing each file; lower " +
             "is slower but more precise (default: %(default)s)",
     )
+    parser.add_argument(
+        '--sampling',
+        choices=SAMPLING_MODES,
+        default='fps',
+        help="How to pick the frames to hash: 'fps' decodes every frame " +
+            "and hashes the one at each sample time; 'keyframe' decodes " +
+            "only keyframes (several times faster, but samples can be off " +
+            "by up to a keyframe interval, so matches score a higher " +
+            "distance - consider raising --sequence-threshold) " +
+            "(default: %(default)s)",
+    )
+    parser.add_argument(
+        '--engine',
+        choices=ENGINES,
+        default='dhash',
+        help="What each sampled frame is hashed into: 'dhash' is a 64-bit " +
+            "perceptual hash; 'signature' is its MPEG-7 video signature, " +
+            "from ffmpeg's signature filter - a richer descriptor, but " +
+            "slower to align, and only for plain scans with " +
+            "'--candidates duration' (default: %(default)s)",
+    )
     parser.add_argument(
         '--sequence-threshold',
         type=float,
-        default=10.0,
-        help=f"Maximum average per-frame Hamming distance (0-{HASH_BITS}) " +
-            "over the aligned overlap to flag two files as a possible " +
-            "duplicate (default: %(default)s)",
+        default=None,
+        help="Maximum average per-frame distance over the aligned overlap " +
+            "to flag two files as a possible duplicate (default: " +
+            f"{DEFAULT_SEQUENCE_THRESHOLD} of {HASH_BITS} for the dhash " +
+            f"engine, {video_signature.SIGNATURE_THRESHOLD} of " +
+            f"{video_signature.SIGNATURE_BITS} for signature)",
     )
     parser.add_argument(
         '--min-overlap',
@@ -459,11 +2106,91 @@ def create_parser() -> argparse.ArgumentParser:
             "many seconds - keeps the scan from hashing files that can't " +
             "plausibly be related (default: %(default)s)",
     )
+    parser.add_argument(
+        '--candidates',
+        choices=CANDIDATE_MODES,
+        default='duration',
+        help="How to pick the pairs of files to compare: 'duration' only " +
+            "compares files of similar length (see --max-duration-diff); " +
+            "'index' hashes every file and compares those sharing " +
+            "near-identical frames, whatever their lengths - this also " +
+            "finds clips cut out of longer videos (default: %(default)s)",
+    )
+    parser.add_argument(
+        '--min-shared-frames',
+        type=int,
+        default=MIN_SHARED_FRAMES,
+        help="With '--candidates index', the near-identical sampled frames " +
+            "two files must share to be compared (default: %(default)s)",
+    )
+    parser.add_argument(
+        '--audio-prefilter',
+        action='store_true',
+        help="With '--candidates duration', fingerprint each file's audio " +
+            "first and only hash the video of files whose audio matches a " +
+            "candidate's - much cheaper on large libraries, but misses " +
+            "duplicates whose soundtracks differ (e.g. another language). " +
+            "Files without audio are hashed as usual. Not used with " +
+            "--update/--against",
+    )
+    parser.add_argument(
+        '--probe-workers',
+        type=int,
+        default=ffmpeg_utils.DEFAULT_PROBE_WORKERS,
+        help="Number of files to probe concurrently - raise this for " +
+            "libraries on high-latency network storage (default: %(default)s)",
+    )
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        default=1,
+        help="Number of files to decode and hash concurrently; the cores " +
+            "are split between them as decoder threads (default: %(default)s)",
+    )
+    parser.add_argument(
+        '--coarse-factor',
+        type=int,
+        default=COARSE_FACTOR,
+        help="Align each pair on hash sequences downsampled this many " +
+            "times first, then refine only the most promising offsets; 1 " +
+            "scores every offset at full resolution (slower, exhaustive) " +
+            "(default: %(default)s)",
+    )
+    parser.add_argument(
+        '--no-hash-store',
+        action='store_true',
+        default=False,
+        help="Always decode and hash every file rather than reusing hash " +
+            "sequences stored by earlier runs",
+    )
+    parser.add_argument(
+        '--hash-store-dir',
+        default=None,
+        help="Directory to keep the frame-hash sequence store in " +
+            f"(default: ${utils.CACHE_DIR_ENV} or the per-user cache directory)",
+    )
     utils.add_common_arguments(parser=parser)
+    utils.add_probe_cache_arguments(parser=parser)
+    utils.add_backend_arguments(parser=parser)
 
     return parser
 
 
+def parse_shard(value: str) -> tuple[int, int]:
+    """argparse type for `--shard`: 'I/N' -> `(I - 1, N)`.
+
+    Raises:
+        argparse.ArgumentTypeError: If `value` isn't a valid 'I/N'.
+    """
+    try:
+        shard, num_shards = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected I/N, e.g. 1/4, not '{value}'") from None
+    if not 1 <= shard <= num_shards:
+        raise argparse.ArgumentTypeError(f"shard must be between 1/{num_shards} and {num_shards}/{num_shards}")
+    return shard - 1, num_shards
+
+
 def parse_cli() -> argparse.Namespace:
     """Return the parsed cli arguments for the video duplicate finder.
 
@@ -471,7 +2198,17 @@ def parse_cli() -> argparse.Namespace:
         argparse.Namespace: Parsed arguments.
     """
     parser = create_parser()
-    return parser.parse_args()
+    args = parser.parse_args()
+    if args.shard is not None and args.hash_only is None:
+        parser.error("--shard only applies with --hash-only")
+    if args.engine != 'dhash':
+        if any(mode is not None for mode in (args.update, args.against, args.hash_only, args.merge)):
+            parser.error(f"--engine {args.engine} only works for plain scans")
+        if args.candidates == 'index':
+            parser.error(f"--engine {args.engine} only works with '--candidates duration'")
+    if args.sequence_threshold is None:
+        args.sequence_threshold = engine_threshold(args.engine)
+    return args
 
 
 def scan_for_video_files(base_path: str, recursive: bool) -> list[str]:
@@ -483,10 +2220,10 @@ def scan_for_video_files(base_path: str, recursive: bool) -> list[str]:
             only scan `base_path` itself.
 
     Returns:
-        list[str]: Video files found, filtered to `ACCEPTED_EXTENSIONS`.
+        list[str]: Video files found, filtered to `utils.ACCEPTED_EXTENSIONS`.
     """
     if recursive:
-        candidates = walk_files(base_path)
+        candidates = utils.walk_files(base_path)
     else:
         candidates = [
             os.path.join(base_path, curr_file)
@@ -496,7 +2233,7 @@ def scan_for_video_files(base_path: str, recursive: bool) -> list[str]:
     return sorted(
         curr_file for curr_file in candidates
         if os.path.isfile(curr_file) and
-            curr_file.rsplit('.', 1)[-1].lower() in ACCEPTED_EXTENSIONS
+            curr_file.rsplit('.', 1)[-1].lower() in utils.ACCEPTED_EXTENSIONS
     )
 
 
@@ -504,20 +2241,107 @@ def main() -> None:
     """CLI entry point for vudupcheck."""
     args = parse_cli()
     utils.setup_logging(args=args)
+    ffmpeg_utils.configure_probe_cache(
+        enabled=not args.no_probe_cache,
+        cache_dir=args.probe_cache_dir,
+    )
+    ffmpeg_utils.set_backend(args.backend)
     logger.debug(f"Parsed arguments: {pprint.pformat(args)}")
 
-    file_list = scan_for_video_files(str(args.path), args.recursive)
-    logger.info(f"Found {len(file_list)} candidate video file(s) under '{args.path}'")
+    kind = hash_store_kind(args.sequence_interval, args.sampling)
+    match_options = {
+        'sequence_threshold': args.sequence_threshold,
+        'min_overlap_fraction': args.min_overlap,
+        'max_duration_diff': args.max_duration_diff,
+        'coarse_factor': args.coarse_factor,
+        'candidates': args.candidates,
+        'min_shared_frames': args.min_shared_frames,
+    }
+
+    if args.merge is not None:
+        shards = []
+        for shard_path in args.merge:
+            try:
+                if not os.path.isfile(shard_path):
+                    raise ValueError("no such file")
+                shards.append(LibraryIndex(shard_path, kind))
+            except (ValueError, sqlite3.Error) as exc:
+                logger.error(f"Can't open shard '{shard_path}': {exc}")
+                sys.exit(1)
+        duplicate_groups, infos, matches = find_duplicates_in_shards(
+            shards, args.sequence_interval, **match_options, base_path=str(args.path),
+        )
+        for shard in shards:
+            shard.close()
+        print_report(duplicate_groups, infos, matches)
+        return
 
-    duplicate_groups, infos, matches = find_duplicates(
-        file_list,
-        sequence_interval=args.sequence_interval,
-        sequence_threshold=args.sequence_threshold,
-        min_overlap_fraction=args.min_overlap,
-        max_duration_diff=args.max_duration_diff,
+    scanned_files = scan_for_video_files(str(args.path), args.recursive)
+    logger.info(f"Found {len(scanned_files)} candidate video file(s) under '{args.path}'")
+    file_list = scanned_files
+    if args.shard is not None:
+        shard, num_shards = args.shard
+        file_list = select_shard(scanned_files, str(args.path), shard, num_shards)
+        logger.info(f"{len(file_list)} of them are in shard {shard + 1}/{num_shards}")
+
+    library = None
+    index_path = args.update or args.against or args.hash_only
+    if index_path is not None:
+        try:
+            library = LibraryIndex(index_path, kind)
+        except (ValueError, sqlite3.Error) as exc:
+            logger.error(f"Can't open duplicate index '{index_path}': {exc}")
+            sys.exit(1)
+
+    hash_store = open_hash_store(
+        enabled=not args.no_hash_store,
+        store_dir=args.hash_store_dir,
     )
 
-    print_report(duplicate_groups, infos, matches)
+    hash_options = {
+        'sequence_interval': args.sequence_interval,
+        'probe_workers': args.probe_workers,
+        'hash_store': hash_store,
+        'jobs': args.jobs,
+        'sampling': args.sampling,
+    }
+    if args.update is not None or args.hash_only is not None:
+        # A shard is just a duplicate index of a slice of the library.
+        num_indexed, num_dropped = update_library_index(
+            library, file_list, str(args.path), **hash_options,
+        )
+    elif args.against is not None:
+        duplicate_groups, infos, matches = find_duplicates_against(
+            library, file_list, **hash_options, **match_options,
+        )
+    else:
+        duplicate_groups, infos, matches = find_duplicates(
+            file_list, **hash_options, **match_options,
+            audio_prefilter=args.audio_prefilter, engine=args.engine,
+        )
+    if library is not None:
+        library.close()
+
+    ffmpeg_utils.log_probe_cache_stats()
+    if hash_store is not None:
+        # Only files the scan of --path no longer finds: the store may also
+        # hold other directories' files, which this run knows nothing about.
+        evicted = hash_store.evict_missing(str(args.path), scanned_files, args.recursive)
+        logger.info(
+            f"Hash store: {hash_store.hits} hit(s), {hash_store.misses} " +
+            f"miss(es), {evicted} deleted file(s) evicted ('{hash_store.path}')"
+        )
+        hash_store.close()
+
+    if args.update is not None or args.hash_only is not None:
+        print(
+            f"{'Duplicate index' if args.update is not None else 'Shard'} " +
+            f"'{index_path}' updated: {num_indexed} file(s) " +
+            f"(re)indexed, {num_dropped} deleted file(s) dropped."
+        )
+        return
+
+    print_report(duplicate_groups, infos, matches, max_distance=engine_max_distance(args.engine))
 
 if __name__ == '__main__':
     main()
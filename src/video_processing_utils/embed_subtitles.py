@@ -37,7 +37,6 @@ import sys
 
 # Local imports
 from . import utils
-from .convert_video import determine_new_filename
 
 logger = logging.getLogger(__name__)
 
@@ -118,7 +117,7 @@ def embed_subtitles(
     languages = list(languages or [])
     titles = list(titles or [])
 
-    new_file_name, is_temp_file = determine_new_filename(fileprefix, 'mkv')
+    new_file_name, is_temp_file = utils.determine_new_filename(fileprefix, 'mkv')
 
     command = ['mkvmerge', '-o', new_file_name, video_path]
     for index, subtitle_path in enumerate(subtitle_paths):
@@ -5,18 +5,112 @@ Video utility functions common to multiple commands.
 '''
 
 # System imports
+import abc
+import asyncio
+import concurrent.futures
+import contextlib
+import dataclasses
+import fractions
+import functools
 import json
 import logging
 import os
 import pathlib
 import pprint
+import re
+import sqlite3
+import subprocess
+import sys
 import tempfile
+import threading
+import typing
+import weakref
 
 # External imports
 import ffmpeg
+import ffmpeg.asyncio
+
+# Local imports
+from . import container_probe, probe_cache, utils
+from .media_info import MediaInfo
 
 logger = logging.getLogger(__name__)
 
+# Shared ffprobe result cache - see configure_probe_cache(). Opened lazily on
+# the first probe so tools/imports that never probe don't touch the disk.
+_probe_cache_lock = threading.Lock()
+_probe_cache_settings = {
+    'enabled': True,
+    'cache_dir': None,
+    'max_entries': probe_cache.DEFAULT_MAX_ENTRIES,
+}
+_probe_cache: probe_cache.ProbeCache | None = None
+
+# Concurrent ffprobe processes for the batch probing functions. Probing is
+# I/O/latency-bound (especially over a network share), so this can sit well
+# above the core count.
+DEFAULT_PROBE_WORKERS = 8
+
+# Concurrent ffmpeg/ffprobe processes the asyncio engine (async_run_ffmpeg
+# and everything built on it) allows per event loop, across all callers -
+# see set_async_process_limit().
+DEFAULT_ASYNC_PROCESSES = 8
+_async_process_limit = DEFAULT_ASYNC_PROCESSES
+# One semaphore per event loop - an asyncio.Semaphore is bound to the loop
+# it's first used on.
+_async_semaphores: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+# What a single file's probe can fail with without it being a bug: ffprobe
+# itself failing, the file vanishing/being unreadable, or garbage output.
+# (An asyncio probe timing out raises TimeoutError, an OSError.)
+PROBE_ERRORS = (ffmpeg.errors.FFmpegError, OSError, ValueError)
+
+# Named ffprobe queries, from everything (`full`, the historical default) down
+# to just the fields a particular caller reads. ffprobe's JSON output - and
+# with it the time spent producing and parsing it - scales with what's asked
+# for, and files with hundreds of chapters or attachment streams make `full`
+# output very large. The narrower profiles keep the same layout ('streams'
+# list / 'format' dict) so callers don't care which one they got.
+PROBE_PROFILES = {
+    # Chapters, programs, every stream field and the format section.
+    'full': {
+        'show_chapters': None,
+        'show_format': None,
+        'show_programs': None,
+        'show_streams': None,
+    },
+    # Every stream field and the format section - enough for transcoding.
+    'streams': {
+        'show_format': None,
+        'show_streams': None,
+    },
+    # Stream types/codecs only - check_codec().
+    'codec': {
+        'show_entries': 'stream=index,codec_type,codec_name:' +
+            'stream_disposition=attached_pic',
+    },
+    # Resolution and duration - dup_finder.probe_video_info().
+    'geometry': {
+        'show_entries': 'stream=index,codec_type,width,height,duration:' +
+            'stream_disposition=attached_pic:format=duration',
+    },
+    # The fields concat_ffmpeg_demuxer() compares and builds chapters from.
+    'concat': {
+        'show_entries': 'stream=index,codec_type,codec_name,width,height,' +
+            'channel_layout,sample_rate:format=filename,duration',
+    },
+}
+
+# Decoder downscaling (a power of two) for keyframes-only decoding - the
+# frames end up as tiny thumbnails anyway.
+KEYFRAME_LOWRES = 2
+
+# Frames per chunk SubprocessBackend.iter_gray_frames() reads at a time.
+GRAY_FRAMES_PER_CHUNK = 256
+
+# Samples per chunk SubprocessBackend.iter_mono_audio() reads at a time.
+AUDIO_SAMPLES_PER_CHUNK = 1 << 18
+
 codec_map = {
     'h265': {
         'codec': 'libx265',
@@ -30,9 +124,346 @@ codec_map = {
     },
 }
 
+class MediaBackend(abc.ABC):
+    """How media files get probed and decoded.
+
+    `SubprocessBackend` (ffprobe/ffmpeg processes) is the default; see
+    `set_backend` to switch, e.g. to the in-process `PyAVBackend`. Every
+    backend reports failures as `ffmpeg.errors.FFmpegError`, so callers
+    don't need to care which one is active.
+    """
+    name = ''
+
+    @abc.abstractmethod
+    def probe(self, filename: str, profile: str) -> dict:
+        """Probe `filename`.
+
+        Args:
+            filename (str): File to probe.
+            profile (str): `PROBE_PROFILES` entry to query. Backends may
+                return more than the profile asks for, never less.
+
+        Raises:
+            ffmpeg.errors.FFmpegError: If `filename` can't be read.
+
+        Returns:
+            dict: ffprobe-JSON-shaped output ('streams' list, 'format' dict,
+                ...).
+        """
+
+    def decode_gray_frames(self, filename: str, fps: float, width: int, height: int,
+                           threads: int | None = None,
+                           keyframes_only: bool = False) -> bytes:
+        """Decode the first video stream of `filename` at `fps` frames per
+        second, each frame downscaled (bilinear) to `width` x `height`
+        8-bit greyscale.
+
+        Args:
+            filename (str): File to decode.
+            fps (float): Output frame rate - input frames are dropped or
+                duplicated to match, as ffmpeg's `fps` filter does.
+            width (int): Output frame width.
+            height (int): Output frame height.
+            threads (int | None, optional): Decoder threads to use, e.g. to
+                share the CPU between several concurrent decodes. Defaults
+                to None (the decoder's own choice, typically one per core).
+            keyframes_only (bool, optional): Decode only keyframes (and at
+                reduced resolution where the decoder supports it, see
+                `KEYFRAME_LOWRES`), each output frame then showing the
+                latest keyframe at or before its time. Much cheaper than a
+                full decode, but frames can be off by up to a GOP length.
+                Defaults to False.
+
+        Raises:
+            ffmpeg.errors.FFmpegError: If `filename` can't be decoded.
+
+        Returns:
+            bytes: The frames back to back, `width * height` bytes each.
+        """
+        return b''.join(
+            bytes(chunk) for chunk in self.iter_gray_frames(
+                filename, fps, width, height,
+                threads=threads, keyframes_only=keyframes_only,
+            )
+        )
+
+    @abc.abstractmethod
+    def iter_gray_frames(self, filename: str, fps: float, width: int, height: int,
+                         threads: int | None = None,
+                         keyframes_only: bool = False) -> typing.Iterator[memoryview | bytes]:
+        """Streaming `decode_gray_frames`: yields the frames as they're
+        decoded, so memory use doesn't grow with the video's length and the
+        caller's work on them overlaps the decode.
+
+        Each chunk holds one or more whole frames back to back. It may be a
+        view of a buffer the next chunk reuses, so must be consumed (or
+        copied) before asking for the next one.
+
+        Args:
+            filename (str): File to decode.
+            fps (float): See `decode_gray_frames`.
+            width (int): Output frame width.
+            height (int): Output frame height.
+            threads (int | None, optional): See `decode_gray_frames`.
+            keyframes_only (bool, optional): See `decode_gray_frames`.
+
+        Raises:
+            ffmpeg.errors.FFmpegError: If `filename` can't be decoded -
+                possibly only after some frames have been yielded.
+
+        Yields:
+            memoryview | bytes: Whole frames, `width * height` bytes each.
+        """
+
+    @abc.abstractmethod
+    def iter_mono_audio(self, filename: str,
+                        sample_rate: int) -> typing.Iterator[memoryview | bytes]:
+        """Decode the first audio stream of `filename`, downmixed to mono
+        and resampled to `sample_rate`, yielding the PCM as it's decoded.
+
+        Each chunk holds whole signed 16-bit little-endian samples. As with
+        `iter_gray_frames`, it may be a view of a reused buffer.
+
+        Args:
+            filename (str): File to decode.
+            sample_rate (int): Output sample rate, in Hz.
+
+        Raises:
+            ffmpeg.errors.FFmpegError: If `filename` has no audio stream or
+                it can't be decoded - possibly only after some samples have
+                been yielded.
+
+        Yields:
+            memoryview | bytes: Whole samples, 2 bytes each.
+        """
+
+
+def _ffprobe_command(ffmpeg_class: type, filename: str, profile: str):
+    """Build the ffprobe command for a `PROBE_PROFILES` query of `filename`,
+    as an `ffmpeg.FFmpeg` or `ffmpeg.asyncio.FFmpeg` (`ffmpeg_class`)."""
+    # '-v error' suppresses ffprobe's human-readable info banner on stderr -
+    # we only need the JSON on stdout anyway. That banner truncates long
+    # metadata tag values (e.g. a comment/title) at a fixed byte length with
+    # no regard for UTF-8 character boundaries, which can leave a multi-byte
+    # sequence cut in half; the ffmpeg-python library decodes stderr lines
+    # strictly as UTF-8, so a file with such a tag would otherwise crash
+    # this call with a UnicodeDecodeError instead of returning its metadata.
+    return ffmpeg_class(executable="ffprobe").option("v", "error").input(
+        filename,
+        print_format="json",
+        **PROBE_PROFILES[profile],
+    )
+
+
+def _ffmetadata_command(ffmpeg_class: type, filename: str):
+    """Build the ffmpeg command dumping `filename`'s ffmetadata to stdout."""
+    # See _ffprobe_command() - '-v error' avoids a UnicodeDecodeError from
+    # ffmpeg-python on files whose metadata tags get truncated mid-character
+    # in the (otherwise unused) stderr info banner.
+    return ffmpeg_class().option("v", "error").input(
+            filename
+        ).output(
+            '-', {'f': 'ffmetadata'}
+        )
+
+
+class SubprocessBackend(MediaBackend):
+    """Probe/decode by running the ffprobe/ffmpeg executables."""
+    name = 'subprocess'
+
+    def probe(self, filename: str, profile: str) -> dict:
+        return json.loads(_ffprobe_command(ffmpeg.FFmpeg, filename, profile).execute())
+
+    def iter_gray_frames(self, filename: str, fps: float, width: int, height: int,
+                         threads: int | None = None,
+                         keyframes_only: bool = False) -> typing.Iterator[memoryview]:
+        input_options = {} if threads is None else {'threads': threads}
+        if keyframes_only:
+            # Decoders without lowres support (e.g. H.264/HEVC) just ignore
+            # it - with a warning '-v error' hides.
+            input_options.update(skip_frame='nokey', lowres=KEYFRAME_LOWRES)
+        cmd = ffmpeg.FFmpeg().option('v', 'error').input(filename, input_options).output(
+            'pipe:1',
+            {
+                'vf': f'fps={fps},scale={width}:{height}:flags=bilinear',
+                'f': 'rawvideo',
+                'pix_fmt': 'gray',
+                'an': None,
+            },
+        )
+        # Read straight off the pipe - ffmpeg.FFmpeg.execute() would buffer
+        # the whole output first.
+        yield from _iter_fixed_chunks(cmd.arguments, width * height * GRAY_FRAMES_PER_CHUNK)
+
+    def iter_mono_audio(self, filename: str, sample_rate: int) -> typing.Iterator[memoryview]:
+        cmd = ffmpeg.FFmpeg().option('v', 'error').input(filename).output(
+            'pipe:1',
+            {
+                'map': '0:a:0',
+                'ac': 1,
+                'ar': sample_rate,
+                'f': 's16le',
+            },
+        )
+        yield from _iter_fixed_chunks(cmd.arguments, 2 * AUDIO_SAMPLES_PER_CHUNK)
+
+
+def _iter_fixed_chunks(arguments: list[str], chunk_size: int) -> typing.Iterator[memoryview]:
+    """Run `arguments` and yield its stdout in `chunk_size` pieces (the last
+    one possibly shorter), each read into the same reusable buffer.
+
+    stderr goes to a temporary file rather than a pipe, so a file spewing
+    decode errors can't fill the pipe and stall the process.
+
+    Raises:
+        ffmpeg.errors.FFmpegError: If the process exits with an error.
+    """
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    with tempfile.TemporaryFile() as stderr_file:
+        with subprocess.Popen(arguments, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                              stderr=stderr_file) as process:
+            try:
+                while True:
+                    filled = 0
+                    while filled < chunk_size:
+                        read = process.stdout.readinto(view[filled:])
+                        if not read:
+                            break
+                        filled += read
+                    if filled:
+                        yield view[:filled]
+                    if filled < chunk_size:
+                        break
+            except BaseException:
+                # Stopped early (GeneratorExit) or failed - don't leave
+                # ffmpeg running.
+                process.kill()
+                raise
+            # EOF: let it finish (it may still be writing its trailer or
+            # errors) for a meaningful exit status.
+            process.wait()
+
+        if process.returncode != 0:
+            stderr_file.seek(0)
+            message = stderr_file.read().decode('utf-8', errors='replace').strip()
+            raise ffmpeg.errors.FFmpegError.create(message=message, arguments=arguments)
+
+
+def _create_pyav_backend() -> MediaBackend:
+    # Imported here - PyAV is an optional dependency.
+    from .pyav_backend import PyAVBackend
+    return PyAVBackend()
+
+# Backend name -> factory, see set_backend().
+BACKENDS = {
+    'subprocess': SubprocessBackend,
+    'pyav': _create_pyav_backend,
+}
+_backend: MediaBackend = SubprocessBackend()
+
+def set_backend(name: str) -> MediaBackend:
+    """Select the media backend used for probing and frame decoding from
+    here on.
+
+    Falls back to the subprocess backend (with a warning) if `name` needs
+    an optional dependency that isn't installed, e.g. 'pyav' without the
+    `av` package.
+
+    Args:
+        name (str): A `BACKENDS` key.
+
+    Raises:
+        KeyError: If `name` isn't a known backend.
+
+    Returns:
+        MediaBackend: The backend now in use.
+    """
+    global _backend
+
+    try:
+        _backend = BACKENDS[name]()
+    except ImportError as exc:
+        logger.warning(f"Media backend '{name}' unavailable ({exc}), using 'subprocess'")
+        _backend = SubprocessBackend()
+
+    logger.debug(f"Media backend: {_backend.name}")
+    return _backend
+
+def get_backend() -> MediaBackend:
+    """Return the media backend currently in use (see `set_backend`)."""
+    return _backend
+
+def configure_probe_cache(enabled: bool = True, cache_dir: str | None = None,
+                          max_entries: int = probe_cache.DEFAULT_MAX_ENTRIES) -> None:
+    """Configure the persistent cache consulted by `fetch_file_data` and
+    `fetch_file_metadata`.
+
+    The cache is on by default; this only needs calling to relocate,
+    resize or disable it (e.g. for `--no-probe-cache`). Takes effect from
+    the next probe.
+
+    Args:
+        enabled (bool, optional): Use the cache. Defaults to True.
+        cache_dir (str | None, optional): Directory to keep the cache
+            database in. Defaults to None (`utils.user_cache_dir()`).
+        max_entries (int, optional): Maximum number of cached probe results
+            before the least recently used are evicted. Defaults to
+            probe_cache.DEFAULT_MAX_ENTRIES.
+    """
+    global _probe_cache
+
+    with _probe_cache_lock:
+        if _probe_cache is not None:
+            _probe_cache.close()
+            _probe_cache = None
+        _probe_cache_settings.update(
+            enabled=enabled,
+            cache_dir=cache_dir,
+            max_entries=max_entries,
+        )
+
+def get_probe_cache() -> probe_cache.ProbeCache | None:
+    """Return the shared probe cache, opening it on first use.
+
+    Returns:
+        probe_cache.ProbeCache | None: The cache, or None if it's disabled
+            or couldn't be opened (probing then just runs uncached).
+    """
+    global _probe_cache
+
+    with _probe_cache_lock:
+        if _probe_cache is None and _probe_cache_settings['enabled']:
+            cache_dir = _probe_cache_settings['cache_dir'] or utils.user_cache_dir()
+            try:
+                _probe_cache = probe_cache.ProbeCache(
+                    cache_dir, max_entries=_probe_cache_settings['max_entries'],
+                )
+            except (OSError, sqlite3.Error) as exc:
+                logger.warning(
+                    f"Probe cache in '{cache_dir}' unavailable, probing " +
+                    f"uncached: {exc}"
+                )
+                _probe_cache_settings['enabled'] = False
+        return _probe_cache
+
+def log_probe_cache_stats() -> None:
+    """Log the shared probe cache's hit/miss counts for this run, if it was
+    used at all."""
+    cache = _probe_cache
+    if cache is None:
+        return
+    logger.info(
+        f"Probe cache: {cache.hits} hit(s), {cache.misses} miss(es) " +
+        f"('{cache.path}')"
+    )
+
 def check_codec(filename: str, codec: str) -> bool:
     """Check code of input filename is of specified codec.
 
+    MP4/MOV and Matroska/WebM files are answered from their container
+    headers (see `container_probe`); anything else goes through ffprobe.
+
     Args:
         filename (str): Filename to check.
         codec (str): Codec to check
@@ -40,19 +471,17 @@ def check_codec(filename: str, codec: str) -> bool:
     Returns:
         bool: True if `filename` is of codec `codec`, false otherwise
     """
-    fdata = fetch_file_data(filename)
-    video_formats = list(map(
-        lambda x: x['codec_name'],
-        filter(lambda x: x['codec_type'] == 'video', fdata['streams']),
-    ))
+    # Fast path: MP4/MOV/Matroska headers can answer this without an
+    # ffprobe process - only fall back to ffprobe when they can't.
+    video_formats = container_probe.read_video_codecs(filename)
+    if video_formats is None:
+        media = fetch_media_info(filename, profile='codec')
+        video_formats = [stream.codec_name for stream in media.video_streams]
 
-    codec_found = False
-    for curr_name in video_formats:
-        if curr_name in codec_map[codec]['alias']:
-            codec_found = True
-            break
-
-    return codec_found
+    return any(
+        curr_name in codec_map[codec]['alias']
+        for curr_name in video_formats
+    )
 
 def fetch_file_metadata(filename: str) -> str:
     """Fetch the raw metadata from a file.
@@ -65,66 +494,510 @@ def fetch_file_metadata(filename: str) -> str:
     ffmpeg -v error -i <filename> -f ffmetadata -
     ```
 
+    Results are cached across runs, as with `fetch_file_data`.
+
     Args:
         filename (str): Filename to read metadata from.
 
     Returns:
         str: metadata.
     """
-    # See the comment in fetch_file_data() - '-v error' avoids a
-    # UnicodeDecodeError from ffmpeg-python on files whose metadata tags get
-    # truncated mid-character in the (otherwise unused) stderr info banner.
-    cmd = ffmpeg.FFmpeg().option("v", "error").input(
-            filename
-        ).output(
-            '-', {'f': 'ffmetadata'}
-        )
+    cache = get_probe_cache()
+    if cache is not None:
+        metadata_output = cache.get(filename, 'ffmetadata')
+        if metadata_output is not None:
+            return metadata_output
+
+    cmd = _ffmetadata_command(ffmpeg.FFmpeg, filename)
     metadata_output = cmd.execute()
 
+    if cache is not None:
+        cache.put(filename, 'ffmetadata', metadata_output)
+
     return metadata_output
 
 
-def fetch_file_data(filename: str) -> dict:
+def _probe_cache_kind(backend: MediaBackend, profile: str) -> str:
+    """Probe cache kind for `profile` output from `backend`."""
+    # 'full' keeps its original cache kind so existing entries stay valid.
+    # Other backends' output isn't byte-for-byte ffprobe's, so is kept apart.
+    cache_kind = 'ffprobe' if profile == 'full' else f'ffprobe:{profile}'
+    if backend.name != SubprocessBackend.name:
+        cache_kind = f'{backend.name}:{cache_kind}'
+    return cache_kind
+
+
+def fetch_file_data(filename: str, profile: str = 'full') -> dict:
     """Fetch file data via ffprobe.
 
-    FFmpeg cli:
+    FFmpeg cli (`full` profile):
     ```
     ffprobe -v error -print_format json -show_chapters -show_programs -show_streams -show_format <filename>
     ```
 
+    Narrower profiles replace the `-show_*` options with a `-show_entries`
+    selecting only the fields some caller needs - see `PROBE_PROFILES`.
+
+    Runs through the current media backend (ffprobe itself by default -
+    see `set_backend`).
+
+    Results are cached across runs (keyed by the file's path, size, mtime
+    and inode) - see `configure_probe_cache`.
+
     Args:
         filename (str): Filename to read metadata from.
+        profile (str, optional): Which `PROBE_PROFILES` entry to query.
+            Defaults to 'full'.
 
     Raises:
         ffmpeg.errors.FFmpegError: If ffprobe fails to read `filename`
             (missing file, unreadable/corrupt container, etc.).
+        KeyError: If `profile` isn't a known profile.
 
     Returns:
-        dict: Parsed ffprobe JSON output - chapters, format and stream info.
+        dict: Parsed ffprobe JSON output - chapters, format and stream info
+            (or the subset of it `profile` asks for).
     """
+    if profile not in PROBE_PROFILES:
+        raise KeyError(f"Unknown probe profile '{profile}'")
 
-    # '-v error' suppresses ffprobe's human-readable info banner on stderr -
-    # we only need the JSON on stdout anyway. That banner truncates long
-    # metadata tag values (e.g. a comment/title) at a fixed byte length with
-    # no regard for UTF-8 character boundaries, which can leave a multi-byte
-    # sequence cut in half; the ffmpeg-python library decodes stderr lines
-    # strictly as UTF-8, so a file with such a tag would otherwise crash
-    # this call with a UnicodeDecodeError instead of returning its metadata.
-    cmd = ffmpeg.FFmpeg(executable="ffprobe").option("v", "error").input(
-        filename,
-        print_format="json",
-        show_chapters=None,
-        show_format=None,
-        show_programs=None,
-        show_streams=None,
+    backend = get_backend()
+    cache_kind = _probe_cache_kind(backend, profile)
+
+    cache = get_probe_cache()
+    if cache is not None:
+        cached_output = cache.get(filename, cache_kind)
+        if cached_output is not None:
+            return json.loads(cached_output)
+
+    media_data = backend.probe(filename, profile)
+
+    if cache is not None:
+        cache.put(
+            filename, cache_kind,
+            json.dumps(media_data, separators=(',', ':')).encode('utf-8'),
+        )
+
+    return media_data
+
+
+def fetch_media_info(filename: str, profile: str = 'full') -> MediaInfo:
+    """Probe `filename` via `fetch_file_data` and return the compact, typed
+    `MediaInfo` view of the result.
+
+    Args:
+        filename (str): File to probe.
+        profile (str, optional): Which `PROBE_PROFILES` entry to query -
+            fields outside it are left as None. Defaults to 'full'.
+
+    Raises:
+        ffmpeg.errors.FFmpegError: If ffprobe fails to read `filename`.
+
+    Returns:
+        MediaInfo: The probed file.
+    """
+    return MediaInfo.from_probe(filename, fetch_file_data(filename, profile=profile))
+
+
+@dataclasses.dataclass
+class ProbeResult:
+    '''Outcome of probing one file as part of a batch - exactly one of
+    `data`/`error` is set. `data` is whatever the probe returns (the raw
+    ffprobe dict, or a `MediaInfo`).
+    '''
+    filename: str
+    data: typing.Any = None
+    error: Exception | None = None
+
+
+def _iter_probe(probe_func: typing.Callable[[str], typing.Any],
+                filenames: typing.Iterable[str], max_workers: int,
+                ordered: bool) -> typing.Iterator[ProbeResult]:
+    """Run `probe_func` over `filenames` on a bounded thread pool (the work
+    happens in the ffprobe subprocesses, so threads are enough), yielding a
+    `ProbeResult` per file. See `iter_fetch_file_data`.
+    """
+    def probe_one(filename: str) -> ProbeResult:
+        try:
+            return ProbeResult(filename=filename, data=probe_func(filename))
+        except PROBE_ERRORS as exc:
+            return ProbeResult(filename=filename, error=exc)
+
+    filenames = list(filenames)
+    if max_workers <= 1 or len(filenames) <= 1:
+        yield from map(probe_one, filenames)
+        return
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(probe_one, filename) for filename in filenames]
+        if not ordered:
+            futures = concurrent.futures.as_completed(futures)
+        for future in futures:
+            yield future.result()
+
+
+def iter_fetch_file_data(filenames: typing.Iterable[str],
+                         max_workers: int = DEFAULT_PROBE_WORKERS,
+                         ordered: bool = True,
+                         profile: str = 'full') -> typing.Iterator[ProbeResult]:
+    """Probe many files concurrently via `fetch_file_data`, streaming the
+    results back as they become available.
+
+    A file that fails to probe is reported through its result's `error`
+    rather than aborting the rest of the batch.
+
+    Args:
+        filenames (typing.Iterable[str]): Files to probe.
+        max_workers (int, optional): Maximum concurrent ffprobe processes.
+            Defaults to DEFAULT_PROBE_WORKERS.
+        ordered (bool, optional): Yield results in the same order as
+            `filenames` if True, otherwise in completion order (lower
+            latency to the first results). Defaults to True.
+        profile (str, optional): Which `PROBE_PROFILES` entry to query.
+            Defaults to 'full'.
+
+    Yields:
+        ProbeResult: One per entry in `filenames`, with `data` holding
+            `fetch_file_data`'s output on success.
+    """
+    yield from _iter_probe(
+        functools.partial(fetch_file_data, profile=profile),
+        filenames, max_workers, ordered,
     )
-    media_data = json.loads(cmd.execute())
+
+
+def iter_fetch_media_info(filenames: typing.Iterable[str],
+                          max_workers: int = DEFAULT_PROBE_WORKERS,
+                          ordered: bool = True,
+                          profile: str = 'full') -> typing.Iterator[ProbeResult]:
+    """As `iter_fetch_file_data`, but each successful result's `data` is a
+    `MediaInfo` (see `fetch_media_info`).
+
+    Args:
+        filenames (typing.Iterable[str]): Files to probe.
+        max_workers (int, optional): Maximum concurrent ffprobe processes.
+            Defaults to DEFAULT_PROBE_WORKERS.
+        ordered (bool, optional): Yield results in the same order as
+            `filenames` if True, otherwise in completion order. Defaults to
+            True.
+        profile (str, optional): Which `PROBE_PROFILES` entry to query.
+            Defaults to 'full'.
+
+    Yields:
+        ProbeResult: One per entry in `filenames`.
+    """
+    yield from _iter_probe(
+        functools.partial(fetch_media_info, profile=profile),
+        filenames, max_workers, ordered,
+    )
+
+
+def fetch_file_data_many(filenames: typing.Iterable[str],
+                         max_workers: int = DEFAULT_PROBE_WORKERS,
+                         profile: str = 'full') -> list[ProbeResult]:
+    """Probe many files concurrently via `fetch_file_data`.
+
+    Args:
+        filenames (typing.Iterable[str]): Files to probe.
+        max_workers (int, optional): Maximum concurrent ffprobe processes.
+            Defaults to DEFAULT_PROBE_WORKERS.
+        profile (str, optional): Which `PROBE_PROFILES` entry to query.
+            Defaults to 'full'.
+
+    Returns:
+        list[ProbeResult]: One per entry in `filenames`, in the same order.
+            Check each result's `error` - a failed file doesn't abort the
+            batch.
+    """
+    return list(iter_fetch_file_data(filenames, max_workers=max_workers, profile=profile))
+
+
+### asyncio engine
+#
+# Coroutine counterparts of the probing/ffmpeg helpers above, for running
+# many probes/remuxes concurrently on one event loop instead of a thread per
+# process. Every process goes through async_run_ffmpeg(), which caps how
+# many run at once (see set_async_process_limit()).
+
+def set_async_process_limit(max_processes: int) -> None:
+    """Set how many ffmpeg/ffprobe processes the asyncio engine runs
+    concurrently per event loop. Takes effect for event loops that haven't
+    started a process yet.
+
+    Args:
+        max_processes (int): Maximum concurrent processes (at least 1).
+    """
+    global _async_process_limit
+
+    _async_process_limit = max(1, max_processes)
+    _async_semaphores.clear()
+
+def _get_async_semaphore() -> asyncio.Semaphore:
+    """The running event loop's process-limiting semaphore."""
+    loop = asyncio.get_running_loop()
+    semaphore = _async_semaphores.get(loop)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(_async_process_limit)
+        _async_semaphores[loop] = semaphore
+    return semaphore
+
+async def async_run_ffmpeg(cmd: ffmpeg.asyncio.FFmpeg,
+                           on_progress: typing.Callable[[ffmpeg.Progress], None] | None = None,
+                           on_stderr: typing.Callable[[str], None] | None = None,
+                           timeout: float | None = None) -> bytes:
+    """Run an `ffmpeg.asyncio.FFmpeg` command (ffmpeg or ffprobe), waiting
+    for a free slot under the process limit first.
+
+    Cancelling the awaiting task terminates the process.
+
+    Args:
+        cmd (ffmpeg.asyncio.FFmpeg): Command to run.
+        on_progress (typing.Callable[[ffmpeg.Progress], None] | None, optional):
+            Called with each progress update ffmpeg reports (needs the
+            `stats` option). Defaults to None.
+        on_stderr (typing.Callable[[str], None] | None, optional): Called
+            with each line ffmpeg writes to stderr. Defaults to None.
+        timeout (float | None, optional): Seconds to let the process run
+            before terminating it. Defaults to None (no limit).
+
+    Raises:
+        ffmpeg.errors.FFmpegError: If the process exits with an error.
+        TimeoutError: If `timeout` expires first.
+
+    Returns:
+        bytes: The process's stdout.
+    """
+    if on_progress is not None:
+        cmd.on('progress', on_progress)
+    if on_stderr is not None:
+        cmd.on('stderr', on_stderr)
+
+    async with _get_async_semaphore():
+        logger.debug(f"Running: {cmd.arguments}")
+        execution = asyncio.ensure_future(cmd.execute())
+        try:
+            return await asyncio.wait_for(asyncio.shield(execution), timeout=timeout)
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            # python-ffmpeg leaves the process running when the task awaiting
+            # it is cancelled (and unreaped when its own timeout expires) -
+            # stop it, then let `execute` reap it and close its pipes rather
+            # than leave a zombie behind.
+            try:
+                cmd.terminate()
+            except (ffmpeg.errors.FFmpegError, ProcessLookupError):
+                # Never started, or already exited.
+                execution.cancel()
+            with contextlib.suppress(Exception, asyncio.CancelledError):
+                await execution
+            raise
+
+async def async_probe(filename: str, profile: str = 'full',
+                      timeout: float | None = None) -> dict:
+    """Run ffprobe on `filename` through the asyncio engine, uncached. See
+    `async_fetch_file_data` for the cached version.
+
+    Args:
+        filename (str): File to probe.
+        profile (str, optional): Which `PROBE_PROFILES` entry to query.
+            Defaults to 'full'.
+        timeout (float | None, optional): Seconds before giving up on
+            ffprobe. Defaults to None (no limit).
+
+    Raises:
+        ffmpeg.errors.FFmpegError: If ffprobe fails to read `filename`.
+        TimeoutError: If `timeout` expires first.
+
+    Returns:
+        dict: Parsed ffprobe JSON output.
+    """
+    cmd = _ffprobe_command(ffmpeg.asyncio.FFmpeg, filename, profile)
+    return json.loads(await async_run_ffmpeg(cmd, timeout=timeout))
+
+async def async_fetch_file_metadata(filename: str, timeout: float | None = None) -> bytes:
+    """Coroutine version of `fetch_file_metadata`.
+
+    Args:
+        filename (str): Filename to read metadata from.
+        timeout (float | None, optional): Seconds before giving up on
+            ffmpeg. Defaults to None (no limit).
+
+    Returns:
+        bytes: metadata.
+    """
+    cache = get_probe_cache()
+    if cache is not None:
+        metadata_output = cache.get(filename, 'ffmetadata')
+        if metadata_output is not None:
+            return metadata_output
+
+    cmd = _ffmetadata_command(ffmpeg.asyncio.FFmpeg, filename)
+    metadata_output = await async_run_ffmpeg(cmd, timeout=timeout)
+
+    if cache is not None:
+        cache.put(filename, 'ffmetadata', metadata_output)
+
+    return metadata_output
+
+async def async_fetch_file_data(filename: str, profile: str = 'full',
+                                timeout: float | None = None) -> dict:
+    """Coroutine version of `fetch_file_data`, sharing its cache.
+
+    With the subprocess backend ffprobe runs through the asyncio engine;
+    other (in-process) backends run on a worker thread so they don't block
+    the event loop.
+
+    Args:
+        filename (str): Filename to read metadata from.
+        profile (str, optional): Which `PROBE_PROFILES` entry to query.
+            Defaults to 'full'.
+        timeout (float | None, optional): Seconds before giving up on
+            ffprobe (subprocess backend only). Defaults to None (no limit).
+
+    Raises:
+        ffmpeg.errors.FFmpegError: If ffprobe fails to read `filename`.
+        TimeoutError: If `timeout` expires first.
+        KeyError: If `profile` isn't a known profile.
+
+    Returns:
+        dict: Parsed ffprobe JSON output.
+    """
+    if profile not in PROBE_PROFILES:
+        raise KeyError(f"Unknown probe profile '{profile}'")
+
+    backend = get_backend()
+    cache_kind = _probe_cache_kind(backend, profile)
+
+    cache = get_probe_cache()
+    if cache is not None:
+        cached_output = cache.get(filename, cache_kind)
+        if cached_output is not None:
+            return json.loads(cached_output)
+
+    if isinstance(backend, SubprocessBackend):
+        media_data = await async_probe(filename, profile, timeout=timeout)
+    else:
+        media_data = await asyncio.to_thread(backend.probe, filename, profile)
+
+    if cache is not None:
+        cache.put(
+            filename, cache_kind,
+            json.dumps(media_data, separators=(',', ':')).encode('utf-8'),
+        )
 
     return media_data
 
+async def async_fetch_media_info(filename: str, profile: str = 'full',
+                                 timeout: float | None = None) -> MediaInfo:
+    """Coroutine version of `fetch_media_info`.
+
+    Args:
+        filename (str): File to probe.
+        profile (str, optional): Which `PROBE_PROFILES` entry to query.
+            Defaults to 'full'.
+        timeout (float | None, optional): Seconds before giving up on
+            ffprobe. Defaults to None (no limit).
+
+    Raises:
+        ffmpeg.errors.FFmpegError: If ffprobe fails to read `filename`.
+        TimeoutError: If `timeout` expires first.
+
+    Returns:
+        MediaInfo: The probed file.
+    """
+    media_data = await async_fetch_file_data(filename, profile=profile, timeout=timeout)
+    return MediaInfo.from_probe(filename, media_data)
+
 
-def concat_ffmpeg_demuxer(input_files: list[str], output_file: str,
-                          over_write=False, delete_input=False, print_progress=True) -> None:
+# Per codec_type, the stream fields that have to match for the concat
+# demuxer to stream-copy files back to back.
+CONCAT_FIELDS_TO_CHECK = {
+    'video': ['codec_type', 'codec_name', 'height', 'width'],
+    'audio': ['codec_type', 'codec_name', 'channel_layout', 'sample_rate'],
+}
+
+# Encoder to re-encode into each ffprobe codec_name with, when normalizing
+# concat inputs to match the first one (see normalize_concat_inputs()).
+NORMALIZE_ENCODERS = {
+    'h264': 'libx264',
+    'hevc': 'libx265',
+    'av1': 'libsvtav1',
+    'vp8': 'libvpx',
+    'vp9': 'libvpx-vp9',
+    'mpeg2video': 'mpeg2video',
+    'mpeg4': 'mpeg4',
+    'aac': 'aac',
+    'ac3': 'ac3',
+    'eac3': 'eac3',
+    'flac': 'flac',
+    'mp2': 'mp2',
+    'mp3': 'libmp3lame',
+    'opus': 'libopus',
+    'vorbis': 'libvorbis',
+}
+
+# Output options per format for streaming a concat to a pipe - both can be
+# written without seeking back, and carry the chapters in their header.
+STREAM_FORMATS = {
+    'matroska': {'f': 'matroska'},
+    'mp4': {'f': 'mp4', 'movflags': 'frag_keyframe+empty_moov+default_base_moof'},
+}
+
+
+def find_concat_mismatch(reference: MediaInfo, candidate: MediaInfo) -> str | None:
+    """Check whether `candidate` can be stream-copy concatenated after
+    `reference`, comparing `CONCAT_FIELDS_TO_CHECK` stream by stream.
+
+    Args:
+        reference (MediaInfo): File whose parameters the output will have.
+        candidate (MediaInfo): File to check against it.
+
+    Returns:
+        str | None: Description of the first mismatching field, or None if
+            the files are compatible.
+    """
+    for curr_stream, candidate_stream in enumerate(candidate.streams):
+        if curr_stream >= len(reference.streams):
+            # candidate has more streams than the reference file, e.g. an
+            # attached cover-art image the reference doesn't have.
+            logger.debug(
+                f"'{candidate.filename}' has more streams than the reference " +
+                f"file '{reference.filename}', skipping compatibility check " +
+                f"for stream {curr_stream}"
+            )
+            continue
+
+        reference_stream = reference.streams[curr_stream]
+        if reference_stream.codec_type not in CONCAT_FIELDS_TO_CHECK:
+            # Streams we don't have a comparison defined for (e.g.
+            # subtitles, data, attachments) are left to ffmpeg rather
+            # than blocking the concat here.
+            logger.debug(
+                f"Skipping compatibility check for stream {curr_stream} " +
+                f"in '{candidate.filename}' (codec_type " +
+                f"'{reference_stream.codec_type}')"
+            )
+            continue
+
+        for curr_field in CONCAT_FIELDS_TO_CHECK[reference_stream.codec_type]:
+            reference_value = getattr(reference_stream, curr_field)
+            candidate_value = getattr(candidate_stream, curr_field)
+            if reference_value != candidate_value:
+                return (
+                    f"Field '{curr_field}' in stream {curr_stream} does " +
+                    f"not match in file {candidate.filename}: " +
+                    f"{reference_value} => {candidate_value}"
+                )
+
+    return None
+
+
+def concat_ffmpeg_demuxer(input_files: list[str], output_file: str | int,
+                          over_write=False, delete_input=False, print_progress=True,
+                          probe_workers: int = DEFAULT_PROBE_WORKERS,
+                          split_incompatible: bool = False,
+                          normalize_incompatible: bool = False,
+                          normalize_workers: int | None = None,
+                          stream_format: str = 'matroska') -> list[str | int]:
     """Concatenate two video files together using ffmpeg demuxer.
 
 
@@ -171,166 +1044,738 @@ def concat_ffmpeg_demuxer(input_files: list[str], output_file: str,
     Args:
         input_files (list[str]): Input files, in the order they should be
             concatenated. Two or more required.
-        output_file (str): Path to write the concatenated output to.
+        output_file (str | int): Path to write the concatenated output to,
+            or '-' / an open file descriptor to stream it to (see
+            `stream_format`).
         over_write (bool, optional): Overwrite `output_file` if it already
             exists. Defaults to False.
         delete_input (bool, optional): Delete `input_files` once the
             concatenated output has been written successfully. Defaults to
-            False.
+            False. Not supported when streaming.
         print_progress (bool, optional): Print ffmpeg's progress to stdout
-            while concatenating. Defaults to True.
+            (stderr when streaming) while concatenating. Defaults to True.
+        probe_workers (int, optional): Maximum concurrent ffprobe processes
+            when probing the inputs. Defaults to DEFAULT_PROBE_WORKERS.
+        split_incompatible (bool, optional): Instead of failing on an input
+            that doesn't match the ones before it, split `input_files` into
+            maximal runs of consecutive compatible files (see
+            `split_concat_runs`) and concatenate each run into its own
+            `<output stem>-partN<suffix>` file. Defaults to False.
+        normalize_incompatible (bool, optional): Instead of failing on
+            inputs that don't match the first, re-encode just those to
+            match it (see `normalize_concat_inputs`), then concatenate as
+            usual. Defaults to False.
+        normalize_workers (int | None, optional): Maximum concurrent
+            re-encodes for `normalize_incompatible`. Defaults to None (one
+            per CPU core, up to the number of files to re-encode).
+        stream_format (str, optional): `STREAM_FORMATS` entry to write when
+            streaming to '-' or a file descriptor - Matroska, or fragmented
+            MP4. Both include the chapters. Defaults to 'matroska'.
+
+    Raises:
+        ValueError: If both `split_incompatible` and
+            `normalize_incompatible` are set, or a streamed output is asked
+            to be split, delete its inputs or use an unknown format.
+        RuntimeError: If fewer than two inputs are given, an output file
+            exists (without `over_write`), or - unless `split_incompatible`
+            or `normalize_incompatible` - the inputs can't be stream-copy
+            concatenated.
+        ffmpeg.errors.FFmpegError: If probing, re-encoding or
+            concatenating fails.
+
+    Returns:
+        list[str | int]: The output file(s) written - just `output_file`
+            unless the inputs were split.
     """
     if len(input_files) <= 1:
         raise RuntimeError("Two or more files required to concat")
+    if split_incompatible and normalize_incompatible:
+        raise ValueError("split_incompatible and normalize_incompatible are mutually exclusive")
+    stream_fd = _check_stream_output(output_file, stream_format, split_incompatible, delete_input)
+
+    # Every input's probe and the first input's metadata dump all run
+    # concurrently, once each.
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        metadata_future = executor.submit(fetch_file_metadata, input_files[0])
+        input_media = []
+        for result in iter_fetch_media_info(input_files, max_workers=probe_workers,
+                                            profile='concat'):
+            if result.error is not None:
+                raise result.error
+            input_media.append(result.data)
+        run_metadata = {input_files[0]: metadata_future.result()}
+
+    with _normalize_dir(None if stream_fd is not None else output_file,
+                        normalize_incompatible) as normalize_dir:
+        # Input file each (possibly re-encoded) concat input came from.
+        source_files = {
+            curr_media.filename: curr_file
+            for curr_media, curr_file in zip(input_media, input_files)
+        }
+        if normalize_dir is not None:
+            input_media = normalize_concat_inputs(
+                input_media, normalize_dir, max_workers=normalize_workers,
+            )
+            source_files.update(
+                (curr_media.filename, curr_file)
+                for curr_media, curr_file in zip(input_media, input_files)
+            )
 
-    with tempfile.NamedTemporaryFile(delete_on_close=False, delete=True, dir='.') as fp_filelist, \
-         tempfile.NamedTemporaryFile(delete_on_close=False, delete=True, dir='.') as fp_metadata:
+        # A stream has no existing file to clobber.
+        concat_plan = _plan_concat(
+            input_media, output_file, over_write or stream_fd is not None, split_incompatible,
+        )
 
-        # Read the metadata from the first file in the list and save it.
-        metadata_output = fetch_file_metadata(input_files[0])
-        media_data = fetch_file_data(input_files[0])
+        # Later runs take their global metadata from their own first file.
+        for result in _iter_probe(fetch_file_metadata,
+                                  [run[0].filename for _, run in concat_plan[1:]],
+                                  probe_workers, ordered=True):
+            if result.error is not None:
+                raise result.error
+            run_metadata[result.filename] = result.data
 
-        logger.debug(f"Media data:\n{pprint.pformat(media_data['streams'])}")
+        for run_output, run_media in concat_plan:
+            logger.info(f"Concatenating {len(run_media)} file(s) into '{run_output}'")
+            with tempfile.NamedTemporaryFile(delete_on_close=False, delete=True) as fp_filelist, \
+                 tempfile.NamedTemporaryFile(delete_on_close=False, delete=True) as fp_metadata:
 
-        file_chapter_start = 0
-        # Create the concat input file
-        for curr_file in input_files:
-            quoted_fname = curr_file
-            fp_filelist.write(f"file '{quoted_fname}'\n".encode('utf-8'))
-
-            # Check this file against the first file to ensure parameters match
-            # Possibly look to move this off to its own function.
-            curr_file_media_data = fetch_file_data(curr_file)
-            # Test media_data against the curr_file_media_data
-            fields_to_check = {
-                'video': ['codec_type', 'codec_name', 'height', 'width'],
-                'audio': ['codec_type', 'codec_name', 'channel_layout', 'sample_rate'],
-            }
-            for curr_stream in range(len(curr_file_media_data['streams'])):
-                if curr_stream >= len(media_data['streams']):
-                    # curr_file has more streams than the reference (first) file,
-                    # e.g. an attached cover-art image the first file doesn't have.
-                    logger.debug(
-                        f"'{curr_file}' has more streams than the reference file " +
-                        f"'{input_files[0]}', skipping compatibility check for " +
-                        f"stream {curr_stream}"
+                _write_concat_lists(
+                    fp_filelist, fp_metadata, run_media, run_metadata[run_media[0].filename],
+                )
+
+                if stream_fd is not None:
+                    cmd = _concat_command(
+                        ffmpeg.FFmpeg(), fp_filelist.name, fp_metadata.name, 'pipe:1', True,
+                        STREAM_FORMATS[stream_format],
                     )
+                    logger.debug(cmd.arguments)
+                    try:
+                        _stream_ffmpeg(cmd.arguments, stream_fd, print_progress)
+                    except ffmpeg.errors.FFmpegError as exception:
+                        _log_concat_error(exception, print_progress=False)
+                        raise
                     continue
 
-                stream_codec_type = media_data['streams'][curr_stream]['codec_type']
-                if stream_codec_type not in fields_to_check:
-                    # Streams we don't have a comparison defined for (e.g.
-                    # subtitles, data, attachments) are left to ffmpeg rather
-                    # than blocking the concat here.
-                    logger.debug(
-                        f"Skipping compatibility check for stream {curr_stream} " +
-                        f"in '{curr_file}' (codec_type '{stream_codec_type}')"
+                cmd = _concat_command(
+                    ffmpeg.FFmpeg(), fp_filelist.name, fp_metadata.name, run_output, over_write,
+                )
+
+                @cmd.on("progress")
+                def on_progress(progress: ffmpeg.Progress):
+                    if print_progress:
+                        print(progress, end="\r", flush=True)
+
+                logger.debug(cmd.arguments)
+
+                try:
+                    cmd.execute()
+                except ffmpeg.errors.FFmpegError as exception:
+                    _log_concat_error(exception, print_progress)
+                    raise
+
+                if print_progress:
+                    print(flush=True)
+
+            if delete_input:
+                _delete_concat_inputs(
+                    [source_files[curr_media.filename] for curr_media in run_media], run_output,
+                )
+
+    return [run_output for run_output, _ in concat_plan]
+
+
+async def async_concat_ffmpeg_demuxer(input_files: list[str], output_file: str | int,
+                                      over_write=False, delete_input=False,
+                                      print_progress=True,
+                                      on_progress: typing.Callable[[ffmpeg.Progress], None] | None = None,
+                                      timeout: float | None = None,
+                                      split_incompatible: bool = False,
+                                      normalize_incompatible: bool = False,
+                                      normalize_workers: int | None = None,
+                                      stream_format: str = 'matroska') -> list[str | int]:
+    """Coroutine version of `concat_ffmpeg_demuxer`, running its probes and
+    the concat itself through the asyncio engine.
+
+    Args:
+        input_files (list[str]): Input files, in the order they should be
+            concatenated. Two or more required.
+        output_file (str | int): Path to write the concatenated output to,
+            or '-' / an open file descriptor to stream it to.
+        over_write (bool, optional): Overwrite `output_file` if it already
+            exists. Defaults to False.
+        delete_input (bool, optional): Delete `input_files` once the
+            concatenated output has been written successfully. Defaults to
+            False. Not supported when streaming.
+        print_progress (bool, optional): Print ffmpeg's progress to stdout
+            (stderr when streaming) while concatenating. Ignored if
+            `on_progress` is given. Defaults to True.
+        on_progress (typing.Callable[[ffmpeg.Progress], None] | None, optional):
+            Called with each progress update instead of printing it. Not
+            called when streaming. Defaults to None.
+        timeout (float | None, optional): Seconds to let each concat run
+            before terminating it. Defaults to None (no limit).
+        split_incompatible (bool, optional): Split into runs of compatible
+            files, as `concat_ffmpeg_demuxer` does. Defaults to False.
+        normalize_incompatible (bool, optional): Re-encode mismatching
+            inputs first, as `concat_ffmpeg_demuxer` does (on a worker
+            thread). Defaults to False.
+        normalize_workers (int | None, optional): Maximum concurrent
+            re-encodes for `normalize_incompatible`. Defaults to None.
+        stream_format (str, optional): `STREAM_FORMATS` entry to write when
+            streaming. Defaults to 'matroska'.
+
+    Raises:
+        ValueError: If both `split_incompatible` and
+            `normalize_incompatible` are set, or a streamed output is asked
+            to be split, delete its inputs or use an unknown format.
+        RuntimeError: If fewer than two inputs are given, an output file
+            exists (without `over_write`), or the inputs can't be
+            stream-copy concatenated.
+        ffmpeg.errors.FFmpegError: If probing, re-encoding or
+            concatenating fails.
+        TimeoutError: If `timeout` expires first.
+
+    Returns:
+        list[str | int]: The output file(s) written.
+    """
+    if len(input_files) <= 1:
+        raise RuntimeError("Two or more files required to concat")
+    if split_incompatible and normalize_incompatible:
+        raise ValueError("split_incompatible and normalize_incompatible are mutually exclusive")
+    stream_fd = _check_stream_output(output_file, stream_format, split_incompatible, delete_input)
+
+    print_progress = print_progress and on_progress is None
+    if print_progress:
+        def on_progress(progress: ffmpeg.Progress):
+            print(progress, end="\r", flush=True)
+
+    metadata_output, *input_media = await asyncio.gather(
+        async_fetch_file_metadata(input_files[0]),
+        *(async_fetch_media_info(curr_file, profile='concat') for curr_file in input_files),
+    )
+
+    with _normalize_dir(None if stream_fd is not None else output_file,
+                        normalize_incompatible) as normalize_dir:
+        source_files = {
+            curr_media.filename: curr_file
+            for curr_media, curr_file in zip(input_media, input_files)
+        }
+        if normalize_dir is not None:
+            input_media = await asyncio.to_thread(
+                normalize_concat_inputs, input_media, normalize_dir,
+                max_workers=normalize_workers,
+            )
+            source_files.update(
+                (curr_media.filename, curr_file)
+                for curr_media, curr_file in zip(input_media, input_files)
+            )
+
+        # A stream has no existing file to clobber.
+        concat_plan = _plan_concat(
+            input_media, output_file, over_write or stream_fd is not None, split_incompatible,
+        )
+
+        run_heads = [run[0].filename for _, run in concat_plan]
+        run_metadata = dict(zip(run_heads, [metadata_output, *await asyncio.gather(
+            *(async_fetch_file_metadata(curr_file) for curr_file in run_heads[1:])
+        )]))
+
+        for run_output, run_media in concat_plan:
+            logger.info(f"Concatenating {len(run_media)} file(s) into '{run_output}'")
+            with tempfile.NamedTemporaryFile(delete_on_close=False, delete=True) as fp_filelist, \
+                 tempfile.NamedTemporaryFile(delete_on_close=False, delete=True) as fp_metadata:
+
+                _write_concat_lists(
+                    fp_filelist, fp_metadata, run_media, run_metadata[run_media[0].filename],
+                )
+
+                if stream_fd is not None:
+                    cmd = _concat_command(
+                        ffmpeg.asyncio.FFmpeg(), fp_filelist.name, fp_metadata.name, 'pipe:1',
+                        True, STREAM_FORMATS[stream_format],
                     )
+                    try:
+                        await _async_stream_ffmpeg(
+                            cmd.arguments, stream_fd, print_progress, timeout=timeout,
+                        )
+                    except ffmpeg.errors.FFmpegError as exception:
+                        _log_concat_error(exception, print_progress=False)
+                        raise
                     continue
 
-                stream_fields = fields_to_check[stream_codec_type]
-                for curr_field in stream_fields:
-                    if media_data['streams'][curr_stream].get(curr_field) != \
-                        curr_file_media_data['streams'][curr_stream].get(curr_field):
-                        raise RuntimeError(
-                            f"Field '{curr_field}' in stream {curr_stream} does " +
-                            f"not match in file {curr_file}: " +
-                            f"{media_data['streams'][curr_stream].get(curr_field)}" +
-                            " => " +
-                            f"{curr_file_media_data['streams'][curr_stream].get(curr_field)}"
-                        )
+                cmd = _concat_command(
+                    ffmpeg.asyncio.FFmpeg(), fp_filelist.name, fp_metadata.name, run_output,
+                    over_write,
+                )
 
-            # Insert main chapter data
-            file_chapter_end = round(
-                    file_chapter_start + float(
-                    curr_file_media_data['format']['duration']
-                ),
-                3,
+                try:
+                    await async_run_ffmpeg(cmd, on_progress=on_progress, timeout=timeout)
+                except ffmpeg.errors.FFmpegError as exception:
+                    _log_concat_error(exception, print_progress)
+                    raise
+
+                if print_progress:
+                    print(flush=True)
+
+            if delete_input:
+                _delete_concat_inputs(
+                    [source_files[curr_media.filename] for curr_media in run_media], run_output,
+                )
+
+    return [run_output for run_output, _ in concat_plan]
+
+
+def split_concat_runs(input_media: list[MediaInfo]) -> list[list[MediaInfo]]:
+    """Split files into maximal runs of consecutive files that can be
+    stream-copy concatenated together - each run's files all match its
+    first file (see `find_concat_mismatch`), and a file that doesn't starts
+    the next run.
+
+    Args:
+        input_media (list[MediaInfo]): Probed files, in concat order.
+
+    Returns:
+        list[list[MediaInfo]]: The runs, in order, covering every file.
+    """
+    runs = []
+    for curr_media in input_media:
+        mismatch = find_concat_mismatch(runs[-1][0], curr_media) if runs else None
+        if runs and mismatch is None:
+            runs[-1].append(curr_media)
+            continue
+
+        if runs:
+            logger.info(f"Starting a new concat run at '{curr_media.filename}': {mismatch}")
+        runs.append([curr_media])
+
+    return runs
+
+
+def concat_part_filename(output_file: str, part: int) -> str:
+    """Output filename for part `part` (from 1) of a split concat, e.g.
+    'Out.mp4' -> 'Out-part2.mp4'."""
+    output_path = pathlib.Path(output_file)
+    return str(output_path.with_name(f"{output_path.stem}-part{part}{output_path.suffix}"))
+
+
+def normalize_concat_inputs(input_media: list[MediaInfo], output_dir: str,
+                            max_workers: int | None = None) -> list[MediaInfo]:
+    """Re-encode the inputs that can't be stream-copy concatenated after
+    the first one so that they can, leaving the rest untouched.
+
+    Each mismatching file is re-encoded into `output_dir` with the first
+    file's codecs, resolution, pixel format, frame rate, sample rate and
+    channel layout, its video/audio streams mapped in the same order and
+    the first file's attached pictures copied in (other streams are
+    dropped). Re-encodes run concurrently, with the CPU cores split between
+    them through ffmpeg's `-threads`.
+
+    Args:
+        input_media (list[MediaInfo]): Probed inputs (the 'concat' profile
+            is enough), in concat order - the first is the reference.
+        output_dir (str): Existing directory to write the re-encoded files
+            to. Each keeps its source's file stem, so its chapter title is
+            unchanged.
+        max_workers (int | None, optional): Maximum concurrent re-encodes.
+            Defaults to None (one per CPU core, up to the number of files
+            to re-encode).
+
+    Raises:
+        RuntimeError: If the reference uses a codec with no entry in
+            `NORMALIZE_ENCODERS`, or a re-encoded file still doesn't match.
+        ffmpeg.errors.FFmpegError: If probing the reference or a re-encode
+            fails (e.g. an input lacks a stream the reference has).
+
+    Returns:
+        list[MediaInfo]: `input_media` with the mismatching entries replaced
+            by their re-encoded files.
+    """
+    reference = input_media[0]
+    mismatched = [
+        index for index, curr_media in enumerate(input_media)
+        if find_concat_mismatch(reference, curr_media) is not None
+    ]
+    if not mismatched:
+        return list(input_media)
+
+    # The 'concat' profile leaves out pixel format and frame rate.
+    target = fetch_media_info(reference.filename, profile='streams')
+    output_suffix = pathlib.Path(reference.filename).suffix
+    cpu_count = os.cpu_count() or 1
+    workers = max(1, min(max_workers or cpu_count, len(mismatched)))
+    threads = max(1, cpu_count // workers)
+
+    def normalize_one(index: int) -> MediaInfo:
+        source_file = input_media[index].filename
+        # A subdirectory per input keeps equal stems from colliding.
+        output_path = pathlib.Path(output_dir, str(index))
+        output_path.mkdir(exist_ok=True)
+        output_path = output_path / (pathlib.Path(source_file).stem + output_suffix)
+
+        logger.info(f"Re-encoding '{source_file}' to match '{reference.filename}'")
+        cmd = _normalize_command(source_file, str(output_path), target, threads)
+        logger.debug(cmd.arguments)
+        cmd.execute()
+
+        # Probed directly rather than through the cache - the file is
+        # about to be deleted again.
+        normalized = MediaInfo.from_probe(
+            str(output_path), get_backend().probe(str(output_path), 'concat'),
+        )
+        mismatch = find_concat_mismatch(reference, normalized)
+        if mismatch is not None:
+            raise RuntimeError(f"'{source_file}' still doesn't match after re-encoding: {mismatch}")
+        return normalized
+
+    normalized_media = list(input_media)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        for index, curr_media in zip(mismatched, executor.map(normalize_one, mismatched)):
+            normalized_media[index] = curr_media
+
+    return normalized_media
+
+
+def _normalize_command(source_file: str, output_file: str, target: MediaInfo,
+                       threads: int) -> ffmpeg.FFmpeg:
+    """ffmpeg command re-encoding `source_file` to `target`'s stream
+    layout and parameters - see `normalize_concat_inputs`.
+
+    Attached pictures (cover art) are copied from `target` itself into the
+    same positions: the concat demuxer pairs streams up by index, so
+    leaving them out would shift every later stream.
+    """
+    maps = []
+    output_options = {'threads': threads, 'map_chapters': -1}
+    type_counts = {'video': 0, 'audio': 0}
+
+    for stream in target.streams:
+        if stream.attached_pic:
+            out_index = len(maps)
+            maps.append(f"1:{stream.index}")
+            output_options[f'c:{out_index}'] = 'copy'
+            output_options[f'disposition:{out_index}'] = 'attached_pic'
+            continue
+        if stream.codec_type not in type_counts:
+            continue
+
+        encoder = NORMALIZE_ENCODERS.get(stream.codec_name)
+        if encoder is None:
+            raise RuntimeError(
+                f"Don't know how to encode {stream.codec_type} codec " +
+                f"'{stream.codec_name}' of '{target.filename}'"
             )
-            chapter_name = pathlib.Path(curr_file_media_data['format']['filename']).stem
-            metadata_output += f"""
+
+        out_index = len(maps)
+        # 'V' rather than 'v' skips the source's own attached pictures.
+        stream_type = 'V' if stream.codec_type == 'video' else 'a'
+        maps.append(f"0:{stream_type}:{type_counts[stream.codec_type]}")
+        type_counts[stream.codec_type] += 1
+        output_options[f'c:{out_index}'] = encoder
+
+        if stream.codec_type == 'video':
+            filters = [f'scale={stream.width}:{stream.height}', 'setsar=1']
+            if stream.pix_fmt:
+                filters.append(f'format={stream.pix_fmt}')
+            if stream.frame_rate:
+                frame_rate = fractions.Fraction(stream.frame_rate).limit_denominator(1001)
+                filters.append(f'fps={frame_rate}')
+        else:
+            audio_formats = []
+            if stream.sample_rate:
+                audio_formats.append(f'sample_rates={stream.sample_rate}')
+            if stream.channel_layout:
+                audio_formats.append(f'channel_layouts={stream.channel_layout}')
+            filters = ['aformat=' + ':'.join(audio_formats)] if audio_formats else []
+        if filters:
+            output_options[f'filter:{out_index}'] = ','.join(filters)
+
+    cmd = ffmpeg.FFmpeg().option('y').option('v', 'error').input(source_file)
+    if target.attached_pics:
+        cmd = cmd.input(target.filename)
+    return cmd.output(output_file, output_options, map=maps)
+
+
+@contextlib.contextmanager
+def _normalize_dir(output_file: str | None, enabled: bool):
+    """Temporary directory for `normalize_concat_inputs`' re-encodes, next
+    to `output_file` (where there's room for the output, there's room for
+    a few re-encoded inputs) or in the system temp directory if None, or
+    None if not `enabled`."""
+    if not enabled:
+        yield None
+        return
+
+    output_dir = None
+    if output_file is not None:
+        output_dir = os.path.dirname(os.path.abspath(output_file))
+    with tempfile.TemporaryDirectory(prefix='.vuconcat-', dir=output_dir) as normalize_dir:
+        yield normalize_dir
+
+
+def _plan_concat(input_media: list[MediaInfo], output_file: str, over_write: bool,
+                 split_incompatible: bool) -> list[tuple[str, list[MediaInfo]]]:
+    """Validate the probed inputs and decide what gets concatenated into
+    which output file, before any output is written.
+
+    Raises:
+        RuntimeError: If an input's duration is unknown, the inputs don't
+            match (without `split_incompatible`), or an output exists
+            (without `over_write`).
+
+    Returns:
+        list[tuple[str, list[MediaInfo]]]: `(output file, its inputs)` pairs.
+    """
+    for curr_media in input_media:
+        if curr_media.duration is None:
+            raise RuntimeError(f"Could not determine duration of '{curr_media.filename}'")
+
+    logger.debug(f"Media data:\n{pprint.pformat(input_media[0].streams)}")
+
+    if split_incompatible:
+        runs = split_concat_runs(input_media)
+    else:
+        # Check every file against the first file to ensure parameters match
+        for curr_media in input_media[1:]:
+            mismatch = find_concat_mismatch(input_media[0], curr_media)
+            if mismatch is not None:
+                raise RuntimeError(mismatch)
+        runs = [input_media]
+
+    if len(runs) == 1:
+        concat_plan = [(output_file, runs[0])]
+    else:
+        concat_plan = [
+            (concat_part_filename(output_file, part), run)
+            for part, run in enumerate(runs, start=1)
+        ]
+
+    if not over_write:
+        for run_output, _ in concat_plan:
+            if os.path.exists(run_output):
+                raise RuntimeError(f"Output file '{run_output}' exists")
+
+    return concat_plan
+
+
+def _escape_ffmetadata(value: str) -> str:
+    """Escape a value for an ffmetadata file."""
+    for special in ('\\', '=', ';', '#', '\n'):
+        value = value.replace(special, '\\' + special)
+    return value
+
+
+def _write_concat_lists(fp_filelist, fp_metadata, run_media: list[MediaInfo],
+                        metadata_output: bytes) -> None:
+    """Write (and close) the concat demuxer's file list for `run_media`
+    and the chapter metadata - `metadata_output` plus a chapter per input -
+    each built in a single pass.
+    """
+    filelist_lines = []
+    chapter_blocks = [metadata_output]
+
+    file_chapter_start = 0
+    for curr_media in run_media:
+        # Absolute paths don't depend on where the list file lives; a quote
+        # inside the concat demuxer's single-quoted string is written as
+        # '\'' (close, escaped quote, reopen).
+        quoted_fname = os.path.abspath(curr_media.filename).replace("'", "'\\''")
+        filelist_lines.append(f"file '{quoted_fname}'\n")
+
+        # Insert main chapter data
+        file_chapter_end = round(file_chapter_start + curr_media.duration, 3)
+        chapter_name = _escape_ffmetadata(pathlib.Path(curr_media.filename).stem)
+        chapter_blocks.append(f"""
 [CHAPTER]
 TIMEBASE=1/1000
 START={int(file_chapter_start * 1000)}
 END={int(file_chapter_end * 1000)}
 title={chapter_name}
-""".encode()
-            # Copy the chapters from the file if present.
-            # offset by the file_chapter_start
-
-            # No gap: the concat demuxer joins files back-to-back, so the next
-            # chapter starts exactly where this one ends. (Previously added a
-            # full extra second here per file, which drifted the chapter
-            # markers further out of sync with the actual content on every
-            # additional file concatenated.)
-            file_chapter_start = file_chapter_end
-
-        # Close the concat file
-        fp_filelist.close()
-
-        # Write the metadata file
-        fp_metadata.write(metadata_output)
-        fp_metadata.close()
-
-        # Main concat call
-        cmd = ffmpeg.FFmpeg()
-
-        if over_write is True:
-            cmd = cmd.option('y')
-
-        cmd = cmd.option(
-                'v', 'error'
-            ).option(
-                'stats'
-            ).option(
-                'f','concat'
-            ).option(
-                'safe',0
-            ).input(
-                fp_filelist.name
-            ).input(
-                fp_metadata.name
-            ).output(
-                output_file,
-                codec='copy',
-                map_metadata='1',
-            )
+""".encode())
+        # Copy the chapters from the file if present.
+        # offset by the file_chapter_start
 
-        @cmd.on("progress")
-        def on_progress(progress: ffmpeg.Progress):
-            if print_progress:
-                print(progress, end="\r", flush=True)
+        # No gap: the concat demuxer joins files back-to-back, so the next
+        # chapter starts exactly where this one ends. (Previously added a
+        # full extra second here per file, which drifted the chapter
+        # markers further out of sync with the actual content on every
+        # additional file concatenated.)
+        file_chapter_start = file_chapter_end
 
-        logger.debug(cmd.arguments)
+    fp_filelist.write(''.join(filelist_lines).encode('utf-8'))
+    fp_filelist.close()
+
+    fp_metadata.write(b''.join(chapter_blocks))
+    fp_metadata.close()
+
+
+def _concat_command(cmd, filelist_name: str, metadata_name: str, output_file: str,
+                    over_write: bool, output_options: dict | None = None):
+    """Add the concat demuxer options to `cmd` (an `ffmpeg.FFmpeg` or
+    `ffmpeg.asyncio.FFmpeg`), plus any extra `output_options`, and return
+    it."""
+    if over_write is True:
+        cmd = cmd.option('y')
+
+    return cmd.option(
+            'v', 'error'
+        ).option(
+            'stats'
+        ).option(
+            'f','concat'
+        ).option(
+            'safe',0
+        ).input(
+            filelist_name
+        ).input(
+            metadata_name
+        ).output(
+            output_file,
+            output_options,
+            codec='copy',
+            map_metadata='1',
+        )
+
+
+def _log_concat_error(exception: ffmpeg.errors.FFmpegError, print_progress: bool) -> None:
+    if print_progress:
+        # The progress line ends with '\r', not '\n' - print a bare newline
+        # first so the error below doesn't overwrite its front and leave its
+        # tail visible.
+        print(flush=True)
+    logger.error(f"A FFMpeg error has occured: {exception.__class__.__name__}")
+    logger.error(f"- Message from ffmpeg: {exception.message}")
+    logger.error(f"- Arguments to execute ffmpeg: {exception.arguments}")
+
+
+def _delete_concat_inputs(input_files: list[str], output_file: str) -> None:
+    # Only delete the inputs once we know the concat actually produced a
+    # real output file - never delete source footage on the strength of a
+    # failed/empty run.
+    if os.path.exists(output_file) and os.path.getsize(output_file) > 0:
+        for curr_file in input_files:
+            logger.info(f"Deleting input file: {curr_file}")
+            os.remove(curr_file)
+    else:
+        logger.error(
+            f"Output file '{output_file}' is missing or empty, " +
+            "not deleting input files"
+        )
+
+
+def _check_stream_output(output_file: str | int, stream_format: str,
+                         split_incompatible: bool, delete_input: bool) -> int | None:
+    """File descriptor to stream the concat output to, or None if
+    `output_file` is a regular path.
 
+    Raises:
+        ValueError: If streaming with options that need a regular output
+            file, or an unknown `stream_format`.
+    """
+    if isinstance(output_file, int):
+        stream_fd = output_file
+    elif output_file == '-':
+        stream_fd = sys.stdout.fileno()
+    else:
+        return None
+
+    if stream_format not in STREAM_FORMATS:
+        raise ValueError(f"Unknown stream format '{stream_format}'")
+    if split_incompatible:
+        raise ValueError("Can't split the inputs into parts when streaming the output")
+    if delete_input:
+        # There's no output file to check before deleting the sources.
+        raise ValueError("Won't delete the inputs when streaming the output")
+
+    return stream_fd
+
+
+class _StreamingStderr:
+    """Splits the stderr of an ffmpeg writing its output to stdout into the
+    `-stats` progress lines, echoed to our stderr if printing progress, and
+    everything else, kept for the error message."""
+
+    def __init__(self, print_progress: bool):
+        self.print_progress = print_progress
+        self.messages = []
+        self._partial = b''
+
+    def feed(self, data: bytes) -> None:
+        # Progress lines end in '\r', messages in '\n'.
+        lines = re.split(rb'[\r\n]', self._partial + data)
+        self._partial = lines.pop()
+        for line in lines:
+            self._handle_line(line)
+
+    def close(self) -> str:
+        """Flush the last line and return the collected messages."""
+        self._handle_line(self._partial)
+        self._partial = b''
+        if self.print_progress:
+            print(file=sys.stderr, flush=True)
+        return '\n'.join(self.messages)
+
+    def _handle_line(self, line: bytes) -> None:
+        text = line.decode('utf-8', errors='replace').strip()
+        if not text:
+            return
+        if text.startswith(('frame=', 'size=')):
+            if self.print_progress:
+                print(text, end='\r', file=sys.stderr, flush=True)
+        else:
+            self.messages.append(text)
+
+
+def _stream_ffmpeg(arguments: list[str], output_fd: int, print_progress: bool) -> None:
+    """Run ffmpeg with its stdout connected straight to `output_fd`, rather
+    than buffered in memory as `ffmpeg.FFmpeg.execute()` does.
+
+    Raises:
+        ffmpeg.errors.FFmpegError: If ffmpeg exits with an error.
+    """
+    # Anything already buffered for our stdout has to go out first.
+    sys.stdout.flush()
+    stderr = _StreamingStderr(print_progress)
+    with subprocess.Popen(arguments, stdin=subprocess.DEVNULL, stdout=output_fd,
+                          stderr=subprocess.PIPE) as process:
+        for chunk in iter(lambda: process.stderr.read1(65536), b''):
+            stderr.feed(chunk)
+    message = stderr.close()
+
+    if process.returncode != 0:
+        raise ffmpeg.errors.FFmpegError.create(message=message, arguments=arguments)
+
+
+async def _async_stream_ffmpeg(arguments: list[str], output_fd: int, print_progress: bool,
+                               timeout: float | None = None) -> None:
+    """Coroutine version of `_stream_ffmpeg`, under the asyncio engine's
+    process limit and with its cancellation/timeout behaviour.
+
+    Raises:
+        ffmpeg.errors.FFmpegError: If ffmpeg exits with an error.
+        TimeoutError: If `timeout` expires first.
+    """
+    async def read_stderr(stream: asyncio.StreamReader, stderr: _StreamingStderr) -> None:
+        while chunk := await stream.read(65536):
+            stderr.feed(chunk)
+
+    sys.stdout.flush()
+    stderr = _StreamingStderr(print_progress)
+    async with _get_async_semaphore():
+        logger.debug(f"Running: {arguments}")
+        process = await asyncio.create_subprocess_exec(
+            *arguments, stdin=subprocess.DEVNULL, stdout=output_fd, stderr=subprocess.PIPE,
+        )
         try:
-            cmd.execute()
-        except ffmpeg.errors.FFmpegError as exception:
-            if print_progress:
-                # The progress line above ends with '\r', not '\n' - print a
-                # bare newline first so the error below doesn't overwrite its
-                # front and leave its tail visible.
-                print(flush=True)
-            logger.error(f"A FFMpeg error has occured: {exception.__class__.__name__}")
-            logger.error(f"- Message from ffmpeg: {exception.message}")
-            logger.error(f"- Arguments to execute ffmpeg: {exception.arguments}")
+            await asyncio.wait_for(read_stderr(process.stderr, stderr), timeout=timeout)
+            await process.wait()
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            # Timed out or cancelled - don't leave ffmpeg running.
+            if process.returncode is None:
+                process.terminate()
+                await process.wait()
             raise
+        finally:
+            message = stderr.close()
 
-        if print_progress:
-            print(flush=True)
-
-        if delete_input:
-            # Only delete the inputs once we know the concat actually produced
-            # a real output file - never delete source footage on the strength
-            # of a failed/empty run.
-            if os.path.exists(output_file) and os.path.getsize(output_file) > 0:
-                for curr_file in input_files:
-                    logger.info(f"Deleting input file: {curr_file}")
-                    os.remove(curr_file)
-            else:
-                logger.error(
-                    f"Output file '{output_file}' is missing or empty, " +
-                    "not deleting input files"
-                )
-
-    return # Done
+    if process.returncode != 0:
+        raise ffmpeg.errors.FFmpegError.create(message=message, arguments=arguments)
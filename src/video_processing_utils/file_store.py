@@ -0,0 +1,153 @@
+'''Common base of the per-file SQLite caches (`probe_cache`, `hash_store`).
+
+Both keep one row per (absolute path, kind) and only reuse it while the
+file's size, mtime and inode (`utils.file_identity`) still match those
+recorded with it. `FileStore` holds that part - the connection, WAL mode,
+discarding a database of another schema version, identity-checked lookups
+and inserts, hit/miss counters and the lock that makes a store safe to
+share between threads - and each subclass only declares its table and the
+value columns it keeps.
+'''
+
+# System imports
+import os
+import sqlite3
+import threading
+
+# Local imports
+from . import utils
+
+
+class FileStore:
+    """SQLite table of values keyed by file identity and kind.
+
+    Subclasses set `TABLE`, `SCHEMA_VERSION` (bump it whenever the layout
+    or the meaning of a stored value changes; an existing database with a
+    different version is discarded and rebuilt), `COLUMNS` (the value
+    columns, with their SQL types) and optionally `INDEXES` (extra CREATE
+    INDEX statements).
+
+    Safe to share between threads; several processes may also use the same
+    database concurrently (SQLite handles the locking).
+    """
+    TABLE: str
+    SCHEMA_VERSION: int
+    COLUMNS: dict[str, str]
+    INDEXES: tuple[str, ...] = ()
+
+    def __init__(self, store_dir: str, filename: str):
+        """Open (creating if needed) the database `filename` in `store_dir`.
+
+        Args:
+            store_dir (str): Directory to keep the database in. Created if
+                it doesn't exist.
+            filename (str): Database file name.
+
+        Raises:
+            OSError: If `store_dir` can't be created.
+            sqlite3.Error: If the database can't be opened.
+        """
+        os.makedirs(store_dir, exist_ok=True)
+        self.path = os.path.join(store_dir, filename)
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._create_schema()
+
+    def _create_schema(self) -> None:
+        columns = ''.join(f'{name} {sql_type}, ' for name, sql_type in self.COLUMNS.items())
+        with self._conn:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            version = self._conn.execute('PRAGMA user_version').fetchone()[0]
+            if version != self.SCHEMA_VERSION:
+                self._conn.execute(f'DROP TABLE IF EXISTS {self.TABLE}')
+                self._conn.execute(f'PRAGMA user_version={self.SCHEMA_VERSION}')
+            self._conn.execute(
+                f'CREATE TABLE IF NOT EXISTS {self.TABLE} (' +
+                'path TEXT NOT NULL, kind TEXT NOT NULL, ' +
+                'size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, ' +
+                f'inode INTEGER NOT NULL, {columns}PRIMARY KEY (path, kind))'
+            )
+            for statement in self.INDEXES:
+                self._conn.execute(statement)
+
+    def _lookup(self, filename: str, kind: str) -> tuple[str, tuple] | None:
+        """Fetch the `COLUMNS` of the `kind` entry for `filename`, counting
+        a hit if there is one and the file hasn't changed since it was
+        stored, else a miss.
+
+        Returns:
+            tuple[str, tuple] | None: `(absolute path, column values)`, or
+                None on a miss.
+        """
+        path = os.path.abspath(filename)
+        try:
+            identity = utils.file_identity(path)
+        except OSError:
+            # Let the real work report the missing/unreadable file.
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            row = self._conn.execute(
+                f'SELECT size, mtime_ns, inode, {", ".join(self.COLUMNS)} FROM {self.TABLE} ' +
+                'WHERE path = ? AND kind = ?',
+                (path, kind),
+            ).fetchone()
+            if row is None or tuple(row[:3]) != identity:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+        return path, row[3:]
+
+    def _store(self, filename: str, kind: str, values: tuple) -> bool:
+        """Store `values` (one per `COLUMNS`) as the `kind` entry for
+        `filename`, with its current identity, replacing any earlier one.
+
+        Returns:
+            bool: False if the file couldn't be stat'ed, so nothing was
+                stored.
+        """
+        path = os.path.abspath(filename)
+        try:
+            identity = utils.file_identity(path)
+        except OSError:
+            return False
+
+        placeholders = ', '.join('?' * (5 + len(self.COLUMNS)))
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    f'INSERT OR REPLACE INTO {self.TABLE} ' +
+                    f'(path, kind, size, mtime_ns, inode, {", ".join(self.COLUMNS)}) ' +
+                    f'VALUES ({placeholders})',
+                    (path, kind, *identity, *values),
+                )
+        return True
+
+    def invalidate(self, filename: str) -> None:
+        """Drop every entry for `filename`.
+
+        Args:
+            filename (str): File whose entries to drop.
+        """
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    f'DELETE FROM {self.TABLE} WHERE path = ?', (os.path.abspath(filename),)
+                )
+
+    def clear(self) -> None:
+        """Drop every entry."""
+        with self._lock:
+            with self._conn:
+                self._conn.execute(f'DELETE FROM {self.TABLE}')
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
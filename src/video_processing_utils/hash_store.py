@@ -0,0 +1,134 @@
+'''Persistent frame-hash sequence store for vudupcheck.
+
+Hashing a file (`dup_finder.compute_frame_hash_sequence`) means decoding the
+whole video, so it dwarfs every other step of a duplicate scan - and without
+this every run re-decoded the entire library, even just to retry with a
+different `--sequence-threshold` or after adding a single file. This keeps
+each file's hash sequence in a small SQLite database, keyed by the file's
+absolute path and the kind of hashing (sample interval, hash geometry,
+...), and only reuses an entry while the file's size, mtime and inode still
+match those recorded with it, like `probe_cache`.
+
+Sequences are stored as raw little-endian uint64 arrays, 8 bytes per
+sampled frame. Entries for files that a scan no longer finds are dropped by
+`evict_missing` - only within the scanned directory, so entries for other
+libraries (or an unmounted share) survive.
+'''
+
+# System imports
+import logging
+import os
+
+# External imports
+import numpy
+
+# Local imports
+from .file_store import FileStore
+
+logger = logging.getLogger(__name__)
+
+STORE_FILENAME = 'hash_store.sqlite3'
+
+# Bump whenever the table layout or the meaning of a stored sequence
+# changes; an existing database with a different version is discarded and
+# rebuilt.
+SCHEMA_VERSION = 1
+
+# On-disk element type of a stored sequence.
+SEQUENCE_DTYPE = numpy.dtype('<u8')
+
+
+class HashStore(FileStore):
+    """SQLite-backed store of frame-hash sequences, keyed by file identity.
+
+    Safe to share between threads; several processes may also use the same
+    database concurrently (SQLite handles the locking).
+    """
+    TABLE = 'sequence'
+    SCHEMA_VERSION = SCHEMA_VERSION
+    COLUMNS = {'hashes': 'BLOB NOT NULL'}
+
+    def __init__(self, store_dir: str):
+        """Open (creating if needed) the store database in `store_dir`.
+
+        Args:
+            store_dir (str): Directory to keep the database in. Created if
+                it doesn't exist.
+
+        Raises:
+            OSError: If `store_dir` can't be created.
+            sqlite3.Error: If the database can't be opened.
+        """
+        super().__init__(store_dir, STORE_FILENAME)
+
+    def get(self, filename: str, kind: str) -> numpy.ndarray | None:
+        """Fetch the stored `kind` hash sequence for `filename`, if there is
+        one and the file hasn't changed since it was stored.
+
+        Args:
+            filename (str): Hashed file.
+            kind (str): How the sequence was computed (sample interval,
+                hash geometry, ...), as chosen by the caller.
+
+        Returns:
+            numpy.ndarray | None: The uint64 sequence, or None on a miss.
+        """
+        entry = self._lookup(filename, kind)
+        if entry is None:
+            return None
+
+        _, (hashes,) = entry
+        return numpy.frombuffer(hashes, dtype=SEQUENCE_DTYPE).astype(numpy.uint64)
+
+    def put(self, filename: str, kind: str, sequence: numpy.ndarray) -> None:
+        """Store the `kind` hash sequence for `filename`, replacing any
+        earlier entry.
+
+        Args:
+            filename (str): Hashed file.
+            kind (str): How the sequence was computed.
+            sequence (numpy.ndarray): The uint64 hash sequence.
+        """
+        self._store(filename, kind, (numpy.asarray(sequence, dtype=SEQUENCE_DTYPE).tobytes(),))
+
+    def evict_missing(self, base_path: str, found_files: list[str],
+                      recursive: bool = True) -> int:
+        """Drop the entries of files under `base_path` that a scan of it
+        (`found_files`) no longer found. Nothing is stat'ed: entries
+        outside the scanned directory - other libraries, other shares -
+        are left alone whether or not their files are reachable right now.
+
+        Args:
+            base_path (str): Directory that was scanned.
+            found_files (list[str]): Every file the scan found (before any
+                shard selection). If empty, nothing is evicted - an empty
+                scan looks the same as an unmounted share.
+            recursive (bool, optional): Whether the scan descended into
+                subdirectories; if not, entries in them are kept. Defaults
+                to True.
+
+        Returns:
+            int: Number of files whose entries were dropped.
+        """
+        if not found_files:
+            return 0
+
+        root = os.path.join(os.path.abspath(base_path), '')
+        found = {os.path.abspath(path) for path in found_files}
+        with self._lock:
+            # Prefix range on the primary key: only the scanned subtree.
+            paths = [
+                row[0] for row in self._conn.execute(
+                    'SELECT DISTINCT path FROM sequence WHERE path >= ? AND path < ?',
+                    (root, root[:-1] + chr(ord(os.sep) + 1)),
+                )
+            ]
+            missing = [
+                (path,) for path in paths
+                if path not in found and (recursive or os.path.dirname(path) + os.sep == root)
+            ]
+            if missing:
+                logger.debug(f"Hash store: evicting {len(missing)} file(s) gone from '{root}'")
+                with self._conn:
+                    self._conn.executemany('DELETE FROM sequence WHERE path = ?', missing)
+        return len(missing)
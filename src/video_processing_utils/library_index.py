@@ -0,0 +1,261 @@
+'''Persistent duplicate index of a media library for vudupcheck.
+
+Holds each library file's technical info and frame-hash sequence in one
+SQLite file, so new files can be checked against the library (`vudupcheck
+--against INDEX`) without rescanning, re-probing or re-hashing any of it,
+and the index itself kept current incrementally (`vudupcheck --update
+INDEX`) - only files that are new or changed since they were indexed get
+hashed, and deleted ones are dropped.
+
+Unlike `hash_store`, which is a transparent cache, the index is a named
+file the user manages, and every sequence in it must have been computed
+the same way (sample interval, sampling mode, hash geometry, backend) to be
+comparable - recorded as its `kind`, which opening it checks.
+
+Files are stored by their '/'-separated path relative to the library root
+the index was last updated from (also recorded), so an index or shard
+stays valid wherever the library is mounted: updating it from another
+mount point only moves the root, and shards hashed on machines mounting
+the library at different places agree on every file's path.
+'''
+
+# System imports
+import dataclasses
+import logging
+import os
+import pathlib
+import sqlite3
+import typing
+
+# External imports
+import numpy
+
+# Local imports
+from . import utils
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the table layout or the meaning of a stored value changes.
+# Unlike the caches, an index with a different version is an error rather
+# than silently rebuilt - rebuilding it means rehashing the whole library.
+# Version 2 stores paths relative to the recorded library root.
+SCHEMA_VERSION = 2
+
+# On-disk element type of a stored sequence.
+SEQUENCE_DTYPE = numpy.dtype('<u8')
+
+
+@dataclasses.dataclass
+class LibraryEntry:
+    '''One indexed file, without its hash sequence. `path` is relative to
+    the index's root (see `relative_path`).'''
+    path: str
+    size_bytes: int
+    mtime_ns: int
+    inode: int
+    duration: float
+    width: int
+    height: int
+
+    @property
+    def identity(self) -> tuple[int, int, int]:
+        """`utils.file_identity` of the file when it was indexed."""
+        return (self.size_bytes, self.mtime_ns, self.inode)
+
+
+class LibraryIndex:
+    """SQLite-backed index of library files' info and hash sequences,
+    keyed by path relative to the library root (`root`).
+    """
+
+    def __init__(self, path: str, kind: str):
+        """Open the index at `path`, creating it if it doesn't exist.
+
+        Args:
+            path (str): Index file.
+            kind (str): How the sequences in it are (to be) computed, e.g.
+                `dup_finder.hash_store_kind()`.
+
+        Raises:
+            ValueError: If the existing index holds sequences of another
+                kind, or was written by an incompatible version.
+            sqlite3.Error: If the database can't be opened.
+        """
+        self.path = path
+        self.kind = kind
+
+        self._conn = sqlite3.connect(path, timeout=30)
+        try:
+            self._open_schema()
+        except (ValueError, sqlite3.Error):
+            self._conn.close()
+            raise
+
+    def _open_schema(self) -> None:
+        with self._conn:
+            version = self._conn.execute('PRAGMA user_version').fetchone()[0]
+            if version == 0:
+                self._conn.execute(f'PRAGMA user_version={SCHEMA_VERSION}')
+                self._conn.execute(
+                    'CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)'
+                )
+                self._conn.execute(
+                    'CREATE TABLE file (' +
+                    'path TEXT PRIMARY KEY, size INTEGER NOT NULL, ' +
+                    'mtime_ns INTEGER NOT NULL, inode INTEGER NOT NULL, ' +
+                    'duration REAL NOT NULL, width INTEGER NOT NULL, ' +
+                    'height INTEGER NOT NULL, hashes BLOB NOT NULL)'
+                )
+                self._conn.execute(
+                    'INSERT INTO meta (key, value) VALUES (?, ?)', ('kind', self.kind),
+                )
+                return
+            if version != SCHEMA_VERSION:
+                raise ValueError(
+                    f"Index '{self.path}' has format version {version}, " +
+                    f"expected {SCHEMA_VERSION} - delete it and rebuild it with --update"
+                )
+
+        meta = dict(self._conn.execute('SELECT key, value FROM meta'))
+        if meta['kind'] != self.kind:
+            raise ValueError(
+                f"Index '{self.path}' holds '{meta['kind']}' sequences, not " +
+                f"'{self.kind}' - use the --sequence-interval/--sampling/" +
+                "--backend it was built with, or a new index"
+            )
+
+    def __len__(self) -> int:
+        return self._conn.execute('SELECT COUNT(*) FROM file').fetchone()[0]
+
+    @property
+    def root(self) -> str | None:
+        """Absolute path of the library root the index was last updated
+        from, on the machine that did it - None for a new index."""
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'root'").fetchone()
+        return None if row is None else row[0]
+
+    def set_root(self, root: str) -> None:
+        """Record the library root the indexed paths are relative to.
+
+        Args:
+            root (str): The library root.
+        """
+        with self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)',
+                ('root', os.path.abspath(root)),
+            )
+
+    def entries(self) -> dict[str, LibraryEntry]:
+        """Every indexed file, by path relative to `root`.
+
+        Returns:
+            dict[str, LibraryEntry]: The indexed files.
+        """
+        return {
+            row[0]: LibraryEntry(*row)
+            for row in self._conn.execute(
+                'SELECT path, size, mtime_ns, inode, duration, width, height FROM file'
+            )
+        }
+
+    def sequence(self, path: str) -> numpy.ndarray | None:
+        """The stored hash sequence of `path`.
+
+        Args:
+            path (str): Indexed file's path relative to `root`.
+
+        Returns:
+            numpy.ndarray | None: The uint64 sequence, or None if `path`
+                isn't indexed.
+        """
+        row = self._conn.execute(
+            'SELECT hashes FROM file WHERE path = ?', (path,),
+        ).fetchone()
+        if row is None:
+            return None
+        return numpy.frombuffer(row[0], dtype=SEQUENCE_DTYPE).astype(numpy.uint64)
+
+    def iter_sequences(self) -> typing.Iterator[tuple[str, numpy.ndarray]]:
+        """Yield `(path relative to root, sequence)` for every indexed
+        file."""
+        for path, hashes in self._conn.execute('SELECT path, hashes FROM file'):
+            yield path, numpy.frombuffer(hashes, dtype=SEQUENCE_DTYPE).astype(numpy.uint64)
+
+    def put(self, entry: LibraryEntry, sequence: numpy.ndarray) -> None:
+        """Add or replace one file.
+
+        Args:
+            entry (LibraryEntry): The file's info, `path` relative to
+                `root`.
+            sequence (numpy.ndarray): Its uint64 hash sequence.
+        """
+        with self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO file ' +
+                '(path, size, mtime_ns, inode, duration, width, height, hashes) ' +
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (
+                    entry.path, entry.size_bytes, entry.mtime_ns, entry.inode,
+                    entry.duration, entry.width, entry.height,
+                    numpy.asarray(sequence, dtype=SEQUENCE_DTYPE).tobytes(),
+                ),
+            )
+
+    def remove(self, paths: typing.Iterable[str]) -> None:
+        """Drop files from the index.
+
+        Args:
+            paths (typing.Iterable[str]): Indexed files' paths relative
+                to `root`.
+        """
+        with self._conn:
+            self._conn.executemany(
+                'DELETE FROM file WHERE path = ?', [(path,) for path in paths],
+            )
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        self._conn.close()
+
+
+def relative_path(path: str, root: str) -> str:
+    """The '/'-separated path of `path` relative to `root`, as indexed.
+
+    Args:
+        path (str): File under `root`.
+        root (str): Library root.
+
+    Returns:
+        str: E.g. 'Season 1/Episode 1.mkv'.
+    """
+    return pathlib.PurePath(os.path.relpath(path, root)).as_posix()
+
+
+def absolute_path(path: str, root: str) -> str:
+    """Where the indexed `path` (see `relative_path`) is under `root`.
+
+    Args:
+        path (str): Indexed path.
+        root (str): Library root, as mounted here.
+
+    Returns:
+        str: The file's path under `root`.
+    """
+    return os.path.join(root, *path.split('/'))
+
+
+def is_current(entry: LibraryEntry, root: str) -> bool:
+    """Whether the file behind `entry` still exists unchanged.
+
+    Args:
+        entry (LibraryEntry): Indexed file.
+        root (str): Library root its path is relative to.
+
+    Returns:
+        bool: True if its identity still matches the indexed one.
+    """
+    try:
+        return utils.file_identity(absolute_path(entry.path, root)) == entry.identity
+    except OSError:
+        return False
@@ -0,0 +1,170 @@
+'''Compact typed view of ffprobe output.
+
+`ffmpeg_utils.fetch_file_data` returns ffprobe's JSON as nested dicts of
+strings, which every consumer then re-filters (real video stream vs attached
+cover art, audio streams, ...) and re-parses ('2997/100' frame rates,
+'00:42:17.123000000' duration tags). At library scale those dicts also cost
+kilobytes per file to hold: some 20 KB for a typical Matroska file, against
+about 2.5 KB as a `MediaInfo` (benchmarks/bench_media_info.py).
+
+`MediaInfo.from_probe` does that work once: it keeps only the fields this
+package uses, already converted to numbers, in slotted dataclasses, with
+the commonly needed stream subsets precomputed.
+'''
+
+# System imports
+import dataclasses
+
+
+def parse_frame_rate(value: str | None) -> float | None:
+    """Convert an ffprobe rational frame rate to frames per second.
+
+    Args:
+        value (str | None): e.g. '2997/100', '982057/32768' or '25'.
+
+    Returns:
+        float | None: Frames per second, or None if `value` is missing,
+            malformed, or ffprobe's '0/0' "unknown" placeholder.
+    """
+    if not value:
+        return None
+
+    numerator, _, denominator = value.partition('/')
+    try:
+        frame_rate = float(numerator) / float(denominator or 1)
+    except (ValueError, ZeroDivisionError):
+        return None
+
+    return frame_rate or None
+
+
+def parse_duration(value: str | None) -> float | None:
+    """Convert an ffprobe duration to seconds.
+
+    Args:
+        value (str | None): Either plain seconds ('2537.123000') or a
+            Matroska-style 'HH:MM:SS.fffffffff' DURATION tag.
+
+    Returns:
+        float | None: Duration in seconds, or None if missing/malformed.
+    """
+    if not value:
+        return None
+
+    seconds = 0.0
+    try:
+        for part in value.strip().split(':'):
+            seconds = seconds * 60 + float(part)
+    except ValueError:
+        return None
+
+    return seconds
+
+
+def _parse_int(value) -> int | None:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclasses.dataclass(slots=True, frozen=True)
+class StreamInfo:
+    '''One stream of a probed file.'''
+    index: int
+    codec_type: str
+    codec_name: str | None = None
+    attached_pic: bool = False
+    width: int | None = None
+    height: int | None = None
+    pix_fmt: str | None = None
+    sample_rate: int | None = None
+    channel_layout: str | None = None
+    frame_rate: float | None = None    # avg_frame_rate, else r_frame_rate
+    duration: float | None = None      # stream duration, else its DURATION tag
+    start_time: float | None = None
+    nb_frames: int | None = None
+
+    @classmethod
+    def from_probe(cls, stream: dict) -> 'StreamInfo':
+        """Build from one entry of ffprobe's 'streams' list.
+
+        Args:
+            stream (dict): ffprobe stream entry.
+
+        Returns:
+            StreamInfo: The parsed stream.
+        """
+        duration = parse_duration(stream.get('duration'))
+        if duration is None:
+            # Matroska keeps per-stream durations in a tag, which can be
+            # either DURATION or DURATION-<lang>.
+            for key, value in stream.get('tags', {}).items():
+                if key[:8] == 'DURATION':
+                    duration = parse_duration(value)
+                    break
+
+        return cls(
+            index=stream.get('index', 0),
+            codec_type=stream.get('codec_type', ''),
+            codec_name=stream.get('codec_name'),
+            attached_pic=bool(stream.get('disposition', {}).get('attached_pic', 0)),
+            width=_parse_int(stream.get('width')),
+            height=_parse_int(stream.get('height')),
+            pix_fmt=stream.get('pix_fmt'),
+            sample_rate=_parse_int(stream.get('sample_rate')),
+            channel_layout=stream.get('channel_layout'),
+            frame_rate=parse_frame_rate(stream.get('avg_frame_rate')) or \
+                parse_frame_rate(stream.get('r_frame_rate')),
+            duration=duration,
+            start_time=parse_duration(stream.get('start_time')),
+            nb_frames=_parse_int(stream.get('nb_frames')),
+        )
+
+
+@dataclasses.dataclass(slots=True, frozen=True)
+class MediaInfo:
+    '''A probed file: container-level info plus its streams.'''
+    filename: str
+    duration: float | None
+    streams: tuple[StreamInfo, ...]
+    # Precomputed views of `streams`, in stream order:
+    video_streams: tuple[StreamInfo, ...]   # real video, excluding attached pictures
+    attached_pics: tuple[StreamInfo, ...]   # embedded cover art
+    audio_streams: tuple[StreamInfo, ...]
+
+    @property
+    def primary_video(self) -> StreamInfo | None:
+        """The first real (non-attached-picture) video stream, if any."""
+        return self.video_streams[0] if self.video_streams else None
+
+    @classmethod
+    def from_probe(cls, filename: str, data: dict) -> 'MediaInfo':
+        """Build from `ffmpeg_utils.fetch_file_data` output (any profile).
+
+        Args:
+            filename (str): The probed file.
+            data (dict): Parsed ffprobe JSON output.
+
+        Returns:
+            MediaInfo: The parsed file.
+        """
+        streams = tuple(
+            StreamInfo.from_probe(stream) for stream in data.get('streams', [])
+        )
+        return cls(
+            filename=filename,
+            duration=parse_duration(data.get('format', {}).get('duration')),
+            streams=streams,
+            video_streams=tuple(
+                stream for stream in streams
+                if stream.codec_type == 'video' and not stream.attached_pic
+            ),
+            attached_pics=tuple(
+                stream for stream in streams
+                if stream.codec_type == 'video' and stream.attached_pic
+            ),
+            audio_streams=tuple(
+                stream for stream in streams if stream.codec_type == 'audio'
+            ),
+        )
@@ -0,0 +1,132 @@
+'''Persistent ffprobe result cache.
+
+Probing a file (ffprobe, or ffmpeg's ffmetadata dump) costs a process spawn
+plus a read of the container headers - tens of milliseconds locally, a lot
+more over a NAS - and every tool re-probes the same library on every run.
+This keeps the raw probe output in a small SQLite database, keyed by the
+file's absolute path and the kind of probe, and only reuses an entry while
+the file's size, mtime and inode still match those recorded with it. Any
+rewrite, replacement or touch of the file therefore invalidates its entries
+automatically.
+
+The database is bounded to `max_entries` rows; once over, the least
+recently used entries are evicted.
+
+Used transparently by `ffmpeg_utils.fetch_file_data` and
+`ffmpeg_utils.fetch_file_metadata` - see
+`ffmpeg_utils.configure_probe_cache` to relocate or disable it.
+'''
+
+# System imports
+import logging
+import time
+
+# Local imports
+from .file_store import FileStore
+
+logger = logging.getLogger(__name__)
+
+CACHE_FILENAME = 'probe_cache.sqlite3'
+DEFAULT_MAX_ENTRIES = 200_000
+
+# Bump whenever the table layout or the meaning of a stored payload changes;
+# an existing database with a different version is discarded and rebuilt.
+SCHEMA_VERSION = 1
+
+# Only check the entry count (and evict) every this many inserts, rather
+# than paying for a COUNT(*) on every single one.
+PRUNE_INTERVAL = 100
+
+# Don't rewrite an entry's last_used timestamp on every hit - once a day is
+# plenty of resolution for LRU eviction and keeps cache reads read-only.
+LAST_USED_RESOLUTION = 24 * 60 * 60
+
+
+class ProbeCache(FileStore):
+    """SQLite-backed cache of probe output, keyed by file identity.
+
+    Safe to share between threads; several processes may also use the same
+    database concurrently (SQLite handles the locking).
+    """
+    TABLE = 'probe'
+    SCHEMA_VERSION = SCHEMA_VERSION
+    COLUMNS = {'last_used': 'INTEGER NOT NULL', 'payload': 'BLOB NOT NULL'}
+    INDEXES = ('CREATE INDEX IF NOT EXISTS probe_last_used ON probe (last_used)',)
+
+    def __init__(self, cache_dir: str, max_entries: int = DEFAULT_MAX_ENTRIES):
+        """Open (creating if needed) the cache database in `cache_dir`.
+
+        Args:
+            cache_dir (str): Directory to keep the database in. Created if
+                it doesn't exist.
+            max_entries (int, optional): Maximum number of cached probe
+                results before the least recently used are evicted.
+                Defaults to DEFAULT_MAX_ENTRIES.
+
+        Raises:
+            OSError: If `cache_dir` can't be created.
+            sqlite3.Error: If the database can't be opened.
+        """
+        super().__init__(cache_dir, CACHE_FILENAME)
+        self.max_entries = max_entries
+        self._inserts_since_prune = 0
+
+    def get(self, filename: str, kind: str) -> bytes | None:
+        """Fetch the cached `kind` probe output for `filename`, if there is
+        one and the file hasn't changed since it was stored.
+
+        Args:
+            filename (str): Probed file.
+            kind (str): Which probe the output came from (e.g. 'ffprobe').
+
+        Returns:
+            bytes | None: The cached output, or None on a miss.
+        """
+        entry = self._lookup(filename, kind)
+        if entry is None:
+            return None
+
+        path, (last_used, payload) = entry
+        now = int(time.time())
+        if now - last_used > LAST_USED_RESOLUTION:
+            with self._lock:
+                with self._conn:
+                    self._conn.execute(
+                        'UPDATE probe SET last_used = ? WHERE path = ? AND kind = ?',
+                        (now, path, kind),
+                    )
+        return payload
+
+    def put(self, filename: str, kind: str, payload: bytes) -> None:
+        """Store the `kind` probe output for `filename`, replacing any
+        earlier entry.
+
+        Args:
+            filename (str): Probed file.
+            kind (str): Which probe the output came from (e.g. 'ffprobe').
+            payload (bytes): The probe output.
+        """
+        if not self._store(filename, kind, (int(time.time()), payload)):
+            return
+
+        with self._lock:
+            self._inserts_since_prune += 1
+            if self._inserts_since_prune >= PRUNE_INTERVAL:
+                self._inserts_since_prune = 0
+                self._prune()
+
+    def _prune(self) -> None:
+        """Evict the least recently used entries beyond `max_entries`.
+        Caller must hold `_lock`."""
+        count = self._conn.execute('SELECT COUNT(*) FROM probe').fetchone()[0]
+        excess = count - self.max_entries
+        if excess <= 0:
+            return
+
+        logger.debug(f"Probe cache over {self.max_entries} entries, evicting {excess}")
+        with self._conn:
+            self._conn.execute(
+                'DELETE FROM probe WHERE rowid IN (' +
+                'SELECT rowid FROM probe ORDER BY last_used ASC LIMIT ?)',
+                (excess,),
+            )
@@ -0,0 +1,144 @@
+'''Disk-backed storage for a scan's hash sequences.
+
+A duplicate scan needs every candidate file's hash sequence at hand while
+it aligns pairs, and on a large library with a short sample interval those
+sequences outgrow RAM - as lots of separate arrays they also cost a Python
+object apiece. `SequenceArena` instead appends them all to one anonymous
+temporary file, remembers each one's offset and shape, and hands out
+read-only views of a memory map of that file: no copies, and the pages
+are the OS's to evict, so a scan is bounded by disk rather than memory.
+
+The file lives in the default temporary directory (`TMPDIR`), unless
+given another one - point it away from a RAM-backed tmpfs for the largest
+scans.
+'''
+
+# System imports
+import logging
+import tempfile
+import typing
+
+# External imports
+import numpy
+
+logger = logging.getLogger(__name__)
+
+# Element type of a stored sequence.
+SEQUENCE_DTYPE = numpy.dtype('<u8')
+# Smallest map, in elements (512 KiB).
+MIN_MAP_ELEMENTS = 1 << 16
+
+
+class SequenceArena:
+    """Append-only store of uint64 sequences by key, in one contiguous
+    memory-mapped temporary file.
+
+    Supports the read side of a dict (`get`, `in`, `len`, iteration over
+    keys, `items`). Not thread-safe; the file is deleted on `close` (or
+    when the arena is garbage collected), though views handed out stay
+    readable.
+    """
+
+    def __init__(self, directory: str | None = None):
+        """Create an empty arena.
+
+        Args:
+            directory (str | None, optional): Where to create the backing
+                file. Defaults to None (the default temporary directory).
+
+        Raises:
+            OSError: If the backing file can't be created.
+        """
+        self._file = tempfile.TemporaryFile(dir=directory)
+        self._index: dict[str, tuple[int, tuple[int, ...]]] = {}
+        self._size = 0
+        # Elements written to the file (rather than still buffered).
+        self._flushed = 0
+        self._map: numpy.ndarray | None = None
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._index
+
+    def __iter__(self) -> typing.Iterator[str]:
+        return iter(self._index)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes of sequence data in the arena."""
+        return self._size * SEQUENCE_DTYPE.itemsize
+
+    def add(self, key: str, sequence: numpy.ndarray) -> None:
+        """Append `sequence` under `key`. Adding an existing key again
+        points it at the new copy (the old one stays in the file, unused).
+
+        Args:
+            key (str): Identifies the sequence, e.g. its file's path.
+            sequence (numpy.ndarray): uint64 hashes - one per entry, or a
+                row of several per entry for wider hashes.
+        """
+        sequence = numpy.ascontiguousarray(sequence, dtype=SEQUENCE_DTYPE)
+        # Not at the end of the file - that may already be mapped ahead.
+        self._file.seek(self._size * SEQUENCE_DTYPE.itemsize)
+        self._file.write(sequence.data)
+        self._index[key] = (self._size, sequence.shape)
+        self._size += sequence.size
+
+    def get(self, key: str, default: numpy.ndarray | None = None) -> numpy.ndarray | None:
+        """The sequence stored under `key`, as a read-only view of the
+        arena.
+
+        Args:
+            key (str): Key the sequence was added under.
+            default (numpy.ndarray | None, optional): Returned if `key`
+                isn't stored. Defaults to None.
+
+        Returns:
+            numpy.ndarray | None: The uint64 sequence, shaped as it was
+                added, or `default`.
+        """
+        location = self._index.get(key)
+        if location is None:
+            return default
+        offset, shape = location
+        size = int(numpy.prod(shape))
+        if self._flushed < offset + size:
+            self._file.flush()
+            self._flushed = self._size
+        if self._map is None or len(self._map) < offset + size:
+            self._remap()
+        return self._map[offset:offset + size].reshape(shape)
+
+    def items(self) -> typing.Iterator[tuple[str, numpy.ndarray]]:
+        """Yield `(key, sequence)` for every stored sequence, in the order
+        they were added."""
+        for key in self._index:
+            yield key, self.get(key)
+
+    def _remap(self) -> None:
+        # Every map holds a file descriptor and a kernel mapping, for as
+        # long as any view of it is alive, so adds and gets taking turns
+        # mustn't map the file again each time: the file is grown (sparse)
+        # to at least twice the old map's length and mapped whole, leaving
+        # room for the next adds. Views of an earlier, shorter map stay
+        # valid: the bytes they cover never change.
+        if self._size == 0:
+            self._map = numpy.empty(0, dtype=SEQUENCE_DTYPE)
+            return
+        length = max(self._size, 2 * len(self._map) if self._map is not None else 0,
+                     MIN_MAP_ELEMENTS)
+        self._file.truncate(length * SEQUENCE_DTYPE.itemsize)
+        self._map = numpy.asarray(numpy.memmap(
+            self._file, dtype=SEQUENCE_DTYPE, mode='r', shape=(length,),
+        ))
+        logger.debug(
+            f"Sequence arena: mapped {length * SEQUENCE_DTYPE.itemsize} byte(s) for " +
+            f"{self.nbytes} byte(s) of {len(self)} sequence(s)"
+        )
+
+    def close(self) -> None:
+        """Delete the backing file."""
+        self._map = None
+        self._file.close()
@@ -8,9 +8,33 @@ functions.
 import argparse
 import logging
 import os
+import sys
 
 logger = logging.getLogger(__name__)
 
+# Name of the per-user cache subdirectory (and the environment variable that
+# overrides the whole cache location).
+CACHE_DIR_NAME = 'video_processing_utils'
+CACHE_DIR_ENV = 'VU_CACHE_DIR'
+
+# Media backends selectable with --backend, see ffmpeg_utils.set_backend().
+MEDIA_BACKENDS = ['subprocess', 'pyav']
+
+# Video file extensions the tools will pick up when scanning directories.
+ACCEPTED_EXTENSIONS = [
+    '3gp',
+    'asf', 'avi',
+    'divx',
+    'flv',
+    'm2ts', 'm2v', 'm4v', 'mkv', 'mov', 'mp4', 'mpeg', 'mpg',
+    'ogm',
+    'rm', 'rmvb',
+    'ts',
+    'vob',
+    'webm', 'wmv',
+    'xvid',
+]
+
 def setup_logging(args: argparse.Namespace, default_level: int = logging.INFO) -> None:
     """Setup logging for invocation.
 
@@ -53,6 +77,122 @@ def add_common_arguments(parser: argparse.ArgumentParser) -> None:
         required=False,
     )
 
+def add_probe_cache_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the ffprobe result cache arguments to `parser`, for the tools
+    that probe files (see `ffmpeg_utils.configure_probe_cache`).
+
+    Args:
+        parser (argparse.ArgumentParser): Parser to add the arguments to.
+    """
+    parser.add_argument(
+        '--no-probe-cache',
+        help="Always run ffprobe rather than reusing cached results from " +
+            "earlier runs",
+        action='store_true',
+        default=False,
+    )
+    parser.add_argument(
+        '--probe-cache-dir',
+        help="Directory to keep the ffprobe result cache in " +
+            f"(default: ${CACHE_DIR_ENV} or the per-user cache directory)",
+        default=None,
+    )
+
+def add_backend_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the media backend selection argument to `parser` (see
+    `ffmpeg_utils.set_backend`).
+
+    Args:
+        parser (argparse.ArgumentParser): Parser to add the arguments to.
+    """
+    parser.add_argument(
+        '--backend',
+        choices=MEDIA_BACKENDS,
+        default='subprocess',
+        help="How to probe/decode media: 'subprocess' runs ffprobe/ffmpeg, " +
+            "'pyav' uses PyAV in-process (needs the optional 'av' package; " +
+            "falls back to 'subprocess' if missing) (default: %(default)s)",
+    )
+
+def user_cache_dir() -> str:
+    """Directory to keep this package's persistent caches in.
+
+    `$VU_CACHE_DIR` if set, otherwise a `video_processing_utils` directory
+    under the platform's per-user cache location (`%LOCALAPPDATA%` on
+    Windows, `$XDG_CACHE_HOME` or `~/.cache` elsewhere). Not created here.
+
+    Returns:
+        str: Cache directory path.
+    """
+    if os.environ.get(CACHE_DIR_ENV):
+        return os.environ[CACHE_DIR_ENV]
+
+    if sys.platform == 'win32' and os.environ.get('LOCALAPPDATA'):
+        base_dir = os.environ['LOCALAPPDATA']
+    else:
+        base_dir = os.environ.get('XDG_CACHE_HOME') or \
+            os.path.join(os.path.expanduser('~'), '.cache')
+
+    return os.path.join(base_dir, CACHE_DIR_NAME)
+
+def file_identity(filename: str) -> tuple[int, int, int]:
+    """Identity of a file's current contents, for cache invalidation: any
+    rewrite, replacement or touch of the file changes at least one field.
+
+    Args:
+        filename (str): File to identify.
+
+    Raises:
+        OSError: If `filename` can't be stat'ed.
+
+    Returns:
+        tuple[int, int, int]: `(size, mtime_ns, inode)`.
+    """
+    stat_result = os.stat(filename)
+    return (stat_result.st_size, stat_result.st_mtime_ns, stat_result.st_ino)
+
+def walk_files(base_path='.') -> list[str]:
+    """Recursively walk files in a directory.
+
+    Args:
+        base_path (str, optional): Directory to walk. Defaults to '.'.
+
+    Returns:
+        list[str]: Paths of every file found under `base_path`.
+    """
+    file_list = []
+    for root, _, files in os.walk(base_path):
+        for curr_file in files:
+            file_list.append(f"{os.path.join(root,curr_file)}")
+
+    return file_list
+
+def determine_new_filename(fileprefix: str, ext: str='mp4') -> tuple[str,bool]:
+    """Determine temp output filename during encode.
+
+    Args:
+        fileprefix (str): Prefix to use.
+        ext (str, optional): output extension. Defaults to 'mp4'.
+
+    Returns:
+        tuple[str,bool]: filename as index 0, index 1 will be True if this is a
+            temporary filename, False if this will be the final filename.
+    """
+    new_file_name = f"{fileprefix}.{ext}"
+
+    if not os.path.exists(new_file_name):
+        return (new_file_name, False)
+
+    # The file exists so we need to try an incrementing number
+    i = 1
+    while True:
+        new_file_name = f"{fileprefix}-{i}.{ext}"
+
+        if not os.path.exists(new_file_name):
+            return (new_file_name, True)
+
+        i += 1
+
 def is_valid_file(parser: argparse.ArgumentParser, filename: str) -> str:
     """Check for valid input file.
 
@@ -0,0 +1,155 @@
+'''MPEG-7 video signatures for vudupcheck's 'signature' engine.
+
+ffmpeg's `signature` filter computes the MPEG-7 video signature of each
+frame in C: 380 ternary (0/1/2) elements, each comparing the average
+brightness of two regions of the frame. It's a richer frame descriptor
+than the 64-bit dHash `dup_finder` computes by default - and the matching
+MPEG-7 frame distance is the L1 distance between two signatures.
+
+The filter can also match two videos itself, but only while decoding both
+at once - every candidate pair would mean decoding both files again. So
+instead each file's signatures are exported once (`format=xml`), and kept
+in the hash store like frame-hash sequences. Each signature is stored
+"thermometer" coded, element `v` as the two bits `v >= 1, v >= 2`: the
+Hamming distance between two coded signatures is exactly their L1
+distance, so `dup_finder`'s alignment scores them unchanged, just as
+`SIGNATURE_WORDS`-word rows instead of single uint64 hashes.
+
+Signatures are always computed by the ffmpeg executable, whatever the
+media backend.
+'''
+
+# System imports
+import logging
+import os
+import subprocess
+import tempfile
+import xml.etree.ElementTree
+
+# External imports
+import ffmpeg
+import numpy
+
+# Local imports
+from .ffmpeg_utils import KEYFRAME_LOWRES
+
+logger = logging.getLogger(__name__)
+
+# Elements in one MPEG-7 frame signature, each 0, 1 or 2.
+SIGNATURE_ELEMENTS = 380
+# Bits per thermometer-coded signature - also the largest possible distance
+# between two frames - and the uint64 words they're padded out to.
+SIGNATURE_BITS = 2 * SIGNATURE_ELEMENTS
+SIGNATURE_WORDS = (SIGNATURE_BITS + 63) // 64
+
+# Default match threshold: ffmpeg's own default (`th_xh`) for calling two
+# frames' signatures a match.
+SIGNATURE_THRESHOLD = 116.0
+
+# Frames are downscaled to this width before signing - the signature only
+# looks at averages over a 32x32 grid, so more pixels just cost time.
+SIGNATURE_WIDTH = 320
+
+# Name of the signature file in the per-file temporary directory; fixed, as
+# filter arguments would need escaping of arbitrary paths.
+_SIGNATURE_FILENAME = 'signature.xml'
+
+
+def compute_signature_sequence(path: str, sample_interval_seconds: float,
+                               threads: int | None = None,
+                               keyframes_only: bool = False) -> numpy.ndarray:
+    """MPEG-7 signatures of frames sampled at a fixed interval across the
+    whole video, thermometer coded.
+
+    Args:
+        path (str): Path to the video file.
+        sample_interval_seconds (float): Seconds between sampled frames.
+        threads (int | None, optional): Decoder threads to use. Defaults to
+            None (the decoder's own choice).
+        keyframes_only (bool, optional): Only decode keyframes, as
+            `MediaBackend.decode_gray_frames` does. Defaults to False.
+
+    Raises:
+        ffmpeg.errors.FFmpegError: If `path` can't be decoded, or ffmpeg's
+            signature output can't be read.
+
+    Returns:
+        numpy.ndarray: `(frames, SIGNATURE_WORDS)` uint64 array, one row
+            per sampled frame, in playback order.
+    """
+    input_options = {} if threads is None else {'threads': threads}
+    if keyframes_only:
+        input_options.update(skip_frame='nokey', lowres=KEYFRAME_LOWRES)
+    cmd = ffmpeg.FFmpeg().option('v', 'error').input(os.path.abspath(path), input_options).output(
+        '-',
+        {
+            'vf': f'fps={1.0 / sample_interval_seconds},' +
+                f'scale={SIGNATURE_WIDTH}:-2:flags=bilinear,' +
+                f'signature=format=xml:filename={_SIGNATURE_FILENAME}',
+            'an': None,
+            'sn': None,
+            'f': 'null',
+        },
+    )
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        process = subprocess.run(
+            cmd.arguments, cwd=work_dir, check=False,
+            stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+        )
+        if process.returncode != 0:
+            message = process.stderr.decode('utf-8', errors='replace').strip()
+            raise ffmpeg.errors.FFmpegError.create(message=message, arguments=cmd.arguments)
+
+        try:
+            signatures = _read_xml_signatures(os.path.join(work_dir, _SIGNATURE_FILENAME))
+        except (OSError, ValueError, xml.etree.ElementTree.ParseError) as exc:
+            raise ffmpeg.errors.FFmpegError(
+                f"Unreadable signature output for '{path}': {exc}", cmd.arguments,
+            ) from exc
+    return encode_signatures(signatures)
+
+
+def _read_xml_signatures(filename: str) -> numpy.ndarray:
+    """The `<FrameSignature>` elements of a `signature=format=xml` file, as
+    a `(frames, SIGNATURE_ELEMENTS)` uint8 array."""
+    signatures = []
+    for _, element in xml.etree.ElementTree.iterparse(filename):
+        # Tags are namespaced ('{urn:mpeg:mpeg7:schema:2001}FrameSignature').
+        if element.tag.rsplit('}', 1)[-1] != 'FrameSignature':
+            continue
+        values = numpy.array(element.text.split(), dtype=numpy.uint8)
+        if len(values) != SIGNATURE_ELEMENTS or values.max(initial=0) > 2:
+            raise ValueError(f"malformed frame signature ({len(values)} elements)")
+        signatures.append(values)
+        element.clear()
+
+    if not signatures:
+        return numpy.empty((0, SIGNATURE_ELEMENTS), dtype=numpy.uint8)
+    return numpy.stack(signatures)
+
+
+def encode_signatures(signatures: numpy.ndarray) -> numpy.ndarray:
+    """Thermometer-code frame signatures, so Hamming distance between rows
+    is L1 distance between signatures.
+
+    Args:
+        signatures (numpy.ndarray): `(frames, SIGNATURE_ELEMENTS)` array of
+            0/1/2.
+
+    Returns:
+        numpy.ndarray: `(frames, SIGNATURE_WORDS)` uint64 array.
+    """
+    bits = numpy.zeros((len(signatures), 64 * SIGNATURE_WORDS), dtype=bool)
+    bits[:, :SIGNATURE_ELEMENTS] = signatures >= 1
+    bits[:, SIGNATURE_ELEMENTS:SIGNATURE_BITS] = signatures >= 2
+    packed = numpy.packbits(bits, axis=1)
+    return packed.view('>u8').astype(numpy.uint64)
+
+
+def signature_store_kind(sample_interval_seconds: float, sampling: str = 'fps') -> str:
+    """`HashStore` kind for sequences from `compute_signature_sequence`."""
+    kind = f"mpeg7sig:{float(sample_interval_seconds)!r}"
+    if sampling != 'fps':
+        kind = f"{kind}:{sampling}"
+    return kind
@@ -0,0 +1,93 @@
+'''Synthetic frame-hash sequence pairs for the alignment tests and
+`benchmarks/bench_alignment.py`.
+
+A "video" is a run of scenes: each scene has a random base hash, and every
+sample in it is that hash with a couple of bits flipped (motion). A
+re-encode of it flips a few more random bits per sample. Pairs are one of
+`PAIR_KINDS`:
+
+  - 'same': the video and a re-encode of it.
+  - 'intro' / 'outro': a re-encode with extra scenes before / after.
+  - 'clip': a re-encode of a stretch of the video.
+  - 'unrelated': two independent videos.
+'''
+
+# External imports
+import numpy
+
+PAIR_KINDS = ('same', 'intro', 'outro', 'clip', 'unrelated')
+
+# Per-bit flip probabilities: sample to sample within a scene, and added by
+# a re-encode (about 4 of 64 bits).
+MOTION_FLIP_PROBABILITY = 0.03
+REENCODE_FLIP_PROBABILITY = 0.06
+# Scene lengths, in samples.
+SCENE_LENGTHS = (5, 40)
+
+
+def random_flips(rng: numpy.random.Generator, shape: tuple[int, ...],
+                 probability: float) -> numpy.ndarray:
+    """uint64 masks of `shape` (`(n,)`, or `(n, words)` for wider hashes),
+    each bit set with `probability`."""
+    bits = rng.random((*shape, 64)) < probability
+    return numpy.packbits(bits, axis=-1).view('>u8')[..., 0].astype(numpy.uint64)
+
+
+def scene_sequence(rng: numpy.random.Generator, length: int, words: int | None = None) -> numpy.ndarray:
+    """A `length`-sample video: `(length,)` uint64 hashes, or `(length,
+    words)` rows."""
+    row_shape = () if words is None else (words,)
+    scenes = []
+    total = 0
+    while total < length:
+        scene_length = int(rng.integers(*SCENE_LENGTHS))
+        base = rng.integers(0, 1 << 63, size=(1, *row_shape), dtype=numpy.uint64) << numpy.uint64(1)
+        base |= rng.integers(0, 2, size=(1, *row_shape), dtype=numpy.uint64)
+        scenes.append(base ^ random_flips(rng, (scene_length, *row_shape), MOTION_FLIP_PROBABILITY))
+        total += scene_length
+    return numpy.concatenate(scenes)[:length]
+
+
+def reencode(rng: numpy.random.Generator, sequence: numpy.ndarray) -> numpy.ndarray:
+    """`sequence` with re-encode noise added."""
+    return sequence ^ random_flips(rng, sequence.shape, REENCODE_FLIP_PROBABILITY)
+
+
+def make_pair(rng: numpy.random.Generator, kind: str, length: int,
+              words: int | None = None) -> tuple[numpy.ndarray, numpy.ndarray, int | None]:
+    """One `kind` pair of sequences about `length` samples long.
+
+    Returns:
+        tuple[numpy.ndarray, numpy.ndarray, int | None]: `(seq_a, seq_b,
+            offset)`, `offset` being where `seq_b` really aligns with
+            `seq_a` (as `dup_finder.best_alignment` reports it), None for
+            'unrelated'.
+    """
+    video = scene_sequence(rng, length, words)
+    if kind == 'same':
+        return video, reencode(rng, video), 0
+    if kind == 'intro':
+        intro = scene_sequence(rng, int(rng.integers(10, length // 4)), words)
+        return video, numpy.concatenate((intro, reencode(rng, video))), -len(intro)
+    if kind == 'outro':
+        outro = scene_sequence(rng, int(rng.integers(10, length // 4)), words)
+        return video, numpy.concatenate((reencode(rng, video), outro)), 0
+    if kind == 'clip':
+        clip_length = int(rng.integers(length // 2, length - 10))
+        start = int(rng.integers(0, length - clip_length))
+        return video, reencode(rng, video[start:start + clip_length]), start
+    if kind == 'unrelated':
+        return video, scene_sequence(rng, int(length * rng.uniform(0.8, 1.2)), words), None
+    raise ValueError(f"Unknown pair kind '{kind}'")
+
+
+def corpus(seed: int, pairs_per_kind: int, lengths: tuple[int, int] = (200, 1500),
+           words: int | None = None) -> list[tuple[str, numpy.ndarray, numpy.ndarray, int | None]]:
+    """`pairs_per_kind` pairs of every kind, as `(kind, seq_a, seq_b,
+    offset)`, with `seq_a` lengths drawn from `lengths`."""
+    rng = numpy.random.default_rng(seed)
+    return [
+        (kind, *make_pair(rng, kind, int(rng.integers(*lengths)), words))
+        for kind in PAIR_KINDS
+        for _ in range(pairs_per_kind)
+    ]
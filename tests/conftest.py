@@ -0,0 +1,94 @@
+'''Shared pytest fixtures.
+
+Tests that need the ffmpeg/ffprobe executables (or a real media file) take
+the `ffmpeg_tools` or `make_video` fixture and are skipped where ffmpeg
+isn't installed; everything else runs on plain NumPy/Python, with
+`stub_backend` standing in for ffmpeg where files need probing or decoding.
+'''
+
+# System imports
+import os
+import shutil
+import subprocess
+import tempfile
+
+# External imports
+import pytest
+
+# Local imports
+from video_processing_utils import ffmpeg_utils
+
+from media_stubs import StubBackend
+
+
+def pytest_configure(config):
+    # Keep the probe cache and hash store of the tests out of the user's
+    # real cache directory.
+    os.environ['VU_CACHE_DIR'] = tempfile.mkdtemp(prefix='vu-test-cache-')
+
+
+@pytest.fixture
+def uncached_probes():
+    """Probe without the probe cache for the test."""
+    ffmpeg_utils.configure_probe_cache(enabled=False)
+    yield
+    ffmpeg_utils.configure_probe_cache()
+
+
+@pytest.fixture
+def stub_backend(monkeypatch):
+    """Make a `media_stubs.StubBackend` the media backend for the test;
+    files to probe/decode are registered with its `add`."""
+    backend = StubBackend()
+    monkeypatch.setattr(ffmpeg_utils, '_backend', backend)
+    return backend
+
+
+@pytest.fixture
+def ffmpeg_tools():
+    """Skip the test unless both ffmpeg and ffprobe are on the path."""
+    if shutil.which('ffmpeg') is None or shutil.which('ffprobe') is None:
+        pytest.skip("ffmpeg/ffprobe not installed")
+
+
+@pytest.fixture
+def make_video(tmp_path, ffmpeg_tools):
+    """Factory writing a short synthetic clip (moving test pattern plus a
+    sine tone) with ffmpeg's lavfi sources, returning its path.
+
+    Keyword args: `name` (file name, its extension picks the container),
+    `duration` (seconds), `size` ('WxH'), `rate` (fps), `gop` (keyframe
+    interval in frames), `vcodec` and `acodec` (ffmpeg encoders; `acodec`
+    None for no audio) and `chapters` (number of equal-length chapters).
+    """
+    def make(name: str = 'clip.mkv', duration: float = 4.0, size: str = '160x120',
+             rate: int = 25, gop: int = 25, vcodec: str = 'mpeg4',
+             acodec: str | None = 'aac', chapters: int = 0) -> str:
+        output = str(tmp_path / name)
+        arguments = [
+            'ffmpeg', '-v', 'error', '-y',
+            '-f', 'lavfi', '-i', f'testsrc2=size={size}:rate={rate}:duration={duration}',
+        ]
+        if acodec is not None:
+            arguments += ['-f', 'lavfi', '-i', f'sine=frequency=440:duration={duration}']
+        if chapters:
+            metadata = tmp_path / f'{name}.ffmetadata'
+            lines = [';FFMETADATA1']
+            step_ms = int(duration * 1000 / chapters)
+            for chapter in range(chapters):
+                lines += [
+                    '[CHAPTER]', 'TIMEBASE=1/1000',
+                    f'START={chapter * step_ms}', f'END={(chapter + 1) * step_ms}',
+                    f'title=Chapter {chapter + 1}',
+                ]
+            metadata.write_text('\n'.join(lines) + '\n')
+            arguments += ['-f', 'ffmetadata', '-i', str(metadata)]
+            arguments += ['-map_chapters', str(2 if acodec is not None else 1)]
+        arguments += ['-map', '0:v']
+        if acodec is not None:
+            arguments += ['-map', '1:a', '-c:a', acodec]
+        arguments += ['-c:v', vcodec, '-g', str(gop), '-pix_fmt', 'yuv420p', output]
+        subprocess.run(arguments, check=True)
+        return output
+
+    return make
@@ -0,0 +1,124 @@
+'''An in-memory media backend for tests that exercise probing and hashing
+without ffmpeg: `StubBackend` serves whatever each file was registered
+with, and `frames_for_hashes` builds decoded frames hashing to a chosen
+dHash sequence.
+'''
+
+# System imports
+import os
+import threading
+import time
+
+# External imports
+import ffmpeg
+import numpy
+
+# Local imports
+from video_processing_utils import dup_finder, ffmpeg_utils
+
+
+def frames_for_hashes(hashes) -> bytes:
+    """Raw `FRAME_HASH_WIDTH` x `FRAME_HASH_HEIGHT` grey frames whose dHashes
+    (`dup_finder.dhash_frames`) are exactly `hashes`."""
+    bits = numpy.unpackbits(
+        numpy.asarray(hashes, dtype='>u8').view(numpy.uint8).reshape(-1, 8), axis=1,
+    ).reshape(-1, dup_finder.FRAME_HASH_HEIGHT, dup_finder.FRAME_HASH_WIDTH - 1)
+    # Each pixel one level darker than its left neighbour where the bit is
+    # set, one brighter where it isn't.
+    steps = numpy.where(bits, -1, 1)
+    rows = 128 + numpy.concatenate(
+        (numpy.zeros(bits.shape[:2] + (1,), dtype=int), numpy.cumsum(steps, axis=2)), axis=2,
+    )
+    return rows.astype(numpy.uint8).tobytes()
+
+
+class StubBackend(ffmpeg_utils.MediaBackend):
+    """Media backend serving registered files from memory.
+
+    `add` registers a file (which must exist on disk for the callers that
+    stat it) with its duration, geometry, decoded frames and audio.
+    Anything not registered fails like an unreadable file. Every call is
+    logged in `calls` (and the decoder threads asked for in
+    `decode_threads`), and `delay` makes each one take that long, to
+    observe concurrency (`peak` is the most calls ever in flight at once).
+    """
+    name = 'stub'
+
+    def __init__(self):
+        self.files: dict[str, dict] = {}
+        self.calls: list[tuple[str, str]] = []
+        self.decode_threads: list[int | None] = []
+        self.delay = 0.0
+        self.peak = 0
+        self._running = 0
+        self._lock = threading.Lock()
+
+    def add(self, filename: str, duration: float = 60.0, width: int = 1920, height: int = 1080,
+            hashes=None, audio: numpy.ndarray | None = None, streams: list[dict] | None = None,
+            chapters: list[dict] | None = None, delay: float = 0.0) -> str:
+        """Register `filename` (creating it, empty, if it doesn't exist);
+        its frames hash to `hashes`, its audio is the int16 `audio`, and
+        every call on it takes an extra `delay` seconds. Returns
+        `filename`."""
+        if not os.path.exists(filename):
+            with open(filename, 'wb'):
+                pass
+        if streams is None:
+            streams = [{
+                'index': 0, 'codec_type': 'video', 'codec_name': 'h264',
+                'width': width, 'height': height, 'pix_fmt': 'yuv420p',
+                'avg_frame_rate': '25/1', 'disposition': {'attached_pic': 0},
+            }]
+            if audio is not None:
+                streams.append({
+                    'index': 1, 'codec_type': 'audio', 'codec_name': 'aac',
+                    'sample_rate': '44100', 'channel_layout': 'stereo',
+                })
+        self.files[os.path.abspath(filename)] = {
+            'probe': {
+                'format': {'duration': f'{duration:.6f}'},
+                'streams': streams,
+                'chapters': chapters or [],
+            },
+            'frames': frames_for_hashes(hashes if hashes is not None else []),
+            'audio': audio,
+            'delay': delay,
+        }
+        return filename
+
+    def _enter(self, method: str, filename: str) -> dict:
+        path = os.path.abspath(filename)
+        with self._lock:
+            self.calls.append((method, path))
+            self._running += 1
+            self.peak = max(self.peak, self._running)
+        try:
+            time.sleep(self.delay + self.files.get(path, {}).get('delay', 0.0))
+        finally:
+            with self._lock:
+                self._running -= 1
+        if path not in self.files:
+            raise ffmpeg.errors.FFmpegError(f"{filename}: No such file or directory", [])
+        return self.files[path]
+
+    def count(self, method: str, filename: str | None = None) -> int:
+        """How many `method` calls there were (for `filename`)."""
+        return sum(
+            call_method == method and (filename is None or path == os.path.abspath(filename))
+            for call_method, path in self.calls
+        )
+
+    def probe(self, filename: str, profile: str) -> dict:
+        return self._enter('probe', filename)['probe']
+
+    def iter_gray_frames(self, filename: str, fps: float, width: int, height: int,
+                         threads: int | None = None, keyframes_only: bool = False):
+        with self._lock:
+            self.decode_threads.append(threads)
+        yield self._enter('frames', filename)['frames']
+
+    def iter_mono_audio(self, filename: str, sample_rate: int):
+        audio = self._enter('audio', filename)['audio']
+        if audio is None:
+            raise ffmpeg.errors.FFmpegError(f"{filename}: no audio stream", [])
+        yield numpy.asarray(audio, dtype='<i2').tobytes()
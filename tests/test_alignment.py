@@ -0,0 +1,75 @@
+'''Frame-hash sequence alignment: `dup_finder.best_alignment` against its
+pure-Python reference, and the coarse-to-fine search
+(`dup_finder.coarse_to_fine_alignment`) against the exhaustive one over a
+synthetic corpus (`alignment_corpus`).'''
+
+# External imports
+import numpy
+import pytest
+
+# Local imports
+from video_processing_utils import dup_finder
+
+import alignment_corpus
+
+THRESHOLD = dup_finder.DEFAULT_SEQUENCE_THRESHOLD
+MIN_OVERLAP = 0.5
+
+
+@pytest.mark.parametrize('kind', alignment_corpus.PAIR_KINDS)
+def test_best_alignment_matches_reference(kind):
+    rng = numpy.random.default_rng(len(kind))
+    seq_a, seq_b, _ = alignment_corpus.make_pair(rng, kind, 120)
+
+    offset, avg_distance, overlap = dup_finder.best_alignment(seq_a, seq_b, MIN_OVERLAP)
+    ref_offset, ref_distance, ref_overlap = dup_finder._best_alignment_reference(
+        seq_a.tolist(), seq_b.tolist(), MIN_OVERLAP,
+    )
+    assert (offset, overlap) == (ref_offset, ref_overlap)
+    assert avg_distance == pytest.approx(ref_distance)
+
+
+def test_best_alignment_empty():
+    assert dup_finder.best_alignment([], [1, 2], MIN_OVERLAP) is None
+    assert dup_finder.coarse_to_fine_alignment([1, 2], [], MIN_OVERLAP) is None
+
+
+@pytest.fixture(scope='module')
+def pairs():
+    return alignment_corpus.corpus(seed=14, pairs_per_kind=20)
+
+
+def test_exhaustive_finds_true_offsets(pairs):
+    for kind, seq_a, seq_b, true_offset in pairs:
+        offset, avg_distance, _ = dup_finder.best_alignment(seq_a, seq_b, MIN_OVERLAP)
+        if true_offset is None:
+            assert avg_distance > THRESHOLD, kind
+        else:
+            assert (offset, kind) == (true_offset, kind)
+            assert avg_distance <= THRESHOLD, kind
+
+
+def test_coarse_to_fine_agrees_with_exhaustive(pairs):
+    for kind, seq_a, seq_b, _ in pairs:
+        exhaustive = dup_finder.best_alignment(seq_a, seq_b, MIN_OVERLAP)
+        coarse = dup_finder.coarse_to_fine_alignment(
+            seq_a, seq_b, MIN_OVERLAP, max_distance=THRESHOLD,
+        )
+        if exhaustive[1] <= THRESHOLD:
+            # Every match the exhaustive search finds, at the same offset.
+            assert coarse is not None, kind
+            assert (coarse[0], coarse[2], kind) == (exhaustive[0], exhaustive[2], kind)
+            assert coarse[1] == pytest.approx(exhaustive[1])
+        else:
+            # ... and never a match it doesn't.
+            assert coarse is None or coarse[1] > THRESHOLD, kind
+
+
+def test_coarse_to_fine_short_sequences():
+    # Too short to shrink: the exhaustive search, as is.
+    rng = numpy.random.default_rng(0)
+    seq_a, seq_b, _ = alignment_corpus.make_pair(
+        rng, 'clip', dup_finder.COARSE_FACTOR * dup_finder.COARSE_MIN_BLOCKS,
+    )
+    assert dup_finder.coarse_to_fine_alignment(seq_a, seq_b, MIN_OVERLAP) == \
+        dup_finder.best_alignment(seq_a, seq_b, MIN_OVERLAP)
@@ -0,0 +1,150 @@
+'''asyncio ffmpeg engine (`ffmpeg_utils.async_run_ffmpeg`) and vucheck on
+top of it, run against a stub `ffmpeg` executable so no real ffmpeg is
+needed.'''
+
+# System imports
+import asyncio
+import os
+import sys
+import time
+
+# External imports
+import ffmpeg
+import ffmpeg.asyncio
+import pytest
+
+# Local imports
+from video_processing_utils import check_media, ffmpeg_utils
+
+# The stub: appends a line to $STUB_LOG on start, every 10 ms while it
+# "runs" ($STUB_SECONDS) and on exit, writes $STUB_STDOUT/$STUB_STDERR and
+# exits with $STUB_EXIT.
+STUB_SOURCE = '''
+import os, sys, time
+log = open(os.environ['STUB_LOG'], 'a', buffering=1)
+log.write(f'start {os.getpid()}\\n')
+sys.stderr.write(os.environ.get('STUB_STDERR', ''))
+sys.stderr.flush()
+deadline = time.monotonic() + float(os.environ.get('STUB_SECONDS', '0'))
+while time.monotonic() < deadline:
+    log.write('tick\\n')
+    time.sleep(0.01)
+sys.stdout.write(os.environ.get('STUB_STDOUT', ''))
+log.write('end\\n')
+sys.exit(int(os.environ.get('STUB_EXIT', '0')))
+'''
+
+
+@pytest.fixture
+def stub_ffmpeg(tmp_path, monkeypatch):
+    """Put the stub on PATH as `ffmpeg`; returns a function setting its
+    behaviour and returning the path of its log."""
+    if sys.platform == 'win32':
+        pytest.skip("the stub is a shebang script")
+    stub = tmp_path / 'bin' / 'ffmpeg'
+    stub.parent.mkdir()
+    stub.write_text(f'#!{sys.executable}\n{STUB_SOURCE}')
+    stub.chmod(0o755)
+    monkeypatch.setenv('PATH', f"{stub.parent}{os.pathsep}{os.environ['PATH']}")
+    log = tmp_path / 'stub.log'
+    monkeypatch.setenv('STUB_LOG', str(log))
+
+    def configure(seconds: float = 0, stdout: str = '', stderr: str = '', exit_code: int = 0):
+        monkeypatch.setenv('STUB_SECONDS', str(seconds))
+        monkeypatch.setenv('STUB_STDOUT', stdout)
+        monkeypatch.setenv('STUB_STDERR', stderr)
+        monkeypatch.setenv('STUB_EXIT', str(exit_code))
+        return log
+    return configure
+
+
+def stub_command() -> ffmpeg.asyncio.FFmpeg:
+    return ffmpeg.asyncio.FFmpeg().option('v', 'error').input('in.mkv').output('-', f='null')
+
+
+def log_lines(log) -> list[str]:
+    return log.read_text().splitlines() if log.exists() else []
+
+
+async def wait_for_start(log) -> None:
+    while not any(line.startswith('start') for line in log_lines(log)):
+        await asyncio.sleep(0.01)
+
+
+def assert_stopped(log) -> None:
+    """The stub has stopped ticking (and never got to finish)."""
+    time.sleep(0.1)
+    ticks = len(log_lines(log))
+    time.sleep(0.2)
+    assert len(log_lines(log)) == ticks
+    assert 'end' not in log_lines(log)
+
+
+def test_output_and_stderr(stub_ffmpeg):
+    stub_ffmpeg(stdout='{"streams": []}', stderr='first\nsecond\n')
+    lines = []
+
+    output = asyncio.run(ffmpeg_utils.async_run_ffmpeg(stub_command(), on_stderr=lines.append))
+    assert output == b'{"streams": []}'
+    assert lines == ['first', 'second']
+
+
+def test_failure_raises(stub_ffmpeg):
+    stub_ffmpeg(stderr='in.mkv: Invalid data found\n', exit_code=1)
+
+    with pytest.raises(ffmpeg.errors.FFmpegError, match='Invalid data'):
+        asyncio.run(ffmpeg_utils.async_run_ffmpeg(stub_command()))
+
+
+def test_cancel_terminates_process(stub_ffmpeg):
+    log = stub_ffmpeg(seconds=30)
+
+    async def run_and_cancel():
+        task = asyncio.create_task(ffmpeg_utils.async_run_ffmpeg(stub_command()))
+        await asyncio.wait_for(wait_for_start(log), timeout=10)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run_and_cancel())
+    assert_stopped(log)
+
+
+def test_timeout_terminates_process(stub_ffmpeg):
+    log = stub_ffmpeg(seconds=30)
+
+    with pytest.raises(TimeoutError):
+        asyncio.run(ffmpeg_utils.async_run_ffmpeg(stub_command(), timeout=0.5))
+    assert_stopped(log)
+
+
+def test_process_limit(stub_ffmpeg):
+    log = stub_ffmpeg(seconds=0.2)
+
+    async def run_many():
+        ffmpeg_utils.set_async_process_limit(2)
+        try:
+            await asyncio.gather(*(ffmpeg_utils.async_run_ffmpeg(stub_command()) for _ in range(5)))
+        finally:
+            ffmpeg_utils.set_async_process_limit(ffmpeg_utils.DEFAULT_ASYNC_PROCESSES)
+
+    asyncio.run(run_many())
+    running = peak = 0
+    for line in log_lines(log):
+        if line.startswith('start'):
+            running += 1
+            peak = max(peak, running)
+        elif line == 'end':
+            running -= 1
+    assert peak == 2
+
+
+def test_vucheck_counts_errors(stub_ffmpeg):
+    stub_ffmpeg(stderr='[h264] error while decoding MB 3 4\nconcealing 12 errors\nother\n')
+    assert asyncio.run(check_media.count_decode_errors('in.mkv')) == 2
+
+    stub_ffmpeg(stderr='in.mkv: No such file or directory\n', exit_code=1)
+    assert asyncio.run(check_media.count_decode_errors('in.mkv')) == 1
+
+    stub_ffmpeg()
+    assert asyncio.run(check_media.check_files(['a.mkv', 'b.mkv'], jobs=2)) == []
@@ -0,0 +1,159 @@
+'''Audio fingerprints (`audio_fingerprint`) on synthetic PCM, and the audio
+prefilter built on them (`dup_finder.filter_pairs_by_audio`,
+`find_duplicates(audio_prefilter=True)`) with the stub media backend.'''
+
+# External imports
+import numpy
+import pytest
+
+# Local imports
+from video_processing_utils import audio_fingerprint, dup_finder
+
+
+def noise(seed: int, seconds: float = 20.0, amplitude: float = 4000.0) -> numpy.ndarray:
+    """int16 noise shaped a little by a moving loudness, as `seconds` of
+    audio at `audio_fingerprint.SAMPLE_RATE`."""
+    rng = numpy.random.default_rng(seed)
+    samples = int(seconds * audio_fingerprint.SAMPLE_RATE)
+    envelope = 0.5 + 0.5 * numpy.abs(numpy.sin(numpy.arange(samples) / 3000.0 + seed))
+    return (rng.normal(0.0, amplitude, samples) * envelope).clip(-32768, 32767).astype(numpy.int16)
+
+
+def windows_of(audio: numpy.ndarray) -> numpy.ndarray:
+    return numpy.lib.stride_tricks.sliding_window_view(
+        audio.astype(numpy.float32), audio_fingerprint.WINDOW_SAMPLES,
+    )[::audio_fingerprint.HOP_SAMPLES]
+
+
+def mean_distance(fingerprint_a: numpy.ndarray, fingerprint_b: numpy.ndarray) -> float:
+    return float(dup_finder._bit_counts(fingerprint_a ^ fingerprint_b).mean())
+
+
+def test_band_energies():
+    windows = windows_of(noise(1))
+    energies = audio_fingerprint.band_energies(windows)
+    assert energies.shape == (len(windows), audio_fingerprint.FINGERPRINT_BITS + 1)
+    assert (energies > 0).all()
+    # Energy goes with the square of the amplitude, in every band.
+    numpy.testing.assert_allclose(audio_fingerprint.band_energies(windows / 4), energies / 16, rtol=1e-4)
+
+
+def test_fingerprint_bits_identical_and_scaled():
+    audio = noise(2)
+    fingerprint = audio_fingerprint.fingerprint_bits(audio_fingerprint.band_energies(windows_of(audio)))
+    assert fingerprint.dtype == numpy.uint64
+    assert len(fingerprint) == len(windows_of(audio)) - 1
+
+    again = audio_fingerprint.fingerprint_bits(audio_fingerprint.band_energies(windows_of(audio.copy())))
+    numpy.testing.assert_array_equal(again, fingerprint)
+
+    # Quieter (and re-quantized to int16) flips hardly any bit.
+    quieter = (audio * 0.3).astype(numpy.int16)
+    scaled = audio_fingerprint.fingerprint_bits(audio_fingerprint.band_energies(windows_of(quieter)))
+    assert mean_distance(scaled, fingerprint) < 3
+
+
+def test_fingerprint_bits_unrelated():
+    fingerprints = [
+        audio_fingerprint.fingerprint_bits(audio_fingerprint.band_energies(windows_of(noise(seed))))
+        for seed in (3, 4)
+    ]
+    # About half the bits agree by chance.
+    assert 28 < mean_distance(*fingerprints) < 36
+
+
+@pytest.mark.parametrize('zeros, silent', [(0, False), (5, False), (6, True), (10, True)])
+def test_is_mostly_silent(zeros, silent):
+    fingerprint = numpy.arange(1, 11, dtype=numpy.uint64)
+    fingerprint[:zeros] = 0
+    assert audio_fingerprint.is_mostly_silent(fingerprint) is silent
+
+
+def test_is_mostly_silent_empty():
+    assert audio_fingerprint.is_mostly_silent(numpy.empty(0, dtype=numpy.uint64))
+
+
+@pytest.fixture
+def stub(stub_backend, uncached_probes):
+    return stub_backend
+
+
+def test_compute_audio_fingerprint(tmp_path, stub):
+    audio = noise(5)
+    clip = stub.add(str(tmp_path / 'clip.mkv'), audio=audio)
+    quiet = stub.add(str(tmp_path / 'quiet.mkv'), audio=(audio * 0.3).astype(numpy.int16))
+    silent = stub.add(str(tmp_path / 'silent.mkv'), audio=numpy.zeros_like(audio))
+    short = stub.add(str(tmp_path / 'short.mkv'), audio=audio[:1000])
+
+    fingerprint = audio_fingerprint.compute_audio_fingerprint(clip)
+    expected = audio_fingerprint.fingerprint_bits(audio_fingerprint.band_energies(windows_of(audio)))
+    numpy.testing.assert_array_equal(fingerprint, expected)
+    assert not audio_fingerprint.is_mostly_silent(fingerprint)
+    assert mean_distance(audio_fingerprint.compute_audio_fingerprint(quiet), fingerprint) < 3
+
+    silent_fingerprint = audio_fingerprint.compute_audio_fingerprint(silent)
+    assert len(silent_fingerprint) == len(fingerprint)
+    assert not silent_fingerprint.any()
+    assert audio_fingerprint.is_mostly_silent(silent_fingerprint)
+
+    assert len(audio_fingerprint.compute_audio_fingerprint(short)) == 0
+
+
+def test_filter_pairs_by_audio():
+    def fingerprint(seed):
+        return audio_fingerprint.fingerprint_bits(audio_fingerprint.band_energies(windows_of(noise(seed))))
+
+    fingerprints = {'a': fingerprint(6), 'a2': fingerprint(6), 'b': fingerprint(7), 'mute': None}
+    pairs = [('a', 'a2'), ('a', 'b'), ('a', 'mute'), ('mute', 'b'), ('a2', 'b')]
+
+    kept = dup_finder.filter_pairs_by_audio(pairs, fingerprints.get, 0.5)
+    # Unrelated audio is dropped; a file with no usable audio keeps its pairs.
+    assert kept == [('a', 'a2'), ('a', 'mute'), ('mute', 'b')]
+
+
+def prefilter_files(tmp_path, stub, with_mute: bool) -> dict[str, str]:
+    frames = numpy.frombuffer(numpy.random.default_rng(8).bytes(8 * 30), dtype=numpy.uint64)
+    other_frames = numpy.frombuffer(numpy.random.default_rng(9).bytes(8 * 30), dtype=numpy.uint64)
+    audio = noise(10)
+    files = {
+        'original': stub.add(str(tmp_path / 'original.mkv'), hashes=frames, audio=audio),
+        'copy': stub.add(str(tmp_path / 'copy.mkv'), hashes=frames, audio=audio),
+        # Unrelated, and its audio says so.
+        'other': stub.add(str(tmp_path / 'other.mkv'), hashes=other_frames, audio=noise(11)),
+    }
+    if with_mute:
+        # Same video, but audio that can't tell: silent, or missing.
+        files['silent'] = stub.add(str(tmp_path / 'silent.mkv'), hashes=frames,
+                                   audio=numpy.zeros_like(audio))
+        files['no_audio'] = stub.add(str(tmp_path / 'no_audio.mkv'), hashes=frames)
+    return files
+
+
+def find_with_prefilter(files: dict[str, str]) -> list[set[str]]:
+    groups, _, _ = dup_finder.find_duplicates(
+        list(files.values()), 1.0, sequence_threshold=dup_finder.DEFAULT_SEQUENCE_THRESHOLD,
+        min_overlap_fraction=0.5, max_duration_diff=300.0, audio_prefilter=True,
+    )
+    return [set(group) for group in groups]
+
+
+def test_audio_prefilter_skips_ruled_out_video(tmp_path, stub):
+    files = prefilter_files(tmp_path, stub, with_mute=False)
+    assert find_with_prefilter(files) == [{files['original'], files['copy']}]
+    # Both of 'other's pairs were ruled out by audio: its video was never decoded.
+    assert stub.count('audio') == 3
+    assert stub.count('frames', files['other']) == 0
+    assert stub.count('frames') == 2
+
+
+def test_audio_prefilter_keeps_mute_files(tmp_path, stub):
+    files = prefilter_files(tmp_path, stub, with_mute=True)
+
+    fingerprints = dup_finder.fingerprint_audio_files(list(files.values()))
+    assert list(fingerprints) == [files['original'], files['copy'], files['other']]
+    fingerprints.close()
+
+    # Silent and audio-less files are judged on their video alone.
+    assert find_with_prefilter(files) == [
+        {files['original'], files['copy'], files['silent'], files['no_audio']},
+    ]
@@ -0,0 +1,74 @@
+'''Batch probing (`ffmpeg_utils.iter_fetch_file_data` and friends, and
+`dup_finder.probe_video_infos` on top of them), against the stub media
+backend.'''
+
+# External imports
+import ffmpeg
+import pytest
+
+# Local imports
+from video_processing_utils import dup_finder, ffmpeg_utils
+from video_processing_utils.media_info import MediaInfo
+
+
+@pytest.fixture
+def clips(tmp_path, stub_backend, uncached_probes):
+    """Ten registered clips, the n-th lasting n + 1 minutes, and one file
+    that fails to probe."""
+    paths = [
+        stub_backend.add(str(tmp_path / f'{n}.mkv'), duration=60.0 * (n + 1))
+        for n in range(10)
+    ]
+    broken = tmp_path / 'broken.mkv'
+    broken.write_bytes(b'')
+    paths.insert(4, str(broken))
+    return paths
+
+
+@pytest.mark.parametrize('max_workers', [1, 4])
+def test_ordered_results(clips, max_workers):
+    results = list(ffmpeg_utils.iter_fetch_file_data(clips, max_workers=max_workers))
+    assert [result.filename for result in results] == clips
+    for result in results:
+        if result.filename.endswith('broken.mkv'):
+            assert result.data is None
+            assert isinstance(result.error, ffmpeg.errors.FFmpegError)
+        else:
+            assert result.error is None
+            assert result.data['format']['duration']
+
+
+def test_unordered_results_stream_as_completed(tmp_path, clips, stub_backend):
+    slow = stub_backend.add(str(tmp_path / 'slow.mkv'), delay=0.3)
+    results = list(ffmpeg_utils.iter_fetch_file_data([slow] + clips, max_workers=4, ordered=False))
+    assert sorted(result.filename for result in results) == sorted([slow] + clips)
+    assert sum(result.error is not None for result in results) == 1
+    # Everything else was through while the first file was still probing.
+    assert results[-1].filename == slow
+
+
+def test_concurrency_is_bounded(clips, stub_backend):
+    stub_backend.delay = 0.05
+    results = ffmpeg_utils.fetch_file_data_many(clips, max_workers=3)
+    assert len(results) == len(clips)
+    assert stub_backend.peak == 3
+    # One probe per file.
+    assert stub_backend.count('probe') == len(clips)
+
+
+def test_media_info_results(clips):
+    results = list(ffmpeg_utils.iter_fetch_media_info(clips, profile='geometry'))
+    infos = [result.data for result in results if result.error is None]
+    assert all(isinstance(info, MediaInfo) for info in infos)
+    assert [info.duration for info in infos] == [60.0 * (n + 1) for n in range(10)]
+
+
+def test_probe_video_infos_skips_unusable(tmp_path, clips, stub_backend):
+    audio_only = stub_backend.add(str(tmp_path / 'audio.mka'), streams=[
+        {'index': 0, 'codec_type': 'audio', 'codec_name': 'aac'},
+    ])
+    infos = dup_finder.probe_video_infos(clips + [audio_only], probe_workers=4)
+
+    assert list(infos) == [path for path in clips if not path.endswith('broken.mkv')]
+    first = infos[clips[0]]
+    assert (first.duration, first.width, first.height, first.size_bytes) == (60.0, 1920, 1080, 0)
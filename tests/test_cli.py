@@ -0,0 +1,48 @@
+'''vuconcat argument handling (`cli`).'''
+
+# System imports
+import sys
+
+# External imports
+import pytest
+
+# Local imports
+from video_processing_utils import cli
+
+
+@pytest.fixture
+def concat_argv(tmp_path, monkeypatch):
+    inputs = []
+    for name in ('a.mkv', 'b.mkv'):
+        (tmp_path / name).write_bytes(b'')
+        inputs += ['-i', str(tmp_path / name)]
+
+    def set_argv(*args: str) -> None:
+        monkeypatch.setattr(sys, 'argv', ['vuconcat', *inputs, *args])
+    return set_argv
+
+
+def test_existing_output_refused(tmp_path, concat_argv, capsys):
+    output = tmp_path / 'out.mkv'
+    output.write_bytes(b'')
+    concat_argv('-o', str(output))
+
+    with pytest.raises(SystemExit) as exc_info:
+        cli.cli_concat_parse_cli()
+    assert exc_info.value.code == 2
+    assert 'exists' in capsys.readouterr().err
+
+
+def test_existing_output_over_write(tmp_path, concat_argv):
+    output = tmp_path / 'out.mkv'
+    output.write_bytes(b'')
+    concat_argv('-o', str(output), '--over-write')
+
+    args = cli.cli_concat_parse_cli()
+    assert args.output == str(output)
+    assert len(args.input) == 2
+
+
+def test_stream_output_skips_exists_check(concat_argv):
+    concat_argv('-o', '-')
+    assert cli.cli_concat_parse_cli().output == '-'
@@ -0,0 +1,91 @@
+'''Re-encoding mismatching concat inputs (`ffmpeg_utils.normalize_concat_inputs`).'''
+
+# System imports
+import subprocess
+
+# External imports
+import pytest
+
+# Local imports
+from video_processing_utils import ffmpeg_utils
+from video_processing_utils.media_info import MediaInfo
+
+VIDEO = {
+    'codec_type': 'video', 'codec_name': 'mpeg4', 'width': 320, 'height': 240,
+    'pix_fmt': 'yuv420p', 'avg_frame_rate': '25/1',
+}
+COVER = {
+    'codec_type': 'video', 'codec_name': 'png', 'width': 64, 'height': 64,
+    'disposition': {'attached_pic': 1},
+}
+AUDIO = {'codec_type': 'audio', 'codec_name': 'aac', 'sample_rate': '44100', 'channel_layout': 'mono'}
+
+
+def media(filename: str, *streams: dict) -> MediaInfo:
+    return MediaInfo.from_probe(filename, {
+        'streams': [dict(stream, index=index) for index, stream in enumerate(streams)],
+    })
+
+
+def test_normalize_command_keeps_attached_pic_positions():
+    target = media('ref.mp4', VIDEO, COVER, AUDIO)
+    arguments = ffmpeg_utils._normalize_command('src.mkv', 'out.mp4', target, threads=2).arguments
+
+    assert arguments[arguments.index('-i') + 1:][:3] == ['src.mkv', '-i', 'ref.mp4']
+    maps = [arguments[i + 1] for i, arg in enumerate(arguments) if arg == '-map']
+    # Source video without its own cover art, the reference's cover, source audio.
+    assert maps == ['0:V:0', '1:1', '0:a:0']
+    options = dict(zip(arguments, arguments[1:]))
+    assert options['-c:1'] == 'copy'
+    assert options['-disposition:1'] == 'attached_pic'
+    assert options['-c:0'] == 'mpeg4'
+    assert options['-c:2'] == 'aac'
+
+
+def test_normalize_command_without_attached_pic():
+    arguments = ffmpeg_utils._normalize_command(
+        'src.mkv', 'out.mkv', media('ref.mkv', VIDEO, AUDIO), threads=1,
+    ).arguments
+
+    assert arguments.count('-i') == 1
+    assert [arguments[i + 1] for i, arg in enumerate(arguments) if arg == '-map'] == ['0:V:0', '0:a:0']
+
+
+def test_normalize_command_unknown_codec():
+    with pytest.raises(RuntimeError, match='encode'):
+        ffmpeg_utils._normalize_command(
+            'src.mkv', 'out.mkv', media('ref.mkv', dict(VIDEO, codec_name='cinepak')), threads=1,
+        )
+
+
+def add_cover(clip: str, tmp_path) -> str:
+    cover = tmp_path / 'cover.png'
+    subprocess.run([
+        'ffmpeg', '-v', 'error', '-y', '-f', 'lavfi', '-i', 'color=red:size=64x64',
+        '-frames:v', '1', str(cover),
+    ], check=True)
+    output = str(tmp_path / 'with_cover.mp4')
+    # Cover art between the video and the audio, so a dropped cover would
+    # shift the audio.
+    subprocess.run([
+        'ffmpeg', '-v', 'error', '-y', '-i', clip, '-i', str(cover),
+        '-map', '0:v', '-map', '1:v', '-map', '0:a', '-c', 'copy',
+        '-disposition:v:1', 'attached_pic', output,
+    ], check=True)
+    return output
+
+
+def test_normalize_with_attached_pic(make_video, tmp_path, uncached_probes):
+    reference = add_cover(make_video(name='ref.mp4', duration=2.0), tmp_path)
+    candidate = make_video(name='odd.mp4', duration=2.0, size='176x144')
+    input_media = [ffmpeg_utils.fetch_media_info(filename, profile='concat')
+                   for filename in (reference, candidate)]
+    assert ffmpeg_utils.find_concat_mismatch(input_media[0], input_media[1]) is not None
+
+    output_dir = tmp_path / 'normalized'
+    output_dir.mkdir()
+    normalized = ffmpeg_utils.normalize_concat_inputs(input_media, str(output_dir))
+
+    assert normalized[0] is input_media[0]
+    assert ffmpeg_utils.find_concat_mismatch(normalized[0], normalized[1]) is None
+    assert [stream.codec_type for stream in normalized[1].streams] == ['video', 'video', 'audio']
@@ -0,0 +1,167 @@
+'''Concat pre-flight: run splitting (`ffmpeg_utils.split_concat_runs`), the
+concat demuxer's file list and chapter metadata, and the checks
+`concat_ffmpeg_demuxer` makes before writing anything - the inputs come
+from the stub media backend, so no ffmpeg is needed.'''
+
+# System imports
+import os
+
+# External imports
+import ffmpeg
+import pytest
+
+# Local imports
+from video_processing_utils import ffmpeg_utils
+from video_processing_utils.media_info import MediaInfo
+
+H264 = {'codec_type': 'video', 'codec_name': 'h264', 'width': 1920, 'height': 1080}
+HEVC = dict(H264, codec_name='hevc')
+AAC = {'codec_type': 'audio', 'codec_name': 'aac', 'sample_rate': '48000', 'channel_layout': 'stereo'}
+COVER = {'codec_type': 'video', 'codec_name': 'png', 'width': 64, 'height': 64,
+         'disposition': {'attached_pic': 1}}
+SUBRIP = {'codec_type': 'subtitle', 'codec_name': 'subrip'}
+ASS = dict(SUBRIP, codec_name='ass')
+
+
+def media(filename: str, *streams: dict, duration: float = 60.0) -> MediaInfo:
+    return MediaInfo.from_probe(filename, {
+        'format': {'duration': str(duration)},
+        'streams': [dict(stream, index=index) for index, stream in enumerate(streams)],
+    })
+
+
+def test_split_concat_runs():
+    inputs = [
+        media('a1.mkv', H264, AAC),
+        media('a2.mkv', H264, AAC, COVER),    # extra streams don't count
+        media('b1.mkv', HEVC, AAC),
+        media('b2.mkv', HEVC, AAC),
+        media('c1.mkv', HEVC, dict(AAC, sample_rate='44100')),
+        media('a3.mkv', H264, AAC),
+    ]
+    runs = ffmpeg_utils.split_concat_runs(inputs)
+    assert [[item.filename for item in run] for run in runs] == \
+        [['a1.mkv', 'a2.mkv'], ['b1.mkv', 'b2.mkv'], ['c1.mkv'], ['a3.mkv']]
+
+
+def test_split_concat_runs_ignores_unchecked_streams():
+    inputs = [media('a.mkv', H264, SUBRIP), media('b.mkv', H264, ASS)]
+    assert ffmpeg_utils.split_concat_runs(inputs) == [inputs]
+    assert ffmpeg_utils.find_concat_mismatch(*inputs) is None
+
+
+def test_concat_part_filename():
+    assert ffmpeg_utils.concat_part_filename('/out/Show.mp4', 3) == '/out/Show-part3.mp4'
+    assert ffmpeg_utils.concat_part_filename('Show', 1) == 'Show-part1'
+
+
+def write_lists(tmp_path, run_media: list[MediaInfo], header: bytes) -> tuple[str, str]:
+    with open(tmp_path / 'list.txt', 'wb') as fp_filelist, \
+         open(tmp_path / 'metadata.txt', 'wb') as fp_metadata:
+        ffmpeg_utils._write_concat_lists(fp_filelist, fp_metadata, run_media, header)
+    return (
+        (tmp_path / 'list.txt').read_text(encoding='utf-8'),
+        (tmp_path / 'metadata.txt').read_text(encoding='utf-8'),
+    )
+
+
+def test_file_list_escaping(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    run_media = [
+        media("Don't Stop.mkv", H264),
+        media(str(tmp_path / 'sub' / 'plain.mkv'), H264),
+    ]
+    filelist, _ = write_lists(tmp_path, run_media, b';FFMETADATA1\n')
+    assert filelist.splitlines() == [
+        "file '" + str(tmp_path / "Don'\\''t Stop.mkv") + "'",
+        "file '" + str(tmp_path / 'sub' / 'plain.mkv') + "'",
+    ]
+
+
+def test_chapter_metadata(tmp_path):
+    run_media = [
+        media('/in/Part 1.mkv', H264, duration=10.0004),
+        media('/in/a=b; #c\\d.mkv', H264, duration=20.25),
+        media('/in/Part 3.mkv', H264, duration=5.0),
+    ]
+    _, metadata = write_lists(tmp_path, run_media, b';FFMETADATA1\ntitle=Show\n')
+    assert metadata.startswith(';FFMETADATA1\ntitle=Show\n')
+
+    chapters = [
+        dict(line.split('=', 1) for line in block.strip().splitlines()[1:])
+        for block in metadata.split('[CHAPTER]')[1:]
+    ]
+    assert [(chapter['START'], chapter['END']) for chapter in chapters] == \
+        [('0', '10000'), ('10000', '30250'), ('30250', '35250')]
+    assert chapters[0]['title'] == 'Part 1'
+    assert chapters[1]['title'] == 'a\\=b\\; \\#c\\\\d'
+    assert ffmpeg_utils._escape_ffmetadata('line\nbreak') == 'line\\\nbreak'
+
+
+@pytest.fixture
+def concat_stub(tmp_path, stub_backend, uncached_probes, monkeypatch):
+    """The stub backend, with the metadata dump (an ffmpeg run of its own)
+    stubbed too; fetched files are logged in `stub_backend.metadata`."""
+    stub_backend.metadata = []
+
+    def fetch_file_metadata(filename: str) -> bytes:
+        stub_backend.metadata.append(filename)
+        return b';FFMETADATA1\n'
+
+    monkeypatch.setattr(ffmpeg_utils, 'fetch_file_metadata', fetch_file_metadata)
+    return stub_backend
+
+
+def add_clips(stub_backend, tmp_path, codecs: str) -> list[str]:
+    return [
+        stub_backend.add(str(tmp_path / f'{n}.mkv'), streams=[
+            dict(H264 if codec == 'a' else HEVC, index=0), dict(AAC, index=1),
+        ])
+        for n, codec in enumerate(codecs)
+    ]
+
+
+def test_mismatch_fails_before_output(tmp_path, concat_stub):
+    inputs = add_clips(concat_stub, tmp_path, 'aaaab')
+    output = str(tmp_path / 'out.mkv')
+
+    with pytest.raises(RuntimeError, match="'codec_name' in stream 0 .*/4.mkv: h264 => hevc"):
+        ffmpeg_utils.concat_ffmpeg_demuxer(inputs, output, print_progress=False)
+    assert not os.path.exists(output)
+    # Every input probed exactly once.
+    assert concat_stub.count('probe') == len(inputs)
+    assert all(concat_stub.count('probe', path) == 1 for path in inputs)
+    assert concat_stub.metadata == [inputs[0]]
+
+
+def test_unknown_duration_fails_before_output(tmp_path, concat_stub):
+    inputs = add_clips(concat_stub, tmp_path, 'aaa')
+    del concat_stub.files[os.path.abspath(inputs[2])]['probe']['format']['duration']
+    output = str(tmp_path / 'out.mkv')
+
+    with pytest.raises(RuntimeError, match='duration of .*2.mkv'):
+        ffmpeg_utils.concat_ffmpeg_demuxer(inputs, output, print_progress=False)
+    assert not os.path.exists(output)
+
+
+def test_unreadable_input_fails_before_output(tmp_path, concat_stub):
+    inputs = add_clips(concat_stub, tmp_path, 'aa')
+    missing = str(tmp_path / 'missing.mkv')
+    output = str(tmp_path / 'out.mkv')
+
+    with pytest.raises(ffmpeg.errors.FFmpegError, match='missing.mkv'):
+        ffmpeg_utils.concat_ffmpeg_demuxer(inputs + [missing], output, print_progress=False)
+    assert not os.path.exists(output)
+
+
+def test_existing_split_output_fails_before_output(tmp_path, concat_stub):
+    inputs = add_clips(concat_stub, tmp_path, 'aabb')
+    output = str(tmp_path / 'out.mkv')
+    part2 = tmp_path / 'out-part2.mkv'
+    part2.write_bytes(b'keep')
+
+    with pytest.raises(RuntimeError, match='out-part2.mkv.* exists'):
+        ffmpeg_utils.concat_ffmpeg_demuxer(inputs, output, print_progress=False,
+                                           split_incompatible=True)
+    assert not os.path.exists(tmp_path / 'out-part1.mkv')
+    assert part2.read_bytes() == b'keep'
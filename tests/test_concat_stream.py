@@ -0,0 +1,121 @@
+'''Streaming concat output to a pipe (`concat_ffmpeg_demuxer` with '-' or a
+file descriptor, `vuconcat -o -`): the streamed output is fed to ffprobe,
+which has to see every stream and the chapters.'''
+
+# System imports
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import threading
+
+# External imports
+import pytest
+
+# Local imports
+from video_processing_utils import ffmpeg_utils
+
+
+@pytest.mark.parametrize('kwargs, message', [
+    ({'stream_format': 'avi'}, 'Unknown stream format'),
+    ({'split_incompatible': True}, 'split'),
+    ({'delete_input': True}, 'delete'),
+])
+def test_stream_refuses(kwargs, message):
+    options = dict(stream_format='matroska', split_incompatible=False, delete_input=False)
+    options.update(kwargs)
+    with pytest.raises(ValueError, match=message):
+        ffmpeg_utils._check_stream_output(5, **options)
+
+
+def test_regular_output_isnt_streamed():
+    assert ffmpeg_utils._check_stream_output('out.mkv', 'matroska', True, True) is None
+
+
+@pytest.fixture
+def concat_inputs(make_video):
+    return [
+        make_video(name=f'{name}.mkv', duration=2.0)
+        for name in ('Part One', 'Part Two')
+    ]
+
+
+def read_pipe(write_to_fd) -> bytes:
+    """Call `write_to_fd(fd)` with the write end of a pipe, returning
+    everything written to it."""
+    read_fd, write_fd = os.pipe()
+    chunks = []
+    reader = threading.Thread(target=lambda: chunks.extend(iter(
+        lambda: os.read(read_fd, 1 << 16), b'',
+    )))
+    reader.start()
+    try:
+        write_to_fd(write_fd)
+    finally:
+        os.close(write_fd)
+        reader.join()
+        os.close(read_fd)
+    return b''.join(chunks)
+
+
+# -count_packets makes ffprobe read its input to the end rather than stop
+# after the header.
+FFPROBE_STDIN = [
+    'ffprobe', '-v', 'error', '-print_format', 'json', '-show_streams', '-show_chapters',
+    '-count_packets', '-i', 'pipe:0',
+]
+
+
+def ffprobe_stdin(data: bytes) -> dict:
+    process = subprocess.run(FFPROBE_STDIN, input=data, capture_output=True, check=True)
+    return json.loads(process.stdout)
+
+
+def assert_concat_probe(probe: dict) -> None:
+    assert [stream['codec_type'] for stream in probe['streams']] == ['video', 'audio']
+    assert all(int(stream['nb_read_packets']) > 0 for stream in probe['streams'])
+    assert [chapter['tags']['title'] for chapter in probe['chapters']] == ['Part One', 'Part Two']
+    assert float(probe['chapters'][1]['start_time']) == pytest.approx(2.0, abs=0.1)
+
+
+@pytest.mark.parametrize('stream_format', list(ffmpeg_utils.STREAM_FORMATS))
+def test_stream_to_fd(concat_inputs, uncached_probes, stream_format):
+    outputs = []
+    data = read_pipe(lambda fd: outputs.extend(ffmpeg_utils.concat_ffmpeg_demuxer(
+        concat_inputs, fd, print_progress=False, stream_format=stream_format,
+    )))
+
+    assert len(outputs) == 1
+    assert_concat_probe(ffprobe_stdin(data))
+
+
+def test_async_stream_to_fd(concat_inputs, uncached_probes):
+    data = read_pipe(lambda fd: asyncio.run(ffmpeg_utils.async_concat_ffmpeg_demuxer(
+        concat_inputs, fd, print_progress=False, stream_format='mp4',
+    )))
+    assert_concat_probe(ffprobe_stdin(data))
+
+
+@pytest.mark.parametrize('stream_format', list(ffmpeg_utils.STREAM_FORMATS))
+def test_vuconcat_to_stdout(concat_inputs, stream_format):
+    src_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+    arguments = [
+        sys.executable, '-c',
+        'from video_processing_utils.cli import cli_concat_main; cli_concat_main()',
+    ]
+    for filename in concat_inputs:
+        arguments += ['-i', filename]
+    arguments += ['-o', '-', '--stream-format', stream_format]
+
+    # ffprobe reads vuconcat's stdout straight off the pipe.
+    vuconcat = subprocess.Popen(arguments, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                env={**os.environ, 'PYTHONPATH': src_dir})
+    try:
+        ffprobe = subprocess.run(FFPROBE_STDIN, stdin=vuconcat.stdout,
+                                 capture_output=True, check=True)
+    finally:
+        vuconcat.stdout.close()
+        _, stderr = vuconcat.communicate()
+    assert vuconcat.returncode == 0, stderr.decode(errors='replace')
+    assert_concat_probe(json.loads(ffprobe.stdout))
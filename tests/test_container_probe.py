@@ -0,0 +1,121 @@
+'''Container header fast path (`container_probe`).'''
+
+# System imports
+import struct
+import subprocess
+
+# External imports
+import pytest
+
+# Local imports
+from video_processing_utils import container_probe, ffmpeg_utils
+
+
+def mp4_box(box_type: bytes, payload: bytes) -> bytes:
+    return struct.pack('>I4s', 8 + len(payload), box_type) + payload
+
+
+def mp4_trak(handler_type: bytes, sample_format: bytes) -> bytes:
+    hdlr = mp4_box(b'hdlr', bytes(8) + handler_type + bytes(12))
+    sample_entry = struct.pack('>I4s', 16, sample_format) + bytes(8)
+    stsd = mp4_box(b'stsd', struct.pack('>II', 0, 1) + sample_entry)
+    minf = mp4_box(b'minf', mp4_box(b'stbl', stsd))
+    return mp4_box(b'trak', mp4_box(b'mdia', hdlr + minf))
+
+
+def mp4_file(*traks: bytes, moov_first: bool = False) -> bytes:
+    ftyp = mp4_box(b'ftyp', b'isom' + bytes(4) + b'isomiso2')
+    moov = mp4_box(b'moov', mp4_box(b'mvhd', bytes(100)) + b''.join(traks))
+    mdat = mp4_box(b'mdat', bytes(4096))
+    return ftyp + (moov + mdat if moov_first else mdat + moov)
+
+
+def ebml_element(element_id: int, payload: bytes) -> bytes:
+    id_bytes = element_id.to_bytes((element_id.bit_length() + 7) // 8, 'big')
+    # 8-byte size, marker in the first byte.
+    return id_bytes + (len(payload) | (1 << 56)).to_bytes(8, 'big') + payload
+
+
+def mkv_file(*tracks: tuple[int, str], unknown_segment_size: bool = False) -> bytes:
+    header = ebml_element(container_probe.EBML_HEADER_ID, ebml_element(0x4282, b'matroska'))
+    entries = b''.join(
+        ebml_element(container_probe.MKV_TRACK_ENTRY_ID,
+                     ebml_element(0xD7, bytes([number + 1])) +
+                     ebml_element(container_probe.MKV_TRACK_TYPE_ID, bytes([track_type])) +
+                     ebml_element(container_probe.MKV_CODEC_ID_ID, codec_id.encode('ascii')))
+        for number, (track_type, codec_id) in enumerate(tracks)
+    )
+    body = (
+        ebml_element(0x1549A966, bytes(32)) +    # Info
+        ebml_element(container_probe.MKV_TRACKS_ID, entries) +
+        ebml_element(container_probe.MKV_CLUSTER_ID, bytes(4096))
+    )
+    if unknown_segment_size:
+        segment = container_probe.MKV_SEGMENT_ID.to_bytes(4, 'big') + b'\x01' + b'\xff' * 7 + body
+    else:
+        segment = ebml_element(container_probe.MKV_SEGMENT_ID, body)
+    return header + segment
+
+
+@pytest.fixture
+def write(tmp_path):
+    def write_file(name: str, data: bytes) -> str:
+        path = tmp_path / name
+        path.write_bytes(data)
+        return str(path)
+    return write_file
+
+
+@pytest.mark.parametrize('moov_first', [False, True])
+def test_mp4_tracks(write, moov_first):
+    filename = write('clip.mp4', mp4_file(
+        mp4_trak(b'vide', b'hvc1'), mp4_trak(b'soun', b'mp4a'), mp4_trak(b'tmcd', b'tmcd'),
+        moov_first=moov_first,
+    ))
+    assert container_probe.read_track_codecs(filename) == [
+        ('video', 'hevc'), ('audio', None), ('data', None),
+    ]
+    assert container_probe.read_video_codecs(filename) == ['hevc']
+
+
+def test_mp4_ambiguous_video_codec_needs_ffprobe(write):
+    filename = write('clip.mp4', mp4_file(mp4_trak(b'vide', b'mp4v')))
+    assert container_probe.read_track_codecs(filename) == [('video', None)]
+    assert container_probe.read_video_codecs(filename) is None
+
+
+@pytest.mark.parametrize('unknown_segment_size', [False, True])
+def test_matroska_tracks(write, unknown_segment_size):
+    filename = write('clip.mkv', mkv_file(
+        (1, 'V_MPEGH/ISO/HEVC'), (2, 'A_AAC/MPEG4/LC'), (0x11, 'S_TEXT/UTF8'),
+        unknown_segment_size=unknown_segment_size,
+    ))
+    assert container_probe.read_track_codecs(filename) == [
+        ('video', 'hevc'), ('audio', 'aac'), ('subtitle', 'subrip'),
+    ]
+    assert container_probe.read_video_codecs(filename) == ['hevc']
+
+
+@pytest.mark.parametrize('data', [
+    b'',
+    b'not a media file at all',
+    mp4_file(mp4_trak(b'vide', b'avc1'))[:-40],      # truncated moov
+    mkv_file((1, 'V_VP9'))[:60],                      # truncated before Tracks
+    struct.pack('>I4s', 4, b'ftyp') + bytes(64),      # box smaller than its header
+])
+def test_unreadable_headers_need_ffprobe(write, data):
+    assert container_probe.read_track_codecs(write('bad.bin', data)) is None
+
+
+@pytest.mark.parametrize('name', ['clip.mkv', 'clip.webm'])
+def test_matches_ffprobe(make_video, uncached_probes, name):
+    vcodec, acodec = ('libvpx-vp9', 'libopus') if name.endswith('.webm') else ('mpeg4', 'aac')
+    try:
+        filename = make_video(name=name, duration=1.0, vcodec=vcodec, acodec=acodec)
+    except subprocess.CalledProcessError:             # encoder not built in
+        pytest.skip(f"ffmpeg can't encode {vcodec}/{acodec}")
+
+    data = ffmpeg_utils.fetch_file_data(filename, profile='codec')
+    assert container_probe.read_track_codecs(filename) == [
+        (stream['codec_type'], stream['codec_name']) for stream in data['streams']
+    ]
@@ -0,0 +1,55 @@
+'''Vectorized frame dHash (`dup_finder.dhash_frames`) against the
+pure-Python reference `dup_finder._dhash_from_frame`.'''
+
+# External imports
+import numpy
+import pytest
+
+# Local imports
+from video_processing_utils import dup_finder
+
+FRAME_BYTES = dup_finder.FRAME_HASH_BYTES
+
+
+def reference_hashes(raw_frames: bytes) -> list[int]:
+    return [
+        dup_finder._dhash_from_frame(raw_frames[start:start + FRAME_BYTES])
+        for start in range(0, len(raw_frames) - FRAME_BYTES + 1, FRAME_BYTES)
+    ]
+
+
+@pytest.mark.parametrize('levels', [256, 3, 1])
+def test_matches_reference(levels):
+    # Few grey levels make lots of equal neighbours - equal is "not
+    # brighter", so those bits must stay clear.
+    rng = numpy.random.default_rng(levels)
+    raw_frames = rng.integers(0, levels, size=2000 * FRAME_BYTES, dtype=numpy.uint8).tobytes()
+
+    hashes = dup_finder.dhash_frames(raw_frames)
+    assert hashes.dtype == numpy.uint64
+    assert hashes.tolist() == reference_hashes(raw_frames)
+
+
+def test_bit_order():
+    # Only the first pixel of the first row is brighter than its neighbour:
+    # the most significant bit.
+    frame = bytearray(FRAME_BYTES)
+    frame[0] = 1
+    assert dup_finder.dhash_frames(bytes(frame)).tolist() == [1 << 63]
+
+    # ... and only the last comparison of the last row: the least.
+    frame = bytearray(FRAME_BYTES)
+    frame[-2] = 1
+    assert dup_finder.dhash_frames(bytes(frame)).tolist() == [1]
+
+
+def test_partial_frames_and_views():
+    rng = numpy.random.default_rng(0)
+    raw_frames = rng.integers(0, 256, size=10 * FRAME_BYTES + 17, dtype=numpy.uint8).tobytes()
+
+    expected = reference_hashes(raw_frames)
+    assert len(expected) == 10
+    assert dup_finder.dhash_frames(raw_frames).tolist() == expected
+    assert dup_finder.dhash_frames(memoryview(raw_frames)).tolist() == expected
+    assert len(dup_finder.dhash_frames(b'')) == 0
+    assert len(dup_finder.dhash_frames(raw_frames[:FRAME_BYTES - 1])) == 0
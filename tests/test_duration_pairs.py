@@ -0,0 +1,112 @@
+'''The duration prefilter (`dup_finder.iter_duration_close_pairs`,
+`duration_close_summary`, `iter_duration_close_cross_pairs`) against
+brute-force all-pairs comparison, and at library scale, on synthetic
+`VideoInfo` records.'''
+
+# System imports
+import itertools
+import random
+import time
+
+# External imports
+import numpy
+import pytest
+
+# Local imports
+from video_processing_utils import dup_finder
+
+
+def make_infos(durations: list[float], prefix: str = 'v') -> dict[str, dup_finder.VideoInfo]:
+    return {
+        f'{prefix}{n}.mkv': dup_finder.VideoInfo(
+            path=f'{prefix}{n}.mkv', duration=duration, width=1920, height=1080, size_bytes=1,
+        )
+        for n, duration in enumerate(durations)
+    }
+
+
+def random_durations(rng: random.Random, count: int) -> list[float]:
+    """Durations with plenty of ties and exact max_duration_diff gaps (from
+    a coarse grid), as well as arbitrary floats."""
+    if rng.random() < 0.5:
+        return [rng.randrange(0, 40) * 0.5 for _ in range(count)]
+    return [rng.uniform(0, 60) for _ in range(count)]
+
+
+def brute_force_pairs(infos, max_duration_diff) -> list[tuple[str, str]]:
+    return [
+        (a.path, b.path)
+        for a, b in itertools.combinations(infos.values(), 2)
+        if abs(a.duration - b.duration) <= max_duration_diff
+    ]
+
+
+@pytest.mark.parametrize('seed', range(200))
+def test_pairs_match_brute_force(seed):
+    rng = random.Random(seed)
+    infos = make_infos(random_durations(rng, rng.randrange(0, 40)))
+    max_duration_diff = rng.choice([0.0, 0.5, 1.0, 2.5, rng.uniform(0, 10)])
+
+    expected = brute_force_pairs(infos, max_duration_diff)
+    pairs = list(dup_finder.iter_duration_close_pairs(infos, max_duration_diff))
+    assert sorted(pairs) == sorted(expected)
+    assert len(set(pairs)) == len(pairs)
+
+    paired, num_pairs = dup_finder.duration_close_summary(infos, max_duration_diff)
+    assert num_pairs == len(expected)
+    assert paired == {path for pair in expected for path in pair}
+
+
+@pytest.mark.parametrize('seed', range(200))
+def test_cross_pairs_match_brute_force(seed):
+    rng = random.Random(seed)
+    infos_a = make_infos(random_durations(rng, rng.randrange(0, 30)), 'a')
+    infos_b = make_infos(random_durations(rng, rng.randrange(0, 30)), 'b')
+    max_duration_diff = rng.choice([0.0, 0.5, 1.0, 2.5, rng.uniform(0, 10)])
+
+    expected = [
+        (a.path, b.path)
+        for a, b in itertools.product(infos_a.values(), infos_b.values())
+        if abs(a.duration - b.duration) <= max_duration_diff
+    ]
+    pairs = list(dup_finder.iter_duration_close_cross_pairs(infos_a, infos_b, max_duration_diff))
+    assert sorted(pairs) == sorted(expected)
+    # In infos_a order.
+    order = list(infos_a)
+    assert [order.index(a) for a, _ in pairs] == sorted(order.index(a) for a, _ in pairs)
+
+
+def test_library_scale():
+    # A 100k-file library: durations spread over two hours.
+    rng = numpy.random.default_rng(19)
+    durations = rng.uniform(60, 7200, size=100_000)
+    infos = make_infos(durations.tolist())
+    max_duration_diff = 0.5
+
+    # Pair count, counted independently.
+    ordered = numpy.sort(durations)
+    expected = int((
+        numpy.searchsorted(ordered, ordered + max_duration_diff, side='right') -
+        numpy.arange(1, len(ordered) + 1)
+    ).sum())
+
+    start = time.perf_counter()
+    paired, num_pairs = dup_finder.duration_close_summary(infos, max_duration_diff)
+    num_yielded = sum(1 for _ in dup_finder.iter_duration_close_pairs(infos, max_duration_diff))
+    elapsed = time.perf_counter() - start
+
+    assert num_pairs == num_yielded == expected
+    assert len(paired) <= len(infos)
+    # All n^2 / 2 comparisons would be 5 * 10^9; the sweep is a few
+    # seconds even on a slow machine.
+    assert elapsed < 30, f"took {elapsed:.1f} s"
+
+    library = make_infos(rng.uniform(60, 7200, size=1000).tolist(), 'lib')
+    num_cross = sum(1 for _ in dup_finder.iter_duration_close_cross_pairs(
+        library, infos, max_duration_diff,
+    ))
+    library_durations = numpy.array([info.duration for info in library.values()])
+    assert num_cross == int((
+        numpy.searchsorted(ordered, library_durations + max_duration_diff, side='right') -
+        numpy.searchsorted(ordered, library_durations - max_duration_diff, side='left')
+    ).sum())
@@ -0,0 +1,92 @@
+'''Decoder output streaming (`ffmpeg_utils._iter_fixed_chunks`), with small
+Python child processes standing in for ffmpeg.'''
+
+# System imports
+import sys
+import time
+
+# External imports
+import ffmpeg
+import pytest
+
+# Local imports
+from video_processing_utils import ffmpeg_utils
+
+
+def child(source: str) -> list[str]:
+    return [sys.executable, '-c', source]
+
+
+def collect(arguments: list[str], chunk_size: int) -> list[bytes]:
+    # The chunks share one buffer - copy each before the next is read.
+    return [bytes(chunk) for chunk in ffmpeg_utils._iter_fixed_chunks(arguments, chunk_size)]
+
+
+@pytest.mark.parametrize('size', [0, 1, 7, 8, 9, 64, 1000])
+def test_chunks(size):
+    data = bytes(range(256)) * 4
+    source = f'''
+import sys
+data = {data[:size]!r}
+# Dribbled out, so reads come back short.
+for start in range(0, len(data), 5):
+    sys.stdout.buffer.write(data[start:start + 5])
+    sys.stdout.buffer.flush()
+'''
+    chunks = collect(child(source), 8)
+    assert b''.join(chunks) == data[:size]
+    assert [len(chunk) for chunk in chunks] == [8] * (size // 8) + ([size % 8] if size % 8 else [])
+
+
+def test_success_after_closing_stdout():
+    # Output ends well before the process does (as ffmpeg finishing its
+    # trailer and log): not an error.
+    source = '''
+import os, sys, time
+sys.stdout.buffer.write(b'abcdefgh')
+sys.stdout.flush()
+os.close(1)
+time.sleep(0.2)
+sys.stderr.write('done')
+'''
+    assert collect(child(source), 4) == [b'abcd', b'efgh']
+
+
+def test_failure_raises_with_stderr():
+    source = '''
+import sys
+sys.stdout.buffer.write(b'abc')
+sys.stderr.write('in.mkv: Invalid data found when processing input')
+sys.exit(1)
+'''
+    with pytest.raises(ffmpeg.errors.FFmpegError, match='Invalid data'):
+        collect(child(source), 2)
+
+
+def test_stopping_early_kills_process(tmp_path):
+    marker = tmp_path / 'finished'
+    source = f'''
+import sys, time
+sys.stdout.buffer.write(b'x' * 16)
+sys.stdout.flush()
+time.sleep(5)
+open({str(marker)!r}, 'w').close()
+'''
+    chunks = ffmpeg_utils._iter_fixed_chunks(child(source), 4)
+    start = time.monotonic()
+    assert bytes(next(chunks)) == b'xxxx'
+    chunks.close()
+    assert time.monotonic() - start < 4
+    assert not marker.exists()
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason="uses os.kill")
+def test_process_killed_raises():
+    source = '''
+import os, signal, sys
+sys.stdout.buffer.write(b'abcd')
+sys.stdout.flush()
+os.kill(os.getpid(), signal.SIGKILL)
+'''
+    with pytest.raises(ffmpeg.errors.FFmpegError):
+        collect(child(source), 4)
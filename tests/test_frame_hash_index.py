@@ -0,0 +1,150 @@
+'''The frame-hash multi-index (`dup_finder.FrameHashIndex`) against
+brute-force all-frames comparison, on synthetic libraries of random hash
+sequences with planted near-duplicates.'''
+
+# System imports
+import itertools
+
+# External imports
+import numpy
+import pytest
+
+# Local imports
+from video_processing_utils import dup_finder
+
+# Hashes this close to zero are near-flat frames, which are never matched.
+FLAT_FRAMES = numpy.array([0, 1, 0b1011, 1 << 40], dtype=numpy.uint64)
+
+
+def random_hashes(rng: numpy.random.Generator, count: int) -> numpy.ndarray:
+    return numpy.frombuffer(rng.bytes(8 * count), dtype=numpy.uint64).copy()
+
+
+def flip_bits(rng: numpy.random.Generator, hashes: numpy.ndarray, max_bits: int) -> numpy.ndarray:
+    """`hashes`, each with up to `max_bits` distinct random bits flipped."""
+    flipped = hashes.copy()
+    for position in range(len(flipped)):
+        bits = rng.choice(dup_finder.HASH_BITS, size=rng.integers(0, max_bits + 1), replace=False)
+        for bit in bits:
+            flipped[position] ^= numpy.uint64(1) << numpy.uint64(bit)
+    return flipped
+
+
+def make_library(rng: numpy.random.Generator, max_flips: int) -> dict[str, numpy.ndarray]:
+    """Unrelated files, plus near-duplicates of some of them: a slice of
+    the source with up to `max_flips` bits flipped per frame, between
+    frames of their own. Every file has a few flat frames too."""
+    library = {}
+    for n in range(rng.integers(5, 25)):
+        library[f'file{n}'] = random_hashes(rng, rng.integers(1, 60))
+    for n, (key, source) in enumerate(list(library.items())[:rng.integers(1, 6)]):
+        start = rng.integers(0, len(source))
+        stop = rng.integers(start + 1, len(source) + 1)
+        library[f'copy{n}'] = numpy.concatenate((
+            random_hashes(rng, rng.integers(0, 10)),
+            flip_bits(rng, source[start:stop], max_flips),
+            random_hashes(rng, rng.integers(0, 10)),
+        ))
+    return {
+        key: numpy.concatenate((sequence, rng.permutation(FLAT_FRAMES)[:rng.integers(0, 3)]))
+        for key, sequence in library.items()
+    }
+
+
+def brute_force_counts(library: dict[str, numpy.ndarray], sequence: numpy.ndarray,
+                       radius: int) -> dict[str, int]:
+    """For each file, how many of `sequence`'s informative frames are
+    within `radius` of one of its informative frames."""
+    def informative(hashes):
+        return hashes[dup_finder._bit_counts(hashes) >= dup_finder.INDEX_MIN_FRAME_BITS]
+
+    sequence = informative(sequence)
+    counts = {}
+    for key, hashes in library.items():
+        hashes = informative(hashes)
+        if not len(sequence) or not len(hashes):
+            continue
+        distances = dup_finder._bit_counts(
+            (sequence[:, None] ^ hashes[None, :]).ravel()
+        ).reshape(len(sequence), len(hashes))
+        count = int((distances <= radius).any(axis=1).sum())
+        if count:
+            counts[key] = count
+    return counts
+
+
+def build_index(library: dict[str, numpy.ndarray], **options) -> dup_finder.FrameHashIndex:
+    index = dup_finder.FrameHashIndex(**options)
+    for key, sequence in library.items():
+        index.add(key, sequence)
+    return index
+
+
+@pytest.mark.parametrize('seed', range(25))
+def test_exact_within_pigeonhole_radius(seed):
+    # 16 chunks: two frames within 15 bits always agree on one exactly, so
+    # with radius 8 nothing within the radius can be missed.
+    rng = numpy.random.default_rng(seed)
+    library = make_library(rng, max_flips=8)
+    index = build_index(library, num_chunks=16, radius=8)
+
+    for key, sequence in library.items():
+        assert index.query(sequence) == brute_force_counts(library, sequence, 8)
+
+    expected_pairs = []
+    for (key_a, seq_a), (key_b, _) in itertools.combinations(library.items(), 2):
+        shared = brute_force_counts({key_b: library[key_b]}, seq_a, 8).get(key_b, 0)
+        if shared >= dup_finder.MIN_SHARED_FRAMES:
+            expected_pairs.append((key_a, key_b, shared))
+    assert list(index.iter_candidate_pairs()) == expected_pairs
+
+
+@pytest.mark.parametrize('seed', range(25))
+def test_default_index_finds_planted_duplicates(seed):
+    # The default 4 chunks guarantee frames within 3 bits; anything found
+    # beyond that is a bonus, but never more than brute force finds.
+    rng = numpy.random.default_rng(seed)
+    library = make_library(rng, max_flips=dup_finder.INDEX_CHUNKS - 1)
+    index = build_index(library)
+
+    for key, sequence in library.items():
+        found = index.query(sequence)
+        expected = brute_force_counts(library, sequence, dup_finder.FRAME_MATCH_RADIUS)
+        assert set(found) <= set(expected)
+        assert all(count <= expected[other] for other, count in found.items())
+        if key.startswith('copy'):
+            source = f'file{key[4:]}'
+            assert found[source] == expected[source]
+
+    pairs = {(key_a, key_b) for key_a, key_b, _ in index.iter_candidate_pairs(min_shared_frames=1)}
+    copies = [key for key in library if key.startswith('copy')]
+    assert {(f'file{key[4:]}', key) for key in copies} <= pairs
+
+
+def test_unrelated_files_are_not_paired():
+    rng = numpy.random.default_rng(2020)
+    library = {f'file{n}': random_hashes(rng, 200) for n in range(200)}
+    # The same black/flat frames in every file don't make them duplicates.
+    library = {key: numpy.concatenate((sequence, FLAT_FRAMES)) for key, sequence in library.items()}
+    index = build_index(library)
+
+    assert list(index.iter_candidate_pairs()) == []
+    probe = random_hashes(rng, 200)
+    assert index.query(probe) == brute_force_counts(library, probe, dup_finder.FRAME_MATCH_RADIUS) == {}
+    assert index.query(FLAT_FRAMES) == {}
+
+
+def test_min_shared_frames():
+    rng = numpy.random.default_rng(7)
+    source = random_hashes(rng, 50)
+    index = build_index({'source': source, 'other': random_hashes(rng, 50)})
+
+    partial = numpy.concatenate((flip_bits(rng, source[:4], 3), random_hashes(rng, 20)))
+    assert index.query(partial) == {'source': 4}
+    assert index.query(partial, min_shared_frames=4) == {'source': 4}
+    assert index.query(partial, min_shared_frames=5) == {}
+
+
+def test_chunks_must_divide_hash_bits():
+    with pytest.raises(ValueError, match='divide'):
+        dup_finder.FrameHashIndex(num_chunks=5)
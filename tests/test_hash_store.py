@@ -0,0 +1,162 @@
+'''Persistent frame-hash sequence store (`hash_store.HashStore`): lookups
+keyed by file identity, and eviction scoped to the scanned directory.'''
+
+# System imports
+import os
+
+# External imports
+import numpy
+import pytest
+
+# Local imports
+from video_processing_utils import hash_store
+
+SEQUENCE = numpy.array([0, 1, 2**63, 2**64 - 1], dtype=numpy.uint64)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = hash_store.HashStore(str(tmp_path / 'store'))
+    yield store
+    store.close()
+
+
+def make_files(directory, *names: str) -> list[str]:
+    paths = []
+    for name in names:
+        path = directory / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b'x' * 10)
+        paths.append(str(path))
+    return paths
+
+
+def test_hit(store, tmp_path):
+    path, = make_files(tmp_path, 'clip.mkv')
+    assert store.get(path, 'fps:2') is None
+    store.put(path, 'fps:2', SEQUENCE)
+
+    stored = store.get(path, 'fps:2')
+    assert stored.dtype == numpy.uint64
+    numpy.testing.assert_array_equal(stored, SEQUENCE)
+    assert store.get(path, 'fps:1') is None
+    assert (store.hits, store.misses) == (1, 2)
+
+
+def test_persists(tmp_path):
+    path, = make_files(tmp_path, 'clip.mkv')
+    first = hash_store.HashStore(str(tmp_path / 'store'))
+    first.put(path, 'fps:2', SEQUENCE)
+    first.close()
+
+    second = hash_store.HashStore(str(tmp_path / 'store'))
+    numpy.testing.assert_array_equal(second.get(path, 'fps:2'), SEQUENCE)
+    second.close()
+
+
+def test_schema_change_discards(tmp_path, monkeypatch):
+    path, = make_files(tmp_path, 'clip.mkv')
+    first = hash_store.HashStore(str(tmp_path / 'store'))
+    first.put(path, 'fps:2', SEQUENCE)
+    first.close()
+
+    monkeypatch.setattr(hash_store.HashStore, 'SCHEMA_VERSION', hash_store.SCHEMA_VERSION + 1)
+    second = hash_store.HashStore(str(tmp_path / 'store'))
+    assert second.get(path, 'fps:2') is None
+    second.close()
+
+
+def test_miss_after_size_change(store, tmp_path):
+    path, = make_files(tmp_path, 'clip.mkv')
+    store.put(path, 'fps:2', SEQUENCE)
+    stat = os.stat(path)
+    with open(path, 'ab') as fp:
+        fp.write(b'more')
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert store.get(path, 'fps:2') is None
+
+
+def test_miss_after_mtime_change(store, tmp_path):
+    path, = make_files(tmp_path, 'clip.mkv')
+    store.put(path, 'fps:2', SEQUENCE)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert store.get(path, 'fps:2') is None
+
+    # Re-storing picks up the new identity.
+    store.put(path, 'fps:2', SEQUENCE[:2])
+    numpy.testing.assert_array_equal(store.get(path, 'fps:2'), SEQUENCE[:2])
+
+
+def test_invalidate_and_clear(store, tmp_path):
+    first, second = make_files(tmp_path, 'a.mkv', 'b.mkv')
+    store.put(first, 'fps:2', SEQUENCE)
+    store.put(first, 'audio', SEQUENCE)
+    store.put(second, 'fps:2', SEQUENCE)
+
+    store.invalidate(first)
+    assert store.get(first, 'fps:2') is None
+    assert store.get(first, 'audio') is None
+    assert store.get(second, 'fps:2') is not None
+
+    store.clear()
+    assert store.get(second, 'fps:2') is None
+
+
+def stored_paths(store) -> set[str]:
+    return {row[0] for row in store._conn.execute('SELECT path FROM sequence')}
+
+
+def test_evict_only_within_scanned_root(store, tmp_path):
+    library = tmp_path / 'library'
+    kept, deleted, nested = make_files(library, 'kept.mkv', 'deleted.mkv', 'season/nested.mkv')
+    # Outside the scanned root: another library, a sibling sharing the
+    # root's name as a prefix, and a share that isn't mounted.
+    other, sibling = make_files(tmp_path, 'other/film.mkv', 'library2/film.mkv')
+    unmounted = str(tmp_path / 'share' / 'film.mkv')
+    for path in (kept, deleted, nested, other, sibling):
+        store.put(path, 'fps:2', SEQUENCE)
+    store._conn.execute(
+        'INSERT INTO sequence VALUES (?, ?, 1, 1, 1, ?)', (unmounted, 'fps:2', b''),
+    )
+    os.remove(deleted)
+    os.remove(other)
+
+    evicted = store.evict_missing(str(library), [kept, nested])
+    assert evicted == 1
+    assert stored_paths(store) == {kept, nested, other, sibling, unmounted}
+
+
+def test_evict_non_recursive_keeps_subdirectories(store, tmp_path):
+    library = tmp_path / 'library'
+    kept, deleted, nested = make_files(library, 'kept.mkv', 'deleted.mkv', 'season/nested.mkv')
+    for path in (kept, deleted, nested):
+        store.put(path, 'fps:2', SEQUENCE)
+
+    # A non-recursive scan never sees season/, so nested.mkv isn't gone.
+    assert store.evict_missing(str(library), [kept], recursive=False) == 1
+    assert stored_paths(store) == {kept, nested}
+
+    assert store.evict_missing(str(library), [kept]) == 1
+    assert stored_paths(store) == {kept}
+
+
+def test_evict_relative_root(store, tmp_path, monkeypatch):
+    kept, deleted = make_files(tmp_path / 'library', 'kept.mkv', 'deleted.mkv')
+    for path in (kept, deleted):
+        store.put(path, 'fps:2', SEQUENCE)
+    monkeypatch.chdir(tmp_path)
+
+    assert store.evict_missing('library', [os.path.join('library', 'kept.mkv')]) == 1
+    assert stored_paths(store) == {kept}
+
+
+def test_empty_scan_evicts_nothing(store, tmp_path):
+    library = tmp_path / 'library'
+    paths = make_files(library, 'a.mkv', 'b.mkv')
+    for path in paths:
+        store.put(path, 'fps:2', SEQUENCE)
+
+    # An unmounted mount point scans as an empty directory.
+    assert store.evict_missing(str(library), []) == 0
+    assert stored_paths(store) == set(paths)
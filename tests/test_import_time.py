@@ -0,0 +1,65 @@
+'''Start-up cost of the entry points: what each one imports, and how long
+that takes (`python -X importtime`).
+
+The budgets are several times what importing takes on a typical machine,
+so only a regression that pulls a heavy dependency back in trips them;
+the module lists are the precise check.
+'''
+
+# System imports
+import importlib.util
+import os
+import subprocess
+import sys
+
+# External imports
+import pytest
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+
+# Modules that make up most of the cost the entry points used to pay up
+# front.
+HEAVY_MODULES = {'ffmpeg', 'numpy', 'asyncio', 'sqlite3', 'psutil', 'av'}
+
+# (module, modules it must not import, import time budget in ms)
+ENTRY_POINTS = [
+    ('video_processing_utils', HEAVY_MODULES, 25),
+    ('video_processing_utils.check_media', HEAVY_MODULES, 150),
+    ('video_processing_utils.embed_subtitles', HEAVY_MODULES, 150),
+    ('video_processing_utils.cli',
+     {'numpy', 'psutil', 'av', 'video_processing_utils.convert_video'}, 400),
+    ('video_processing_utils.convert_container', {'numpy', 'psutil', 'av'}, 400),
+    ('video_processing_utils.convert_video', {'numpy', 'av'}, 500),
+    ('video_processing_utils.dup_finder',
+     {'psutil', 'av', 'video_processing_utils.convert_video', 'video_processing_utils.cli'}, 800),
+]
+
+
+def import_times(module: str) -> dict[str, int]:
+    """Cumulative import time, in microseconds, of every module imported by
+    a fresh interpreter importing `module`."""
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        env={**os.environ, 'PYTHONPATH': SRC_DIR}, capture_output=True, text=True, check=True,
+    )
+    times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+@pytest.mark.parametrize('module, forbidden, budget_ms', ENTRY_POINTS,
+                         ids=[entry[0] for entry in ENTRY_POINTS])
+def test_entry_point_imports(module, forbidden, budget_ms):
+    if module == 'video_processing_utils.convert_video' and \
+       importlib.util.find_spec('psutil') is None:
+        pytest.skip("psutil not installed")
+
+    # Best of a few runs, to ride out a busy machine.
+    runs = [import_times(module) for _ in range(3)]
+    assert not forbidden & set(runs[0]), f"{module} imports {sorted(forbidden & set(runs[0]))}"
+    best_ms = min(times[module] for times in runs) / 1000
+    assert best_ms <= budget_ms, f"importing {module} took {best_ms:.1f} ms"
@@ -0,0 +1,82 @@
+'''Keyframe-only frame sampling (`vudupcheck --sampling keyframe`): the
+decode command, hash store separation, and - with ffmpeg - how two
+encodes of the same content with different GOPs score against each other
+in either mode.'''
+
+# External imports
+import pytest
+
+# Local imports
+from video_processing_utils import dup_finder, ffmpeg_utils
+
+
+@pytest.fixture
+def decode_arguments(monkeypatch):
+    """Capture the subprocess backend's decode command lines instead of
+    running them."""
+    commands = []
+
+    def record(arguments, chunk_size):
+        commands.append(arguments)
+        return iter(())
+    monkeypatch.setattr(ffmpeg_utils, '_iter_fixed_chunks', record)
+    return commands
+
+
+def input_options(arguments: list[str]) -> list[str]:
+    return arguments[:arguments.index('-i')]
+
+
+def test_keyframe_decode_command(decode_arguments):
+    backend = ffmpeg_utils.SubprocessBackend()
+    list(backend.iter_gray_frames('in.mkv', 0.5, 9, 8))
+    list(backend.iter_gray_frames('in.mkv', 0.5, 9, 8, keyframes_only=True))
+
+    fps_command, keyframe_command = decode_arguments
+    assert '-skip_frame' not in fps_command
+    options = input_options(keyframe_command)
+    assert options[options.index('-skip_frame') + 1] == 'nokey'
+    assert options[options.index('-lowres') + 1] == str(ffmpeg_utils.KEYFRAME_LOWRES)
+    # Same output either way - one frame per sample slot.
+    assert fps_command[fps_command.index('-i'):] == keyframe_command[keyframe_command.index('-i'):]
+
+
+def test_hash_store_kinds():
+    fps_kind = dup_finder.hash_store_kind(2.0)
+    keyframe_kind = dup_finder.hash_store_kind(2.0, 'keyframe')
+    assert keyframe_kind == f'{fps_kind}:keyframe'
+    assert dup_finder.hash_store_kind(2.0, 'keyframe', 'signature') != \
+        dup_finder.hash_store_kind(2.0, 'fps', 'signature')
+
+
+def test_unknown_sampling_mode():
+    with pytest.raises(ValueError, match='sampling'):
+        dup_finder.compute_frame_hash_sequence('in.mkv', 1.0, sampling='scene')
+
+
+# (GOP of the first encode, of the second) in frames at 25 fps - sampled
+# every 4 s, above either.
+GOP_PAIRS = [(25, 25), (25, 75), (12, 100)]
+SAMPLE_INTERVAL = 4.0
+
+
+@pytest.mark.parametrize('gops', GOP_PAIRS, ids=[f'gop{a}-gop{b}' for a, b in GOP_PAIRS])
+def test_keyframe_sampling_matches(make_video, gops):
+    files = [
+        make_video(name=f'gop{gop}-{n}.mkv', duration=40.0, gop=gop, acodec=None)
+        for n, gop in enumerate(gops)
+    ]
+
+    distances = {}
+    for sampling in dup_finder.SAMPLING_MODES:
+        seq_a, seq_b = (
+            dup_finder.compute_frame_hash_sequence(filename, SAMPLE_INTERVAL, sampling=sampling)
+            for filename in files
+        )
+        # Still one sample per slot.
+        assert abs(len(seq_a) - 40 / SAMPLE_INTERVAL) <= 1
+        assert abs(len(seq_a) - len(seq_b)) <= 1
+        _, distances[sampling], _ = dup_finder.best_alignment(seq_a, seq_b, 0.5)
+
+    assert distances['fps'] <= dup_finder.DEFAULT_SEQUENCE_THRESHOLD
+    assert distances['keyframe'] <= dup_finder.DEFAULT_SEQUENCE_THRESHOLD
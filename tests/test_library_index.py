@@ -0,0 +1,161 @@
+'''Persistent duplicate index (`library_index.LibraryIndex`), kept current
+by `dup_finder.update_library_index` (`vudupcheck --update`) and queried
+by `dup_finder.find_duplicates_against` (`--against`), with the files
+served by the stub media backend.'''
+
+# System imports
+import os
+import sqlite3
+
+# External imports
+import numpy
+import pytest
+
+# Local imports
+from video_processing_utils import dup_finder, library_index
+from video_processing_utils.library_index import LibraryEntry, LibraryIndex
+
+KIND = dup_finder.hash_store_kind(1.0)
+
+
+def random_hashes(seed: int, count: int = 40) -> list[int]:
+    rng = numpy.random.default_rng(seed)
+    return numpy.frombuffer(rng.bytes(8 * count), dtype=numpy.uint64).tolist()
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = LibraryIndex(str(tmp_path / 'library.index'), KIND)
+    yield index
+    index.close()
+
+
+def test_entries_roundtrip(index):
+    entry = LibraryEntry(path='a.mkv', size_bytes=10, mtime_ns=20, inode=30,
+                         duration=60.0, width=1920, height=1080)
+    index.put(entry, numpy.array([1, 2**64 - 1], dtype=numpy.uint64))
+
+    assert len(index) == 1
+    assert index.entries() == {'a.mkv': entry}
+    assert index.sequence('a.mkv').tolist() == [1, 2**64 - 1]
+    assert index.sequence('missing.mkv') is None
+
+    index.remove(['a.mkv'])
+    assert len(index) == 0
+
+
+def test_kind_mismatch(index):
+    with pytest.raises(ValueError, match='holds .* sequences, not'):
+        LibraryIndex(index.path, dup_finder.hash_store_kind(2.0))
+    # The same kind opens fine.
+    LibraryIndex(index.path, KIND).close()
+
+
+def test_schema_version_mismatch(index):
+    index.close()
+    conn = sqlite3.connect(index.path)
+    conn.execute(f'PRAGMA user_version={library_index.SCHEMA_VERSION + 1}')
+    conn.close()
+
+    # Unlike the caches, never silently rebuilt.
+    with pytest.raises(ValueError, match='format version'):
+        LibraryIndex(index.path, KIND)
+    conn = sqlite3.connect(index.path)
+    assert conn.execute('SELECT COUNT(*) FROM meta').fetchone()[0] == 1
+    conn.close()
+
+
+@pytest.fixture
+def library(tmp_path, stub_backend, uncached_probes):
+    """Three library clips with unrelated frames, under tmp_path/'lib'
+    (one in a subdirectory)."""
+    (tmp_path / 'lib' / 'sub').mkdir(parents=True)
+    return [
+        stub_backend.add(str(tmp_path / 'lib' / name), hashes=random_hashes(n))
+        for n, name in enumerate(['0.mkv', '1.mkv', 'sub/2.mkv'])
+    ]
+
+
+def update(index, files: list[str]) -> tuple[int, int]:
+    root = os.path.dirname(files[0]) if files else ''
+    return dup_finder.update_library_index(index, files, root, 1.0)
+
+
+def test_update_is_incremental(index, library, stub_backend):
+    assert update(index, library) == (3, 0)
+    assert stub_backend.count('frames') == 3
+    # Stored relative to the root.
+    assert index.root == os.path.dirname(library[0])
+    assert sorted(index.entries()) == ['0.mkv', '1.mkv', 'sub/2.mkv']
+    assert index.sequence('0.mkv').tolist() == random_hashes(0)
+
+    # Nothing changed: nothing decoded.
+    assert update(index, library) == (0, 0)
+    assert stub_backend.count('frames') == 3
+
+    # A changed file is re-hashed, and only that one.
+    stub_backend.add(library[1], hashes=random_hashes(10))
+    with open(library[1], 'ab') as fp:
+        fp.write(b'new content')
+    assert update(index, library) == (1, 0)
+    assert stub_backend.count('frames') == 4
+    assert stub_backend.count('frames', library[1]) == 2
+    assert index.sequence('1.mkv').tolist() == random_hashes(10)
+    assert index.entries()['1.mkv'].size_bytes == len(b'new content')
+
+
+def test_update_drops_deleted(index, library):
+    update(index, library)
+    os.remove(library[2])
+
+    assert update(index, library[:2]) == (0, 1)
+    assert sorted(index.entries()) == ['0.mkv', '1.mkv']
+
+
+def test_update_drops_changed_file_that_fails(index, library, stub_backend):
+    update(index, library)
+    del stub_backend.files[os.path.abspath(library[0])]
+    with open(library[0], 'ab') as fp:
+        fp.write(b'corrupt')
+
+    # Not kept with its stale sequence.
+    assert update(index, library) == (0, 0)
+    assert sorted(index.entries()) == ['1.mkv', 'sub/2.mkv']
+
+
+def test_update_from_another_mount(tmp_path, index, library, stub_backend):
+    update(index, library)
+    # The same library, mounted somewhere else.
+    mount = tmp_path / 'mnt'
+    mount.symlink_to(tmp_path / 'lib')
+    remounted = [str(mount / os.path.relpath(path, tmp_path / 'lib')) for path in library]
+    for path in remounted:
+        stub_backend.add(path, hashes=random_hashes(0))
+
+    assert update(index, remounted) == (0, 0)
+    assert index.root == str(mount)
+    assert stub_backend.count('frames') == 3
+
+
+@pytest.mark.parametrize('candidates', ['duration', 'index'])
+def test_against_finds_indexed_duplicate(tmp_path, index, library, stub_backend, candidates):
+    update(index, library)
+    (tmp_path / 'new').mkdir()
+    # A copy of library clip 1, an unrelated clip, and an indexed clip,
+    # which isn't checked (or decoded) again.
+    copy = stub_backend.add(str(tmp_path / 'new' / 'copy.mkv'), hashes=random_hashes(1))
+    other = stub_backend.add(str(tmp_path / 'new' / 'other.mkv'), hashes=random_hashes(99))
+    decoded = stub_backend.count('frames')
+
+    groups, infos, matches = dup_finder.find_duplicates_against(
+        index, [copy, other, library[0]], 1.0,
+        sequence_threshold=dup_finder.DEFAULT_SEQUENCE_THRESHOLD,
+        min_overlap_fraction=0.5, max_duration_diff=300.0, candidates=candidates,
+    )
+
+    assert stub_backend.count('frames') == decoded + 2
+    assert [set(group) for group in groups] == [{copy, library[1]}]
+    assert [(match.file_a, match.file_b) for match in matches] == [(copy, library[1])]
+    assert matches[0].distance == 0
+    assert infos[library[1]].duration == 60.0
+    assert infos[library[1]].path == library[1]
@@ -0,0 +1,110 @@
+'''Media backends (`ffmpeg_utils.MediaBackend`): the backend interface, and
+parity of the optional PyAV backend with the default subprocess one.'''
+
+# System imports
+import importlib.util
+import subprocess
+
+# External imports
+import numpy
+import pytest
+
+# Local imports
+from video_processing_utils import audio_fingerprint, dup_finder, ffmpeg_utils
+
+# Containers/codecs the parity tests run on.
+PARITY_CLIPS = [
+    ('clip.mp4', 'mpeg4', 'aac'),
+    ('clip.mkv', 'mpeg4', 'aac'),
+    ('clip.webm', 'libvpx-vp9', 'libopus'),
+]
+
+
+def test_media_backend_is_abstract():
+    with pytest.raises(TypeError):
+        ffmpeg_utils.MediaBackend()
+
+    class ProbeOnly(ffmpeg_utils.MediaBackend):
+        def probe(self, filename, profile):
+            return {}
+
+    with pytest.raises(TypeError):
+        ProbeOnly()
+
+
+def test_set_backend():
+    try:
+        assert isinstance(ffmpeg_utils.set_backend('subprocess'), ffmpeg_utils.SubprocessBackend)
+        with pytest.raises(KeyError):
+            ffmpeg_utils.set_backend('gstreamer')
+        if importlib.util.find_spec('av') is None:
+            # Falls back rather than failing.
+            assert ffmpeg_utils.set_backend('pyav').name == 'subprocess'
+    finally:
+        ffmpeg_utils.set_backend('subprocess')
+
+
+@pytest.fixture(params=PARITY_CLIPS, ids=[clip[0] for clip in PARITY_CLIPS])
+def parity_clip(request, make_video):
+    name, vcodec, acodec = request.param
+    try:
+        return make_video(name=name, duration=10.0, size='320x240', vcodec=vcodec, acodec=acodec)
+    except subprocess.CalledProcessError:             # encoder not built in
+        pytest.skip(f"ffmpeg can't encode {vcodec}/{acodec}")
+
+
+@pytest.fixture
+def backends():
+    pytest.importorskip('av')
+    from video_processing_utils.pyav_backend import PyAVBackend
+
+    return ffmpeg_utils.SubprocessBackend(), PyAVBackend()
+
+
+def test_probe_parity(parity_clip, backends):
+    subprocess_data, pyav_data = (backend.probe(parity_clip, 'geometry') for backend in backends)
+
+    assert [stream['codec_type'] for stream in pyav_data['streams']] == \
+        [stream['codec_type'] for stream in subprocess_data['streams']]
+    for subprocess_stream, pyav_stream in zip(subprocess_data['streams'], pyav_data['streams']):
+        if subprocess_stream['codec_type'] == 'video':
+            assert (pyav_stream['width'], pyav_stream['height']) == \
+                (subprocess_stream['width'], subprocess_stream['height'])
+    assert float(pyav_data['format']['duration']) == \
+        pytest.approx(float(subprocess_data['format']['duration']), abs=0.05)
+
+
+@pytest.mark.parametrize('keyframes_only', [False, True])
+def test_frame_hash_parity(parity_clip, backends, keyframes_only):
+    subprocess_hashes, pyav_hashes = (
+        dup_finder.dhash_frames(backend.decode_gray_frames(
+            parity_clip, 1.0, dup_finder.FRAME_HASH_WIDTH, dup_finder.FRAME_HASH_HEIGHT,
+            keyframes_only=keyframes_only,
+        ))
+        for backend in backends
+    )
+
+    assert len(pyav_hashes) == len(subprocess_hashes) > 0
+    distances = numpy.unpackbits(
+        (pyav_hashes ^ subprocess_hashes).view(numpy.uint8).reshape(-1, 8), axis=1,
+    ).sum(axis=1)
+    # Both scale with swscale's bilinear filter, but the colour conversion
+    # path to grey can differ by a level here and there.
+    assert distances.mean() <= 2.0
+
+
+def test_audio_parity(parity_clip, backends):
+    rate = audio_fingerprint.SAMPLE_RATE
+    subprocess_pcm, pyav_pcm = (
+        numpy.frombuffer(
+            b''.join(bytes(chunk) for chunk in backend.iter_mono_audio(parity_clip, rate)),
+            dtype='<i2',
+        ).astype(numpy.float64)
+        for backend in backends
+    )
+
+    assert abs(len(pyav_pcm) - len(subprocess_pcm)) <= rate // 10
+    # The resamplers needn't agree sample for sample (hence the separate
+    # hash store kinds), but the waveforms have to.
+    length = min(len(pyav_pcm), len(subprocess_pcm))
+    assert numpy.corrcoef(pyav_pcm[:length], subprocess_pcm[:length])[0, 1] > 0.9
@@ -0,0 +1,136 @@
+'''Typed probe model (`media_info`): value parsing and `MediaInfo.from_probe`.'''
+
+# External imports
+import dataclasses
+
+import pytest
+
+# Local imports
+from video_processing_utils.media_info import (
+    MediaInfo, StreamInfo, parse_duration, parse_frame_rate,
+)
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('25', 25.0),
+    ('25/1', 25.0),
+    ('30000/1001', 30000 / 1001),
+    ('2997/100', 29.97),
+    ('0/0', None),
+    ('0/1', None),
+    ('25/0', None),
+    ('', None),
+    (None, None),
+    ('abc', None),
+    ('1/x', None),
+])
+def test_parse_frame_rate(value, expected):
+    result = parse_frame_rate(value)
+    if expected is None:
+        assert result is None
+    else:
+        assert result == pytest.approx(expected)
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('2537.123000', 2537.123),
+    ('0.000000', 0.0),
+    ('00:42:17.123000000', 42 * 60 + 17.123),
+    ('01:00:00.000000000', 3600.0),
+    (' 00:00:05.5\n', 5.5),
+    ('', None),
+    (None, None),
+    ('N/A', None),
+    ('00:xx:01', None),
+])
+def test_parse_duration(value, expected):
+    result = parse_duration(value)
+    if expected is None:
+        assert result is None
+    else:
+        assert result == pytest.approx(expected)
+
+
+PROBE = {
+    'format': {'duration': '1800.500000', 'format_name': 'matroska,webm'},
+    'streams': [
+        {
+            'index': 0, 'codec_type': 'video', 'codec_name': 'mjpeg',
+            'width': 600, 'height': 600, 'avg_frame_rate': '0/0', 'r_frame_rate': '90000/1',
+            'disposition': {'attached_pic': 1},
+        },
+        {
+            'index': 1, 'codec_type': 'video', 'codec_name': 'hevc',
+            'width': 1920, 'height': 1080, 'pix_fmt': 'yuv420p10le',
+            'avg_frame_rate': '0/0', 'r_frame_rate': '24000/1001',
+            'disposition': {'attached_pic': 0},
+            'tags': {'DURATION-eng': '00:30:00.500000000', 'language': 'eng'},
+        },
+        {
+            'index': 2, 'codec_type': 'audio', 'codec_name': 'opus',
+            'sample_rate': '48000', 'channel_layout': '5.1', 'start_time': '-0.007000',
+            'tags': {'DURATION': '00:30:00.493000000'},
+        },
+        {
+            'index': 3, 'codec_type': 'subtitle', 'codec_name': 'subrip',
+            'duration': '1700.0', 'nb_frames': '400',
+        },
+    ],
+}
+
+
+def test_from_probe():
+    media = MediaInfo.from_probe('film.mkv', PROBE)
+    assert media.filename == 'film.mkv'
+    assert media.duration == 1800.5
+    assert [stream.index for stream in media.streams] == [0, 1, 2, 3]
+
+    # The cover is split off from the real video.
+    assert [stream.index for stream in media.attached_pics] == [0]
+    assert [stream.index for stream in media.video_streams] == [1]
+    assert [stream.index for stream in media.audio_streams] == [2]
+    assert media.primary_video is media.video_streams[0]
+
+    video = media.primary_video
+    assert (video.codec_name, video.width, video.height, video.pix_fmt) == \
+        ('hevc', 1920, 1080, 'yuv420p10le')
+    # avg_frame_rate '0/0' falls back to r_frame_rate.
+    assert video.frame_rate == pytest.approx(24000 / 1001)
+    # No duration field: the DURATION-<lang> tag.
+    assert video.duration == pytest.approx(1800.5)
+
+    audio = media.audio_streams[0]
+    assert (audio.sample_rate, audio.channel_layout) == (48000, '5.1')
+    assert audio.duration == pytest.approx(1800.493)
+    assert audio.start_time == pytest.approx(-0.007)
+    assert audio.frame_rate is None
+
+    subtitle = media.streams[3]
+    assert (subtitle.duration, subtitle.nb_frames) == (1700.0, 400)
+
+
+def test_from_probe_sparse():
+    # Narrow profiles leave most fields out.
+    media = MediaInfo.from_probe('clip.mp4', {'streams': [
+        {'codec_type': 'video', 'width': 'x'},
+    ]})
+    assert media.duration is None
+    assert media.primary_video == StreamInfo(index=0, codec_type='video')
+
+    empty = MediaInfo.from_probe('empty.mkv', {})
+    assert empty.streams == empty.video_streams == ()
+    assert empty.primary_video is None
+
+
+def test_stream_duration_beats_tag():
+    stream = StreamInfo.from_probe({
+        'codec_type': 'audio', 'duration': '10.0', 'tags': {'DURATION': '00:00:20.0'},
+    })
+    assert stream.duration == 10.0
+
+
+def test_frozen_and_slotted():
+    media = MediaInfo.from_probe('film.mkv', PROBE)
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        media.duration = 1.0
+    assert not hasattr(media.primary_video, '__dict__')
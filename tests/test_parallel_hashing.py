@@ -0,0 +1,80 @@
+'''Hashing many files concurrently (`dup_finder.iter_frame_hash_sequences`,
+`dup_finder.hash_video_files`), against the stub media backend.'''
+
+# System imports
+import os
+
+# External imports
+import ffmpeg
+import numpy
+import pytest
+
+# Local imports
+from video_processing_utils import dup_finder
+
+
+@pytest.fixture
+def clips(tmp_path, stub_backend, uncached_probes):
+    """Eight clips whose frames hash to distinct sequences (the n-th
+    `[n, n + 1, ...]`, n + 2 frames long), the first one slowest to
+    decode, and a file that fails to decode third."""
+    paths = [
+        stub_backend.add(str(tmp_path / f'{n}.mkv'), hashes=list(range(n, 2 * n + 2)),
+                         delay=0.2 if n == 0 else 0.0)
+        for n in range(8)
+    ]
+    broken = tmp_path / 'broken.mkv'
+    broken.write_bytes(b'')
+    paths.insert(2, str(broken))
+    return paths
+
+
+def expected_sequence(path: str) -> list[int]:
+    n = int(os.path.basename(path).split('.')[0])
+    return list(range(n, 2 * n + 2))
+
+
+@pytest.mark.parametrize('jobs', [1, 4])
+def test_results_in_order(clips, jobs):
+    results = list(dup_finder.iter_frame_hash_sequences(clips, 1.0, jobs=jobs))
+
+    assert [result.path for result in results] == clips
+    for result in results:
+        if result.path.endswith('broken.mkv'):
+            # Reported on its own result, the rest of the batch carries on.
+            assert result.sequence is None
+            assert isinstance(result.error, ffmpeg.errors.FFmpegError)
+        else:
+            assert result.error is None
+            assert result.sequence.tolist() == expected_sequence(result.path)
+
+
+def test_concurrency_is_bounded(clips, stub_backend):
+    stub_backend.delay = 0.05
+    list(dup_finder.iter_frame_hash_sequences(clips, 1.0, jobs=3))
+    assert stub_backend.peak == 3
+    assert stub_backend.count('frames') == len(clips)
+
+
+@pytest.mark.parametrize('jobs, cpus, threads', [
+    (1, 8, None),
+    (2, 8, 4),
+    (3, 8, 2),
+    (16, 8, 1),
+    (4, None, 1),
+])
+def test_decoder_threads_per_job(clips, stub_backend, monkeypatch, jobs, cpus, threads):
+    monkeypatch.setattr(dup_finder.os, 'cpu_count', lambda: cpus)
+    assert dup_finder.decode_threads_per_job(jobs) == threads
+
+    list(dup_finder.iter_frame_hash_sequences(clips, 1.0, jobs=jobs))
+    assert stub_backend.decode_threads == [threads] * len(clips)
+
+
+def test_hash_video_files_skips_failures(clips):
+    arena = dup_finder.hash_video_files(clips, 1.0, jobs=4)
+    hashed = [path for path in clips if not path.endswith('broken.mkv')]
+
+    assert list(arena) == hashed
+    for path in hashed:
+        numpy.testing.assert_array_equal(arena.get(path), expected_sequence(path))
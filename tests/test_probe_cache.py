@@ -0,0 +1,162 @@
+'''Persistent probe cache (`probe_cache.ProbeCache`) and its use by
+`ffmpeg_utils.fetch_file_data`.'''
+
+# System imports
+import os
+
+# External imports
+import pytest
+
+# Local imports
+from video_processing_utils import ffmpeg_utils, probe_cache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = probe_cache.ProbeCache(str(tmp_path / 'cache'))
+    yield cache
+    cache.close()
+
+
+@pytest.fixture
+def media_file(tmp_path):
+    path = tmp_path / 'clip.mkv'
+    path.write_bytes(b'x' * 100)
+    return str(path)
+
+
+def test_hit(cache, media_file):
+    assert cache.get(media_file, 'ffprobe') is None
+    cache.put(media_file, 'ffprobe', b'{"streams": []}')
+
+    assert cache.get(media_file, 'ffprobe') == b'{"streams": []}'
+    # Relative paths name the same entry.
+    assert cache.get(os.path.relpath(media_file), 'ffprobe') == b'{"streams": []}'
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_kinds_are_separate(cache, media_file):
+    cache.put(media_file, 'ffprobe', b'full')
+    assert cache.get(media_file, 'ffprobe:codec') is None
+    cache.put(media_file, 'ffprobe:codec', b'codec')
+    assert cache.get(media_file, 'ffprobe') == b'full'
+
+
+def test_persists(tmp_path, media_file):
+    first = probe_cache.ProbeCache(str(tmp_path / 'cache'))
+    first.put(media_file, 'ffprobe', b'data')
+    first.close()
+
+    second = probe_cache.ProbeCache(str(tmp_path / 'cache'))
+    assert second.get(media_file, 'ffprobe') == b'data'
+    second.close()
+
+
+def test_miss_after_size_change(cache, media_file):
+    cache.put(media_file, 'ffprobe', b'data')
+    stat = os.stat(media_file)
+    with open(media_file, 'ab') as fp:
+        fp.write(b'more')
+    # Same mtime - only the size tells.
+    os.utime(media_file, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert cache.get(media_file, 'ffprobe') is None
+
+
+def test_miss_after_touch(cache, media_file):
+    cache.put(media_file, 'ffprobe', b'data')
+    stat = os.stat(media_file)
+    os.utime(media_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert cache.get(media_file, 'ffprobe') is None
+
+
+def test_miss_after_replace(cache, tmp_path, media_file):
+    cache.put(media_file, 'ffprobe', b'data')
+    stat = os.stat(media_file)
+    # Same size and mtime, but another file (inode) now.
+    replacement = tmp_path / 'replacement'
+    replacement.write_bytes(b'y' * 100)
+    os.utime(replacement, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    keep = tmp_path / 'old'
+    os.rename(media_file, keep)  # keep the old inode from being reused
+    os.rename(replacement, media_file)
+    assert cache.get(media_file, 'ffprobe') is None
+
+
+def test_missing_file(cache, tmp_path):
+    missing = str(tmp_path / 'missing.mkv')
+    cache.put(missing, 'ffprobe', b'data')
+    assert cache.get(missing, 'ffprobe') is None
+    assert cache.misses == 1
+
+
+def test_invalidate_and_clear(cache, tmp_path, media_file):
+    other = tmp_path / 'other.mkv'
+    other.write_bytes(b'z')
+    cache.put(media_file, 'ffprobe', b'a')
+    cache.put(media_file, 'ffmetadata', b'b')
+    cache.put(str(other), 'ffprobe', b'c')
+
+    cache.invalidate(media_file)
+    assert cache.get(media_file, 'ffprobe') is None
+    assert cache.get(media_file, 'ffmetadata') is None
+    assert cache.get(str(other), 'ffprobe') == b'c'
+
+    cache.clear()
+    assert cache.get(str(other), 'ffprobe') is None
+
+
+def test_prune_to_size_limit(tmp_path, monkeypatch):
+    monkeypatch.setattr(probe_cache, 'PRUNE_INTERVAL', 5)
+    # Every insert a day apart, so the least recently used are well defined.
+    now = [1_000_000_000]
+    monkeypatch.setattr(probe_cache.time, 'time', lambda: now[0])
+    cache = probe_cache.ProbeCache(str(tmp_path / 'cache'), max_entries=8)
+
+    files = []
+    for n in range(10):
+        path = tmp_path / f'{n}.mkv'
+        path.write_bytes(b'x')
+        files.append(str(path))
+        cache.put(files[-1], 'ffprobe', str(n).encode())
+        now[0] += probe_cache.LAST_USED_RESOLUTION + 1
+        if n == 2:
+            # A hit more than a day on refreshes the entry's last use.
+            assert cache.get(files[0], 'ffprobe') == b'0'
+
+    # Pruned on the 5th and 10th inserts: the 2 least recently used go.
+    count = cache._conn.execute('SELECT COUNT(*) FROM probe').fetchone()[0]
+    assert count == 8
+    kept = [path for path in files if cache.get(path, 'ffprobe') is not None]
+    assert kept == [files[0]] + files[3:]
+    cache.close()
+
+
+def test_fetch_file_data_uses_cache(tmp_path, stub_backend):
+    ffmpeg_utils.configure_probe_cache(cache_dir=str(tmp_path / 'cache'))
+    try:
+        clip = stub_backend.add(str(tmp_path / 'clip.mkv'), duration=12.5)
+        first = ffmpeg_utils.fetch_file_data(clip, profile='geometry')
+        second = ffmpeg_utils.fetch_file_data(clip, profile='geometry')
+        assert first == second
+        assert first['format']['duration'] == '12.500000'
+        assert stub_backend.count('probe') == 1
+
+        # Another profile is another entry.
+        ffmpeg_utils.fetch_file_data(clip, profile='codec')
+        assert stub_backend.count('probe') == 2
+        assert ffmpeg_utils.get_probe_cache().hits == 1
+    finally:
+        ffmpeg_utils.configure_probe_cache()
+
+
+def test_disabled(tmp_path, stub_backend):
+    ffmpeg_utils.configure_probe_cache(enabled=False, cache_dir=str(tmp_path / 'cache'))
+    try:
+        assert ffmpeg_utils.get_probe_cache() is None
+        clip = stub_backend.add(str(tmp_path / 'clip.mkv'))
+        ffmpeg_utils.fetch_file_data(clip)
+        ffmpeg_utils.fetch_file_data(clip)
+        assert stub_backend.count('probe') == 2
+        assert not (tmp_path / 'cache').exists()
+    finally:
+        ffmpeg_utils.configure_probe_cache()
@@ -0,0 +1,49 @@
+'''ffprobe profiles (`ffmpeg_utils.PROBE_PROFILES`).'''
+
+# System imports
+import json
+
+# External imports
+import pytest
+
+# Local imports
+from video_processing_utils import ffmpeg_utils
+
+
+@pytest.fixture
+def chaptered_clip(make_video):
+    return make_video(name='chapters.mkv', chapters=40)
+
+
+@pytest.mark.parametrize('profile, stream_fields', [
+    ('codec', {'index', 'codec_type', 'codec_name'}),
+    ('geometry', {'index', 'codec_type'}),
+    ('concat', {'index', 'codec_type', 'codec_name'}),
+])
+def test_narrow_profile_has_caller_fields(chaptered_clip, uncached_probes, profile, stream_fields):
+    data = ffmpeg_utils.fetch_file_data(chaptered_clip, profile=profile)
+    assert 'chapters' not in data
+    assert [stream['codec_type'] for stream in data['streams']] == ['video', 'audio']
+    for stream in data['streams']:
+        assert stream_fields <= set(stream)
+    if profile in ('geometry', 'concat'):
+        video = data['streams'][0]
+        assert (video['width'], video['height']) == (160, 120)
+        assert float(data['format']['duration']) == pytest.approx(4.0, abs=0.1)
+    if profile == 'concat':
+        assert data['streams'][1]['sample_rate'] == '44100'
+
+
+def test_narrow_profiles_output_less_than_full(chaptered_clip, uncached_probes):
+    sizes = {
+        profile: len(json.dumps(ffmpeg_utils.fetch_file_data(chaptered_clip, profile=profile)))
+        for profile in ffmpeg_utils.PROBE_PROFILES
+    }
+    assert len(ffmpeg_utils.fetch_file_data(chaptered_clip, profile='full')['chapters']) == 40
+    for profile in ('codec', 'geometry', 'concat'):
+        assert sizes[profile] < sizes['streams'] < sizes['full']
+
+
+def test_unknown_profile():
+    with pytest.raises(KeyError):
+        ffmpeg_utils.fetch_file_data('whatever.mkv', profile='nope')
@@ -0,0 +1,75 @@
+'''`sequence_arena.SequenceArena`: storage round trip, and the number of
+memory maps (and file descriptors) it holds when adds and gets take turns.'''
+
+# System imports
+import os
+
+# External imports
+import numpy
+import pytest
+
+# Local imports
+from video_processing_utils.sequence_arena import MIN_MAP_ELEMENTS, SequenceArena
+
+
+def test_round_trip(tmp_path):
+    rng = numpy.random.default_rng(23)
+    sequences = {
+        'empty.mkv': numpy.empty(0, dtype=numpy.uint64),
+        'a.mkv': rng.integers(0, 1 << 63, size=100, dtype=numpy.uint64),
+        'wide.mkv': rng.integers(0, 1 << 63, size=(30, 12), dtype=numpy.uint64),
+        'list.mkv': [1, 2, 3],
+    }
+    arena = SequenceArena(directory=str(tmp_path))
+    for key, sequence in sequences.items():
+        arena.add(key, sequence)
+
+    assert len(arena) == 4 and list(arena) == list(sequences)
+    assert 'a.mkv' in arena and 'b.mkv' not in arena
+    assert arena.get('b.mkv') is None
+    assert arena.nbytes == 8 * (100 + 30 * 12 + 3)
+    for (key, stored), expected in zip(arena.items(), sequences.values()):
+        numpy.testing.assert_array_equal(stored, numpy.asarray(expected, dtype=numpy.uint64))
+        assert stored.shape == numpy.shape(expected)
+        assert not stored.flags.writeable
+
+    arena.add('a.mkv', [7])
+    assert arena.get('a.mkv').tolist() == [7]
+    arena.close()
+
+
+def open_fds() -> int:
+    return len(os.listdir('/proc/self/fd'))
+
+
+def mappings_of(directory) -> int:
+    with open('/proc/self/maps', encoding='utf-8') as fp:
+        return sum(str(directory) in line for line in fp)
+
+
+@pytest.mark.skipif(not os.path.exists('/proc/self/maps'), reason="needs /proc")
+def test_interleaved_add_and_get(tmp_path):
+    # As find_duplicates_against does with library sequences loaded on
+    # demand: every add followed by a get, with the views kept.
+    rng = numpy.random.default_rng(0)
+    arena = SequenceArena(directory=str(tmp_path))
+    fds_before = open_fds()
+
+    expected, views = [], []
+    for n in range(3000):
+        sequence = rng.integers(0, 1 << 63, size=int(rng.integers(1, 400)), dtype=numpy.uint64)
+        arena.add(f'{n}.mkv', sequence)
+        views.append(arena.get(f'{n}.mkv'))
+        expected.append(sequence)
+
+    # ~600k elements: a handful of maps, grown by doubling - not one per get.
+    max_maps = (arena.nbytes // 8 // MIN_MAP_ELEMENTS).bit_length() + 1
+    assert mappings_of(tmp_path) <= max_maps
+    assert open_fds() - fds_before <= max_maps
+    # Every view, from whichever map, still reads what was added.
+    for view, sequence in zip(views, expected):
+        numpy.testing.assert_array_equal(view, sequence)
+
+    arena.close()
+    del views
+    assert open_fds() <= fds_before
@@ -0,0 +1,160 @@
+'''Sharded scans: the shard assignment (`dup_finder.shard_index`,
+`select_shard`), and merging shards hashed on differently mounted
+machines (`dup_finder.find_duplicates_in_shards`) against a single-machine
+scan, with the files served by the stub media backend.'''
+
+# System imports
+import logging
+import os
+
+# External imports
+import numpy
+import pytest
+
+# Local imports
+from video_processing_utils import dup_finder
+from video_processing_utils.library_index import LibraryIndex
+
+KIND = dup_finder.hash_store_kind(1.0)
+MATCH_OPTIONS = {
+    'sequence_threshold': dup_finder.DEFAULT_SEQUENCE_THRESHOLD,
+    'min_overlap_fraction': 0.5,
+    'max_duration_diff': 300.0,
+}
+
+
+@pytest.mark.parametrize('relative, num_shards, shard', [
+    # Pinned: machines running different versions must still agree.
+    ('a.mkv', 3, 1),
+    ('a.mkv', 7, 2),
+    ('Season 1/Episode 1.mkv', 3, 1),
+    ('Season 1/Episode 1.mkv', 7, 5),
+    ('x/y/z.mp4', 7, 2),
+])
+def test_shard_index_is_stable(relative, num_shards, shard):
+    for root in ('/lib', '/mnt/other/mount', 'relative/root'):
+        path = os.path.join(root, *relative.split('/'))
+        assert dup_finder.shard_index(path, root, num_shards) == shard
+
+
+def test_select_shard_partitions():
+    files = [f'/lib/dir{n % 7}/file{n}.mkv' for n in range(500)]
+    shards = [dup_finder.select_shard(files, '/lib', shard, 4) for shard in range(4)]
+
+    assert sorted(path for shard in shards for path in shard) == sorted(files)
+    for shard in shards:
+        # Roughly even, in file_list order.
+        assert 80 < len(shard) < 170
+        assert shard == [path for path in files if path in set(shard)]
+
+    # Listing order, and other files coming and going, move nothing.
+    more = list(reversed(files)) + [f'/lib/new{n}.mkv' for n in range(100)]
+    for shard_number, shard in enumerate(shards):
+        assert set(shard) <= set(dup_finder.select_shard(more, '/lib', shard_number, 4))
+
+
+def random_hashes(seed: int, count: int = 40) -> numpy.ndarray:
+    return numpy.frombuffer(numpy.random.default_rng(seed).bytes(8 * count), dtype=numpy.uint64)
+
+
+@pytest.fixture
+def library(tmp_path, stub_backend, uncached_probes):
+    """A library with two duplicate groups among unrelated files, and two
+    other mount points of it (symlinks) registered with the stub too."""
+    root = tmp_path / 'library'
+    contents = {
+        'a.mkv': 1, 'Season 1/a copy.mkv': 1, 'Season 1/a again.mkv': 1,
+        'b.mkv': 2, 'Season 2/b copy.mkv': 2,
+        **{f'Season {n % 3}/other{n}.mkv': 100 + n for n in range(8)},
+    }
+    for mount in ('library', 'mount1', 'mount2'):
+        if mount != 'library':
+            (tmp_path / mount).symlink_to(root)
+        for relative, seed in contents.items():
+            path = tmp_path / mount / relative
+            path.parent.mkdir(parents=True, exist_ok=True)
+            stub_backend.add(str(path), hashes=random_hashes(seed))
+    return root
+
+
+def hash_shards(tmp_path, num_shards: int, name: str) -> list[str]:
+    """Hash shard I of `num_shards` on mount (I % 2) + 1, as
+    `vudupcheck --path MOUNT -r --hash-only SHARD --shard I/N` would."""
+    shard_paths = []
+    for shard in range(num_shards):
+        mount = str(tmp_path / f'mount{shard % 2 + 1}')
+        files = dup_finder.select_shard(
+            dup_finder.scan_for_video_files(mount, True), mount, shard, num_shards,
+        )
+        shard_paths.append(str(tmp_path / f'{name}{shard}.shard'))
+        index = LibraryIndex(shard_paths[-1], KIND)
+        dup_finder.update_library_index(index, files, mount, 1.0)
+        index.close()
+    return shard_paths
+
+
+def merge(shard_paths: list[str], base_path: str = ''):
+    shards = [LibraryIndex(path, KIND) for path in shard_paths]
+    try:
+        return dup_finder.find_duplicates_in_shards(shards, 1.0, **MATCH_OPTIONS, base_path=base_path)
+    finally:
+        for shard in shards:
+            shard.close()
+
+
+def single_machine_scan(root) -> tuple:
+    return dup_finder.find_duplicates(
+        dup_finder.scan_for_video_files(str(root), True), 1.0, **MATCH_OPTIONS,
+    )
+
+
+def summary(groups, infos, matches) -> tuple:
+    return (
+        sorted(sorted(group) for group in groups),
+        sorted(infos),
+        sorted((match.file_a, match.file_b, match.distance) for match in matches),
+    )
+
+
+def test_merge_matches_single_machine_scan(tmp_path, library):
+    expected = summary(*single_machine_scan(library))
+    assert len(expected[0]) == 2
+
+    shard_paths = hash_shards(tmp_path, 3, 'n3-')
+    # Reported under the local mount point, however the shards were hashed.
+    assert summary(*merge(shard_paths, str(library))) == expected
+
+    # Or relative to the library root.
+    groups, infos, _ = merge(shard_paths)
+    assert sorted(infos) == sorted(os.path.relpath(path, library) for path in expected[1])
+    assert ['Season 1/a again.mkv', 'Season 1/a copy.mkv', 'a.mkv'] in \
+        [sorted(group) for group in groups]
+
+
+def test_merge_dedupes_across_resharding(tmp_path, library, caplog):
+    expected = summary(*single_machine_scan(library))
+    # Shards of an earlier 2-way split still lying around next to a 3-way one.
+    shard_paths = hash_shards(tmp_path, 2, 'n2-') + hash_shards(tmp_path, 3, 'n3-')
+
+    with caplog.at_level(logging.WARNING):
+        result = merge(shard_paths, str(library))
+    assert summary(*result) == expected
+    assert '13 file(s) are in more than one shard' in caplog.text
+
+
+def test_merge_prefers_newest_version(tmp_path, library, stub_backend):
+    old_shards = hash_shards(tmp_path, 1, 'old-')
+    # b.mkv is re-encoded into something else, and only re-hashed by a
+    # later shard.
+    changed = library / 'b.mkv'
+    changed.write_bytes(b're-encoded')
+    os.utime(changed, ns=(0, os.stat(changed).st_mtime_ns + 10**9))
+    for mount in ('mount1', 'mount2'):
+        stub_backend.add(str(tmp_path / mount / 'b.mkv'), hashes=random_hashes(50))
+    new_shards = hash_shards(tmp_path, 1, 'new-')
+
+    for shard_paths in (old_shards + new_shards, new_shards + old_shards):
+        groups, _, _ = merge(shard_paths)
+        assert sorted(sorted(group) for group in groups) == [
+            ['Season 1/a again.mkv', 'Season 1/a copy.mkv', 'a.mkv'],
+        ]
@@ -0,0 +1,105 @@
+'''MPEG-7 signature engine (`video_signature`): the thermometer coding,
+reading ffmpeg's XML output, aligning signature rows, and - with ffmpeg -
+signing real clips.'''
+
+# External imports
+import numpy
+import pytest
+
+# Local imports
+from video_processing_utils import dup_finder, video_signature
+
+ELEMENTS = video_signature.SIGNATURE_ELEMENTS
+
+
+def random_signatures(rng: numpy.random.Generator, frames: int) -> numpy.ndarray:
+    return rng.integers(0, 3, size=(frames, ELEMENTS), dtype=numpy.uint8)
+
+
+def hamming(rows_a: numpy.ndarray, rows_b: numpy.ndarray) -> numpy.ndarray:
+    return numpy.unpackbits((rows_a ^ rows_b).view(numpy.uint8), axis=-1).sum(axis=-1)
+
+
+def test_hamming_distance_is_l1():
+    rng = numpy.random.default_rng(25)
+    signatures_a = random_signatures(rng, 500)
+    # Some pairs close, as real matches would be.
+    signatures_b = numpy.where(rng.random((500, ELEMENTS)) < 0.9, signatures_a,
+                               random_signatures(rng, 500))
+
+    coded_a = video_signature.encode_signatures(signatures_a)
+    coded_b = video_signature.encode_signatures(signatures_b)
+    assert coded_a.shape == (500, video_signature.SIGNATURE_WORDS)
+    assert coded_a.dtype == numpy.uint64
+
+    l1 = numpy.abs(signatures_a.astype(int) - signatures_b.astype(int)).sum(axis=1)
+    numpy.testing.assert_array_equal(hamming(coded_a, coded_b), l1)
+
+
+def test_extreme_signatures():
+    coded = video_signature.encode_signatures(numpy.array([
+        [0] * ELEMENTS, [2] * ELEMENTS,
+    ], dtype=numpy.uint8))
+    assert hamming(coded[0], coded[1]) == video_signature.SIGNATURE_BITS
+    # The padding out to whole words stays clear.
+    assert numpy.unpackbits(coded[1].view(numpy.uint8)).sum() == video_signature.SIGNATURE_BITS
+
+
+def write_xml(path, frames: list[str]) -> str:
+    path.write_text(
+        '<?xml version="1.0" encoding="ISO-8859-1"?>\n'
+        '<Mpeg7 xmlns="urn:mpeg:mpeg7:schema:2001"><DescriptionUnit><Descriptor>'
+        '<VideoSignatureRegion>' +
+        ''.join(f'<VSVideoSegment><FrameSignature>{frame}</FrameSignature></VSVideoSegment>'
+                for frame in frames) +
+        '</VideoSignatureRegion></Descriptor></DescriptionUnit></Mpeg7>\n'
+    )
+    return str(path)
+
+
+def test_read_xml_signatures(tmp_path):
+    rng = numpy.random.default_rng(0)
+    signatures = random_signatures(rng, 3)
+    filename = write_xml(tmp_path / 'sig.xml', [
+        ' '.join(map(str, signature)) for signature in signatures
+    ])
+    numpy.testing.assert_array_equal(video_signature._read_xml_signatures(filename), signatures)
+
+    empty = video_signature._read_xml_signatures(write_xml(tmp_path / 'empty.xml', []))
+    assert empty.shape == (0, ELEMENTS)
+
+
+@pytest.mark.parametrize('frame', ['0 1 2', ' '.join(['3'] * ELEMENTS)],
+                         ids=['short', 'out of range'])
+def test_read_malformed_signatures(tmp_path, frame):
+    with pytest.raises(ValueError, match='malformed'):
+        video_signature._read_xml_signatures(write_xml(tmp_path / 'sig.xml', [frame]))
+
+
+def test_alignment_scores_l1():
+    rng = numpy.random.default_rng(1)
+    signatures_a = random_signatures(rng, 60)
+    signatures_b = signatures_a[10:50].copy()
+    signatures_b[rng.random(signatures_b.shape) < 0.05] = 1
+
+    offset, avg_distance, overlap = dup_finder.best_alignment(
+        video_signature.encode_signatures(signatures_a),
+        video_signature.encode_signatures(signatures_b), 0.5,
+    )
+    assert (offset, overlap) == (10, 40)
+    l1 = numpy.abs(signatures_a[10:50].astype(int) - signatures_b.astype(int)).sum(axis=1)
+    assert avg_distance == pytest.approx(l1.mean())
+
+
+def test_signature_sequences_match(make_video):
+    files = [
+        make_video(name=f'gop{gop}.mkv', duration=20.0, size='320x240', gop=gop, acodec=None)
+        for gop in (25, 75)
+    ]
+    seq_a, seq_b = (video_signature.compute_signature_sequence(filename, 1.0) for filename in files)
+    assert seq_a.shape[1] == video_signature.SIGNATURE_WORDS
+    assert abs(len(seq_a) - 20) <= 1
+
+    offset, avg_distance, _ = dup_finder.best_alignment(seq_a, seq_b, 0.5)
+    assert offset == 0
+    assert avg_distance <= video_signature.SIGNATURE_THRESHOLD